@@ -292,6 +292,8 @@ PRINTFUL_MERCH_PRODUCT_URL_TEMPLATE = os.getenv("PRINTFUL_MERCH_PRODUCT_URL_TEMP
 PRINTFUL_MERCH_LIMIT = max(0, _int_env("PRINTFUL_MERCH_LIMIT", 8))
 PRINTFUL_MERCH_CACHE_SECONDS = max(0, _int_env("PRINTFUL_MERCH_CACHE_SECONDS", 300))
 PRINTFUL_TIMEOUT_SECONDS = max(0.5, _float_env("PRINTFUL_TIMEOUT_SECONDS", 4.0))
+PRINTFUL_FETCH_WORKERS = max(1, _int_env("PRINTFUL_FETCH_WORKERS", 4))
+PRINTFUL_RATE_LIMIT_PER_MINUTE = max(1, _int_env("PRINTFUL_RATE_LIMIT_PER_MINUTE", 120))
 PRINTFUL_MERCH_SHOW_PRICE = _bool_env("PRINTFUL_MERCH_SHOW_PRICE", "True")
 PRINTFUL_WEBHOOK_SECRET = os.getenv("PRINTFUL_WEBHOOK_SECRET", "")
 SHOP_SHARED_DATA_KEY = os.getenv("SHOP_SHARED_DATA_KEY", "bgm-shop-data-v3")
@@ -346,10 +348,11 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
+    "django.contrib.postgres",
 
     "whitenoise.runserver_nostatic",   # для локалки без дубля статики
     "django.contrib.staticfiles",
-    "store",
+    "store.apps.StoreConfig",
 ]
 
 # ── Middleware ───────────────────────────────────────────────────────────
@@ -413,6 +416,74 @@ DATABASES = {
     )
 }
 
+# ── Кэш ──────────────────────────────────────────────────────────────────
+# Version keys (store settings, catalog) and cached payloads must be seen by every gunicorn
+# worker, cron job and worker dyno, so the default is the database cache table created by
+# `createcachetable` in the release phase. The test runner keeps local memory.
+_DEFAULT_CACHE_BACKEND = (
+    "django.core.cache.backends.locmem.LocMemCache"
+    if RUNNING_TESTS
+    else "django.core.cache.backends.db.DatabaseCache"
+)
+_CACHE_BACKEND = os.getenv("DJANGO_CACHE_BACKEND", _DEFAULT_CACHE_BACKEND)
+CACHES = {
+    "default": {
+        "BACKEND": _CACHE_BACKEND,
+        "LOCATION": os.getenv(
+            "DJANGO_CACHE_LOCATION",
+            "bgm_cache" if _CACHE_BACKEND.endswith(".DatabaseCache") else "",
+        ),
+    }
+}
+# A process-local backend cannot carry invalidations to other processes: the caches below
+# that rely on a shared version key default to off with it.
+CACHE_IS_SHARED = _CACHE_BACKEND not in {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+# Pricing/shipping/inventory singletons are snapshotted per process. Workers re-check the
+# shared version key every STORE_SETTINGS_VERSION_CHECK_SECONDS; 0 disables the snapshot.
+STORE_SETTINGS_SNAPSHOT_SECONDS = (
+    0 if RUNNING_TESTS else max(0, _int_env("STORE_SETTINGS_SNAPSHOT_SECONDS", 300 if CACHE_IS_SHARED else 0))
+)
+STORE_SETTINGS_VERSION_CHECK_SECONDS = max(0, _int_env("STORE_SETTINGS_VERSION_CHECK_SECONDS", 5))
+
+# Storefront filter facets are cached per catalog version (bumped by catalog signals);
+# 0 rebuilds them on every request.
+STORE_FACETS_CACHE_SECONDS = (
+    0 if RUNNING_TESTS else max(0, _int_env("STORE_FACETS_CACHE_SECONDS", 86400 if CACHE_IS_SHARED else 0))
+)
+
+# Storefront listing JSON is cached per catalog version + query; browsers/CDNs may reuse
+# anonymous responses for STORE_LISTING_MAX_AGE and serve them stale while revalidating.
+STORE_LISTING_CACHE_SECONDS = (
+    0 if RUNNING_TESTS else max(0, _int_env("STORE_LISTING_CACHE_SECONDS", 3600 if CACHE_IS_SHARED else 0))
+)
+STORE_LISTING_MAX_AGE = max(0, _int_env("STORE_LISTING_MAX_AGE", 60))
+STORE_LISTING_STALE_WHILE_REVALIDATE = max(0, _int_env("STORE_LISTING_STALE_WHILE_REVALIDATE", 300))
+
+# Merch shipping quotes live in the shared cache keyed on country / region / postal prefix
+# and the cart's variants. Quotes past FRESH are served for up to STALE more seconds while a
+# background refresh runs; FRESH=0 (the default with a process-local cache) sends every quote
+# to Printful.
+PRINTFUL_SHIPPING_QUOTE_FRESH_SECONDS = (
+    0
+    if RUNNING_TESTS
+    else max(0, _int_env("PRINTFUL_SHIPPING_QUOTE_FRESH_SECONDS", 300 if CACHE_IS_SHARED else 0))
+)
+PRINTFUL_SHIPPING_QUOTE_STALE_SECONDS = max(0, _int_env("PRINTFUL_SHIPPING_QUOTE_STALE_SECONDS", 6 * 3600))
+PRINTFUL_SHIPPING_QUOTE_POSTAL_PREFIX = max(0, _int_env("PRINTFUL_SHIPPING_QUOTE_POSTAL_PREFIX", 3))
+
+# Supplier image URL checks are kept in the RemoteImageCheckRecord table; older entries are
+# revalidated with conditional requests. 0 revalidates every URL on every run.
+STORE_IMAGE_CHECK_TTL_SECONDS = max(0, _int_env("STORE_IMAGE_CHECK_TTL_SECONDS", 7 * 86400))
+
+# Supplier catalog responses are kept on disk (gzip) and revalidated with conditional
+# requests; the supplier import commands' --offline flag replays the stored snapshot.
+# Dyno disk is ephemeral and per container: use a persistent volume to keep snapshots.
+STORE_SUPPLIER_HTTP_CACHE_DIR = os.getenv("STORE_SUPPLIER_HTTP_CACHE_DIR", BASE_DIR / "var" / "supplier-http-cache")
+
 # ── Пароли ───────────────────────────────────────────────────────────────
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
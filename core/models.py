@@ -4590,11 +4590,15 @@ class BookingDayOverride(models.Model):
         return f"{self.date} — {self.get_status_display()}"
 
     @classmethod
-    def resolve_status(cls, day_value, override=None):
+    def resolve_status(cls, day_value, override=None, *, lookup=True):
+        """
+        Booking status for a day. Without `override` the row is looked up, unless
+        `lookup` is False because the caller already loaded the range's overrides.
+        """
         if isinstance(day_value, datetime):
             day_value = day_value.date()
         default_closed = day_value.weekday() >= 5
-        if override is None:
+        if override is None and lookup:
             override = cls.objects.filter(date=day_value).first()
         if override:
             is_closed = override.status == cls.Status.CLOSED
@@ -1,7 +1,7 @@
 # core/services/booking.py
 from __future__ import annotations
-from datetime import datetime, timedelta, time
-from typing import List, Dict, Optional, Tuple
+from datetime import date, datetime, timedelta, time
+from typing import Iterable, List, Dict, Optional, Tuple
 
 from django.db.models import Q
 from django.utils import timezone
@@ -15,6 +15,10 @@ from core.models import (
 
 Slot = Tuple[datetime, datetime]
 DEFAULT_SLOT_STEP_MINUTES = 30
+# Записи, начавшиеся до полуночи, ещё блокируют утро следующего дня.
+APPOINTMENT_LOOKBACK = timedelta(hours=3)
+# Верхняя граница ?days=N в api_availability.
+MAX_AVAILABILITY_DAYS = 31
 
 def _tz_aware(dt: datetime) -> datetime:
     if timezone.is_aware(dt):
@@ -78,51 +82,115 @@ def _master_day_work_window(mp: MasterProfile, day: datetime) -> Slot:
     we = _tz_aware(datetime(day.year, day.month, day.day, end_t.hour, end_t.minute))
     return ws, we
 
-def _appointment_intervals(master: CustomUserDisplay, day: datetime) -> List[Slot]:
+def get_service_masters(service: Service) -> CustomUserDisplay:
     """
-    Интервалы занятости по существующим записям мастера на указанную дату.
-    Исключаем отменённые.
+    Список мастеров, которые умеют выполнять услугу.
     """
-    start_day = _tz_aware(datetime(day.year, day.month, day.day, 0, 0)) - timedelta(hours=3)
-    end_day = start_day + timedelta(days=1, hours=3)
-
-    qs = (
-        Appointment.objects
-        .filter(master=master, start_time__gte=start_day, start_time__lt=end_day)
-        .select_related("service")
-    )
+    master_ids = ServiceMaster.objects.filter(service=service).values_list("master_id", flat=True)
+    return CustomUserDisplay.objects.filter(id__in=master_ids).select_related("master_profile")
 
-    # исключаем отменённые (если есть статус 'Cancelled')
-    cancelled = AppointmentStatus.objects.filter(name__iexact="Cancelled").first()
-    if cancelled:
-        qs = qs.exclude(appointmentstatushistory__status=cancelled)
+def _local_date(value) -> date:
+    if isinstance(value, datetime):
+        return _tz_aware(value).astimezone(get_current_timezone()).date()
+    return value
 
-    blocks: List[Slot] = []
-    for ap in qs:
-        ap_start = ap.start_time
-        dur = timedelta(minutes=ap.service.duration_min or 0)
-        blocks.append((ap_start, ap_start + dur))
-    return blocks
+def _day_bounds(day: date) -> Slot:
+    start = _tz_aware(datetime(day.year, day.month, day.day, 0, 0))
+    return start, start + timedelta(days=1)
 
-def _timeoff_intervals(master: CustomUserDisplay, day: datetime) -> List[Slot]:
+def get_booking_day_statuses(start_day, end_day) -> Dict[date, dict]:
     """
-    Интервалы отпусков/перерывов мастера на дату.
+    BookingDayOverride.resolve_status для каждого дня диапазона одним запросом.
     """
-    start_day = _tz_aware(datetime(day.year, day.month, day.day, 0, 0))
-    end_day = start_day + timedelta(days=1)
-    qs = MasterAvailability.objects.filter(
-        master=master,
-        start_time__lt=end_day,
-        end_time__gt=start_day
-    )
-    return [(p.start_time, p.end_time) for p in qs]
-
-def get_service_masters(service: Service) -> CustomUserDisplay:
+    first, last = _local_date(start_day), _local_date(end_day)
+    overrides = {o.date: o for o in BookingDayOverride.objects.filter(date__range=(first, last))}
+    return {
+        first + timedelta(days=offset): BookingDayOverride.resolve_status(
+            first + timedelta(days=offset), overrides.get(first + timedelta(days=offset)), lookup=False
+        )
+        for offset in range((last - first).days + 1)
+    }
+
+def get_available_slots_range(
+    service: Service,
+    start_day,
+    end_day,
+    masters: Optional[Iterable[CustomUserDisplay]] = None,
+    step_minutes: int = DEFAULT_SLOT_STEP_MINUTES,
+    day_statuses: Optional[Dict[date, dict]] = None,
+) -> Dict[date, Dict[int, List[datetime]]]:
     """
-    Список мастеров, которые умеют выполнять услугу.
+    Слоты на каждый день от start_day до end_day включительно:
+    {date: {master_id: [datetime слот-старты]}}.
+    Записи, отпуска и BookingDayOverride за весь диапазон грузятся тремя
+    запросами, дальше всё считается в памяти.
     """
-    master_ids = ServiceMaster.objects.filter(service=service).values_list("master_id", flat=True)
-    return CustomUserDisplay.objects.filter(id__in=master_ids).select_related("master_profile")
+    first, last = _local_date(start_day), _local_date(end_day)
+    if last < first:
+        return {}
+    total_minutes = (service.duration_min or 0) + (service.extra_time_min or 0)
+    masters = list(masters) if masters is not None else list(get_service_masters(service))
+    if day_statuses is None:
+        day_statuses = get_booking_day_statuses(first, last)
+
+    range_start, _ = _day_bounds(first)
+    _, range_end = _day_bounds(last)
+    master_ids = [m.id for m in masters if m]
+    appointments: Dict[int, List[Slot]] = {}
+    timeoff: Dict[int, List[Slot]] = {}
+    if master_ids:
+        rows = (
+            Appointment.objects
+            .filter(
+                master_id__in=master_ids,
+                start_time__gte=range_start - APPOINTMENT_LOOKBACK,
+                start_time__lt=range_end,
+            )
+            # исключаем отменённые (статус 'Cancelled' в истории)
+            .exclude(appointmentstatushistory__status__name__iexact="Cancelled")
+            .values_list("master_id", "start_time", "service__duration_min")
+        )
+        for master_id, ap_start, duration in rows:
+            appointments.setdefault(master_id, []).append(
+                (ap_start, ap_start + timedelta(minutes=duration or 0))
+            )
+        periods = MasterAvailability.objects.filter(
+            master_id__in=master_ids,
+            start_time__lt=range_end,
+            end_time__gt=range_start,
+        ).values_list("master_id", "start_time", "end_time")
+        for master_id, p_start, p_end in periods:
+            timeoff.setdefault(master_id, []).append((p_start, p_end))
+
+    result: Dict[date, Dict[int, List[datetime]]] = {}
+    for offset in range((last - first).days + 1):
+        day = first + timedelta(days=offset)
+        if day_statuses[day]["is_closed"]:
+            result[day] = {m.id: [] for m in masters if m}
+            continue
+
+        day_start, day_end = _day_bounds(day)
+        day_slots: Dict[int, List[datetime]] = {}
+        for m in masters:
+            mp: Optional[MasterProfile] = getattr(m, "master_profile", None)
+            if not mp:
+                continue
+
+            work_s, work_e = _master_day_work_window(mp, day_start)
+            if work_s >= work_e:
+                continue
+
+            blocks = [
+                (s, e) for s, e in appointments.get(m.id, ())
+                if day_start - APPOINTMENT_LOOKBACK <= s < day_end
+            ] + [
+                (s, e) for s, e in timeoff.get(m.id, ())
+                if s < day_end and e > day_start
+            ]
+            free = _intervals_subtract((work_s, work_e), blocks)
+            day_slots[m.id] = _gen_slots_in_intervals(free, total_minutes=total_minutes, step_minutes=step_minutes)
+        result[day] = day_slots
+    return result
 
 def get_available_slots(
     service: Service,
@@ -134,32 +202,11 @@ def get_available_slots(
     Возвращает словарь {master_id: [datetime слот-старты]} на дату day.
     Учитывает рабочее окно, существующие записи и периоды недоступности.
     """
-    total_minutes = (service.duration_min or 0) + (service.extra_time_min or 0)
-    day = day.astimezone(get_current_timezone())
-
-    masters = [master] if master else list(get_service_masters(service))
-    day_status = BookingDayOverride.resolve_status(day)
-    if day_status["is_closed"]:
-        return {m.id: [] for m in masters if m}
-
-    result: Dict[int, List[datetime]] = {}
-    for m in masters:
-        mp: Optional[MasterProfile] = getattr(m, "master_profile", None)
-        if not mp:
-            continue
-
-        work_s, work_e = _master_day_work_window(mp, day)
-        if work_s >= work_e:
-            continue
-
-        blocks = _appointment_intervals(m, day) + _timeoff_intervals(m, day)
-        free = _intervals_subtract((work_s, work_e), blocks)
-        slots = _gen_slots_in_intervals(free, total_minutes=total_minutes, step_minutes=step_minutes)
-        if slots:
-            result[m.id] = slots
-        else:
-            result[m.id] = []
-    return result
+    local_day = _local_date(day)
+    masters = [master] if master else None
+    return get_available_slots_range(
+        service, local_day, local_day, masters=masters, step_minutes=step_minutes
+    )[local_day]
 
 def get_or_create_status(name: str) -> AppointmentStatus:
     obj, _ = AppointmentStatus.objects.get_or_create(name=name)
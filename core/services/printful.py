@@ -10,7 +10,9 @@ live shipping-rate lookups, order submission, and webhook subscription sync.
 import json
 import logging
 import hashlib
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from decimal import Decimal, InvalidOperation
 from typing import Any
@@ -20,17 +22,28 @@ from urllib.request import Request, urlopen
 
 from django.conf import settings
 from django.core.cache import cache
+from django.db import connections
 from django.utils.text import slugify
 
+from core.services.printful_http import (
+    PrintfulAPIError,
+    PrintfulHTTPClient,
+    PrintfulRateLimiter,
+    decode_printful_payload,
+)
 from core.utils import format_currency
 
 logger = logging.getLogger(__name__)
 
 _CACHE_PREFIX = "printful_merch_v1"
+# Printful caps /sync/products pages at 100 rows; 24 keeps each response small.
+_FEED_PAGE_SIZE = 24
 
-
-class PrintfulAPIError(RuntimeError):
-    """Raised when a Printful API request fails."""
+_catalog_client: PrintfulHTTPClient | None = None
+_catalog_client_key: tuple | None = None
+_catalog_client_lock = threading.Lock()
+_shipping_refresh_executor: ThreadPoolExecutor | None = None
+_shipping_refresh_lock = threading.Lock()
 
 
 def _printful_cache_dir() -> Path:
@@ -133,6 +146,45 @@ def _build_headers() -> dict[str, str]:
     return headers
 
 
+def _api_base_url() -> str:
+    base_url = (getattr(settings, "PRINTFUL_API_BASE_URL", "https://api.printful.com") or "https://api.printful.com").strip()
+    if not base_url:
+        base_url = "https://api.printful.com"
+    return base_url.rstrip("/")
+
+
+def _catalog_http_client() -> PrintfulHTTPClient:
+    """
+    Shared keep-alive client for catalog reads. It is rebuilt (and the old pool
+    closed) whenever the API settings it was built from change.
+    """
+    global _catalog_client, _catalog_client_key
+
+    headers = _build_headers()
+    timeout = _float_setting("PRINTFUL_TIMEOUT_SECONDS", 4.0, min_value=0.5)
+    workers = _int_setting("PRINTFUL_FETCH_WORKERS", 4, min_value=1)
+    rate = _int_setting("PRINTFUL_RATE_LIMIT_PER_MINUTE", 120, min_value=1)
+    key = (_api_base_url(), tuple(sorted(headers.items())), timeout, workers, rate)
+    with _catalog_client_lock:
+        if _catalog_client is not None and _catalog_client_key == key:
+            return _catalog_client
+        if _catalog_client is not None:
+            _catalog_client.close()
+        try:
+            _catalog_client = PrintfulHTTPClient(
+                base_url=key[0],
+                headers=headers,
+                timeout=timeout,
+                max_connections=workers,
+                limiter=PrintfulRateLimiter(rate_per_minute=rate),
+            )
+        except ValueError as exc:
+            _catalog_client = None
+            raise PrintfulAPIError("request_failed") from exc
+        _catalog_client_key = key
+        return _catalog_client
+
+
 def _api_request(
     method: str,
     path: str,
@@ -140,11 +192,7 @@ def _api_request(
     query: dict[str, Any] | None = None,
     data: dict[str, Any] | list[Any] | None = None,
 ) -> dict[str, Any]:
-    base_url = (getattr(settings, "PRINTFUL_API_BASE_URL", "https://api.printful.com") or "https://api.printful.com").strip()
-    if not base_url:
-        base_url = "https://api.printful.com"
-    base_url = base_url.rstrip("/")
-    url = f"{base_url}{path}"
+    url = f"{_api_base_url()}{path}"
     if query:
         url = f"{url}?{urlencode(query, doseq=True)}"
 
@@ -178,19 +226,7 @@ def _api_request(
 
     if status >= 400:
         raise PrintfulAPIError(f"http_{status}")
-
-    try:
-        payload = json.loads(raw.decode("utf-8", errors="ignore"))
-    except (TypeError, ValueError) as exc:
-        raise PrintfulAPIError("invalid_json") from exc
-
-    if isinstance(payload, dict):
-        api_code = _coerce_int(payload.get("code"), default=200)
-        if api_code >= 400:
-            raise PrintfulAPIError(f"api_{api_code}")
-        if payload.get("error"):
-            raise PrintfulAPIError("api_error")
-    return payload if isinstance(payload, dict) else {}
+    return decode_printful_payload(raw)
 
 
 def _api_get(path: str, *, query: dict[str, Any] | None = None) -> dict[str, Any]:
@@ -491,11 +527,79 @@ def _fetch_product_detail_variants(product_id: int) -> list[dict[str, Any]]:
     return _extract_variants(payload)
 
 
+def _listed_product_id(raw_item: dict[str, Any]) -> int:
+    """Sync product id of a listing row, or 0 when the feed would skip the row."""
+    item = _extract_product(raw_item)
+    if not isinstance(item, dict) or item.get("is_ignored") is True:
+        return 0
+    if not (item.get("name") or "").strip():
+        return 0
+    return _coerce_int(item.get("id"))
+
+
+def _fetch_listing_items(client: PrintfulHTTPClient, *, max_items: int | None) -> list[dict[str, Any]]:
+    """
+    Listing rows for the feed, in catalog order. Pages are read one at a time
+    until `max_items` usable rows are found; for the full catalog the pages
+    after the first are fetched concurrently once `paging.total` is known.
+    """
+    page_size = min(max(max_items or _FEED_PAGE_SIZE, 1), _FEED_PAGE_SIZE)
+    items: list[dict[str, Any]] = []
+    usable = 0
+    offset = 0
+
+    while True:
+        listing_payload = client.get_json("/sync/products", query={"limit": page_size, "offset": offset})
+        page = _extract_result_items(listing_payload)
+        if not page:
+            break
+        items.extend(page)
+        usable += sum(1 for raw_item in page if _listed_product_id(raw_item))
+
+        if max_items is not None and usable >= max_items:
+            break
+        if len(page) < page_size:
+            break
+        offset += page_size
+
+        paging = listing_payload.get("paging")
+        total = _coerce_int(paging.get("total")) if isinstance(paging, dict) else 0
+        if max_items is None and total > offset:
+            paths = [
+                f"/sync/products?{urlencode({'limit': page_size, 'offset': page_offset})}"
+                for page_offset in range(offset, total, page_size)
+            ]
+            pages = client.get_many(paths, workers=client.max_connections)
+            for path in paths:
+                result = pages[path]
+                if isinstance(result, PrintfulAPIError):
+                    raise result
+                items.extend(_extract_result_items(result))
+            break
+
+    return items
+
+
+def _fetch_detail_variants_many(client: PrintfulHTTPClient, product_ids: list[int]) -> dict[int, list[dict[str, Any]]]:
+    """
+    Detail variants for several sync products on the client's worker pool. A
+    product whose detail request fails maps to [] like the serial lookup did.
+    """
+    paths = {product_id: f"/sync/products/{product_id}" for product_id in product_ids if product_id}
+    results = client.get_many(paths.values(), workers=client.max_connections)
+    variants: dict[int, list[dict[str, Any]]] = {}
+    for product_id, path in paths.items():
+        result = results[path]
+        variants[product_id] = [] if isinstance(result, PrintfulAPIError) else _extract_variants(result)
+    return variants
+
+
 def _normalize_merch_product(
     raw_item: dict[str, Any],
     *,
     catalog_url: str,
     show_prices: bool,
+    detail_variants: list[dict[str, Any]] | None = None,
 ) -> dict[str, Any] | None:
     item = _extract_product(raw_item)
     if not isinstance(item, dict):
@@ -509,7 +613,9 @@ def _normalize_merch_product(
         return None
 
     variants = _extract_variants(item)
-    if not variants:
+    if not variants and detail_variants is not None:
+        variants = detail_variants
+    elif not variants:
         try:
             variants = _fetch_product_detail_variants(product_id)
         except PrintfulAPIError:
@@ -610,35 +716,28 @@ def get_printful_merch_feed(*, force_refresh: bool = False) -> dict[str, Any]:
         # /sync/products works across connected platforms (Wix/Shopify/etc).
         # /store/products is limited to Manual Order / API stores.
         max_items = limit if limit > 0 else None
-        page_size = min(max(limit or 24, 1), 24)
-        offset = 0
-        products: list[dict[str, Any]] = []
+        client = _catalog_http_client()
+        listed = [
+            (raw_item, product_id)
+            for raw_item in _fetch_listing_items(client, max_items=max_items)
+            if (product_id := _listed_product_id(raw_item))
+        ][:max_items]
+        detail_variants = _fetch_detail_variants_many(
+            client,
+            [product_id for raw_item, product_id in listed if not _extract_variants(_extract_product(raw_item))],
+        )
 
-        while True:
-            listing_payload = _api_get("/sync/products", query={"limit": page_size, "offset": offset})
-            items = _extract_result_items(listing_payload)
-            if not items:
-                break
-
-            for raw_item in items:
-                normalized = _normalize_merch_product(
-                    raw_item,
-                    catalog_url=catalog_url,
-                    show_prices=show_prices,
-                )
-                if not normalized:
-                    continue
+        products: list[dict[str, Any]] = []
+        for raw_item, product_id in listed:
+            normalized = _normalize_merch_product(
+                raw_item,
+                catalog_url=catalog_url,
+                show_prices=show_prices,
+                detail_variants=detail_variants.get(product_id, []),
+            )
+            if normalized:
                 products.append(normalized)
 
-                if max_items is not None and len(products) >= max_items:
-                    break
-
-            if max_items is not None and len(products) >= max_items:
-                break
-            if len(items) < page_size:
-                break
-            offset += page_size
-
         payload["products"] = products
     except PrintfulAPIError as exc:
         payload["error"] = str(exc)
@@ -671,47 +770,70 @@ def printful_is_enabled() -> bool:
     return bool((getattr(settings, "PRINTFUL_TOKEN", "") or "").strip())
 
 
-def _shipping_rates_cache_key(*, recipient: dict[str, Any], items: list[dict[str, Any]], currency: str) -> str:
+def _shipping_quote_cache_key(*, recipient: dict[str, Any], items: list[dict[str, Any]], currency: str) -> str:
+    """
+    Shared cache key for a shipping quote. Only what moves Printful's rates is
+    keyed: country, region, postal prefix and the cart's variant quantities, so
+    edits to names, streets or contact fields keep hitting the same quote.
+    """
+    prefix_length = _int_setting("PRINTFUL_SHIPPING_QUOTE_POSTAL_PREFIX", 3, min_value=0)
+    postal = "".join(ch for ch in str(recipient.get("zip") or "").upper() if ch.isalnum())
+    quantities: dict[int, int] = {}
+    for item in items:
+        variant_id = _coerce_int(item.get("variant_id"))
+        quantities[variant_id] = quantities.get(variant_id, 0) + max(_coerce_int(item.get("quantity"), default=1), 1)
     digest = hashlib.sha256(
         json.dumps(
             {
-                "recipient": recipient,
-                "items": items,
+                "country": str(recipient.get("country_code") or "").strip().upper(),
+                "region": str(recipient.get("state_code") or "").strip().upper(),
+                "postal": postal[:prefix_length] if prefix_length else postal,
+                "items": sorted(quantities.items()),
                 "currency": currency,
                 "store_id": (getattr(settings, "PRINTFUL_STORE_ID", "") or "").strip(),
             },
             sort_keys=True,
-            default=str,
         ).encode("utf-8")
     ).hexdigest()
-    return f"{_CACHE_PREFIX}:shipping_rates:{digest}"
+    return f"{_CACHE_PREFIX}:shipping_quote:{digest}"
 
 
-def quote_printful_shipping_rates(
-    *,
-    recipient: dict[str, Any],
-    items: list[dict[str, Any]],
-    currency: str = "",
-    force_refresh: bool = False,
-) -> list[dict[str, Any]]:
-    if not printful_is_enabled():
-        raise PrintfulAPIError("disabled")
+def _shipping_refresh_pool() -> ThreadPoolExecutor:
+    global _shipping_refresh_executor
+    with _shipping_refresh_lock:
+        if _shipping_refresh_executor is None:
+            _shipping_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="printful-shipping")
+        return _shipping_refresh_executor
 
-    normalized_currency = (currency or "").strip().upper()
-    payload: dict[str, Any] = {
-        "recipient": recipient,
-        "items": items,
-    }
-    if normalized_currency:
-        payload["currency"] = normalized_currency
 
-    cache_key = _shipping_rates_cache_key(recipient=recipient, items=items, currency=normalized_currency)
-    cache_seconds = _int_setting("PRINTFUL_MERCH_CACHE_SECONDS", 300, min_value=0)
-    if cache_seconds > 0 and not force_refresh:
-        cached = cache.get(cache_key)
-        if isinstance(cached, list):
-            return cached
+def _store_shipping_quote(cache_key: str, rates: list[dict[str, Any]], *, fresh_seconds: int) -> None:
+    stale_seconds = _int_setting("PRINTFUL_SHIPPING_QUOTE_STALE_SECONDS", 6 * 3600, min_value=0)
+    cache.set(cache_key, {"rates": rates, "fetched_at": time.time()}, fresh_seconds + stale_seconds)
+
+
+def _refresh_shipping_quote(cache_key: str, payload: dict[str, Any], currency: str, fresh_seconds: int) -> None:
+    try:
+        _store_shipping_quote(cache_key, _fetch_shipping_rates(payload, currency), fresh_seconds=fresh_seconds)
+    except PrintfulAPIError as exc:
+        logger.warning("Background Printful shipping-rate refresh failed: %s", exc)
+    except Exception:
+        logger.exception("Background Printful shipping-rate refresh failed")
+    finally:
+        cache.delete(f"{cache_key}:refreshing")
+        # Database-backed caches open a connection on this worker thread.
+        connections.close_all()
+
+
+def _schedule_shipping_quote_refresh(cache_key: str, payload: dict[str, Any], currency: str, fresh_seconds: int) -> None:
+    # With the shared cache, cache.add is the cross-process guard: one refresh per key while
+    # it is in flight.
+    timeout = _float_setting("PRINTFUL_TIMEOUT_SECONDS", 4.0, min_value=0.5)
+    if not cache.add(f"{cache_key}:refreshing", 1, int(timeout) + 30):
+        return
+    _shipping_refresh_pool().submit(_refresh_shipping_quote, cache_key, payload, currency, fresh_seconds)
+
 
+def _fetch_shipping_rates(payload: dict[str, Any], normalized_currency: str) -> list[dict[str, Any]]:
     response = _api_post("/shipping/rates", data=payload)
     result = response.get("result")
     rows = result if isinstance(result, list) else []
@@ -760,11 +882,53 @@ def quote_printful_shipping_rates(
         )
 
     normalized_rows.sort(key=lambda item: (_coerce_decimal(item.get("rate")) or Decimal("0.00"), item.get("name") or ""))
-    if cache_seconds > 0:
-        cache.set(cache_key, normalized_rows, min(cache_seconds, 300))
     return normalized_rows
 
 
+def quote_printful_shipping_rates(
+    *,
+    recipient: dict[str, Any],
+    items: list[dict[str, Any]],
+    currency: str = "",
+    force_refresh: bool = False,
+    allow_stale: bool = True,
+) -> list[dict[str, Any]]:
+    """
+    Live shipping rates for a cart, through the shared quote cache. A quote past
+    PRINTFUL_SHIPPING_QUOTE_FRESH_SECONDS is still returned at once (unless
+    `allow_stale` is off) while a background refresh replaces it.
+    """
+    if not printful_is_enabled():
+        raise PrintfulAPIError("disabled")
+
+    normalized_currency = (currency or "").strip().upper()
+    payload: dict[str, Any] = {
+        "recipient": recipient,
+        "items": items,
+    }
+    if normalized_currency:
+        payload["currency"] = normalized_currency
+
+    fresh_seconds = _int_setting("PRINTFUL_SHIPPING_QUOTE_FRESH_SECONDS", 300, min_value=0)
+    if fresh_seconds <= 0:
+        return _fetch_shipping_rates(payload, normalized_currency)
+
+    cache_key = _shipping_quote_cache_key(recipient=recipient, items=items, currency=normalized_currency)
+    if not force_refresh:
+        cached = cache.get(cache_key)
+        if isinstance(cached, dict) and isinstance(cached.get("rates"), list):
+            age = time.time() - float(cached.get("fetched_at") or 0)
+            if age < fresh_seconds:
+                return cached["rates"]
+            if allow_stale:
+                _schedule_shipping_quote_refresh(cache_key, payload, normalized_currency, fresh_seconds)
+                return cached["rates"]
+
+    rates = _fetch_shipping_rates(payload, normalized_currency)
+    _store_shipping_quote(cache_key, rates, fresh_seconds=fresh_seconds)
+    return rates
+
+
 def create_printful_order(
     *,
     recipient: dict[str, Any],
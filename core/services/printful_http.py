@@ -0,0 +1,276 @@
+"""
+Pooled HTTP client for Printful catalog reads.
+
+A full merch refresh pages /sync/products and then loads /sync/products/<id>
+for every product whose listing row has no variants. PrintfulHTTPClient keeps
+keep-alive connections to the API host, fetches detail pages on a bounded
+thread pool and paces every request through a token bucket. The bucket follows
+Printful's X-Ratelimit-* headers and backs off on 429 using Retry-After.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+from urllib.parse import urlencode, urlsplit
+
+logger = logging.getLogger(__name__)
+
+MAX_RESPONSE_BYTES = 1024 * 1024
+MAX_RETRY_AFTER = 60.0
+# A reused keep-alive connection the server already closed fails like this; the
+# request is resent once on a fresh connection.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class PrintfulAPIError(RuntimeError):
+    """Raised when a Printful API request fails."""
+
+
+def decode_printful_payload(raw: bytes) -> dict[str, Any]:
+    """
+    JSON body of a Printful response; API-level error codes raise PrintfulAPIError.
+    """
+    try:
+        payload = json.loads(raw.decode("utf-8", errors="ignore"))
+    except (TypeError, ValueError) as exc:
+        raise PrintfulAPIError("invalid_json") from exc
+
+    if isinstance(payload, dict):
+        try:
+            api_code = int(payload.get("code") or 200)
+        except (TypeError, ValueError):
+            api_code = 200
+        if api_code >= 400:
+            raise PrintfulAPIError(f"api_{api_code}")
+        if payload.get("error"):
+            raise PrintfulAPIError("api_error")
+    return payload if isinstance(payload, dict) else {}
+
+
+class PrintfulRateLimiter:
+    """
+    Token bucket shared by the client's worker threads. `rate_per_minute` is the
+    starting budget; `observe` adopts the limit, remaining count and reset time
+    Printful reports so the bucket never runs ahead of the server's window.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate_per_minute: float,
+        burst: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = max(float(rate_per_minute), 1.0) / 60.0
+        self.capacity = float(max(int(burst if burst is not None else rate_per_minute), 1))
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                if wait <= 0:
+                    wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + max(seconds, 0.0))
+            self.tokens = 0.0
+            self._updated = now
+
+    def observe(self, headers: dict[str, str]) -> None:
+        """
+        Sync with `X-Ratelimit-Limit` / `-Policy` (`120;w=60`), `-Remaining` and `-Reset`.
+        """
+        limit = _header_float(headers, "x-ratelimit-limit")
+        window = 60.0
+        policy = headers.get("x-ratelimit-policy", "")
+        for part in policy.split(";")[1:]:
+            name, _, value = part.strip().partition("=")
+            if name == "w":
+                window = _parse_float(value) or window
+        remaining = _header_float(headers, "x-ratelimit-remaining")
+        reset = _header_float(headers, "x-ratelimit-reset")
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if limit:
+                self.rate = limit / window
+                self.capacity = max(limit, 1.0)
+            if remaining is not None:
+                self.tokens = min(self.tokens, remaining)
+                if remaining < 1 and reset:
+                    self._paused_until = max(self._paused_until, now + min(reset, MAX_RETRY_AFTER))
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self._updated, 0.0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+
+class PrintfulHTTPClient:
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        headers: dict[str, str],
+        timeout: float = 4.0,
+        max_connections: int = 4,
+        retries: int = 3,
+        backoff: float = 1.0,
+        limiter: PrintfulRateLimiter | None = None,
+    ) -> None:
+        parts = urlsplit((base_url or "").rstrip("/"))
+        if parts.scheme not in {"http", "https"} or not parts.netloc:
+            raise ValueError(f"Unsupported Printful API base URL: {base_url!r}")
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.base_path = parts.path
+        self.headers = dict(headers)
+        self.timeout = max(float(timeout or 0.0), 0.5)
+        self.max_connections = max(int(max_connections or 1), 1)
+        self.retries = max(int(retries or 1), 1)
+        self.backoff = max(float(backoff or 0.0), 0.0)
+        self.limiter = limiter or PrintfulRateLimiter(rate_per_minute=120)
+        self.stats = {"requests": 0, "connections_opened": 0, "rate_limited": 0}
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "PrintfulHTTPClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def get_json(self, path: str, *, query: dict[str, Any] | None = None) -> dict[str, Any]:
+        target = f"{self.base_path}{path}"
+        if query:
+            target = f"{target}?{urlencode(query, doseq=True)}"
+
+        for attempt in range(1, self.retries + 1):
+            self.limiter.acquire()
+            try:
+                status, headers, raw = self._send("GET", target)
+            except (OSError, http.client.HTTPException) as exc:
+                logger.warning("Printful network error on %s: %s", path, exc)
+                raise PrintfulAPIError("network_error") from exc
+            self.limiter.observe(headers)
+            if status != 429 or attempt >= self.retries:
+                break
+            self.stats["rate_limited"] += 1
+            delay = _header_float(headers, "retry-after")
+            self.limiter.pause(min(delay, MAX_RETRY_AFTER) if delay is not None else self.backoff * (2 ** (attempt - 1)))
+
+        if status >= 400:
+            logger.warning(
+                "Printful HTTP error %s on %s: %s", status, path, raw[:512].decode("utf-8", errors="ignore")
+            )
+            raise PrintfulAPIError(f"http_{status}")
+        return decode_printful_payload(raw)
+
+    def get_many(
+        self,
+        paths: Iterable[str],
+        *,
+        workers: int | None = None,
+    ) -> dict[str, dict[str, Any] | PrintfulAPIError]:
+        """
+        GET several paths concurrently. Each path maps to its payload or to the
+        PrintfulAPIError it raised, so one failing product does not sink the rest.
+        """
+        unique = list(dict.fromkeys(paths))
+        if not unique:
+            return {}
+        worker_count = min(max(int(workers or self.max_connections), 1), len(unique))
+
+        def _fetch(path: str) -> dict[str, Any] | PrintfulAPIError:
+            try:
+                return self.get_json(path)
+            except PrintfulAPIError as exc:
+                return exc
+
+        if worker_count == 1:
+            return {path: _fetch(path) for path in unique}
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            return dict(zip(unique, executor.map(_fetch, unique)))
+
+    def _checkout(self) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.stats["connections_opened"] += 1
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.netloc, timeout=self.timeout), False
+
+    def _release(self, connection: http.client.HTTPConnection, *, reusable: bool) -> None:
+        if not reusable:
+            connection.close()
+            return
+        with self._lock:
+            self._idle.append(connection)
+
+    def _send(self, method: str, target: str) -> tuple[int, dict[str, str], bytes]:
+        with self._slots:
+            for _attempt in range(2):
+                connection, reused = self._checkout()
+                try:
+                    connection.request(method, target, headers=self.headers)
+                    response = connection.getresponse()
+                    status = int(response.status or 0)
+                    headers = {key.lower(): value for key, value in response.getheaders()}
+                    raw = response.read(MAX_RESPONSE_BYTES + 1)
+                except STALE_CONNECTION_ERRORS:
+                    connection.close()
+                    if reused:
+                        continue
+                    raise
+                except Exception:
+                    connection.close()
+                    raise
+                with self._lock:
+                    self.stats["requests"] += 1
+                # Oversized bodies are cut off (as before) and their connection dropped.
+                drained = len(raw) <= MAX_RESPONSE_BYTES
+                self._release(connection, reusable=drained and not response.will_close)
+                return status, headers, raw[:MAX_RESPONSE_BYTES]
+        raise http.client.RemoteDisconnected("connection closed by server")
+
+
+def _parse_float(value: Any) -> float | None:
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _header_float(headers: dict[str, str], name: str) -> float | None:
+    value = headers.get(name)
+    if value in (None, ""):
+        return None
+    parsed = _parse_float(value)
+    return max(parsed, 0.0) if parsed is not None else None
@@ -11,13 +11,18 @@ from PIL import Image
 
 from core.models import (
     Appointment,
+    AppointmentStatus,
+    AppointmentStatusHistory,
+    BookingDayOverride,
     ClientFile,
     CustomUserDisplay,
+    MasterAvailability,
     MasterProfile,
     PaymentStatus,
     Service,
     ServiceMaster,
 )
+from core.services.booking import get_available_slots, get_available_slots_range
 
 
 class BookingApiTests(TestCase):
@@ -158,3 +163,76 @@ class BookingApiTests(TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(Appointment.objects.count(), 1)
         self.assertEqual(ClientFile.objects.filter(user=client_user).count(), 1)
+
+    def _next_monday(self):
+        today = timezone.localdate()
+        return today + timedelta(days=7 - today.weekday())
+
+    def _at(self, day, hour: int, minute: int = 0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def test_slot_range_matches_single_days_with_a_fixed_number_of_queries(self):
+        monday = self._next_monday()
+        tuesday, wednesday, thursday, friday = (monday + timedelta(days=offset) for offset in range(1, 5))
+        pending = PaymentStatus.objects.get(name="Pending")
+        booked = Appointment.objects.create(
+            master=self.available_master,
+            service=self.service,
+            start_time=self._at(tuesday, 10),
+            payment_status=pending,
+            contact_name="Jane Doe",
+            contact_email="jane@example.com",
+            contact_phone="+15551234569",
+        )
+        cancelled = Appointment.objects.create(
+            master=self.available_master,
+            service=self.service,
+            start_time=self._at(wednesday, 10),
+            payment_status=pending,
+            contact_name="Jane Doe",
+            contact_email="jane@example.com",
+            contact_phone="+15551234569",
+        )
+        AppointmentStatusHistory.objects.create(
+            appointment=cancelled, status=AppointmentStatus.objects.create(name="Cancelled")
+        )
+        MasterAvailability.objects.create(
+            master=self.available_master, start_time=self._at(thursday, 12), end_time=self._at(thursday, 14)
+        )
+        BookingDayOverride.objects.create(date=friday, status=BookingDayOverride.Status.CLOSED)
+
+        with self.assertNumQueries(4):
+            week = get_available_slots_range(self.service, monday, monday + timedelta(days=6))
+
+        self.assertEqual(list(week), [monday + timedelta(days=offset) for offset in range(7)])
+        for day, slots_map in week.items():
+            self.assertEqual(slots_map, get_available_slots(self.service, self._at(day, 12)))
+
+        slots = {day: week[day].get(self.available_master.id, []) for day in week}
+        self.assertNotIn(booked.start_time, slots[tuesday])
+        self.assertIn(cancelled.start_time, slots[wednesday])
+        self.assertNotIn(self._at(thursday, 13), slots[thursday])
+        self.assertIn(self._at(thursday, 14), slots[thursday])
+        self.assertEqual(slots[friday], [])
+        self.assertEqual(slots[monday + timedelta(days=5)], [])
+        self.assertNotIn(self.idle_master.id, week[monday])
+
+    def test_api_availability_days_mode_returns_a_week_strip(self):
+        monday = self._next_monday()
+        response = self.client.get(
+            self.availability_url,
+            {"service": str(self.service.pk), "date": monday.isoformat(), "days": "7"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        days = response.json()["days"]
+        self.assertEqual([row["date"] for row in days], [(monday + timedelta(days=i)).isoformat() for i in range(7)])
+        self.assertEqual([row["day_status"]["is_closed"] for row in days], [False] * 5 + [True] * 2)
+        monday_slots = next(row for row in days[0]["masters"] if row["id"] == self.available_master.id)["slots"]
+        self.assertEqual(monday_slots[0], self._at(monday, 9).isoformat())
+
+        invalid = self.client.get(
+            self.availability_url,
+            {"service": str(self.service.pk), "date": monday.isoformat(), "days": "0"},
+        )
+        self.assertEqual(invalid.status_code, 400)
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
 
 from django.core.cache import cache
 from django.test import SimpleTestCase, override_settings
 
+from core.services import printful
 from core.services.printful import create_printful_order, find_printful_order_by_external_id, quote_printful_shipping_rates
 
 
@@ -148,3 +151,80 @@ class PrintfulCheckoutApiTests(SimpleTestCase):
             payload = find_printful_order_by_external_id("bgm-order-202", page_size=1, max_pages=2)
 
         self.assertEqual(payload["id"], 202)
+
+
+def _recipient(**overrides) -> dict:
+    return {
+        "name": "Test User",
+        "address1": "123 Main St",
+        "city": "Medicine Hat",
+        "state_code": "AB",
+        "country_code": "CA",
+        "zip": "T1A 0A1",
+        **overrides,
+    }
+
+
+def _rates_response(rate: str) -> _FakeResponse:
+    return _FakeResponse({"code": 200, "result": [{"id": "STANDARD", "name": "Flat Rate", "rate": rate, "currency": "CAD"}]})
+
+
+@override_settings(
+    PRINTFUL_TOKEN="token-123",
+    PRINTFUL_SHIPPING_QUOTE_FRESH_SECONDS=60,
+    PRINTFUL_SHIPPING_QUOTE_STALE_SECONDS=3600,
+    PRINTFUL_SHIPPING_QUOTE_POSTAL_PREFIX=3,
+)
+class PrintfulShippingQuoteCacheTests(SimpleTestCase):
+    items = [{"variant_id": 18730, "quantity": 1}, {"variant_id": 18731, "quantity": 2}]
+
+    def setUp(self):
+        cache.clear()
+
+    def _quote(self, recipient: dict, **kwargs) -> list[dict]:
+        return quote_printful_shipping_rates(recipient=recipient, items=self.items, currency="CAD", **kwargs)
+
+    def test_quotes_are_shared_across_contact_details_and_postal_suffixes(self):
+        with patch("core.services.printful.urlopen", return_value=_rates_response("11.95")) as mocked_urlopen:
+            first = self._quote(_recipient())
+            second = self._quote(_recipient(name="Someone Else", address1="9 Side Rd", zip="t1a 9z9"))
+            reordered = quote_printful_shipping_rates(
+                recipient=_recipient(), items=list(reversed(self.items)), currency="CAD"
+            )
+            self._quote(_recipient(zip="T2P 1J9"))
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, reordered)
+        self.assertEqual(mocked_urlopen.call_count, 2)
+
+    def test_stale_quote_is_served_while_a_background_refresh_replaces_it(self):
+        with patch("core.services.printful.urlopen", return_value=_rates_response("11.95")):
+            self._quote(_recipient())
+        key = printful._shipping_quote_cache_key(recipient=_recipient(), items=self.items, currency="CAD")
+        entry = cache.get(key)
+        cache.set(key, {**entry, "fetched_at": time.time() - 120}, 3600)
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        with (
+            patch("core.services.printful._shipping_refresh_pool", return_value=executor),
+            patch("core.services.printful.urlopen", return_value=_rates_response("13.50")) as mocked_urlopen,
+        ):
+            stale = self._quote(_recipient())
+            self._quote(_recipient())
+            executor.shutdown(wait=True)
+
+        self.assertEqual(stale[0]["rate"], "11.95")
+        self.assertEqual(mocked_urlopen.call_count, 1)
+        self.assertEqual(cache.get(key)["rates"][0]["rate"], "13.50")
+        self.assertIsNone(cache.get(f"{key}:refreshing"))
+
+    def test_stale_quote_is_not_used_when_the_caller_needs_a_current_rate(self):
+        with patch("core.services.printful.urlopen", return_value=_rates_response("11.95")):
+            self._quote(_recipient())
+        key = printful._shipping_quote_cache_key(recipient=_recipient(), items=self.items, currency="CAD")
+        cache.set(key, {**cache.get(key), "fetched_at": time.time() - 120}, 3600)
+
+        with patch("core.services.printful.urlopen", return_value=_rates_response("13.50")):
+            current = self._quote(_recipient(), allow_stale=False)
+
+        self.assertEqual(current[0]["rate"], "13.50")
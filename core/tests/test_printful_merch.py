@@ -7,21 +7,23 @@ from django.core.cache import cache
 from django.test import SimpleTestCase, override_settings
 
 from core.services.printful import get_printful_merch_feed
+from core.services.printful_http import PrintfulRateLimiter
+from store.tests.http_stub import StubHTTPServer
 
 
-class _FakeResponse:
-    def __init__(self, payload: dict, status: int = 200):
-        self.status = status
-        self._payload = json.dumps(payload).encode("utf-8")
+def _json(payload: dict, status: int = 200, headers: dict | None = None):
+    return (status, {"Content-Type": "application/json", **(headers or {})}, json.dumps(payload).encode("utf-8"))
 
-    def __enter__(self):
-        return self
 
-    def __exit__(self, exc_type, exc, tb):
-        return False
+def _listing(*rows: dict, total: int | None = None):
+    payload = {"code": 200, "result": list(rows)}
+    if total is not None:
+        payload["paging"] = {"total": total}
+    return _json(payload)
 
-    def read(self, *_args, **_kwargs):
-        return self._payload
+
+def _detail(*prices: str):
+    return _json({"code": 200, "result": {"sync_variants": [{"retail_price": price} for price in prices]}})
 
 
 class PrintfulMerchFeedTests(SimpleTestCase):
@@ -46,37 +48,21 @@ class PrintfulMerchFeedTests(SimpleTestCase):
         PRINTFUL_TIMEOUT_SECONDS=1,
     )
     def test_builds_products_with_price_from_sync_product_details(self):
-        def _urlopen(req, timeout=0):
-            if req.full_url.endswith("/sync/products?limit=8&offset=0"):
-                return _FakeResponse(
-                    {
-                        "code": 200,
-                        "result": [
-                            {
-                                "id": 101,
-                                "name": "BGM Tee",
-                                "thumbnail_url": "https://cdn.example.com/tee.jpg",
-                                "external_id": "",
-                                "variants": 3,
-                            }
-                        ],
-                    }
-                )
-            if req.full_url.endswith("/sync/products/101"):
-                return _FakeResponse(
+        routes = {
+            "/sync/products?limit=8&offset=0": [
+                _listing(
                     {
-                        "code": 200,
-                        "result": {
-                            "sync_variants": [
-                                {"retail_price": "29.99"},
-                                {"retail_price": "34.99"},
-                            ]
-                        },
+                        "id": 101,
+                        "name": "BGM Tee",
+                        "thumbnail_url": "https://cdn.example.com/tee.jpg",
+                        "external_id": "",
+                        "variants": 3,
                     }
                 )
-            raise AssertionError(f"Unexpected URL: {req.full_url}")
-
-        with patch("core.services.printful.urlopen", side_effect=_urlopen):
+            ],
+            "/sync/products/101": [_detail("29.99", "34.99")],
+        }
+        with StubHTTPServer(routes) as server, self.settings(PRINTFUL_API_BASE_URL=server.url("")):
             feed = get_printful_merch_feed(force_refresh=True)
 
         self.assertTrue(feed["enabled"])
@@ -99,31 +85,25 @@ class PrintfulMerchFeedTests(SimpleTestCase):
         PRINTFUL_MERCH_CACHE_SECONDS=0,
     )
     def test_prefers_external_url_or_template_when_available(self):
-        with patch(
-            "core.services.printful.urlopen",
-            return_value=_FakeResponse(
-                {
-                    "code": 200,
-                    "result": [
-                        {
-                            "id": 1,
-                            "name": "Direct Product",
-                            "external_id": "https://store.example.com/direct",
-                            "thumbnail_url": "",
-                            "variants": 1,
-                        },
-                        {
-                            "id": 2,
-                            "name": "BGM Hoodie Black",
-                            "external_id": "hoodie-black",
-                            "thumbnail_url": "",
-                            "variants": 2,
-                        },
-                    ],
-                }
-            ),
-        ):
-            feed = get_printful_merch_feed(force_refresh=True)
+        listing = _listing(
+            {
+                "id": 1,
+                "name": "Direct Product",
+                "external_id": "https://store.example.com/direct",
+                "thumbnail_url": "",
+                "variants": 1,
+            },
+            {
+                "id": 2,
+                "name": "BGM Hoodie Black",
+                "external_id": "hoodie-black",
+                "thumbnail_url": "",
+                "variants": 2,
+            },
+        )
+        with StubHTTPServer({"/sync/products?limit=8&offset=0": [listing]}) as server:
+            with self.settings(PRINTFUL_API_BASE_URL=server.url("")):
+                feed = get_printful_merch_feed(force_refresh=True)
 
         self.assertEqual(len(feed["products"]), 2)
         self.assertEqual(feed["products"][0]["url"], "https://store.example.com/direct")
@@ -146,26 +126,97 @@ class PrintfulMerchFeedTests(SimpleTestCase):
             "error": "",
         }
 
+        listing = _listing({"id": 11, "name": "Fresh Product", "thumbnail_url": "", "variants": 1})
         with (
+            StubHTTPServer({"/sync/products?limit=8&offset=0": [listing]}) as server,
+            self.settings(PRINTFUL_API_BASE_URL=server.url("")),
             patch("core.services.printful._read_last_good_payload", return_value=stale_disk_payload),
-            patch(
-                "core.services.printful.urlopen",
-                return_value=_FakeResponse(
-                    {
-                        "code": 200,
-                        "result": [
-                            {
-                                "id": 11,
-                                "name": "Fresh Product",
-                                "thumbnail_url": "",
-                                "variants": 1,
-                            }
-                        ],
-                    }
-                ),
-            ) as mocked_urlopen,
         ):
             feed = get_printful_merch_feed(force_refresh=False)
 
         self.assertEqual([row["id"] for row in feed["products"]], [11])
-        mocked_urlopen.assert_called()
+        self.assertEqual(server.hits("/sync/products?limit=8&offset=0"), 1)
+
+
+@override_settings(
+    PRINTFUL_TOKEN="token-123",
+    PRINTFUL_MERCH_LIMIT=0,
+    PRINTFUL_MERCH_CACHE_SECONDS=0,
+    PRINTFUL_MERCH_SHOW_PRICE=True,
+    PRINTFUL_FETCH_WORKERS=4,
+    PRINTFUL_RATE_LIMIT_PER_MINUTE=6000,
+)
+class PrintfulCatalogFetchTests(SimpleTestCase):
+    def _catalog_routes(self, count: int) -> dict:
+        rows = [{"id": 500 + index, "name": f"BGM Item {index}", "variants": 1} for index in range(count)]
+        routes = {
+            f"/sync/products?limit=24&offset={offset}": [_listing(*rows[offset : offset + 24], total=count)]
+            for offset in range(0, count, 24)
+        }
+        for index in range(count):
+            routes[f"/sync/products/{500 + index}"] = [_detail(f"{20 + index}.00")]
+        return routes
+
+    def test_full_catalog_reuses_keep_alive_connections_and_fetches_details_concurrently(self):
+        with StubHTTPServer(self._catalog_routes(60), delay=0.02) as server:
+            with self.settings(PRINTFUL_API_BASE_URL=server.url("")):
+                feed = get_printful_merch_feed(force_refresh=True)
+
+        self.assertEqual(feed["error"], "")
+        self.assertEqual([row["id"] for row in feed["products"]], [500 + index for index in range(60)])
+        self.assertEqual(feed["products"][59]["price_label"], "$79.00")
+        self.assertEqual(len(server.requests), 3 + 60)
+        self.assertLessEqual(len(server.connections), 4)
+        self.assertGreater(server.peak_in_flight, 1)
+        self.assertLessEqual(server.peak_in_flight, 4)
+        self.assertTrue(all(request["headers"].get("Authorization") == "Bearer token-123" for request in server.requests))
+
+    def test_rate_limited_detail_request_is_retried_after_retry_after(self):
+        routes = self._catalog_routes(2)
+        routes["/sync/products/501"] = [
+            _json({"code": 429, "error": {"message": "Too many requests"}}, status=429, headers={"Retry-After": "0"}),
+            _detail("45.00"),
+        ]
+        with StubHTTPServer(routes) as server, self.settings(PRINTFUL_API_BASE_URL=server.url("")):
+            feed = get_printful_merch_feed(force_refresh=True)
+
+        self.assertEqual(feed["error"], "")
+        self.assertEqual(feed["products"][1]["price_label"], "$45.00")
+        self.assertEqual(server.hits("/sync/products/501"), 2)
+
+    def test_failed_listing_page_keeps_the_feed_error_path(self):
+        routes = self._catalog_routes(30)
+        routes["/sync/products?limit=24&offset=24"] = [_json({"code": 500}, status=500)]
+        with StubHTTPServer(routes) as server, self.settings(PRINTFUL_API_BASE_URL=server.url("")):
+            with patch("core.services.printful._read_last_good_payload", return_value=None):
+                feed = get_printful_merch_feed(force_refresh=True)
+
+        self.assertEqual(feed["error"], "http_500")
+        self.assertEqual(feed["products"], [])
+
+
+class PrintfulRateLimiterTests(SimpleTestCase):
+    def _limiter(self, **kwargs) -> tuple[PrintfulRateLimiter, list[float]]:
+        now = [0.0]
+        sleeps: list[float] = []
+
+        def _sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        return PrintfulRateLimiter(clock=lambda: now[0], sleep=_sleep, **kwargs), sleeps
+
+    def test_bucket_spends_the_burst_then_paces_requests(self):
+        limiter, sleeps = self._limiter(rate_per_minute=60, burst=2)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(sleeps, [1.0])
+
+    def test_exhausted_server_window_pauses_until_reset(self):
+        limiter, sleeps = self._limiter(rate_per_minute=600)
+        limiter.observe(
+            {"x-ratelimit-limit": "120", "x-ratelimit-policy": "120;w=60", "x-ratelimit-remaining": "0", "x-ratelimit-reset": "7"}
+        )
+        limiter.acquire()
+        self.assertEqual(limiter.rate, 2.0)
+        self.assertEqual(sleeps, [7.0])
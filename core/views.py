@@ -68,7 +68,6 @@ from core.models import (
     PromoCode,
     SiteNoticeSignup,
     ServicesPageCopy,
-    BookingDayOverride,
     HomePageCopy,
     HomePageFAQItem,
     FAQPageCopy,
@@ -89,8 +88,8 @@ from core.models import (
 )
 from core.forms import LeadForm, ServiceLeadForm
 from core.services.booking import (
-    get_available_slots, get_service_masters,
-    get_or_create_status, get_default_payment_status, _tz_aware
+    get_available_slots, get_available_slots_range, get_booking_day_statuses, get_service_masters,
+    get_or_create_status, get_default_payment_status, _tz_aware, MAX_AVAILABILITY_DAYS,
 )
 from core.validators import clean_phone
 from core.services.fonts import build_page_font_context
@@ -3480,6 +3479,7 @@ def api_availability(request):
     service_id = request.GET.get("service")
     date_str = request.GET.get("date")
     master_id = request.GET.get("master")
+    days_str = request.GET.get("days")
 
     if not service_id or not date_str:
         return HttpResponseBadRequest("service and date required")
@@ -3488,22 +3488,24 @@ def api_availability(request):
     day = parse_date(date_str)
     if not day:
         return HttpResponseBadRequest("invalid date")
+    days = 1
+    if days_str:
+        try:
+            days = int(days_str)
+        except (TypeError, ValueError):
+            return HttpResponseBadRequest("invalid days")
+        if not 1 <= days <= MAX_AVAILABILITY_DAYS:
+            return HttpResponseBadRequest(f"days must be between 1 and {MAX_AVAILABILITY_DAYS}")
 
-    day_dt = _tz_aware(datetime(day.year, day.month, day.day, 12, 0))
     master_obj = get_object_or_404(CustomUserDisplay, pk=master_id) if master_id else None
-    day_status = BookingDayOverride.resolve_status(day)
-    slots_map = get_available_slots(service, day_dt, master=master_obj)
-
     masters_qs = [master_obj] if master_obj else list(get_service_masters(service))
-    resp = {
-        "service": {"id": str(service.pk), "name": service.name, "duration": service.duration_min},
-        "date": date_str,
-        "day_status": {
-            "is_closed": day_status["is_closed"],
-            "source": day_status["source"],
-        },
-        "masters": []
-    }
+    last_day = day + timedelta(days=days - 1)
+    day_statuses = get_booking_day_statuses(day, last_day)
+    slots_by_day = get_available_slots_range(
+        service, day, last_day, masters=masters_qs, day_statuses=day_statuses
+    )
+
+    masters_payload = []
     for m in masters_qs:
         mp = getattr(m, "master_profile", None)
         avatar_url = ""
@@ -3512,13 +3514,37 @@ def api_availability(request):
                 avatar_url = mp.photo.url
             except Exception:
                 avatar_url = ""
-        resp["masters"].append({
+        masters_payload.append({
             "id": m.id,
             "name": m.get_full_name() or m.username,
             "avatar": avatar_url,
-            "slots": [s.isoformat() for s in slots_map.get(m.id, [])]
         })
-    return JsonResponse(resp)
+
+    def _day_payload(current_day):
+        day_status = day_statuses[current_day]
+        slots_map = slots_by_day[current_day]
+        return {
+            "date": current_day.isoformat(),
+            "day_status": {
+                "is_closed": day_status["is_closed"],
+                "source": day_status["source"],
+            },
+            "masters": [
+                {**row, "slots": [s.isoformat() for s in slots_map.get(row["id"], [])]}
+                for row in masters_payload
+            ],
+        }
+
+    service_payload = {"id": str(service.pk), "name": service.name, "duration": service.duration_min}
+    if not days_str:
+        return JsonResponse({"service": service_payload, **_day_payload(day), "date": date_str})
+
+    # Week strip: one request for several days; each entry has the single-day shape.
+    return JsonResponse({
+        "service": service_payload,
+        "date": date_str,
+        "days": [_day_payload(day + timedelta(days=offset)) for offset in range(days)],
+    })
 
 @require_POST
 @csrf_protect
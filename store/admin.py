@@ -11,7 +11,8 @@ from django.core.files.storage import default_storage
 from django.utils.text import get_valid_filename
 from django.db import transaction
 from django.db.models import Count, Q
-from django.shortcuts import redirect
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect
 from django.template.response import TemplateResponse
 from django.urls import path, reverse
 from django.utils.html import format_html, format_html_join
@@ -41,14 +42,18 @@ from .models import (
     StoreReview,
 )
 from .forms_store import ProductAdminForm, ProductImportForm, StoreInventorySettingsAdminForm
-from .importers import import_products
+from .import_jobs import enqueue_import, import_batch_progress
 from .printful_fulfillment import handle_order_payment_status_transition
+from .storefront_index import bump_catalog_version
 
 Product._meta.get_field("unit_cost").verbose_name = "Cost / unit"
 Product._meta.get_field("is_in_house").verbose_name = "In-house"
 Product._meta.get_field("is_active").verbose_name = "Active"
 Product._meta.get_field("contact_for_estimate").verbose_name = "Estimate only"
 
+# Failed imports keep the chunks committed before the failure, so they can be rolled back too.
+ROLLBACK_IMPORT_STATUSES = (ImportBatch.Status.COMPLETED, ImportBatch.Status.FAILED)
+
 
 # ─────────────────────────── Auto directories ───────────────────────────
 
@@ -730,6 +735,7 @@ class ProductAdmin(admin.ModelAdmin):
         opts = self.model._meta
         last_import = ImportBatch.objects.filter(
             is_dry_run=False,
+            status__in=ROLLBACK_IMPORT_STATUSES,
             rolled_back_at__isnull=True,
         ).order_by("-created_at").first()
         last_cleanup = CleanupBatch.objects.filter(
@@ -942,6 +948,8 @@ class ProductAdmin(admin.ModelAdmin):
             return redirect("admin:store_product_changelist")
 
         updated = self.model.objects.update(inventory=self.BULK_RESTOCK_INVENTORY)
+        # Queryset updates skip the catalog signals; cached listings show stock badges.
+        transaction.on_commit(bump_catalog_version)
         messages.success(
             request,
             f"Set inventory to {self.BULK_RESTOCK_INVENTORY} for {updated} product(s).",
@@ -955,73 +963,23 @@ class ProductAdmin(admin.ModelAdmin):
         if request.method == "POST":
             form = ProductImportForm(request.POST, request.FILES)
             if form.is_valid():
-                import_batch = None
-                if not form.cleaned_data["dry_run"]:
-                    import_batch = ImportBatch.objects.create(
-                        created_by=request.user,
-                        source_filename=getattr(form.cleaned_data["file"], "name", ""),
-                        mode=form.cleaned_data["mode"],
-                        is_dry_run=form.cleaned_data["dry_run"],
-                    )
-                try:
-                    result = import_products(
-                        uploaded_file=form.cleaned_data["file"],
-                        mode=form.cleaned_data["mode"],
-                        default_category=form.cleaned_data["default_category"],
-                        default_currency=form.cleaned_data["default_currency"],
-                        update_existing=form.cleaned_data["update_existing"],
-                        create_missing_categories=form.cleaned_data["create_missing_categories"],
-                        dieselr_foreign=form.cleaned_data["dieselr_foreign"],
-                        dry_run=form.cleaned_data["dry_run"],
-                        import_batch=import_batch,
-                    )
-                except ValueError as exc:
-                    if import_batch:
-                        import_batch.delete()
-                    messages.error(request, str(exc))
-                else:
-                    if import_batch:
-                        import_batch.created_products = result.created_products
-                        import_batch.updated_products = result.updated_products
-                        import_batch.skipped_products = result.skipped_products
-                        import_batch.created_options = result.created_options
-                        import_batch.updated_options = result.updated_options
-                        import_batch.skipped_options = result.skipped_options
-                        import_batch.created_categories = result.created_categories
-                        import_batch.error_count = len(result.errors)
-                        import_batch.save(
-                            update_fields=[
-                                "created_products",
-                                "updated_products",
-                                "skipped_products",
-                                "created_options",
-                                "updated_options",
-                                "skipped_options",
-                                "created_categories",
-                                "error_count",
-                            ]
-                        )
-                    summary = (
-                        f"Products: {result.created_products} created, "
-                        f"{result.updated_products} updated, "
-                        f"{result.skipped_products} skipped. "
-                        f"Options: {result.created_options} created, "
-                        f"{result.updated_options} updated, "
-                        f"{result.skipped_options} skipped. "
-                        f"Categories: {result.created_categories} created."
-                    )
-                    level = messages.SUCCESS if not result.errors else messages.WARNING
-                    messages.add_message(request, level, summary)
-                    if result.errors:
-                        errors = result.errors[:10]
-                        if len(result.errors) > 10:
-                            errors.append(f"...and {len(result.errors) - 10} more.")
-                        messages.warning(request, "Errors: " + " | ".join(errors))
-                    if not form.cleaned_data["dry_run"]:
-                        opts = self.model._meta
-                        return redirect(
-                            reverse(f"admin:{opts.app_label}_{opts.model_name}_changelist")
-                        )
+                batch = enqueue_import(
+                    uploaded_file=form.cleaned_data["file"],
+                    created_by=request.user,
+                    mode=form.cleaned_data["mode"],
+                    default_category=form.cleaned_data["default_category"],
+                    default_currency=form.cleaned_data["default_currency"],
+                    update_existing=form.cleaned_data["update_existing"],
+                    create_missing_categories=form.cleaned_data["create_missing_categories"],
+                    dieselr_foreign=form.cleaned_data["dieselr_foreign"],
+                    dry_run=form.cleaned_data["dry_run"],
+                )
+                label = "Dry run" if batch.is_dry_run else "Import"
+                messages.info(
+                    request,
+                    f"{label} #{batch.pk} queued. Progress and row errors are shown below as it runs.",
+                )
+                return redirect(reverse("admin:store_importbatch_change", args=[batch.pk]))
         else:
             form = ProductImportForm(
                 initial={
@@ -1066,11 +1024,13 @@ class ProductAdmin(admin.ModelAdmin):
     @admin.action(description="Hide selected products from storefront")
     def hide_selected_products(self, request, queryset):
         updated = queryset.update(is_active=False)
+        transaction.on_commit(bump_catalog_version)
         self.message_user(request, f"Hidden {updated} product(s) from storefront.", level=messages.SUCCESS)
 
     @admin.action(description="Show selected products on storefront")
     def show_selected_products(self, request, queryset):
         updated = queryset.update(is_active=True)
+        transaction.on_commit(bump_catalog_version)
         self.message_user(request, f"Published {updated} product(s) on storefront.", level=messages.SUCCESS)
 
     def _junk_queryset(self):
@@ -1304,6 +1264,7 @@ class ProductAdmin(admin.ModelAdmin):
                 updated += 1
 
             if updated:
+                transaction.on_commit(bump_catalog_version)
                 messages.success(request, f"Added photo URLs to {updated} products.")
             else:
                 messages.warning(request, "No photo URLs were added.")
@@ -1468,6 +1429,8 @@ class ProductAdmin(admin.ModelAdmin):
                     continue
                 category_updated += 1
 
+            if updated or category_updated:
+                transaction.on_commit(bump_catalog_version)
             if updated:
                 messages.success(request, f"Added placeholder photos to {updated} products.")
             else:
@@ -1578,6 +1541,8 @@ class ProductAdmin(admin.ModelAdmin):
                 Category.objects.filter(pk=category.pk).update(image=None)
                 category_cleared += 1
 
+            if cleared or category_cleared:
+                transaction.on_commit(bump_catalog_version)
             if cleared:
                 messages.success(request, f"Cleared autofilled photos for {cleared} products.")
             else:
@@ -1634,6 +1599,7 @@ class ProductAdmin(admin.ModelAdmin):
                 deactivated = junk_qs.update(is_active=False, cleanup_batch=batch)
                 batch.deactivated_products = deactivated
                 batch.save(update_fields=["deactivated_products"])
+                transaction.on_commit(bump_catalog_version)
 
             messages.success(request, f"Deactivated {deactivated} junk products.")
             return redirect(
@@ -1695,6 +1661,7 @@ class ProductAdmin(admin.ModelAdmin):
                 updated += 1
 
             if updated:
+                transaction.on_commit(bump_catalog_version)
                 messages.success(request, f"Updated {updated} product names.")
             else:
                 messages.warning(request, "No product names were updated.")
@@ -1764,6 +1731,7 @@ class ProductAdmin(admin.ModelAdmin):
                 products_qs = Product.objects.filter(cleanup_batch=batch)
                 products_count = products_qs.count()
                 products_qs.update(is_active=True, cleanup_batch=None)
+                transaction.on_commit(bump_catalog_version)
                 batch.rolled_back_at = timezone.now()
                 batch.save(update_fields=["rolled_back_at"])
 
@@ -1795,6 +1763,7 @@ class ProductAdmin(admin.ModelAdmin):
 
         batch = ImportBatch.objects.filter(
             is_dry_run=False,
+            status__in=ROLLBACK_IMPORT_STATUSES,
             rolled_back_at__isnull=True,
         ).order_by("-created_at").first()
         if not batch:
@@ -1890,18 +1859,21 @@ class ProductOptionAdmin(admin.ModelAdmin):
 
 @admin.register(ImportBatch)
 class ImportBatchAdmin(admin.ModelAdmin):
+    change_form_template = "admin/store/importbatch/change_form.html"
     list_display = (
         "id",
         "created_at",
         "created_by",
         "source_filename",
         "mode",
+        "status",
+        "processed_rows",
         "created_products",
         "created_options",
         "error_count",
         "rolled_back_at",
     )
-    list_filter = ("mode", "is_dry_run", "rolled_back_at")
+    list_filter = ("status", "mode", "is_dry_run", "rolled_back_at")
     search_fields = ("source_filename", "created_by__username")
     readonly_fields = (
         "created_at",
@@ -1909,6 +1881,11 @@ class ImportBatchAdmin(admin.ModelAdmin):
         "source_filename",
         "mode",
         "is_dry_run",
+        "status",
+        "total_rows",
+        "processed_rows",
+        "started_at",
+        "finished_at",
         "created_products",
         "updated_products",
         "skipped_products",
@@ -1917,8 +1894,37 @@ class ImportBatchAdmin(admin.ModelAdmin):
         "skipped_options",
         "created_categories",
         "error_count",
+        "errors",
+        "failure_reason",
         "rolled_back_at",
     )
+    exclude = ("upload", "import_options")
+
+    def get_urls(self):
+        urls = super().get_urls()
+        opts = self.model._meta
+        custom_urls = [
+            path(
+                "<int:object_id>/progress/",
+                self.admin_site.admin_view(self.progress_view),
+                name=f"{opts.app_label}_{opts.model_name}_progress",
+            ),
+        ]
+        return custom_urls + urls
+
+    def progress_view(self, request, object_id):
+        batch = get_object_or_404(ImportBatch, pk=object_id)
+        if not self.has_view_permission(request, batch):
+            raise PermissionDenied
+        return JsonResponse(import_batch_progress(batch))
+
+    def change_view(self, request, object_id, form_url="", extra_context=None):
+        extra_context = extra_context or {}
+        opts = self.model._meta
+        extra_context["progress_url"] = reverse(
+            f"admin:{opts.app_label}_{opts.model_name}_progress", args=[object_id]
+        )
+        return super().change_view(request, object_id, form_url, extra_context=extra_context)
 
     def has_add_permission(self, request):
         return False
@@ -2279,10 +2285,22 @@ class CustomFitmentRequestAdmin(admin.ModelAdmin):
 
 @admin.register(PrintfulWebhookEvent)
 class PrintfulWebhookEventAdmin(admin.ModelAdmin):
-    list_display = ("received_at", "event_type", "order")
-    list_filter = ("event_type",)
+    list_display = ("received_at", "event_type", "order", "status", "attempts", "processing_latency")
+    list_filter = ("status", "event_type")
     search_fields = ("event_type", "order__id", "order__customer_name", "event_hash")
-    readonly_fields = ("event_type", "event_hash", "order", "payload", "received_at")
+    readonly_fields = (
+        "event_type",
+        "event_hash",
+        "order",
+        "payload",
+        "received_at",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "processed_at",
+        "processing_latency",
+        "last_error",
+    )
 
     def has_add_permission(self, request):
         return False
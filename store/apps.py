@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class StoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "store"
+
+    def ready(self):
+        # Import signal handlers once the app is loaded.
+        from . import signals  # noqa: F401
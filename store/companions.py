@@ -0,0 +1,346 @@
+"""
+Offline "items that go along" recommendations.
+
+ProductCompanion keeps the top COMPANION_ROWS_PER_PRODUCT companions per product so
+product pages read a handful of indexed rows instead of scoring the whole catalog.
+Scoring is the same as Product.compute_companion_items (store.models.rank_companions);
+this module only makes it cheap enough to run for every product: profiles are built
+once per catalog load, and candidates are limited to products that share a fitment
+model, a category or a match token, which are the only ones that can score above zero.
+
+Every ranked product is stamped with Product.companions_checked_at, even when it
+has no companions. Signals only clear the stamp of changed products, and of the
+products listing them. The `rebuild_product_companions` cron re-ranks stale products,
+the products listing them and the products they would now rank for; the nightly
+`--all` run repairs anything written around the signals.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import (
+    COMPANION_ROWS_PER_PRODUCT,
+    CompanionProfile,
+    Product,
+    ProductCompanion,
+    companion_match_tokens,
+    is_merch_identity,
+    order_companions,
+    score_companion,
+    score_companion_overlap,
+)
+
+COMPANION_WRITE_BATCH_SIZE = 1000
+
+
+def load_companion_profiles() -> list[CompanionProfile]:
+    """
+    Profiles for every active, non-merch product, newest first. Two queries.
+    """
+    model_ids: dict[int, set[int]] = defaultdict(set)
+    through = Product.compatible_models.through
+    for product_id, carmodel_id in through.objects.filter(product__is_active=True).values_list(
+        "product_id", "carmodel_id"
+    ):
+        model_ids[product_id].add(carmodel_id)
+
+    rows = (
+        Product.objects.filter(is_active=True)
+        .order_by("-created_at", "-id")
+        .values_list(
+            "pk",
+            "category_id",
+            "created_at",
+            "sku",
+            "slug",
+            "category__slug",
+            "category__name",
+            "name",
+            "short_description",
+            "description",
+            "compatibility",
+        )
+    )
+    profiles = []
+    for pk, category_id, created_at, sku, slug, category_slug, category_name, *text in rows.iterator(
+        chunk_size=2000
+    ):
+        if is_merch_identity(category_slug, sku, slug):
+            continue
+        profiles.append(
+            CompanionProfile(
+                pk=pk,
+                category_id=category_id,
+                created_at=created_at,
+                tokens=frozenset(companion_match_tokens(*text, category_name)),
+                model_ids=frozenset(model_ids.get(pk, ())),
+            )
+        )
+    return profiles
+
+
+class CompanionIndex:
+    """
+    Inverted lists over catalog profiles (newest first) used to block candidates.
+    """
+
+    def __init__(self, profiles: list[CompanionProfile]):
+        self.profiles = profiles
+        self.by_pk = {profile.pk: profile for profile in profiles}
+        self.category_of = {profile.pk: profile.category_id for profile in profiles}
+        self.with_models = {profile.pk for profile in profiles if profile.model_ids}
+        self.position = {profile.pk: index for index, profile in enumerate(profiles)}
+        self.by_category: dict[int | None, list[CompanionProfile]] = defaultdict(list)
+        self.by_model: dict[int, list[int]] = defaultdict(list)
+        self.by_token: dict[str, list[int]] = defaultdict(list)
+        for profile in profiles:
+            self.by_category[profile.category_id].append(profile)
+            for model_id in profile.model_ids:
+                self.by_model[model_id].append(profile.pk)
+            for token in profile.tokens:
+                self.by_token[token].append(profile.pk)
+
+    def candidates_for(self, own: CompanionProfile) -> list[CompanionProfile]:
+        pks = {profile.pk for profile in self.by_category.get(own.category_id, ())}
+        for model_id in own.model_ids:
+            pks.update(self.by_model.get(model_id, ()))
+        for token in own.tokens:
+            pks.update(self.by_token.get(token, ()))
+        pks.discard(own.pk)
+        return [self.by_pk[pk] for pk in sorted(pks, key=self.position.__getitem__)]
+
+    def rank(self, own: CompanionProfile, limit: int = COMPANION_ROWS_PER_PRODUCT) -> list[tuple[int, int]]:
+        """
+        Same result as rank_companions(own, self.profiles, limit), with overlaps
+        counted from the posting lists instead of intersecting every candidate.
+        """
+        model_hits: Counter[int] = Counter()
+        for model_id in own.model_ids:
+            model_hits.update(self.by_model.get(model_id, ()))
+        model_hits.pop(own.pk, None)
+
+        if len(model_hits) >= limit:
+            scored = self._score_fitment_matches(own, model_hits, limit)
+        else:
+            scored = self._score_catalog(own, model_hits, limit)
+        return order_companions(
+            own,
+            scored,
+            limit,
+            fallback_pools=(self.by_category.get(own.category_id, ()), self.profiles),
+        )
+
+    def _score_fitment_matches(self, own: CompanionProfile, model_hits: Counter[int], limit: int) -> list:
+        # Any shared fitment model scores at least 145 and nothing else can reach 86,
+        # so only fitment matches compete. Visit them in (shared models, same category)
+        # buckets by best possible score and stop once a bucket cannot reach the top.
+        table = _overlap_score_table()
+        buckets: dict[tuple[int, bool], list[int]] = defaultdict(list)
+        for pk, shared in model_hits.items():
+            buckets[min(shared, 3), self.category_of[pk] == own.category_id].append(pk)
+
+        def best_case(key: tuple[int, bool]) -> int:
+            return table[key[0], 5, key[1], True, True]
+
+        scored: list[tuple[int, int, int]] = []
+        for key in sorted(buckets, key=best_case, reverse=True):
+            if len(scored) >= limit and best_case(key) < heapq.nlargest(limit, scored)[-1][0]:
+                break
+            shared, same_category = key
+            for pk in buckets[key]:
+                tokens = min(len(own.tokens & self.by_pk[pk].tokens), 5)
+                scored.append((table[shared, tokens, same_category, True, True], -self.position[pk], pk))
+        return scored
+
+    def _score_catalog(self, own: CompanionProfile, model_hits: Counter[int], limit: int) -> list:
+        # Few fitment matches: score them, then walk same-category and other products
+        # newest first. Within a walk, once `limit` products reach the walk's best
+        # possible score, every older product there can only tie and lose on recency.
+        table = _overlap_score_table()
+        own_has_models = bool(own.model_ids)
+        scored: list[tuple[int, int, int]] = []
+        for pk, shared in model_hits.items():
+            profile = self.by_pk[pk]
+            value = table[
+                min(shared, 3),
+                min(len(own.tokens & profile.tokens), 5),
+                profile.category_id == own.category_id,
+                own_has_models,
+                True,
+            ]
+            scored.append((value, -self.position[pk], pk))
+
+        walks = ((True, self.by_category.get(own.category_id, ())), (False, self.profiles))
+        for same_category, walk in walks:
+            best = table[0, 5, same_category, own_has_models, False]
+            if len(scored) >= limit and best < heapq.nlargest(limit, scored)[-1][0]:
+                continue
+            best_hits = 0
+            for profile in walk:
+                pk = profile.pk
+                if pk == own.pk or pk in model_hits or (profile.category_id == own.category_id) != same_category:
+                    continue
+                value = table[
+                    0,
+                    min(len(own.tokens & profile.tokens), 5),
+                    same_category,
+                    own_has_models,
+                    pk in self.with_models,
+                ]
+                if value > 0:
+                    scored.append((value, -self.position[pk], pk))
+                if value == best:
+                    best_hits += 1
+                    if best_hits >= limit:
+                        break
+        return scored
+
+
+@lru_cache(maxsize=1)
+def _overlap_score_table() -> dict[tuple[int, int, bool, bool, bool], int]:
+    # score_companion_overlap() caps both overlaps (3 models, 5 tokens), so it has few distinct inputs.
+    return {
+        (models, tokens, same_category, own_has_models, candidate_has_models): score_companion_overlap(
+            shared_models=models,
+            shared_tokens=tokens,
+            same_category=same_category,
+            own_has_models=own_has_models,
+            candidate_has_models=candidate_has_models,
+        )
+        for models, tokens, same_category, own_has_models, candidate_has_models in itertools.product(
+            range(4), range(6), (False, True), (False, True), (False, True)
+        )
+    }
+
+
+def rebuild_product_companions(
+    product_ids: Iterable[int] | None = None,
+    *,
+    index: CompanionIndex | None = None,
+) -> dict[str, int]:
+    """
+    Recompute ProductCompanion rows for the given products (all when None).
+    Products whose ranking did not change are left untouched.
+    """
+    started_at = timezone.now()
+    index = index or CompanionIndex(load_companion_profiles())
+    if product_ids is None:
+        target_ids = set(index.by_pk)
+        stale_qs = ProductCompanion.objects.exclude(product_id__in=target_ids)
+    else:
+        target_ids = {int(pk) for pk in product_ids if pk}
+        stale_qs = ProductCompanion.objects.filter(product_id__in=target_ids - set(index.by_pk))
+
+    existing: dict[int, list[tuple[int, int]]] = defaultdict(list)
+    existing_qs = ProductCompanion.objects.order_by("product_id", "rank")
+    if product_ids is not None:
+        existing_qs = existing_qs.filter(product_id__in=target_ids)
+    for product_id, companion_id, score in existing_qs.values_list("product_id", "companion_id", "score"):
+        existing[product_id].append((companion_id, score))
+
+    changed_ids: list[int] = []
+    checked_ids: list[int] = []
+    new_rows: list[ProductCompanion] = []
+    for product_id in sorted(target_ids):
+        own = index.by_pk.get(product_id)
+        if own is None:
+            continue
+        checked_ids.append(product_id)
+        ranked = index.rank(own)
+        if ranked == existing.get(product_id, []):
+            continue
+        changed_ids.append(product_id)
+        new_rows.extend(
+            ProductCompanion(product_id=product_id, companion_id=companion_id, score=score, rank=rank)
+            for rank, (companion_id, score) in enumerate(ranked)
+        )
+
+    with transaction.atomic():
+        removed, _ = stale_qs.delete()
+        if changed_ids:
+            ProductCompanion.objects.filter(product_id__in=changed_ids).delete()
+            ProductCompanion.objects.bulk_create(new_rows, batch_size=COMPANION_WRITE_BATCH_SIZE)
+        # Stamp every ranked product, including those with an empty ranking, so stale
+        # detection does not pick them up again; edits made meanwhile stay newer.
+        checked_qs = Product.objects.filter(is_active=True)
+        if product_ids is not None:
+            checked_qs = checked_qs.filter(pk__in=checked_ids)
+        checked_qs.update(companions_checked_at=started_at)
+    return {
+        "products_checked": len(target_ids),
+        "products_updated": len(changed_ids),
+        "rows_written": len(new_rows),
+        "rows_removed": removed,
+    }
+
+
+def stale_companion_product_ids() -> set[int]:
+    """
+    Active, non-merch products never ranked or edited since they were last ranked.
+    Merch is never ranked (see load_companion_profiles), so it is left out here too.
+    """
+    return set(
+        Product.objects.filter(is_active=True)
+        .exclude(Q(category__slug__iexact="merch") | Q(sku__istartswith="PF-") | Q(slug__istartswith="merch-"))
+        .filter(Q(companions_checked_at__isnull=True) | Q(updated_at__gt=F("companions_checked_at")))
+        .values_list("pk", flat=True)
+    )
+
+
+def mark_companions_stale(product_ids: Iterable[int]) -> int:
+    """
+    Queue changed products, and the products listing them, for the next stale
+    rebuild by clearing their checked stamp; one UPDATE, no scoring.
+    """
+    ids = {int(pk) for pk in product_ids if pk}
+    if not ids:
+        return 0
+    listing = ProductCompanion.objects.filter(companion_id__in=ids).values("product_id")
+    return Product.objects.filter(Q(pk__in=ids) | Q(pk__in=listing)).update(companions_checked_at=None)
+
+
+def refresh_companions_for(product_ids: Iterable[int], *, index: CompanionIndex | None = None) -> dict[str, int]:
+    """
+    Refresh companions after the given products changed: the products themselves,
+    products currently listing them, and products they would now rank for. Scores
+    are symmetric, so a product is re-ranked only when a changed product scores at
+    least as high as its weakest stored companion or its list is not full.
+    """
+    ids = {int(pk) for pk in product_ids if pk}
+    if not ids:
+        return {"products_checked": 0, "products_updated": 0, "rows_written": 0, "rows_removed": 0}
+    index = index or CompanionIndex(load_companion_profiles())
+
+    affected = set(ids)
+    affected.update(ProductCompanion.objects.filter(companion_id__in=ids).values_list("product_id", flat=True))
+    best_scores: dict[int, int] = {}
+    for pk in ids:
+        own = index.by_pk.get(pk)
+        if own is None:
+            continue
+        for candidate in index.candidates_for(own):
+            score = score_companion(own, candidate)
+            if score > best_scores.get(candidate.pk, 0):
+                best_scores[candidate.pk] = score
+
+    if best_scores:
+        floors = {
+            product_id: (count, floor)
+            for product_id, count, floor in ProductCompanion.objects.filter(product_id__in=best_scores)
+            .values("product_id")
+            .annotate(count=Count("pk"), floor=Min("score"))
+            .values_list("product_id", "count", "floor")
+        }
+        for pk, score in best_scores.items():
+            count, floor = floors.get(pk, (0, None))
+            if count < COMPANION_ROWS_PER_PRODUCT or score >= floor:
+                affected.add(pk)
+    return rebuild_product_companions(affected, index=index)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+from store.models import Product, SupplierProductMatch
+
+from .types import ProductMatch, SourceProduct
+
+# Bump when matching rules change so stored results are recomputed.
+MATCHER_VERSION = 1
+SAVE_BATCH_SIZE = 500
+
+
+def source_key(source: SourceProduct) -> str:
+    return f"{source.product_id}:{source.variant_id}:{source.sku}"[:160]
+
+
+def source_hash(source: SourceProduct) -> str:
+    encoded = json.dumps(source.to_dict(), sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+@dataclass(frozen=True)
+class PendingMatch:
+    product_id: int
+    product_hash: str
+    match: ProductMatch
+
+
+class MatchCache:
+    """
+    Stored product -> supplier matches for one supplier.
+
+    A stored result is reused while the product hash (name, SKU, slug, category
+    and match options) is unchanged and the source records it points to still
+    exist unchanged. High-confidence single matches (SKU, embedded code, exact
+    name) survive other catalog changes; name-scored, ambiguous and failed
+    results depend on the whole catalog and are only reused while it is unchanged.
+    """
+
+    def __init__(
+        self,
+        *,
+        supplier: str,
+        source_products: list[SourceProduct],
+        options: dict[str, bool],
+    ) -> None:
+        self.supplier = supplier[:80]
+        self.options_key = json.dumps({"version": MATCHER_VERSION, **options}, sort_keys=True)
+        self.sources: dict[str, SourceProduct] = {}
+        self.source_hashes: dict[str, str] = {}
+        for source in source_products:
+            key = source_key(source)
+            self.sources[key] = source
+            self.source_hashes[key] = source_hash(source)
+        self.catalog_hash = hashlib.sha256(
+            "\n".join(sorted(f"{key}={value}" for key, value in self.source_hashes.items())).encode("utf-8")
+        ).hexdigest()
+        self._stored: dict[int, SupplierProductMatch] = {}
+        self._pending: list[PendingMatch] = []
+
+    def load(self, products: list[Product]) -> None:
+        product_ids = [product.pk for product in products]
+        for start in range(0, len(product_ids), SAVE_BATCH_SIZE):
+            rows = SupplierProductMatch.objects.filter(
+                supplier=self.supplier,
+                product_id__in=product_ids[start : start + SAVE_BATCH_SIZE],
+            )
+            self._stored.update({row.product_id: row for row in rows})
+
+    def product_hash(self, product: Product) -> str:
+        category = getattr(product, "category", None)
+        parts = [
+            self.options_key,
+            product.name or "",
+            product.sku or "",
+            getattr(product, "slug", "") or "",
+            getattr(category, "name", "") or "",
+            getattr(category, "slug", "") or "",
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def reuse(self, product: Product, product_hash: str) -> ProductMatch | None:
+        row = self._stored.get(product.pk)
+        if row is None or row.product_hash != product_hash:
+            return None
+        depends_on_catalog = row.confidence != "high" or bool(row.alternatives) or not row.source_key
+        if depends_on_catalog and row.catalog_hash != self.catalog_hash:
+            return None
+        source = None
+        if row.source_key:
+            if self.source_hashes.get(row.source_key) != row.source_hash:
+                return None
+            source = self.sources[row.source_key]
+        alternatives: list[SourceProduct] = []
+        for key, expected_hash in row.alternatives:
+            if self.source_hashes.get(key) != expected_hash:
+                return None
+            alternatives.append(self.sources[key])
+        return ProductMatch(
+            confidence=row.confidence,
+            reason=row.reason,
+            source=source,
+            alternatives=tuple(alternatives),
+        )
+
+    def remember(self, product: Product, product_hash: str, match: ProductMatch) -> None:
+        self._pending.append(PendingMatch(product_id=product.pk, product_hash=product_hash, match=match))
+
+    def save(self) -> int:
+        rows = []
+        for pending in self._pending:
+            match = pending.match
+            key = source_key(match.source) if match.source else ""
+            rows.append(
+                SupplierProductMatch(
+                    supplier=self.supplier,
+                    product_id=pending.product_id,
+                    product_hash=pending.product_hash,
+                    catalog_hash=self.catalog_hash,
+                    confidence=match.confidence[:16],
+                    reason=match.reason[:64],
+                    source_key=key,
+                    source_hash=source_hash(match.source) if match.source else "",
+                    alternatives=[[source_key(item), source_hash(item)] for item in match.alternatives],
+                )
+            )
+        if rows:
+            SupplierProductMatch.objects.bulk_create(
+                rows,
+                batch_size=SAVE_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=["supplier", "product"],
+                update_fields=[
+                    "product_hash",
+                    "catalog_hash",
+                    "confidence",
+                    "reason",
+                    "source_key",
+                    "source_hash",
+                    "alternatives",
+                    "updated_at",
+                ],
+            )
+        self._pending = []
+        return len(rows)
@@ -6,10 +6,13 @@ from datetime import datetime, timezone
 from typing import Any
 
 from django.db import transaction
+from django.utils.text import slugify
 
 from store.fassride_import.images import ImageAssetManager
 from store.models import Product, ProductImage
+from store.thumbnails import deferred_thumbnails
 
+from .match_cache import MatchCache
 from .matching import build_compact_sku_index, build_name_index, build_sku_index, match_catalog_product
 from .reporting import save_json_report
 from .source import DirtyDieselCatalogClient, load_source_products
@@ -18,6 +21,7 @@ from .types import ImportReport, SourceProduct
 logger = logging.getLogger(__name__)
 
 DEFAULT_EXCLUDED_CATEGORY_PREFIXES = ("fass-",)
+DIRTYDIESEL_IMAGE_PREFIX = "store/imports/dirtydiesel/assets"
 PRODUCT_IMAGE_ALT_MAX_LENGTH = ProductImage._meta.get_field("alt").max_length or 0
 
 
@@ -40,6 +44,7 @@ class DirtyDieselImportPipeline:
         report_prefix: str = "store/import-reports/dirtydiesel",
         source_client: DirtyDieselCatalogClient | None = None,
         image_manager: ImageAssetManager | None = None,
+        reuse_matches: bool = True,
     ) -> None:
         self.supplier_label = str(supplier_label or "Supplier").strip()
         self.category_slugs = tuple(dict.fromkeys(slug.strip() for slug in category_slugs if slug.strip()))
@@ -59,7 +64,8 @@ class DirtyDieselImportPipeline:
         self.source_report_path = source_report_path.strip()
         self.report_prefix = report_prefix.strip().strip("/") or "store/import-reports/dirtydiesel"
         self.source_client = source_client or DirtyDieselCatalogClient()
-        self.image_manager = image_manager or ImageAssetManager(storage_prefix="store/imports/dirtydiesel/assets")
+        self.image_manager = image_manager or ImageAssetManager(storage_prefix=DIRTYDIESEL_IMAGE_PREFIX)
+        self.reuse_matches = bool(reuse_matches)
         self.run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
 
     def run(self) -> ImportReport:
@@ -72,6 +78,7 @@ class DirtyDieselImportPipeline:
                 "Exact normalized supplier product-name matches are treated as high confidence when the supplier variants collapse to one product page or one shared primary image.",
                 "Normalized-name matches are medium confidence and are only applied when --match-by-name is explicitly enabled.",
                 f"Gallery imports add missing {self.supplier_label} images without duplicating existing gallery entries.",
+                "Stored matches are reused while the product and its matched source records are unchanged; name-based, ambiguous and failed matches are recomputed whenever the source catalog changes.",
             ]
         )
 
@@ -81,30 +88,52 @@ class DirtyDieselImportPipeline:
             if self.source_report_path
             else self.source_client.fetch_catalog()
         )
-        source_by_sku = build_sku_index(source_products)
-        source_by_compact_sku = build_compact_sku_index(source_products)
-        source_candidates, token_index, exact_name_index = build_name_index(source_products)
+        match_cache = MatchCache(
+            supplier=slugify(self.supplier_label) or "supplier",
+            source_products=source_products,
+            options={
+                "allow_name_match": self.allow_name_match,
+                "allow_embedded_code_match": self.allow_embedded_code_match,
+            },
+        )
+        if self.reuse_matches:
+            match_cache.load(products)
+        # Built on first use: a run where every match is reused never profiles the catalog.
+        indexes: dict[str, Any] = {}
 
         planned_updates: list[dict[str, Any]] = []
         summary = defaultdict(int)
         summary["target_products"] = len(products)
         summary["source_products"] = len(source_products)
+        self.image_manager.prime([url for source in source_products for url in source.image_urls])
 
         for product in products:
             summary["products_scanned"] += 1
             if not self._should_replace_product_image(product):
                 summary["skipped_existing_images"] += 1
                 continue
-            match = match_catalog_product(
-                product,
-                source_by_sku=source_by_sku,
-                source_by_compact_sku=source_by_compact_sku,
-                source_candidates=source_candidates,
-                token_index=token_index,
-                exact_name_index=exact_name_index,
-                allow_name_match=self.allow_name_match,
-                allow_embedded_code_match=self.allow_embedded_code_match,
-            )
+            product_hash = match_cache.product_hash(product)
+            match = match_cache.reuse(product, product_hash) if self.reuse_matches else None
+            if match is not None:
+                summary["matches_reused"] += 1
+            else:
+                if not indexes:
+                    source_candidates, token_index, exact_name_index = build_name_index(source_products)
+                    indexes.update(
+                        source_by_sku=build_sku_index(source_products),
+                        source_by_compact_sku=build_compact_sku_index(source_products),
+                        source_candidates=source_candidates,
+                        token_index=token_index,
+                        exact_name_index=exact_name_index,
+                    )
+                match = match_catalog_product(
+                    product,
+                    **indexes,
+                    allow_name_match=self.allow_name_match,
+                    allow_embedded_code_match=self.allow_embedded_code_match,
+                )
+                match_cache.remember(product, product_hash, match)
+                summary["matches_recomputed"] += 1
             if match.reason.startswith("ambiguous_"):
                 summary["ambiguous_matches"] += 1
                 report.ambiguous_matches.append(
@@ -167,13 +196,17 @@ class DirtyDieselImportPipeline:
             summary["matched_embedded_code"] += 1 if match.reason == "embedded_source_sku" else 0
             summary["matched_name"] += 1 if match.reason == "normalized_name" else 0
 
+        match_cache.save()
         report.debug_files.update(self._save_debug_files(source_products, planned_updates))
 
         if self.apply_changes:
-            summary["updated_products"] = self._apply_product_updates(products, planned_updates, report, summary)
+            # Thumbnails for the localized images are rendered by generate_product_thumbnails.
+            with deferred_thumbnails():
+                summary["updated_products"] = self._apply_product_updates(products, planned_updates, report, summary)
         else:
             summary["planned_product_updates"] = len(planned_updates)
 
+        summary.update(self.image_manager.storage_stats())
         report.summary = dict(summary)
         report_path = save_json_report(f"{self.report_prefix}/{self.run_id}/report.json", report.to_dict())
         report.debug_files["report"] = report_path
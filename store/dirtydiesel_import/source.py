@@ -10,6 +10,8 @@ from urllib.request import Request, urlopen
 
 from django.core.files.storage import default_storage
 
+from store.supplier_http_cache import SupplierHttpCache
+
 from .types import SourceProduct
 
 logger = logging.getLogger(__name__)
@@ -28,12 +30,14 @@ class DirtyDieselCatalogClient:
         timeout: float = DEFAULT_TIMEOUT,
         retries: int = 5,
         retry_backoff: float = 1.0,
+        http_cache: SupplierHttpCache | None = None,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.catalog_label = str(catalog_label or "Supplier").strip()
         self.timeout = max(float(timeout), 1.0)
         self.retries = max(int(retries), 1)
         self.retry_backoff = max(float(retry_backoff), 0.0)
+        self.http_cache = http_cache
 
     def fetch_catalog(
         self,
@@ -60,24 +64,23 @@ class DirtyDieselCatalogClient:
                 page,
             )
             page += 1
-            if page_delay > 0:
+            offline = self.http_cache is not None and self.http_cache.offline
+            if page_delay > 0 and not offline:
                 time.sleep(page_delay)
         logger.info("Fetched %s %s source variants total.", len(extracted), self.catalog_label)
         return extracted
 
     def _get_json(self, path: str) -> dict[str, Any]:
         url = f"{self.base_url}{path}"
+        headers = {"Accept": "application/json", "User-Agent": "BGM-CRM/1.0"}
+        if self.http_cache is not None and self.http_cache.offline:
+            return json.loads(self.http_cache.fetch(url))
         last_error: Exception | None = None
         for attempt in range(1, self.retries + 1):
-            req = Request(
-                url,
-                headers={
-                    "Accept": "application/json",
-                    "User-Agent": "BGM-CRM/1.0",
-                },
-            )
             try:
-                with urlopen(req, timeout=self.timeout) as response:
+                if self.http_cache is not None:
+                    return json.loads(self.http_cache.fetch(url, headers=headers, timeout=self.timeout))
+                with urlopen(Request(url, headers=headers), timeout=self.timeout) as response:
                     return json.load(response)
             except HTTPError as exc:  # pragma: no cover - exercised in command/runtime
                 last_error = exc
@@ -0,0 +1,193 @@
+"""
+Storefront filter facets (category / make / model / year).
+
+The facet tree only changes when the catalog does, so it is built once per
+catalog version (store.storefront_index.catalog_version) and kept in the shared
+cache plus a per-process copy. Every filter value maps to the set of visible
+product ids it matches, so counts for any selection are set intersections
+instead of COUNT/DISTINCT joins through the fitment table.
+
+Vehicle matching follows the fitment index (store.fitment_index) that
+`_apply_filters` queries: make, model and year must all hold for one fitment
+model, and open-ended bands run to next model year.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .fitment_index import fitment_year_ceiling, model_years
+from .models import Category, Product
+from .storefront_index import catalog_version, exclude_merch_products
+
+logger = logging.getLogger(__name__)
+
+FACET_CACHE_KEY = "bgm:store:facets:{version}"
+DEFAULT_YEAR_MIN = 1950
+DEFAULT_YEAR_MAX = 2100
+
+# (catalog version, facets) for this process; replaced wholesale, never mutated
+_process_facets: tuple[str, StorefrontFacets] | None = None
+
+
+@dataclass
+class StorefrontFacets:
+    product_ids: frozenset[int] = frozenset()
+    categories: list[Category] = field(default_factory=list)
+    by_category: dict[int, frozenset[int]] = field(default_factory=dict)
+    makes: list[tuple[int, str]] = field(default_factory=list)
+    # (make_id, name) pairs ordered by make name, then model name
+    models: list[tuple[int, str]] = field(default_factory=list)
+    # (make_id, model name, first year, last year, product ids) per fitment model
+    bands: list[tuple[int, str, int | None, int | None, frozenset[int]]] = field(default_factory=list)
+    year_min: int = DEFAULT_YEAR_MIN
+    year_max: int = DEFAULT_YEAR_MAX
+
+    def _bands(self, *, make_id=None, model_name: str = "", year: int | None = None):
+        for band in self.bands:
+            band_make_id, band_model_name, first_year, last_year, _ids = band
+            if make_id and band_make_id != make_id:
+                continue
+            if model_name and band_model_name != model_name:
+                continue
+            if year and (first_year is None or not first_year <= year <= last_year):
+                continue
+            yield band
+
+    def fitment_ids(self, *, make_id=None, model_name: str = "", year: int | None = None) -> set[int] | None:
+        """
+        Products with one fitment model matching every selected value; None when
+        no vehicle value is selected.
+        """
+        if not (make_id or model_name or year):
+            return None
+        ids: set[int] = set()
+        for band in self._bands(make_id=make_id, model_name=model_name, year=year):
+            ids |= band[4]
+        return ids
+
+    def matching_ids(
+        self,
+        *,
+        category_id: int | None = None,
+        make_id: int | None = None,
+        model_name: str = "",
+        year: int | None = None,
+    ) -> set[int]:
+        ids = set(self.product_ids)
+        if category_id:
+            ids &= self.by_category.get(category_id, frozenset())
+        fitment = self.fitment_ids(make_id=make_id, model_name=model_name, year=year)
+        if fitment is not None:
+            ids &= fitment
+        return ids
+
+    def counts(
+        self,
+        *,
+        category_id: int | None = None,
+        make_id: int | None = None,
+        model_name: str = "",
+        year: int | None = None,
+    ) -> dict[str, dict]:
+        """
+        Product counts per facet value for the current selection. Each dimension is
+        counted with the other dimensions applied but not its own, so picking a
+        category does not zero out the other categories.
+        """
+        without_category = self.matching_ids(make_id=make_id, model_name=model_name, year=year)
+        in_category = self.matching_ids(category_id=category_id)
+
+        by_make: dict[int, set[int]] = defaultdict(set)
+        by_model: dict[tuple[int, str], set[int]] = defaultdict(set)
+        for band_make_id, band_model_name, _first, _last, ids in self._bands(year=year):
+            by_make[band_make_id] |= ids
+            by_model[(band_make_id, band_model_name)] |= ids
+        return {
+            "categories": {pk: len(ids & without_category) for pk, ids in self.by_category.items()},
+            "makes": {pk: len(ids & in_category) for pk, ids in by_make.items()},
+            "models": {key: len(ids & in_category) for key, ids in by_model.items()},
+        }
+
+
+def build_storefront_facets() -> StorefrontFacets:
+    """
+    Read the storefront catalog and its fitment once (three queries).
+    """
+    visible_qs = exclude_merch_products(Product.objects.filter(is_active=True))
+    by_category: dict[int, set[int]] = defaultdict(set)
+    for pk, category_id in visible_qs.values_list("pk", "category_id"):
+        by_category[category_id].add(pk)
+    product_ids = frozenset(pk for ids in by_category.values() for pk in ids)
+
+    ceiling = fitment_year_ceiling()
+    make_names: dict[int, str] = {}
+    bands: dict[int, tuple[int, str, int | None, int | None, set[int]]] = {}
+    through = Product.compatible_models.through
+    fitment_rows = through.objects.filter(product__in=visible_qs).values_list(
+        "product_id",
+        "carmodel_id",
+        "carmodel__make_id",
+        "carmodel__make__name",
+        "carmodel__name",
+        "carmodel__year_from",
+        "carmodel__year_to",
+    )
+    for product_id, model_id, make_id, make_name, model_name, year_from, year_to in fitment_rows:
+        if model_id not in bands:
+            years = model_years(year_from, year_to, ceiling=ceiling)
+            first_year, last_year = (years[0], years[-1]) if years and years[0] is not None else (None, None)
+            bands[model_id] = (make_id, model_name, first_year, last_year, set())
+            make_names[make_id] = make_name
+        bands[model_id][4].add(product_id)
+
+    first_years = [band[2] for band in bands.values() if band[2] is not None]
+    last_years = [band[3] for band in bands.values() if band[3] is not None]
+    return StorefrontFacets(
+        product_ids=product_ids,
+        categories=list(Category.objects.filter(pk__in=by_category).order_by("name")),
+        by_category={pk: frozenset(ids) for pk, ids in by_category.items()},
+        makes=sorted(make_names.items(), key=lambda item: (item[1], item[0])),
+        models=sorted(
+            {(band[0], band[1]) for band in bands.values()},
+            key=lambda key: (make_names[key[0]], key[1], key[0]),
+        ),
+        bands=[(*band[:4], frozenset(band[4])) for band in bands.values()],
+        year_min=max(min(first_years, default=DEFAULT_YEAR_MIN), DEFAULT_YEAR_MIN),
+        year_max=min(max(last_years, default=DEFAULT_YEAR_MAX), DEFAULT_YEAR_MAX),
+    )
+
+
+def get_storefront_facets() -> StorefrontFacets:
+    """
+    Facets for the current catalog version: per-process copy, then the shared
+    cache, then a rebuild. STORE_FACETS_CACHE_SECONDS=0 always rebuilds.
+    """
+    timeout = int(getattr(settings, "STORE_FACETS_CACHE_SECONDS", 0) or 0)
+    version = catalog_version() if timeout > 0 else ""
+    if not version:
+        return build_storefront_facets()
+
+    global _process_facets
+    current = _process_facets
+    if current is not None and current[0] == version:
+        return current[1]
+
+    key = FACET_CACHE_KEY.format(version=version)
+    facets = None
+    try:
+        facets = cache.get(key)
+    except Exception:
+        logger.warning("Storefront facet cache read failed", exc_info=True)
+    if facets is None:
+        facets = build_storefront_facets()
+        try:
+            cache.set(key, facets, timeout)
+        except Exception:
+            logger.warning("Storefront facet cache write failed", exc_info=True)
+    _process_facets = (version, facets)
+    return facets
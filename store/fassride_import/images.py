@@ -6,13 +6,15 @@ import mimetypes
 import os
 import time
 from dataclasses import dataclass
+from urllib.error import HTTPError
 from urllib.parse import unquote, urlparse
 from urllib.request import Request, urlopen
 
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from django.utils.text import slugify
 
+from store.image_store import ContentImageStore
+from store.remote_image_checks import RemoteImageCheckCache, is_definitive
+
 logger = logging.getLogger(__name__)
 
 IMAGE_CONTENT_TYPE_PREFIX = "image/"
@@ -35,11 +37,18 @@ class ImageAssetManager:
         timeout: float = 20.0,
         retries: int = 3,
         retry_backoff: float = 1.0,
+        check_cache: RemoteImageCheckCache | None = None,
+        content_store: ContentImageStore | None = None,
+        offline: bool = False,
     ) -> None:
         self.storage_prefix = storage_prefix.strip().strip("/") or "store/imports/fassride/assets"
         self.timeout = max(float(timeout), 1.0)
         self.retries = max(int(retries), 1)
         self.retry_backoff = max(float(retry_backoff), 0.0)
+        # Offline runs answer from stored checks and files only and never contact image hosts.
+        self.offline = bool(offline)
+        self.check_cache = check_cache or RemoteImageCheckCache(offline=self.offline)
+        self.content_store = content_store or ContentImageStore(prefix=self.storage_prefix)
         self._checks: dict[str, ImageCheck] = {}
         self._localized: dict[str, str] = {}
 
@@ -50,12 +59,30 @@ class ImageAssetManager:
         cached = self._checks.get(url)
         if cached is not None:
             return cached
+        # Checks persist across runs; stale ones are revalidated with a conditional request.
+        stored = self.check_cache.get(url)
+        if stored is not None and (stored.fresh or self.offline):
+            result = ImageCheck(ok=stored.ok, content_type=stored.content_type, error=stored.error)
+            self._checks[url] = result
+            return result
+        if self.offline:
+            # Never checked: usable only when an earlier run already stored its file.
+            known = bool(self.content_store.known([url]))
+            result = ImageCheck(ok=known, error="" if known else "offline_unchecked")
+            self._checks[url] = result
+            return result
+        headers = {"Accept": "image/*,*/*;q=0.8", "User-Agent": "BGM-CRM/1.0"}
+        if stored is not None:
+            headers.update(stored.conditional_headers())
         last_error: Exception | None = None
         for attempt in range(1, self.retries + 1):
             try:
-                req = Request(url, headers={"Accept": "image/*,*/*;q=0.8", "User-Agent": "BGM-CRM/1.0"})
+                req = Request(url, headers=headers)
                 with urlopen(req, timeout=self.timeout) as response:
+                    status = int(getattr(response, "status", 200) or 200)
                     content_type = str(response.headers.get("Content-Type") or "").strip()
+                    etag = str(response.headers.get("ETag") or "").strip()
+                    last_modified = str(response.headers.get("Last-Modified") or "").strip()
                     response.read(1)
                 result = (
                     ImageCheck(ok=True, content_type=content_type)
@@ -63,8 +90,35 @@ class ImageAssetManager:
                     else ImageCheck(ok=False, content_type=content_type, error=f"invalid_content_type:{content_type}")
                 )
                 self._checks[url] = result
+                self.check_cache.record(
+                    url,
+                    ok=result.ok,
+                    status_code=status,
+                    content_type=content_type,
+                    etag=etag,
+                    last_modified=last_modified,
+                    error=result.error,
+                )
                 return result
             except Exception as exc:  # pragma: no cover - exercised in command/runtime
+                if isinstance(exc, HTTPError) and exc.code == 304 and stored is not None:
+                    self.check_cache.revalidated([url])
+                    result = ImageCheck(ok=stored.ok, content_type=stored.content_type, error=stored.error)
+                    self._checks[url] = result
+                    return result
+                if isinstance(exc, HTTPError) and is_definitive(status_code=int(exc.code or 0)):
+                    # A 404 or 403 will not change on retry; remember it for the next run.
+                    content_type = str((exc.headers or {}).get("Content-Type") or "").strip()
+                    result = ImageCheck(ok=False, content_type=content_type, error=exc.__class__.__name__)
+                    self._checks[url] = result
+                    self.check_cache.record(
+                        url,
+                        ok=False,
+                        status_code=int(exc.code or 0),
+                        content_type=content_type,
+                        error=result.error,
+                    )
+                    return result
                 last_error = exc
                 if attempt >= self.retries:
                     break
@@ -84,30 +138,50 @@ class ImageAssetManager:
         cached = self._localized.get(url)
         if cached:
             return cached
+        # URLs downloaded by an earlier run are served from the content mapping without a request.
+        known = self.content_store.known([url]).get(url)
+        if known:
+            self._localized[url] = known
+            return known
 
         check = self.validate(url)
         if not check.ok:
             raise ValueError(f"Image URL is not usable: {url}")
 
-        storage_name = self._storage_name(url, check.content_type)
-        if default_storage.exists(storage_name):
-            self._localized[url] = storage_name
-            return storage_name
+        # Files saved under the URL-derived name before content addressing are reused.
+        legacy_name = self._storage_name(url, check.content_type)
+        adopted = self.content_store.adopt(url, legacy_name, content_type=check.content_type)
+        if adopted:
+            self._localized[url] = adopted
+            return adopted
+        if self.offline:
+            raise ValueError(f"Image is not stored locally and the run is offline: {url}")
 
         last_error: Exception | None = None
         for attempt in range(1, self.retries + 1):
             try:
                 req = Request(url, headers={"Accept": "image/*,*/*;q=0.8", "User-Agent": "BGM-CRM/1.0"})
                 with urlopen(req, timeout=self.timeout) as response:
+                    status = int(getattr(response, "status", 200) or 200)
                     content_type = str(response.headers.get("Content-Type") or check.content_type).strip()
                     if not content_type.startswith(IMAGE_CONTENT_TYPE_PREFIX):
                         raise ValueError(f"Unexpected content type: {content_type}")
+                    etag = str(response.headers.get("ETag") or "").strip()
+                    last_modified = str(response.headers.get("Last-Modified") or "").strip()
                     body = response.read()
                 if not body:
                     raise ValueError("Empty image body.")
-                saved_name = default_storage.save(storage_name, ContentFile(body))
+                saved_name = self.content_store.save(url, body, content_type=content_type)
                 self._localized[url] = saved_name
                 self._checks[url] = ImageCheck(ok=True, content_type=content_type)
+                self.check_cache.record(
+                    url,
+                    ok=True,
+                    status_code=status,
+                    content_type=content_type,
+                    etag=etag,
+                    last_modified=last_modified,
+                )
                 return saved_name
             except Exception as exc:  # pragma: no cover - exercised in command/runtime
                 last_error = exc
@@ -123,7 +197,33 @@ class ImageAssetManager:
         url = (url or "").strip()
         if not url:
             raise ValueError("Empty image URL.")
-        return self._storage_name(url, content_type)
+        mapped = self.content_store.mapped_names([url]).get(url)
+        if mapped:
+            return mapped
+        legacy_name = self._storage_name(url, content_type)
+        # The content backfill keeps a mapping row under the old name of every file it moved.
+        return self.content_store.mapped_names([legacy_name]).get(legacy_name) or legacy_name
+
+    def prime_storage_names(self, urls: list[str] | tuple[str, ...]) -> None:
+        """Load stored content names for many URLs in one query before planning."""
+        urls = [url for url in ((raw or "").strip() for raw in urls) if url]
+        mapped = self.content_store.mapped_names(urls)
+        self.content_store.mapped_names([self._storage_name(url, "") for url in urls if url not in mapped])
+
+    def prime(self, urls: list[str] | tuple[str, ...]) -> None:
+        """Load stored checks and content names for many URLs before validating or localizing them."""
+        urls = [url for url in ((raw or "").strip() for raw in urls) if url]
+        self.check_cache.get_many(urls)
+        self.prime_storage_names(urls)
+
+    def storage_stats(self) -> dict[str, int]:
+        stats = self.content_store.stats
+        return {
+            "images_stored": stats["stored"],
+            "images_deduplicated": stats["deduplicated"],
+            "images_reused_from_mapping": stats["reused_urls"],
+            "image_bytes_saved": stats["bytes_saved"],
+        }
 
     def dedupe_urls(self, urls: list[str] | tuple[str, ...]) -> list[str]:
         deduped: list[str] = []
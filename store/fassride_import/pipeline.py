@@ -8,6 +8,7 @@ from typing import Any
 from django.db import transaction
 
 from store.models import Category, Product, ProductImage
+from store.thumbnails import deferred_thumbnails
 
 from .images import ImageAssetManager
 from .matching import build_compact_part_number_index, build_part_number_index, match_catalog_product
@@ -95,6 +96,10 @@ class FassrideImportPipeline:
         summary["target_categories"] = len(categories)
         summary["target_products"] = len(products)
         summary["source_products"] = len(source_products)
+        self.image_manager.prime(
+            [url for source in source_products for url in source.image_urls]
+            + [asset.image_url for asset in curated_category_covers.values()]
+        )
 
         for product in products:
             summary["products_scanned"] += 1
@@ -197,7 +202,9 @@ class FassrideImportPipeline:
         report.debug_files.update(report_paths)
 
         if self.apply_changes:
-            updated_products = self._apply_product_updates(products, planned_updates, report, summary)
+            # Thumbnails for the localized images are rendered by generate_product_thumbnails.
+            with deferred_thumbnails():
+                updated_products = self._apply_product_updates(products, planned_updates, report, summary)
             self._apply_category_updates(categories, category_cover_candidates, report, summary)
             summary["updated_products"] = updated_products
         else:
@@ -212,6 +219,7 @@ class FassrideImportPipeline:
                 )
             )
 
+        summary.update(self.image_manager.storage_stats())
         report.summary = dict(summary)
         report_path = save_json_report(f"{self.report_prefix}/{self.run_id}/report.json", report.to_dict())
         report.debug_files["report"] = report_path
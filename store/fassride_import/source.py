@@ -7,6 +7,8 @@ from typing import Any
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+from store.supplier_http_cache import SupplierHttpCache
+
 from .types import CuratedCategoryImage, SourceProduct
 
 logger = logging.getLogger(__name__)
@@ -60,12 +62,14 @@ class FassrideApiClient:
         timeout: float = DEFAULT_TIMEOUT,
         retries: int = 3,
         retry_backoff: float = 1.0,
+        http_cache: SupplierHttpCache | None = None,
     ) -> None:
         self.api_base_url = api_base_url.rstrip("/")
         self.page_base_url = page_base_url.rstrip("/")
         self.timeout = max(float(timeout), 1.0)
         self.retries = max(int(retries), 1)
         self.retry_backoff = max(float(retry_backoff), 0.0)
+        self.http_cache = http_cache
 
     def fetch_catalog(self, *, page_size: int = 1000, sort: str = "CustomAsc") -> list[SourceProduct]:
         payload = self._get_json(
@@ -99,17 +103,15 @@ class FassrideApiClient:
         url = f"{self.api_base_url}{path}"
         if query:
             url = f"{url}?{query}"
+        headers = {"Accept": "application/json", "User-Agent": "BGM-CRM/1.0"}
+        if self.http_cache is not None and self.http_cache.offline:
+            return json.loads(self.http_cache.fetch(url))
         last_error: Exception | None = None
         for attempt in range(1, self.retries + 1):
-            req = Request(
-                url,
-                headers={
-                    "Accept": "application/json",
-                    "User-Agent": "BGM-CRM/1.0",
-                },
-            )
             try:
-                with urlopen(req, timeout=self.timeout) as response:
+                if self.http_cache is not None:
+                    return json.loads(self.http_cache.fetch(url, headers=headers, timeout=self.timeout))
+                with urlopen(Request(url, headers=headers), timeout=self.timeout) as response:
                     return json.load(response)
             except Exception as exc:  # pragma: no cover - exercised in command/runtime
                 last_error = exc
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 import re
-from typing import Iterable
+from typing import Callable, Iterable
 
 from django.db import transaction
 
 from .models import CarMake, CarModel
+from .storefront_index import bump_catalog_version
 
 UNIVERSAL_COMPATIBILITY_NOTE = (
     "Universal fit unless otherwise stated in the product title. "
@@ -254,6 +256,96 @@ CODE_PATTERN_GROUPS: tuple[tuple[re.Pattern[str], tuple[tuple[str, str], ...], i
     (re.compile(r"\bdmax[- ]?700[12]\b", re.I), MODEL_GROUPS["gm_hd_all"], None, None),
 )
 
+
+def _without_leading_boundary(pattern: re.Pattern[str]) -> str:
+    if not pattern.pattern.startswith(r"\b"):
+        raise ValueError(f"Fitment pattern must start with a word boundary: {pattern.pattern!r}")
+    return pattern.pattern[2:]
+
+
+def _keyword_trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Alternation regex for literal keywords, factored by shared prefix so the
+    regex engine follows one branch per character instead of retrying every
+    keyword at every position.
+    """
+    trie: dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict[str, dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and "" not in node else "(?:" + "|".join(branches) + ")"
+        return body + "?" if "" in node else body
+
+    return emit(trie)
+
+
+# The pattern tables above stay the source of truth. scan_fitment_signals runs
+# them as the combined matchers below, built once at import time. They expect
+# lowercased text: every pattern is lowercase, and matching without re.I and
+# with the shared leading \b hoisted out of the alternation is several times
+# faster than searching each pattern in turn.
+FITMENT_CODE_MATCHER = re.compile(
+    r"\b(?:"
+    + "|".join(
+        [
+            f"(?P<commercial_{index}>{_without_leading_boundary(pattern)})"
+            for index, pattern in enumerate(COMMERCIAL_PATTERNS)
+        ]
+        + [
+            f"(?P<code_{index}>{_without_leading_boundary(entry[0])})"
+            for index, entry in enumerate(CODE_PATTERN_GROUPS)
+        ]
+    )
+    + ")"
+)
+MAKE_MENTION_MAKES: dict[str, tuple[str, ...]] = {
+    "Ford": ("Ford",),
+    "GM": ("Chevy", "GMC"),
+    "Ram / Dodge": ("Ram / Dodge",),
+    "Toyota": ("Toyota",),
+    "Jeep": ("Jeep",),
+    "Nissan": ("Nissan",),
+}
+MAKE_MENTION_GROUP_MAKES = {f"make_{index}": makes for index, makes in enumerate(MAKE_MENTION_MAKES.values())}
+MAKE_MENTION_MATCHER = re.compile(
+    r"\b(?:"
+    + "|".join(
+        f"(?P<make_{index}>{_without_leading_boundary(MAKE_MENTION_PATTERNS[key])})"
+        for index, key in enumerate(MAKE_MENTION_MAKES)
+    )
+    + ")"
+)
+# Every substring that can switch on a branch of _model_token_map, _eco_diesel_fallback
+# or MAKE_MENTION_PATTERNS. Titles without any of them skip those scans entirely.
+VEHICLE_KEYWORDS: tuple[str, ...] = (
+    *(f"f{separator}{series}50" for separator in ("", "-", " ") for series in "12345"),
+    "powerstroke", "ford", "ranger", "maverick", "bronco", "expedition", "excursion",
+    "gm", "chevy", "chevrolet", "silverado", "sierra", "colorado", "canyon", "tahoe", "suburban", "yukon",
+    "duramax", "dmax", "lb7", "lly", "lbz", "lmm", "lml", "l5p", "lwn", "lm2", "lz0",
+    "ram", "dodge", "cummins", "68rfe", "ecodiesel", "eco diesel",
+    "toyota", "tacoma", "tundra", "4runner", "sequoia", "land cruiser", "landcruiser",
+    "jeep", "gladiator", "wrangler", "cherokee", "patriot",
+    "nissan", "titan", "armada",
+)
+VEHICLE_KEYWORD_MATCHER = re.compile(_keyword_trie_pattern(VEHICLE_KEYWORDS))
+FITMENT_CACHE_SIZE = 16384
+
+
+@dataclass(frozen=True)
+class FitmentSignals:
+    commercial: bool
+    code_index: int | None
+    vehicle_mentioned: bool
+    makes: frozenset[str]
+
+
 UNCATEGORIZED_CATEGORY_RULES: tuple[tuple[re.Pattern[str], str], ...] = (
     (re.compile(r"\bswitch\b", re.I), "Electrical Switches"),
     (
@@ -466,23 +558,61 @@ def _model_token_map(text: str) -> set[tuple[str, str]]:
 
 
 def _mentioned_makes(text: str) -> set[str]:
+    mentioned: set[str] = set()
+    for match in MAKE_MENTION_MATCHER.finditer(text.lower()):
+        mentioned.update(MAKE_MENTION_GROUP_MAKES[match.lastgroup])
+    return mentioned
+
+
+def _mentioned_makes_sequential(text: str) -> set[str]:
     lower = text.lower()
     mentioned: set[str] = set()
-    if MAKE_MENTION_PATTERNS["Ford"].search(lower):
-        mentioned.add("Ford")
-    if MAKE_MENTION_PATTERNS["GM"].search(lower):
-        mentioned.update({"Chevy", "GMC"})
-    if MAKE_MENTION_PATTERNS["Ram / Dodge"].search(lower):
-        mentioned.add("Ram / Dodge")
-    if MAKE_MENTION_PATTERNS["Toyota"].search(lower):
-        mentioned.add("Toyota")
-    if MAKE_MENTION_PATTERNS["Jeep"].search(lower):
-        mentioned.add("Jeep")
-    if MAKE_MENTION_PATTERNS["Nissan"].search(lower):
-        mentioned.add("Nissan")
+    for key, makes in MAKE_MENTION_MAKES.items():
+        if MAKE_MENTION_PATTERNS[key].search(lower):
+            mentioned.update(makes)
     return mentioned
 
 
+def scan_fitment_signals(text: str) -> FitmentSignals:
+    """
+    One pass of the combined matchers over a cleaned title. `code_index` is the
+    first CODE_PATTERN_GROUPS entry that matches, as the sequential scan picks it.
+    """
+    lower = text.lower()
+    commercial = False
+    code_indexes: list[int] = []
+    for match in FITMENT_CODE_MATCHER.finditer(lower):
+        kind, index = match.lastgroup.rsplit("_", 1)
+        if kind == "commercial":
+            commercial = True
+            break
+        code_indexes.append(int(index))
+    vehicle_mentioned = VEHICLE_KEYWORD_MATCHER.search(lower) is not None
+    return FitmentSignals(
+        commercial=commercial,
+        code_index=min(code_indexes) if code_indexes else None,
+        vehicle_mentioned=vehicle_mentioned,
+        makes=frozenset(_mentioned_makes(lower)) if vehicle_mentioned else frozenset(),
+    )
+
+
+def scan_fitment_signals_sequential(text: str) -> FitmentSignals:
+    """
+    Reference scan that runs every pattern on its own; kept for the equivalence
+    tests and the benchmark_fitment_inference command.
+    """
+    code_index = next(
+        (index for index, entry in enumerate(CODE_PATTERN_GROUPS) if entry[0].search(text)),
+        None,
+    )
+    return FitmentSignals(
+        commercial=any(pattern.search(text) for pattern in COMMERCIAL_PATTERNS),
+        code_index=code_index,
+        vehicle_mentioned=True,
+        makes=frozenset(_mentioned_makes_sequential(text)),
+    )
+
+
 def _eco_diesel_fallback(text: str, year_from: int | None, year_to: int | None) -> set[tuple[str, str]]:
     lower = text.lower()
     if "ecodiesel" not in lower and "eco diesel" not in lower:
@@ -560,18 +690,40 @@ def infer_fitment(
     name: str,
     sku: str = "",
     category_name: str = "",
+) -> FitmentInference:
+    """
+    Memoized per cleaned, lowercased (name, sku). Inference never reads
+    `category_name`, so it is not part of the cache key.
+    """
+    return _infer_fitment_cached(_clean_text(name).lower(), _clean_text(sku).lower())
+
+
+def clear_fitment_cache() -> None:
+    _infer_fitment_cached.cache_clear()
+
+
+@lru_cache(maxsize=FITMENT_CACHE_SIZE)
+def _infer_fitment_cached(name: str, sku: str) -> FitmentInference:
+    return infer_fitment_uncached(name=name, sku=sku)
+
+
+def infer_fitment_uncached(
+    *,
+    name: str,
+    sku: str = "",
+    scan: Callable[[str], FitmentSignals] = scan_fitment_signals,
 ) -> FitmentInference:
     source = _clean_text(name, sku)
     lower = source.lower()
     year_from, year_to = extract_year_window(name)
+    signals = scan(source)
 
-    for pattern in COMMERCIAL_PATTERNS:
-        if pattern.search(source):
-            return FitmentInference(
-                kind="commercial",
-                specs=tuple(),
-                note=COMMERCIAL_COMPATIBILITY_NOTE,
-            )
+    if signals.commercial:
+        return FitmentInference(
+            kind="commercial",
+            specs=tuple(),
+            note=COMMERCIAL_COMPATIBILITY_NOTE,
+        )
 
     if "universal" in lower or "all gdp intakes" in lower:
         return FitmentInference(
@@ -596,23 +748,30 @@ def infer_fitment(
             note="",
         )
 
-    for pattern, group, override_from, override_to in CODE_PATTERN_GROUPS:
-        if pattern.search(source):
-            if not group:
-                return FitmentInference(
-                    kind="commercial",
-                    specs=tuple(),
-                    note=COMMERCIAL_COMPATIBILITY_NOTE,
-                )
+    if signals.code_index is not None:
+        _pattern, group, override_from, override_to = CODE_PATTERN_GROUPS[signals.code_index]
+        if not group:
             return FitmentInference(
-                kind="specific",
-                specs=_clamped_fitment_specs(
-                    group,
-                    year_from=override_from,
-                    year_to=override_to,
-                ),
-                note="",
+                kind="commercial",
+                specs=tuple(),
+                note=COMMERCIAL_COMPATIBILITY_NOTE,
             )
+        return FitmentInference(
+            kind="specific",
+            specs=_clamped_fitment_specs(
+                group,
+                year_from=override_from,
+                year_to=override_to,
+            ),
+            note="",
+        )
+
+    if not signals.vehicle_mentioned:
+        return FitmentInference(
+            kind="universal",
+            specs=ALL_CONSUMER_SPECS,
+            note=UNIVERSAL_COMPATIBILITY_NOTE,
+        )
 
     model_keys = _model_token_map(source)
 
@@ -621,7 +780,7 @@ def infer_fitment(
         if eco_diesel_matches:
             model_keys.update(eco_diesel_matches)
 
-    mentioned = _mentioned_makes(source)
+    mentioned = signals.makes
     if mentioned:
         for make_name in mentioned:
             if not any(existing_make == make_name for existing_make, _ in model_keys):
@@ -651,23 +810,6 @@ def suggested_category_name(*, current_category_name: str, product_name: str) ->
     return None
 
 
-def _ensure_car_model(
-    *,
-    make_name: str,
-    model_name: str,
-    year_from: int | None,
-    year_to: int | None,
-) -> CarModel:
-    make, _ = CarMake.objects.get_or_create(name=make_name)
-    model, _ = CarModel.objects.get_or_create(
-        make=make,
-        name=model_name,
-        year_from=year_from,
-        year_to=year_to,
-    )
-    return model
-
-
 def _rename_legacy_fitment_records() -> None:
     dodge_make = CarMake.objects.filter(name="Dodge").first()
     if dodge_make and not CarMake.objects.filter(name="Ram / Dodge").exists():
@@ -710,45 +852,71 @@ def sync_consumer_vehicle_catalog(*, apply: bool) -> dict[str, int]:
         _rename_legacy_fitment_records()
         legacy_updates = 1
 
-    makes_created = 0
-    models_created = 0
-    for entry in CONSUMER_VEHICLE_CATALOG:
-        make, make_created = CarMake.objects.get_or_create(name=entry.make)
-        if make_created:
-            makes_created += 1
-        _, model_created = CarModel.objects.get_or_create(
-            make=make,
-            name=entry.model,
-            year_from=entry.year_from,
-            year_to=entry.year_to,
-        )
-        if model_created:
-            models_created += 1
+    created = {"makes_created": 0, "models_created": 0}
+    resolve_fitment_model_ids(
+        ((entry.make, entry.model, entry.year_from, entry.year_to) for entry in CONSUMER_VEHICLE_CATALOG),
+        stats=created,
+    )
 
     return {
         "legacy_records_normalized": legacy_updates,
-        "makes_created": makes_created,
-        "models_created": models_created,
+        **created,
     }
 
 
-def resolve_fitment_models(*, specs: Iterable[FitmentSpec]) -> list[CarModel]:
-    resolved: list[CarModel] = []
-    seen: set[tuple[str, str, int | None, int | None]] = set()
-    for spec in specs:
-        key = (spec.make, spec.model, spec.year_from, spec.year_to)
-        if key in seen:
-            continue
-        seen.add(key)
-        resolved.append(
-            _ensure_car_model(
-                make_name=spec.make,
-                model_name=spec.model,
-                year_from=spec.year_from,
-                year_to=spec.year_to,
-            )
+def _spec_key(spec: FitmentSpec) -> tuple[str, str, int | None, int | None]:
+    return (spec.make, spec.model, spec.year_from, spec.year_to)
+
+
+def resolve_fitment_model_ids(
+    keys: Iterable[tuple[str, str, int | None, int | None]],
+    *,
+    stats: dict[str, int] | None = None,
+) -> dict[tuple[str, str, int | None, int | None], int]:
+    """
+    CarModel ids for (make, model, year_from, year_to) keys. The vehicle tables
+    are read once and missing makes and models are created with one bulk_create
+    each, which skips their save signals; the catalog version is bumped here.
+    `stats`, when given, receives makes_created / models_created counts.
+    """
+    wanted = set(keys)
+    if not wanted:
+        return {}
+    makes = {make.name: make for make in CarMake.objects.all()}
+    missing_makes = sorted({make_name for make_name, *_rest in wanted} - set(makes))
+    if missing_makes:
+        for make in CarMake.objects.bulk_create([CarMake(name=name) for name in missing_makes]):
+            makes[make.name] = make
+
+    model_ids = {
+        (make_name, model_name, year_from, year_to): pk
+        for pk, make_name, model_name, year_from, year_to in CarModel.objects.values_list(
+            "pk", "make__name", "name", "year_from", "year_to"
         )
-    return resolved
+    }
+    missing_models = [key for key in wanted if key not in model_ids]
+    if missing_models:
+        created = CarModel.objects.bulk_create(
+            [
+                CarModel(make=makes[make_name], name=model_name, year_from=year_from, year_to=year_to)
+                for make_name, model_name, year_from, year_to in missing_models
+            ]
+        )
+        for key, model in zip(missing_models, created):
+            model_ids[key] = model.pk
+    if missing_makes or missing_models:
+        transaction.on_commit(bump_catalog_version)
+    if stats is not None:
+        stats["makes_created"] = stats.get("makes_created", 0) + len(missing_makes)
+        stats["models_created"] = stats.get("models_created", 0) + len(missing_models)
+    return {key: model_ids[key] for key in wanted}
+
+
+def resolve_fitment_models(*, specs: Iterable[FitmentSpec]) -> list[CarModel]:
+    keys = list(dict.fromkeys(_spec_key(spec) for spec in specs))
+    ids = resolve_fitment_model_ids(keys)
+    models = CarModel.objects.select_related("make").in_bulk([ids[key] for key in keys])
+    return [models[ids[key]] for key in keys]
 
 
 @transaction.atomic
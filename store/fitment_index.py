@@ -0,0 +1,125 @@
+"""
+Flattened vehicle fitment index (ProductFitmentYear).
+
+Product.compatible_models stores year bands; filtering on them needs range joins
+and a DISTINCT. The index expands every band into one row per model year so a
+"2019 Ram 2500" lookup is a single indexed equality probe, used as an EXISTS
+semi-join that needs no DISTINCT. Open-ended bands run to next model year.
+
+Fitment M2M and CarModel signals keep the rows current; `normalize_store_fitment
+--apply` (and the migration that adds the table) rebuild it in full. The daily
+`rebuild_fitment_index` cron extends open-ended bands once the year rolls over.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Product, ProductFitmentYear
+
+FITMENT_WRITE_BATCH_SIZE = 2000
+
+
+def fitment_year_ceiling() -> int:
+    return timezone.now().year + 1
+
+
+def model_years(year_from: int | None, year_to: int | None, *, ceiling: int | None = None) -> list[int | None]:
+    """
+    Model years covered by a CarModel band; [None] when the band has no start year.
+    """
+    if year_from is None:
+        return [None]
+    last = year_to if year_to is not None else max(ceiling or fitment_year_ceiling(), year_from)
+    return list(range(year_from, last + 1))
+
+
+def fitment_rows(product_ids: Iterable[int] | None = None) -> dict[int, set[tuple[int, str, int | None]]]:
+    """
+    Target (make_id, model_name, year) rows per product from the fitment M2M.
+    """
+    through = Product.compatible_models.through
+    qs = through.objects.all()
+    if product_ids is not None:
+        qs = qs.filter(product_id__in=product_ids)
+    ceiling = fitment_year_ceiling()
+    rows: dict[int, set[tuple[int, str, int | None]]] = defaultdict(set)
+    for product_id, make_id, model_name, year_from, year_to in qs.values_list(
+        "product_id",
+        "carmodel__make_id",
+        "carmodel__name",
+        "carmodel__year_from",
+        "carmodel__year_to",
+    ).iterator(chunk_size=FITMENT_WRITE_BATCH_SIZE):
+        for year in model_years(year_from, year_to, ceiling=ceiling):
+            rows[product_id].add((make_id, model_name, year))
+    return rows
+
+
+def rebuild_fitment_index(product_ids: Iterable[int] | None = None) -> dict[str, int]:
+    """
+    Sync ProductFitmentYear with the fitment M2M for the given products (all when
+    None). Only missing rows are inserted and only obsolete rows deleted.
+    """
+    if product_ids is not None:
+        product_ids = {int(pk) for pk in product_ids if pk}
+        if not product_ids:
+            return {"created": 0, "deleted": 0}
+
+    target = fitment_rows(product_ids)
+    existing_qs = ProductFitmentYear.objects.all()
+    if product_ids is not None:
+        existing_qs = existing_qs.filter(product_id__in=product_ids)
+
+    obsolete: list[int] = []
+    for pk, product_id, make_id, model_name, year in existing_qs.values_list(
+        "pk", "product_id", "make_id", "model_name", "year"
+    ).iterator(chunk_size=FITMENT_WRITE_BATCH_SIZE):
+        key = (make_id, model_name, year)
+        rows = target.get(product_id)
+        if rows is not None and key in rows:
+            rows.discard(key)
+        else:
+            obsolete.append(pk)
+
+    missing = [
+        ProductFitmentYear(product_id=product_id, make_id=make_id, model_name=model_name, year=year)
+        for product_id, rows in target.items()
+        for make_id, model_name, year in rows
+    ]
+    with transaction.atomic():
+        for start in range(0, len(obsolete), FITMENT_WRITE_BATCH_SIZE):
+            ProductFitmentYear.objects.filter(pk__in=obsolete[start : start + FITMENT_WRITE_BATCH_SIZE]).delete()
+        ProductFitmentYear.objects.bulk_create(missing, batch_size=FITMENT_WRITE_BATCH_SIZE)
+    return {"created": len(missing), "deleted": len(obsolete)}
+
+
+def fitment_filter(*, make=None, model_name: str = "", year: int | None = None):
+    """
+    EXISTS expression matching products that fit the selected vehicle, or None
+    when nothing is selected. All criteria apply to the same fitment row.
+    """
+    criteria = {}
+    if make:
+        criteria["make"] = make
+    if model_name:
+        criteria["model_name"] = model_name
+    if year:
+        criteria["year"] = year
+    if not criteria:
+        return None
+    return Exists(ProductFitmentYear.objects.filter(product=OuterRef("pk"), **criteria))
+
+
+def fitment_years(*, make_id: int, model_name: str = "") -> list[int]:
+    """
+    Model years with at least one active product for a make (and model), newest first.
+    """
+    qs = ProductFitmentYear.objects.filter(make_id=make_id, year__isnull=False, product__is_active=True)
+    if model_name:
+        qs = qs.filter(model_name=model_name)
+    return list(qs.order_by("-year").values_list("year", flat=True).distinct())
@@ -0,0 +1,259 @@
+"""
+Content-addressed storage for downloaded product images.
+
+Supplier importers save downloaded images as `<prefix>/<sha256 of the bytes><suffix>`
+(first CONTENT_DIGEST_LENGTH hex characters), so the same picture served from
+different CDN URLs or query strings is stored once per prefix. Each importer
+keeps its own prefix because the pipelines use it to recognise their own files.
+
+RemoteImageContent maps every downloaded URL to its digest and storage name, so
+later runs under the same prefix skip fetching URLs they already hold.
+`backfill_content_names` moves existing Product.main_image / ProductImage.image
+files to content names; files are hashed in a process pool. Each moved file
+keeps a mapping row under its old name.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+from urllib.parse import unquote, urlparse
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Q
+
+from .models import Category, MerchCategory, Product, ProductImage, RemoteImageContent
+from .storefront_index import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+CONTENT_DIGEST_LENGTH = 32
+KNOWN_IMAGE_SUFFIXES = {".avif", ".gif", ".jpeg", ".jpg", ".png", ".webp"}
+DEFAULT_BACKFILL_PREFIXES = ("store/imports/", "store/products/imported/")
+LOOKUP_CHUNK_SIZE = 500
+READ_CHUNK_SIZE = 1024 * 1024
+CONTENT_NAME_RE = re.compile(rf"(?:^|/)[0-9a-f]{{{CONTENT_DIGEST_LENGTH}}}\.[a-z0-9]+$")
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256((url or "").strip().encode("utf-8")).hexdigest()
+
+
+def image_suffix(*, content_type: str = "", source_name: str = "") -> str:
+    suffix = os.path.splitext(unquote(urlparse(source_name).path or ""))[1].lower()
+    if suffix in KNOWN_IMAGE_SUFFIXES:
+        return suffix
+    guessed = mimetypes.guess_extension((content_type or "").split(";", 1)[0].strip()) or ".jpg"
+    guessed = ".jpg" if guessed == ".jpe" else guessed.lower()
+    return guessed if guessed in KNOWN_IMAGE_SUFFIXES else ".jpg"
+
+
+def content_storage_name(prefix: str, digest: str, *, content_type: str = "", source_name: str = "") -> str:
+    prefix = prefix.strip().strip("/")
+    name = f"{digest[:CONTENT_DIGEST_LENGTH]}{image_suffix(content_type=content_type, source_name=source_name)}"
+    return f"{prefix}/{name}" if prefix else name
+
+
+def is_content_name(name: str) -> bool:
+    return bool(CONTENT_NAME_RE.search(name or ""))
+
+
+class ContentImageStore:
+    """
+    Saves downloaded images under content names for one storage prefix and
+    remembers which URL produced which file. `stats` counts files written,
+    duplicates skipped, URLs served from the mapping and bytes saved by both.
+    """
+
+    def __init__(self, *, prefix: str, storage=None) -> None:
+        self.prefix = prefix.strip().strip("/")
+        self.storage = storage or default_storage
+        self.stats = {"stored": 0, "deduplicated": 0, "reused_urls": 0, "bytes_written": 0, "bytes_saved": 0}
+        self._known: dict[str, RemoteImageContent] = {}
+        self._looked_up: set[str] = set()
+
+    def mapped_names(self, urls: Iterable[str]) -> dict[str, str]:
+        """
+        Storage names previously saved for these URLs, without checking the files.
+        """
+        wanted = [url for url in dict.fromkeys((raw or "").strip() for raw in urls) if url]
+        missing = [url for url in wanted if url not in self._looked_up]
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            chunk = missing[start : start + LOOKUP_CHUNK_SIZE]
+            by_hash = {url_hash(url): url for url in chunk}
+            rows = RemoteImageContent.objects.filter(prefix=self.prefix, url_hash__in=list(by_hash))
+            for row in rows:
+                self._known[by_hash[row.url_hash]] = row
+        self._looked_up.update(missing)
+        return {url: self._known[url].storage_name for url in wanted if url in self._known}
+
+    def known(self, urls: Iterable[str]) -> dict[str, str]:
+        """
+        Storage names for URLs whose file is still in storage; these need no download.
+        """
+        found: dict[str, str] = {}
+        for url, name in self.mapped_names(urls).items():
+            if not self.storage.exists(name):
+                self._known.pop(url, None)
+                continue
+            found[url] = name
+            self.stats["reused_urls"] += 1
+            self.stats["bytes_saved"] += self._known[url].size
+        return found
+
+    def save(self, url: str, body: bytes, *, content_type: str = "") -> str:
+        url = (url or "").strip()
+        digest = hashlib.sha256(body).hexdigest()
+        name = content_storage_name(self.prefix, digest, content_type=content_type, source_name=url)
+        if self.storage.exists(name):
+            self.stats["deduplicated"] += 1
+            self.stats["bytes_saved"] += len(body)
+        else:
+            name = self.storage.save(name, ContentFile(body))
+            self.stats["stored"] += 1
+            self.stats["bytes_written"] += len(body)
+        if url:
+            self._remember(url, digest=digest, name=name, size=len(body))
+        return name
+
+    def adopt(self, url: str, name: str, *, content_type: str = "") -> str:
+        """
+        Content name for an image an earlier run saved under its old URL-derived
+        `name`, recorded for `url`. A file the backfill moved resolves through the
+        mapping row kept under its old name; a file still under the old name is
+        hashed into the store. Returns "" when neither exists.
+        """
+        url = (url or "").strip()
+        moved = self.known([name]).get(name)
+        if moved:
+            row = self._known[name]
+            self._remember(url, digest=row.digest, name=moved, size=row.size)
+            return moved
+        if not self.storage.exists(name):
+            return ""
+        with self.storage.open(name, "rb") as handle:
+            body = handle.read()
+        return self.save(url, body, content_type=content_type)
+
+    def _remember(self, url: str, *, digest: str, name: str, size: int) -> None:
+        row, _created = RemoteImageContent.objects.update_or_create(
+            url_hash=url_hash(url),
+            prefix=self.prefix,
+            defaults={"url": url, "digest": digest, "storage_name": name, "size": size},
+        )
+        self._known[url] = row
+        self._looked_up.add(url)
+
+
+# ─────────────────────────── backfill ───────────────────────────
+
+def backfill_candidates(prefixes: Iterable[str] = DEFAULT_BACKFILL_PREFIXES) -> list[str]:
+    """
+    Distinct local image names referenced by products or gallery rows under the
+    given prefixes that are not content-addressed yet.
+    """
+    prefixes = tuple(prefix for prefix in prefixes if prefix)
+    names: set[str] = set()
+    for model, field in ((Product, "main_image"), (ProductImage, "image")):
+        queryset = model.objects.exclude(Q(**{f"{field}__isnull": True}) | Q(**{field: ""}))
+        if prefixes:
+            match = Q()
+            for prefix in prefixes:
+                match |= Q(**{f"{field}__startswith": prefix})
+            queryset = queryset.filter(match)
+        names.update(str(name) for name in queryset.values_list(field, flat=True).distinct())
+    return sorted(name for name in names if not name.startswith(("http://", "https://")) and not is_content_name(name))
+
+
+def hash_storage_file(name: str) -> tuple[str, str, int, str]:
+    """
+    (name, sha256, size, error) for one stored file. Safe to run in a worker process.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with default_storage.open(name, "rb") as handle:
+            for chunk in iter(lambda: handle.read(READ_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+    except Exception as exc:
+        return name, "", 0, f"{type(exc).__name__}: {exc}"
+    return name, digest.hexdigest(), size, ""
+
+
+def iter_hashed_files(names: list[str], *, workers: int = 1) -> Iterator[tuple[str, str, int, str]]:
+    if workers <= 1 or len(names) <= 1:
+        yield from map(hash_storage_file, names)
+        return
+    # Workers only touch storage; forked children must not inherit open DB connections.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(hash_storage_file, names, chunksize=16)
+
+
+def backfill_content_names(
+    names: list[str],
+    *,
+    workers: int = 1,
+    apply: bool = False,
+    delete_old: bool = False,
+) -> dict[str, int]:
+    """
+    Move the given stored images to content names in their own directory and
+    repoint Product.main_image / ProductImage.image (and their thumbnail source,
+    since the bytes are identical). Old files still used by category images are
+    kept. Without `apply` only the savings are reported.
+    """
+    stats = {"files": 0, "unique": 0, "failed": 0, "repointed_rows": 0, "deleted": 0, "bytes_total": 0, "bytes_saved": 0}
+    seen_targets: set[str] = set()
+    for name, digest, size, error in iter_hashed_files(names, workers=workers):
+        if error:
+            logger.warning("Could not hash %s: %s", name, error)
+            stats["failed"] += 1
+            continue
+        stats["files"] += 1
+        stats["bytes_total"] += size
+        target = content_storage_name(os.path.dirname(name), digest, source_name=name)
+        if target in seen_targets or default_storage.exists(target):
+            stats["bytes_saved"] += size
+        else:
+            stats["unique"] += 1
+        seen_targets.add(target)
+        if not apply:
+            continue
+
+        if not default_storage.exists(target):
+            with default_storage.open(name, "rb") as handle:
+                target = default_storage.save(target, ContentFile(handle.read()))
+        # Importers still derive the old name from the image URL; the mapping row under
+        # that name (see ContentImageStore.adopt) leads them to the content file.
+        RemoteImageContent.objects.update_or_create(
+            url_hash=url_hash(name),
+            prefix=os.path.dirname(name),
+            defaults={"url": name, "digest": digest, "storage_name": target, "size": size},
+        )
+        with transaction.atomic():
+            # queryset.update() skips the product signals; the listing cache is bumped below.
+            stats["repointed_rows"] += Product.objects.filter(main_image=name, thumbnail_source=name).update(
+                main_image=target, thumbnail_source=target
+            )
+            stats["repointed_rows"] += Product.objects.filter(main_image=name).update(main_image=target)
+            stats["repointed_rows"] += ProductImage.objects.filter(image=name, thumbnail_source=name).update(
+                image=target, thumbnail_source=target
+            )
+            stats["repointed_rows"] += ProductImage.objects.filter(image=name).update(image=target)
+        still_used = (
+            Category.objects.filter(image=name).exists() or MerchCategory.objects.filter(cover_image=name).exists()
+        )
+        if delete_old and target != name and not still_used:
+            default_storage.delete(name)
+            stats["deleted"] += 1
+    if apply and stats["repointed_rows"]:
+        transaction.on_commit(bump_catalog_version)
+    return stats
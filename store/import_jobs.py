@@ -0,0 +1,229 @@
+"""
+Background product imports.
+
+The admin import form stores the uploaded spreadsheet on a queued ImportBatch and
+returns immediately. The bytes are kept in the database (the worker dyno cannot
+read the web dyno's media directory) until the batch finishes.
+`process_import_batches` claims queued batches and runs them through
+store.importers.import_products, writing progress, counters and the first
+IMPORT_ERROR_LIMIT row errors to the batch after every committed chunk; the batch
+page in the admin polls `import_batch_progress`.
+
+A running batch whose worker stopped writing progress for IMPORT_STALE_SECONDS
+is queued again, up to IMPORT_MAX_ATTEMPTS runs.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .importers import ImportResult, import_products
+from .models import Category, ImportBatch
+
+logger = logging.getLogger(__name__)
+
+# Row errors stored on the batch; the total is still counted in error_count.
+IMPORT_ERROR_LIMIT = 200
+# A running batch with no progress write for this long belongs to a dead worker.
+IMPORT_STALE_SECONDS = 30 * 60
+IMPORT_MAX_ATTEMPTS = 3
+
+
+def enqueue_import(
+    *,
+    uploaded_file,
+    created_by=None,
+    mode: str = "auto",
+    default_category: Optional[Category] = None,
+    default_currency: str = "",
+    update_existing: bool = False,
+    create_missing_categories: bool = True,
+    dieselr_foreign: bool = False,
+    dry_run: bool = False,
+) -> ImportBatch:
+    source_filename = getattr(uploaded_file, "name", "") or "import.csv"
+    batch = ImportBatch(
+        created_by=created_by,
+        source_filename=source_filename,
+        mode=mode,
+        is_dry_run=dry_run,
+        status=ImportBatch.Status.QUEUED,
+        import_options={
+            "default_category_id": default_category.pk if default_category else None,
+            "default_currency": default_currency or "",
+            "update_existing": bool(update_existing),
+            "create_missing_categories": bool(create_missing_categories),
+            "dieselr_foreign": bool(dieselr_foreign),
+        },
+    )
+    uploaded_file.seek(0)
+    batch.upload_data = uploaded_file.read()
+    batch.upload.save(get_valid_filename(source_filename), ContentFile(batch.upload_data), save=False)
+    batch.save()
+    return batch
+
+
+def requeue_stale_batches() -> int:
+    """
+    Queue running batches whose worker stopped writing progress again; batches
+    that already used IMPORT_MAX_ATTEMPTS runs are failed instead.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=IMPORT_STALE_SECONDS)
+    stale = ImportBatch.objects.filter(status=ImportBatch.Status.RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    failed = stale.filter(attempts__gte=IMPORT_MAX_ATTEMPTS).update(
+        status=ImportBatch.Status.FAILED,
+        failure_reason="The import worker stopped before finishing this batch.",
+        upload_data=b"",
+        finished_at=now,
+    )
+    requeued = stale.update(status=ImportBatch.Status.QUEUED)
+    if failed or requeued:
+        logger.warning("Requeued %s stale import batch(es), failed %s", requeued, failed)
+    return requeued + failed
+
+
+def claim_next_batch() -> Optional[ImportBatch]:
+    """
+    Mark the oldest queued batch as running and return it. Concurrent workers skip
+    rows another worker has locked.
+    """
+    with transaction.atomic():
+        batch = (
+            ImportBatch.objects.select_for_update(skip_locked=True)
+            .filter(status=ImportBatch.Status.QUEUED)
+            .order_by("created_at", "pk")
+            .first()
+        )
+        if batch is None:
+            return None
+        batch.status = ImportBatch.Status.RUNNING
+        batch.started_at = batch.heartbeat_at = timezone.now()
+        batch.attempts += 1
+        batch.save(update_fields=["status", "started_at", "heartbeat_at", "attempts"])
+    return batch
+
+
+def _result_fields(result: ImportResult) -> dict:
+    return {
+        "created_products": result.created_products,
+        "updated_products": result.updated_products,
+        "skipped_products": result.skipped_products,
+        "created_options": result.created_options,
+        "updated_options": result.updated_options,
+        "skipped_options": result.skipped_options,
+        "created_categories": result.created_categories,
+        "error_count": len(result.errors),
+        "errors": result.errors[:IMPORT_ERROR_LIMIT],
+    }
+
+
+def run_import_batch(batch: ImportBatch) -> Optional[ImportResult]:
+    """
+    Run a claimed batch. Chunks commit as they go, so a batch that fails midway
+    keeps (and can roll back) the rows written before the failure.
+    """
+    options = batch.import_options or {}
+    category_id = options.get("default_category_id")
+    default_category = Category.objects.filter(pk=category_id).first() if category_id else None
+    batch_qs = ImportBatch.objects.filter(pk=batch.pk)
+
+    def progress(processed_rows: int, total_rows: int, result: ImportResult) -> None:
+        batch_qs.update(
+            processed_rows=processed_rows,
+            total_rows=total_rows,
+            heartbeat_at=timezone.now(),
+            **_result_fields(result),
+        )
+
+    try:
+        with _open_upload(batch) as upload:
+            result = import_products(
+                uploaded_file=upload,
+                mode=batch.mode or "auto",
+                default_category=default_category,
+                default_currency=options.get("default_currency") or None,
+                update_existing=bool(options.get("update_existing")),
+                create_missing_categories=bool(options.get("create_missing_categories", True)),
+                dieselr_foreign=bool(options.get("dieselr_foreign")),
+                dry_run=batch.is_dry_run,
+                import_batch=None if batch.is_dry_run else batch,
+                progress=progress,
+            )
+    except Exception as exc:
+        if not isinstance(exc, ValueError):
+            logger.exception("Product import #%s failed", batch.pk)
+        batch_qs.update(
+            status=ImportBatch.Status.FAILED,
+            failure_reason=str(exc) or type(exc).__name__,
+            upload_data=b"",
+            finished_at=timezone.now(),
+        )
+        return None
+
+    batch_qs.update(
+        status=ImportBatch.Status.COMPLETED,
+        upload_data=b"",
+        finished_at=timezone.now(),
+        # CSV uploads are streamed without a row count; every row has been read now.
+        total_rows=F("processed_rows"),
+        **_result_fields(result),
+    )
+    return result
+
+
+def _open_upload(batch: ImportBatch):
+    data = bytes(batch.upload_data or b"")
+    if data:
+        return ContentFile(data, name=batch.upload.name or batch.source_filename)
+    # Batches queued before uploads were kept in the database.
+    return batch.upload.open("rb")
+
+
+def process_import_batches(*, limit: Optional[int] = None) -> int:
+    """
+    Run queued batches until none are left (or `limit` ran); returns how many ran.
+    """
+    requeue_stale_batches()
+    processed = 0
+    while limit is None or processed < limit:
+        batch = claim_next_batch()
+        if batch is None:
+            break
+        run_import_batch(batch)
+        processed += 1
+    return processed
+
+
+def import_batch_progress(batch: ImportBatch) -> dict:
+    """
+    JSON-friendly snapshot polled by the admin batch page.
+    """
+    return {
+        "id": batch.pk,
+        "status": batch.status,
+        "statusLabel": batch.get_status_display(),
+        "finished": batch.is_finished,
+        "dryRun": batch.is_dry_run,
+        "totalRows": batch.total_rows,
+        "processedRows": batch.processed_rows,
+        "createdProducts": batch.created_products,
+        "updatedProducts": batch.updated_products,
+        "skippedProducts": batch.skipped_products,
+        "createdOptions": batch.created_options,
+        "updatedOptions": batch.updated_options,
+        "skippedOptions": batch.skipped_options,
+        "createdCategories": batch.created_categories,
+        "errorCount": batch.error_count,
+        "errors": (batch.errors or [])[:20],
+        "failureReason": batch.failure_reason,
+    }
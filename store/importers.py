@@ -6,13 +6,18 @@ import json
 import re
 from dataclasses import dataclass, field
 from decimal import Decimal, InvalidOperation
-from typing import Dict, Iterable, List, Optional, Tuple
+from itertools import chain, groupby, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from django.utils.text import slugify
 
 from .forms_store import parse_specs_text
 from .models import Category, Product, ProductOption
+from .storefront_index import deferred_storefront_index, refresh_after_bulk_write
+from .thumbnails import deferred_thumbnails
 
 try:
     from openpyxl import load_workbook
@@ -22,6 +27,10 @@ except Exception:  # pragma: no cover - handled at runtime for xlsx imports
 SKU_MAX_LEN = 64
 SLUG_MAX_LEN = 200
 PRICE_QUANT = Decimal("0.01")
+CATEGORY_SLUG_MAX_LEN = 50
+# Rows (simple) or handle groups (Shopify) written per bulk statement / transaction.
+IMPORT_CHUNK_SIZE = 500
+SHOPIFY_GROUP_CHUNK_SIZE = 200
 
 
 def _normalize_header(value: str) -> str:
@@ -206,53 +215,134 @@ def _trim_text(value: Optional[object], max_len: int) -> str:
     return text[:max_len].rstrip()
 
 
-def _read_csv(uploaded_file) -> Tuple[List[str], List[Dict[str, object]]]:
-    raw = uploaded_file.read()
-    uploaded_file.seek(0)
+# Bytes inspected to pick the CSV encoding and dialect; rows are then read lazily.
+CSV_SNIFF_BYTES = 64 * 1024
+# Spreadsheet exports that are not UTF-8 are almost always Windows-1252.
+CSV_FALLBACK_ENCODING = "cp1252"
+
+
+@dataclass
+class SpreadsheetStream:
+    headers: List[str]
+    rows: Iterator[Dict[str, object]]
+    # Known up front for XLSX (sheet dimensions); None for CSV.
+    total_rows: Optional[int] = None
+
+
+def _sniff_csv(sample: bytes) -> Tuple[str, type[csv.Dialect] | csv.Dialect]:
     try:
-        text = raw.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        text = raw.decode("cp1252", errors="replace")
-    sample = text[:4096]
+        # A multi-byte character may be cut at the end of the sample.
+        text = sample.decode("utf-8-sig")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError as exc:
+        if exc.start < len(sample) - 3:
+            encoding = CSV_FALLBACK_ENCODING
+            text = sample.decode(encoding, errors="replace")
+        else:
+            encoding = "utf-8-sig"
+            text = sample[: exc.start].decode(encoding)
     try:
-        dialect = csv.Sniffer().sniff(sample)
+        dialect = csv.Sniffer().sniff(text[:4096])
     except csv.Error:
         dialect = csv.excel
-    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
-    headers = reader.fieldnames or []
-    rows = [row for row in reader]
-    return headers, rows
+    return encoding, dialect
+
+
+class _RawUpload(io.RawIOBase):
+    """
+    Raw byte view of an uploaded/stored file so it can be buffered and decoded in
+    chunks without TextIOWrapper taking ownership of (and closing) the upload.
+    """
+
+    def __init__(self, uploaded_file):
+        self._file = uploaded_file
+
+    def readable(self) -> bool:
+        return True
 
+    def readinto(self, buffer) -> int:
+        data = self._file.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
 
-def _read_xlsx(uploaded_file) -> Tuple[List[str], List[Dict[str, object]]]:
+
+def _csv_reader(uploaded_file, encoding: str, dialect, fieldnames: Optional[List[str]] = None) -> csv.DictReader:
+    uploaded_file.seek(0)
+    stream = io.TextIOWrapper(
+        io.BufferedReader(_RawUpload(uploaded_file)),
+        encoding=encoding,
+        # cp1252 leaves five byte values unmapped; UTF-8 is strict so a bad byte is noticed.
+        errors="replace" if encoding == CSV_FALLBACK_ENCODING else "strict",
+        newline="",
+    )
+    return csv.DictReader(stream, fieldnames=fieldnames, dialect=dialect)
+
+
+def _iter_csv(uploaded_file) -> SpreadsheetStream:
+    uploaded_file.seek(0)
+    sample = uploaded_file.read(CSV_SNIFF_BYTES)
+    encoding, dialect = _sniff_csv(sample)
+    reader = _csv_reader(uploaded_file, encoding, dialect)
+    headers = list(reader.fieldnames or [])
+
+    def rows() -> Iterator[Dict[str, object]]:
+        consumed = 0
+        try:
+            for row in reader:
+                yield row
+                consumed += 1
+        except UnicodeDecodeError:
+            # A non-UTF-8 byte past the sniffed sample: read the file again as cp1252
+            # and resume after the header and the rows already returned.
+            fallback = _csv_reader(uploaded_file, CSV_FALLBACK_ENCODING, dialect, fieldnames=headers)
+            yield from islice(fallback, consumed + 1, None)
+
+    return SpreadsheetStream(headers=headers, rows=rows())
+
+
+def _iter_xlsx(uploaded_file) -> SpreadsheetStream:
     if load_workbook is None:
         raise ValueError("openpyxl is required to import .xlsx files.")
     wb = load_workbook(uploaded_file, read_only=True, data_only=True)
     ws = wb.active
     rows_iter = ws.iter_rows(values_only=True)
-    try:
-        header_row = next(rows_iter)
-    except StopIteration:
-        return [], []
+    header_row = next(rows_iter, None)
+    if header_row is None:
+        wb.close()
+        return SpreadsheetStream(headers=[], rows=iter(()))
     headers = [str(cell).strip() if cell is not None else "" for cell in header_row]
-    rows: List[Dict[str, object]] = []
-    for row in rows_iter:
-        if not row or all(cell is None or str(cell).strip() == "" for cell in row):
-            continue
-        row_dict = {headers[idx]: row[idx] for idx in range(len(headers))}
-        rows.append(row_dict)
-    return headers, rows
+    total_rows = max(0, ws.max_row - 1) if ws.max_row else None
+
+    def rows() -> Iterator[Dict[str, object]]:
+        try:
+            for row in rows_iter:
+                if not row or all(cell is None or str(cell).strip() == "" for cell in row):
+                    continue
+                # Read-only sheets trim trailing empty cells.
+                yield {header: (row[idx] if idx < len(row) else None) for idx, header in enumerate(headers)}
+        finally:
+            wb.close()
 
+    return SpreadsheetStream(headers=headers, rows=rows(), total_rows=total_rows)
 
-def read_spreadsheet(uploaded_file) -> Tuple[List[str], List[Dict[str, object]]]:
+
+def iter_spreadsheet(uploaded_file) -> SpreadsheetStream:
+    """
+    Headers plus a lazy row iterator; rows are read from the file as they are consumed.
+    """
     name = (uploaded_file.name or "").lower()
     if name.endswith(".csv"):
-        return _read_csv(uploaded_file)
+        return _iter_csv(uploaded_file)
     if name.endswith(".xlsx"):
-        return _read_xlsx(uploaded_file)
+        return _iter_xlsx(uploaded_file)
     raise ValueError("Unsupported file type. Upload a .csv or .xlsx file.")
 
 
+def read_spreadsheet(uploaded_file) -> Tuple[List[str], List[Dict[str, object]]]:
+    spreadsheet = iter_spreadsheet(uploaded_file)
+    return spreadsheet.headers, list(spreadsheet.rows)
+
+
 def detect_shopify(headers: Iterable[str]) -> bool:
     normalized = {_normalize_header(header) for header in headers}
     required = {"handle", "title"}
@@ -284,19 +374,6 @@ def detect_shopify(headers: Iterable[str]) -> bool:
     return required.issubset(normalized) and bool(markers & normalized)
 
 
-def _ensure_unique_slug(base: str) -> str:
-    max_len = 50
-    base_slug = (base or "category")[:max_len]
-    slug = base_slug
-    counter = 2
-    while Category.objects.filter(slug=slug).exists():
-        suffix = f"-{counter}"
-        trimmed = base_slug[: max_len - len(suffix)]
-        slug = f"{trimmed}{suffix}"
-        counter += 1
-    return slug
-
-
 @dataclass
 class ImportResult:
     created_products: int = 0
@@ -426,28 +503,6 @@ def _pick_price(row_norm: Dict[str, object], default_currency: str) -> Optional[
     return _get_value(row_norm, *FIELD_ALIASES["price"])
 
 
-def _resolve_category(
-    name: Optional[str],
-    *,
-    default_category: Optional[Category],
-    create_missing: bool,
-    dry_run: bool,
-) -> Tuple[Optional[Category], bool]:
-    if name:
-        name = _trim_text(name, 120)
-        existing = Category.objects.filter(name__iexact=name).first()
-        if existing:
-            return existing, False
-        slug = _ensure_unique_slug(slugify(name))
-        if create_missing:
-            if dry_run:
-                return None, True
-            return Category.objects.create(name=name, slug=slug), True
-    if default_category:
-        return default_category, False
-    return None, False
-
-
 def import_products(
     *,
     uploaded_file,
@@ -459,10 +514,21 @@ def import_products(
     dieselr_foreign: bool = False,
     dry_run: bool = False,
     import_batch=None,
+    progress: Optional[Callable[[int, int, ImportResult], None]] = None,
 ) -> ImportResult:
-    headers, rows = read_spreadsheet(uploaded_file)
-    if not headers or not rows:
+    """
+    Import a product spreadsheet, reading rows lazily. Dry runs go through the same
+    engine and only skip the writes. `progress(processed_rows, total_rows, result)` is
+    called after every committed chunk; total_rows is 0 when the file does not say
+    (CSV).
+    """
+    spreadsheet = iter_spreadsheet(uploaded_file)
+    headers = spreadsheet.headers
+    first_row = next(spreadsheet.rows, None) if headers else None
+    if first_row is None:
         return ImportResult(errors=["The import file has no data rows."])
+    rows = chain((first_row,), spreadsheet.rows)
+    total_rows = spreadsheet.total_rows or 0
 
     file_name = (uploaded_file.name or "").lower()
     dieselr_from_name = "dieselr" in file_name
@@ -473,18 +539,16 @@ def import_products(
         mode = "shopify" if detect_shopify(headers) else "simple"
 
     if mode == "shopify":
-        return _import_shopify(
-            rows,
-            default_category=default_category,
-            default_currency=default_currency,
-            price_multiplier=price_multiplier,
-            update_existing=update_existing,
-            create_missing_categories=create_missing_categories,
-            dry_run=dry_run,
-            import_batch=import_batch,
-        )
-    if mode == "simple":
-        return _import_simple(
+        importer = _import_shopify
+    elif mode == "simple":
+        importer = _import_simple
+    else:
+        return ImportResult(errors=[f"Unknown import mode: {mode}."])
+
+    # Chunks commit one by one; refresh the storefront index and companions once
+    # for the whole file, and leave image thumbnails to generate_product_thumbnails.
+    with deferred_storefront_index(), deferred_thumbnails():
+        return importer(
             rows,
             default_category=default_category,
             default_currency=default_currency,
@@ -493,8 +557,8 @@ def import_products(
             create_missing_categories=create_missing_categories,
             dry_run=dry_run,
             import_batch=import_batch,
+            progress=(lambda processed, result: progress(processed, total_rows, result)) if progress else None,
         )
-    return ImportResult(errors=[f"Unknown import mode: {mode}."])
 
 
 def _build_sku_registry() -> set[str]:
@@ -517,6 +581,186 @@ def _apply_price_multiplier(price: Optional[Decimal], multiplier: Decimal) -> Op
     return (price * multiplier).quantize(PRICE_QUANT)
 
 
+def _chunked(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _CatalogRegistry:
+    """
+    Upfront lookups for one import run: taken SKUs/slugs and categories by name, so
+    rows resolve in memory instead of with per-row queries.
+    """
+
+    def __init__(self, *, dry_run: bool):
+        self.dry_run = dry_run
+        self.skus = _build_sku_registry()
+        self.slugs = _build_slug_registry()
+        self.categories: Dict[str, Category] = {}
+        self.category_slugs: set[str] = set()
+        self.planned_categories: set[str] = set()
+        for category in Category.objects.order_by("pk"):
+            self.categories.setdefault(category.name.lower(), category)
+            self.category_slugs.add(category.slug)
+
+    def _unique_category_slug(self, base: str) -> str:
+        base_slug = (base or "category")[:CATEGORY_SLUG_MAX_LEN]
+        slug = base_slug
+        counter = 2
+        while slug in self.category_slugs:
+            suffix = f"-{counter}"
+            slug = f"{base_slug[: CATEGORY_SLUG_MAX_LEN - len(suffix)]}{suffix}"
+            counter += 1
+        return slug
+
+    def category(
+        self,
+        name: Optional[str],
+        *,
+        default_category: Optional[Category],
+        create_missing: bool,
+    ) -> Tuple[Optional[Category], bool]:
+        if name:
+            name = _trim_text(name, 120)
+            key = name.lower()
+            existing = self.categories.get(key)
+            if existing:
+                return existing, False
+            if create_missing:
+                if self.dry_run:
+                    created = key not in self.planned_categories
+                    self.planned_categories.add(key)
+                    return None, created
+                slug = self._unique_category_slug(slugify(name))
+                category = Category.objects.create(name=name, slug=slug)
+                self.categories[key] = category
+                self.category_slugs.add(slug)
+                return category, True
+        if default_category:
+            return default_category, False
+        return None, False
+
+
+class _BulkWriter:
+    """
+    Collects one chunk of product/option writes and flushes them with bulk_create /
+    bulk_update in a transaction. When a bulk statement fails the chunk is retried
+    row by row, so a bad row only costs its own error. Dry runs write nothing.
+    """
+
+    def __init__(self, result: ImportResult, *, dry_run: bool):
+        self.result = result
+        self.dry_run = dry_run
+        self._reset()
+
+    def _reset(self) -> None:
+        self.new_products: List[Tuple[str, Product]] = []
+        self.changed_products: Dict[int, Tuple[str, Product]] = {}
+        self.product_fields: set[str] = set()
+        self.new_options: List[Tuple[str, ProductOption]] = []
+        self.changed_options: Dict[int, Tuple[str, ProductOption]] = {}
+        self.option_fields: set[str] = set()
+
+    def create_product(self, label: str, product: Product) -> None:
+        self.new_products.append((label, product))
+        self.result.created_products += 1
+
+    def update_product(self, label: str, product: Product, fields: Iterable[str]) -> None:
+        # Products created earlier in this chunk are simply inserted with the new values.
+        if product.pk is not None:
+            self.changed_products[id(product)] = (label, product)
+            self.product_fields.update(fields)
+        self.result.updated_products += 1
+
+    def create_option(self, label: str, option: ProductOption) -> None:
+        self.new_options.append((label, option))
+        self.result.created_options += 1
+
+    def update_option(self, label: str, option: ProductOption, fields: Iterable[str]) -> None:
+        if option.pk is not None:
+            self.changed_options[id(option)] = (label, option)
+            self.option_fields.update(fields)
+        self.result.updated_options += 1
+
+    def flush(self) -> None:
+        if self.dry_run:
+            self._reset()
+            return
+        result = self.result
+        with transaction.atomic():
+            for label, _obj, exc in self._write(Product, self.new_products):
+                result.created_products -= 1
+                result.skipped_products += 1
+                result.errors.append(f"{label}: {exc}")
+            # bulk_update skips auto_now; stale companion detection compares updated_at.
+            now = timezone.now()
+            for _label, product in self.changed_products.values():
+                product.updated_at = now
+            product_fields = self.product_fields | {"updated_at"}
+            for label, _obj, exc in self._write(Product, list(self.changed_products.values()), product_fields):
+                result.updated_products -= 1
+                result.skipped_products += 1
+                result.errors.append(f"{label}: {exc}")
+
+            new_options = []
+            for label, option in self.new_options:
+                if option.product.pk is None:
+                    # Its product failed to insert; the product error is already recorded.
+                    result.created_options -= 1
+                    continue
+                new_options.append((label, option))
+            failures = self._write(ProductOption, new_options)
+            failures += self._write(ProductOption, list(self.changed_options.values()), self.option_fields)
+            for label, option, exc in failures:
+                if id(option) in self.changed_options:
+                    result.updated_options -= 1
+                else:
+                    result.created_options -= 1
+                result.skipped_options += 1
+                result.errors.append(f"{label}: {exc}")
+
+            product_ids = {product.pk for _label, product in self.new_products if product.pk}
+            product_ids.update(product.pk for _label, product in self.changed_products.values())
+            product_ids.update(option.product_id for _label, option in new_options if option.pk)
+            product_ids.update(option.product_id for _label, option in self.changed_options.values())
+            if product_ids:
+                refresh_after_bulk_write(product_ids)
+        self._reset()
+
+    @staticmethod
+    def _write(model, rows: List[Tuple[str, Any]], fields: Optional[set[str]] = None) -> List[Tuple[str, Any, Exception]]:
+        if not rows:
+            return []
+        objs = [obj for _label, obj in rows]
+        try:
+            with transaction.atomic():
+                if fields is None:
+                    model.objects.bulk_create(objs, batch_size=IMPORT_CHUNK_SIZE)
+                else:
+                    model.objects.bulk_update(objs, sorted(fields), batch_size=IMPORT_CHUNK_SIZE)
+            return []
+        except Exception:
+            pass
+
+        failures = []
+        for label, obj in rows:
+            try:
+                with transaction.atomic():
+                    if fields is None:
+                        obj.save(force_insert=True)
+                    else:
+                        obj.save(update_fields=sorted(fields))
+            except Exception as exc:
+                if fields is None:
+                    obj.pk = None
+                failures.append((label, obj, exc))
+        return failures
+
+
 def _import_simple(
     rows: Iterable[Dict[str, object]],
     *,
@@ -527,126 +771,131 @@ def _import_simple(
     create_missing_categories: bool,
     dry_run: bool,
     import_batch=None,
+    progress: Optional[Callable[[int, ImportResult], None]] = None,
 ) -> ImportResult:
     result = ImportResult()
     currency_default = (default_currency or settings.DEFAULT_CURRENCY_CODE or "CAD").upper()
-    taken_skus = _build_sku_registry()
-    taken_slugs = _build_slug_registry()
-
-    for idx, row in enumerate(rows, start=2):
-        row_norm = _normalize_row(row)
-        name_raw = _get_value(row_norm, *FIELD_ALIASES["name"])
-        sku_raw = _get_value(row_norm, *FIELD_ALIASES["sku"])
-        if sku_raw:
-            sku = _clean_sku(sku_raw)
-            if not sku:
-                sku = _generate_unique_sku(name_raw or f"product-{idx}", taken_skus)
+    registry = _CatalogRegistry(dry_run=dry_run)
+    writer = _BulkWriter(result, dry_run=dry_run)
+    processed = 0
+
+    for chunk in _chunked(enumerate(rows, start=2), IMPORT_CHUNK_SIZE):
+        planned = []
+        for idx, row in chunk:
+            row_norm = _normalize_row(row)
+            name_raw = _get_value(row_norm, *FIELD_ALIASES["name"])
+            sku_raw = _get_value(row_norm, *FIELD_ALIASES["sku"])
+            if sku_raw:
+                sku = _clean_sku(sku_raw)
+                if not sku:
+                    sku = _generate_unique_sku(name_raw or f"product-{idx}", registry.skus)
+                else:
+                    registry.skus.add(sku)
             else:
-                taken_skus.add(sku)
-        else:
-            sku = _generate_unique_sku(name_raw or f"product-{idx}", taken_skus)
-
-        name = _trim_text(name_raw, 180) if name_raw else _trim_text(sku, 180)
-        if not name:
-            result.errors.append(f"Row {idx}: missing product name.")
-            result.skipped_products += 1
-            continue
-
-        category_raw = _get_value(row_norm, *FIELD_ALIASES["category"])
-        category_name = str(category_raw).strip() if category_raw else ""
-        category, category_created = _resolve_category(
-            category_name,
-            default_category=default_category,
-            create_missing=create_missing_categories,
-            dry_run=dry_run,
-        )
-        if category_created:
-            result.created_categories += 1
-        if not category and not dry_run:
-            result.errors.append(f"Row {idx}: missing category and no default set.")
-            result.skipped_products += 1
-            continue
+                sku = _generate_unique_sku(name_raw or f"product-{idx}", registry.skus)
 
-        price_raw = _pick_price(row_norm, currency_default)
-        price = _parse_decimal(price_raw) if price_raw is not None else None
-        price = _apply_price_multiplier(price, price_multiplier)
-        currency_raw = _get_value(row_norm, *FIELD_ALIASES["currency"])
-        currency = (str(currency_raw).strip().upper() if currency_raw else currency_default)
-        inventory_raw = _get_value(row_norm, *FIELD_ALIASES["inventory"])
-        inventory = _parse_int(inventory_raw) if inventory_raw is not None else None
-        description_raw = _get_value(row_norm, *FIELD_ALIASES["description"])
-        description = str(description_raw).strip() if description_raw else ""
-        short_desc_raw = _get_value(row_norm, *FIELD_ALIASES["short_description"])
-        short_description = _trim_text(short_desc_raw, 240) if short_desc_raw else ""
-        tags_raw = _get_value(row_norm, *FIELD_ALIASES["tags"])
-        tags = _parse_tags(tags_raw)
-        specs_raw = _get_value(row_norm, *FIELD_ALIASES["specs"])
-        specs = _parse_specs(specs_raw)
-        active_raw = _get_value(row_norm, *FIELD_ALIASES["active"])
-        is_active = _parse_bool(active_raw, default=True)
-        vendor_raw = _get_value(row_norm, *FIELD_ALIASES["vendor"])
-        if vendor_raw:
-            vendor_tag = _trim_text(vendor_raw, 32)
-            if vendor_tag and vendor_tag not in tags:
-                tags.append(vendor_tag)
-
-        existing = Product.objects.filter(sku=sku).first()
-        if existing:
-            if not update_existing:
+            name = _trim_text(name_raw, 180) if name_raw else _trim_text(sku, 180)
+            if not name:
+                result.errors.append(f"Row {idx}: missing product name.")
                 result.skipped_products += 1
                 continue
-            if dry_run:
-                result.updated_products += 1
+
+            category_raw = _get_value(row_norm, *FIELD_ALIASES["category"])
+            category_name = str(category_raw).strip() if category_raw else ""
+            category, category_created = registry.category(
+                category_name,
+                default_category=default_category,
+                create_missing=create_missing_categories,
+            )
+            if category_created:
+                result.created_categories += 1
+            if not category and not dry_run:
+                result.errors.append(f"Row {idx}: missing category and no default set.")
+                result.skipped_products += 1
                 continue
-            try:
+            planned.append((idx, row_norm, sku, name, name_raw, category_raw, category))
+
+        existing_by_sku: Dict[str, Product] = Product.objects.in_bulk(
+            {item[2] for item in planned}, field_name="sku"
+        )
+        for idx, row_norm, sku, name, name_raw, category_raw, category in planned:
+            price_raw = _pick_price(row_norm, currency_default)
+            price = _parse_decimal(price_raw) if price_raw is not None else None
+            price = _apply_price_multiplier(price, price_multiplier)
+            currency_raw = _get_value(row_norm, *FIELD_ALIASES["currency"])
+            currency = (str(currency_raw).strip().upper() if currency_raw else currency_default)
+            inventory_raw = _get_value(row_norm, *FIELD_ALIASES["inventory"])
+            inventory = _parse_int(inventory_raw) if inventory_raw is not None else None
+            description_raw = _get_value(row_norm, *FIELD_ALIASES["description"])
+            description = str(description_raw).strip() if description_raw else ""
+            short_desc_raw = _get_value(row_norm, *FIELD_ALIASES["short_description"])
+            short_description = _trim_text(short_desc_raw, 240) if short_desc_raw else ""
+            tags_raw = _get_value(row_norm, *FIELD_ALIASES["tags"])
+            tags = _parse_tags(tags_raw)
+            specs_raw = _get_value(row_norm, *FIELD_ALIASES["specs"])
+            specs = _parse_specs(specs_raw)
+            active_raw = _get_value(row_norm, *FIELD_ALIASES["active"])
+            is_active = _parse_bool(active_raw, default=True)
+            vendor_raw = _get_value(row_norm, *FIELD_ALIASES["vendor"])
+            if vendor_raw:
+                vendor_tag = _trim_text(vendor_raw, 32)
+                if vendor_tag and vendor_tag not in tags:
+                    tags.append(vendor_tag)
+
+            existing = existing_by_sku.get(sku)
+            if existing:
+                if not update_existing:
+                    result.skipped_products += 1
+                    continue
+                if dry_run:
+                    result.updated_products += 1
+                    continue
+                fields = []
                 if name_raw:
                     existing.name = name
-                if category_raw or default_category:
-                    if category:
-                        existing.category = category
+                    fields.append("name")
+                if (category_raw or default_category) and category:
+                    existing.category = category
+                    fields.append("category")
                 if price is not None:
                     existing.price = price
+                    fields.append("price")
                 if currency_raw:
                     existing.currency = currency
+                    fields.append("currency")
                 if inventory is not None:
                     existing.inventory = inventory
+                    fields.append("inventory")
                 if description_raw:
                     existing.description = description
+                    fields.append("description")
                 if short_description:
                     existing.short_description = short_description
+                    fields.append("short_description")
                 if tags_raw is not None:
                     existing.tags = tags
+                    fields.append("tags")
                 if specs_raw is not None and specs:
                     existing.specs = specs
+                    fields.append("specs")
                 if active_raw is not None:
                     existing.is_active = is_active
-                existing.save()
-            except Exception as exc:
-                result.errors.append(f"Row {idx}: {exc}")
-                result.skipped_products += 1
+                    fields.append("is_active")
+                writer.update_product(f"Row {idx}", existing, fields)
                 continue
-            else:
-                result.updated_products += 1
-            continue
 
-        if dry_run:
-            result.created_products += 1
-            continue
-
-        price_create = price if price is not None else Decimal("0.00")
-        inventory_create = inventory if inventory is not None else 0
-        slug_seed = name or sku
-        slug_value = _generate_unique_slug(slug_seed, taken_slugs)
+            if dry_run:
+                result.created_products += 1
+                continue
 
-        try:
-            Product.objects.create(
+            product = Product(
                 name=name,
                 sku=sku,
-                slug=slug_value,
+                slug=_generate_unique_slug(name or sku, registry.slugs),
                 category=category,
-                price=price_create,
+                price=price if price is not None else Decimal("0.00"),
                 currency=currency,
-                inventory=inventory_create,
+                inventory=inventory if inventory is not None else 0,
                 is_active=is_active,
                 short_description=short_description,
                 description=description,
@@ -654,11 +903,14 @@ def _import_simple(
                 specs=specs,
                 import_batch=import_batch,
             )
-        except Exception as exc:
-            result.errors.append(f"Row {idx}: {exc}")
-            result.skipped_products += 1
-        else:
-            result.created_products += 1
+            # Later rows with the same SKU update this pending product.
+            existing_by_sku[sku] = product
+            writer.create_product(f"Row {idx}", product)
+
+        writer.flush()
+        processed += len(chunk)
+        if progress is not None:
+            progress(processed, result)
 
     return result
 
@@ -742,6 +994,24 @@ def _pick_shopify_main_image_url(group: List[Dict[str, object]]) -> str:
     return best_src
 
 
+def _shopify_handle(row_norm: Dict[str, object]) -> str:
+    handle_raw = _get_value(row_norm, "handle")
+    title_raw = _get_value(row_norm, "title")
+    return str(handle_raw).strip() if handle_raw else str(title_raw or "").strip()
+
+
+def _iter_shopify_groups(rows: Iterable[Dict[str, object]]) -> Iterator[Tuple[str, List[Dict[str, object]]]]:
+    """
+    Shopify exports list a product's rows together, so rows are grouped per contiguous
+    handle as they stream in. A handle that shows up again later in the file is a new
+    group and matches the product written for its first run (by handle/slug).
+    Rows without a handle or title come through with an empty handle.
+    """
+    normalized = (_normalize_row(row) for row in rows)
+    for handle, group in groupby(normalized, key=_shopify_handle):
+        yield handle, list(group)
+
+
 def _import_shopify(
     rows: Iterable[Dict[str, object]],
     *,
@@ -752,233 +1022,308 @@ def _import_shopify(
     create_missing_categories: bool,
     dry_run: bool,
     import_batch=None,
+    progress: Optional[Callable[[int, ImportResult], None]] = None,
 ) -> ImportResult:
     result = ImportResult()
     currency_default = (default_currency or settings.DEFAULT_CURRENCY_CODE or "CAD").upper()
-    grouped: Dict[str, List[Dict[str, object]]] = {}
-    taken_skus = _build_sku_registry()
-    taken_slugs = _build_slug_registry()
-
-    for row in rows:
-        row_norm = _normalize_row(row)
-        handle_raw = _get_value(row_norm, "handle")
-        title_raw = _get_value(row_norm, "title")
-        handle = str(handle_raw).strip() if handle_raw else str(title_raw or "").strip()
-        if not handle:
-            result.errors.append("Shopify row missing handle/title.")
-            continue
-        grouped.setdefault(handle, []).append(row_norm)
-
-    for handle, group in grouped.items():
-        handle_slug = _slug_seed(handle)
-        primary = _pick_shopify_primary_row(group, currency_default=currency_default)
+    registry = _CatalogRegistry(dry_run=dry_run)
+    writer = _BulkWriter(result, dry_run=dry_run)
+    processed = 0
+
+    for chunk in _chunked(_iter_shopify_groups(rows), SHOPIFY_GROUP_CHUNK_SIZE):
+        planned = []
+        for handle, group in chunk:
+            if not handle:
+                result.errors.extend(["Shopify row missing handle/title."] * len(group))
+                continue
+            primary = _pick_shopify_primary_row(group, currency_default=currency_default)
+            title_raw = _get_value(primary, "title")
+            name = _trim_text(title_raw or handle, 180)
+            if not name:
+                result.errors.append(f"{handle}: missing title.")
+                result.skipped_products += 1
+                continue
 
-        title_raw = _get_value(primary, "title")
-        name = _trim_text(title_raw or handle, 180)
-        if not name:
-            result.errors.append(f"{handle}: missing title.")
-            result.skipped_products += 1
-            continue
+            base_sku = None
+            for row_norm in group:
+                if not _shopify_option_label(row_norm):
+                    sku_candidate = _get_value(row_norm, "variant sku", "sku")
+                    if sku_candidate:
+                        base_sku = _clean_sku(sku_candidate)
+                        break
+            if not base_sku:
+                base_sku = _generate_unique_sku(name or handle, registry.skus)
+            else:
+                registry.skus.add(base_sku)
+            planned.append((handle, group, primary, title_raw, name, _slug_seed(handle), base_sku))
 
-        category_raw = _get_value(primary, "product category", "type", "collection")
-        category_name = str(category_raw).strip() if category_raw else ""
-
-        description_raw = _get_value(primary, "body (html)", "body html", "body")
-        description = str(description_raw).strip() if description_raw else ""
-        short_desc_raw = _get_value(primary, "seo description")
-        short_description = _trim_text(short_desc_raw, 240)
-        tags_raw = _get_value(primary, "tags")
-        tags = _parse_tags(tags_raw)
-        vendor_raw = _get_value(primary, "vendor")
-        if vendor_raw:
-            vendor_tag = _trim_text(vendor_raw, 32)
-            if vendor_tag and vendor_tag not in tags:
-                tags.append(vendor_tag)
-        active_raw = _get_value(primary, "published", "status")
-        is_active = _parse_bool(active_raw, default=True)
-
-        variant_prices = []
-        for row_norm in group:
-            price_value = _pick_price(row_norm, currency_default)
-            price = _parse_decimal(price_value)
-            if price is not None:
-                price = _apply_price_multiplier(price, price_multiplier)
-                variant_prices.append(price)
-        has_price = bool(variant_prices)
-        base_price = min(variant_prices) if variant_prices else Decimal("0.00")
-
-        base_sku = None
-        for row_norm in group:
-            opt_label = _shopify_option_label(row_norm)
-            if not opt_label:
-                sku_candidate = _get_value(row_norm, "variant sku", "sku")
-                if sku_candidate:
-                    base_sku = _clean_sku(sku_candidate)
-                    break
-        if not base_sku:
-            base_sku = _generate_unique_sku(name or handle, taken_skus)
-        else:
-            taken_skus.add(base_sku)
+        # Prefer stable Shopify handle/slug matching; fall back to SKU.
+        by_slug = Product.objects.in_bulk({item[5] for item in planned if item[5]}, field_name="slug")
+        by_sku = Product.objects.in_bulk({item[6] for item in planned}, field_name="sku")
+        option_skus = {
+            _clean_sku(sku_raw)
+            for item in planned
+            for row_norm in item[1]
+            if _shopify_option_label(row_norm) and (sku_raw := _get_value(row_norm, "variant sku", "sku"))
+        }
+        options_by_sku: Dict[str, ProductOption] = ProductOption.objects.in_bulk(option_skus - {""}, field_name="sku")
+
+        product_groups = []
+        for handle, group, primary, title_raw, name, handle_slug, base_sku in planned:
+            product = _plan_shopify_product(
+                writer,
+                registry,
+                handle=handle,
+                group=group,
+                primary=primary,
+                title_raw=title_raw,
+                name=name,
+                base_sku=base_sku,
+                existing=(by_slug.get(handle_slug) if handle_slug else None) or by_sku.get(base_sku),
+                currency_default=currency_default,
+                default_category=default_category,
+                price_multiplier=price_multiplier,
+                update_existing=update_existing,
+                create_missing_categories=create_missing_categories,
+                dry_run=dry_run,
+                import_batch=import_batch,
+            )
+            if product is not False:
+                product_groups.append((handle, group, product))
+                if product is not None and product.pk is None:
+                    by_slug[product.slug] = product
+                    by_sku[base_sku] = product
+
+        options_by_name: Dict[Tuple[int, str], ProductOption] = {}
+        for option in ProductOption.objects.filter(
+            product_id__in={product.pk for _h, _g, product in product_groups if product is not None and product.pk}
+        ).order_by("sort_order", "id"):
+            options_by_name.setdefault((option.product_id, option.name), option)
+
+        for handle, group, product in product_groups:
+            _plan_shopify_options(
+                writer,
+                handle=handle,
+                group=group,
+                product=product,
+                options_by_sku=options_by_sku,
+                options_by_name=options_by_name,
+                currency_default=currency_default,
+                price_multiplier=price_multiplier,
+                update_existing=update_existing,
+                dry_run=dry_run,
+                import_batch=import_batch,
+            )
 
-        inventory_raw = _get_value(primary, "variant inventory qty", "inventory", "qty", "quantity")
-        inventory_value = _parse_int(inventory_raw) if inventory_raw is not None else None
+        writer.flush()
+        processed += sum(len(group) for _handle, group in chunk)
+        if progress is not None:
+            progress(processed, result)
 
-        main_image_url = _pick_shopify_main_image_url(group)
+    return result
 
-        # Prefer stable Shopify handle/slug matching; fall back to SKU.
-        existing = Product.objects.filter(slug=handle_slug).first() if handle_slug else None
-        if not existing:
-            existing = Product.objects.filter(sku=base_sku).first()
 
-        if existing:
-            if not update_existing:
-                result.skipped_products += 1
-                continue
-            if dry_run:
-                result.updated_products += 1
-                product = existing
-            else:
-                category = None
-                category_created = False
-                if category_raw is not None or default_category is not None:
-                    category, category_created = _resolve_category(
-                        category_name,
-                        default_category=default_category,
-                        create_missing=create_missing_categories,
-                        dry_run=dry_run,
-                    )
-                if category_created:
-                    result.created_categories += 1
-                try:
-                    if title_raw is not None:
-                        existing.name = name
-                    if (category_raw is not None or default_category is not None) and category:
-                        existing.category = category
-                    if has_price:
-                        existing.price = base_price
-                        existing.currency = currency_default
-                    if inventory_value is not None:
-                        existing.inventory = inventory_value
-                    if description_raw is not None:
-                        existing.description = description
-                    if short_description:
-                        existing.short_description = short_description
-                    if tags_raw is not None:
-                        existing.tags = tags
-                    if active_raw is not None:
-                        existing.is_active = is_active
-                    if main_image_url:
-                        existing.main_image = main_image_url
-                    existing.save()
-                except Exception as exc:
-                    result.errors.append(f"{handle}: {exc}")
-                    result.skipped_products += 1
-                    continue
-                else:
-                    result.updated_products += 1
-            product = existing
-        else:
-            category, category_created = _resolve_category(
+def _plan_shopify_product(
+    writer: _BulkWriter,
+    registry: _CatalogRegistry,
+    *,
+    handle: str,
+    group: List[Dict[str, object]],
+    primary: Dict[str, object],
+    title_raw,
+    name: str,
+    base_sku: str,
+    existing: Optional[Product],
+    currency_default: str,
+    default_category: Optional[Category],
+    price_multiplier: Decimal,
+    update_existing: bool,
+    create_missing_categories: bool,
+    dry_run: bool,
+    import_batch,
+):
+    """
+    Queue the product write for one handle group. Returns the product the group's
+    options attach to, None on dry runs of new products, or False when skipped.
+    """
+    result = writer.result
+    category_raw = _get_value(primary, "product category", "type", "collection")
+    category_name = str(category_raw).strip() if category_raw else ""
+
+    description_raw = _get_value(primary, "body (html)", "body html", "body")
+    description = str(description_raw).strip() if description_raw else ""
+    short_desc_raw = _get_value(primary, "seo description")
+    short_description = _trim_text(short_desc_raw, 240)
+    tags_raw = _get_value(primary, "tags")
+    tags = _parse_tags(tags_raw)
+    vendor_raw = _get_value(primary, "vendor")
+    if vendor_raw:
+        vendor_tag = _trim_text(vendor_raw, 32)
+        if vendor_tag and vendor_tag not in tags:
+            tags.append(vendor_tag)
+    active_raw = _get_value(primary, "published", "status")
+    is_active = _parse_bool(active_raw, default=True)
+
+    variant_prices = []
+    for row_norm in group:
+        price = _parse_decimal(_pick_price(row_norm, currency_default))
+        if price is not None:
+            variant_prices.append(_apply_price_multiplier(price, price_multiplier))
+    has_price = bool(variant_prices)
+    base_price = min(variant_prices) if variant_prices else Decimal("0.00")
+
+    inventory_raw = _get_value(primary, "variant inventory qty", "inventory", "qty", "quantity")
+    inventory_value = _parse_int(inventory_raw) if inventory_raw is not None else None
+    main_image_url = _pick_shopify_main_image_url(group)
+
+    if existing:
+        if not update_existing:
+            result.skipped_products += 1
+            return False
+        category = None
+        if category_raw is not None or default_category is not None:
+            category, category_created = registry.category(
                 category_name,
                 default_category=default_category,
                 create_missing=create_missing_categories,
-                dry_run=dry_run,
             )
             if category_created:
                 result.created_categories += 1
-            if not category and not dry_run:
-                result.errors.append(f"{handle}: missing category and no default set.")
-                result.skipped_products += 1
-                continue
+        if dry_run:
+            result.updated_products += 1
+            return existing
+        fields = []
+        if title_raw is not None:
+            existing.name = name
+            fields.append("name")
+        if (category_raw is not None or default_category is not None) and category:
+            existing.category = category
+            fields.append("category")
+        if has_price:
+            existing.price = base_price
+            existing.currency = currency_default
+            fields += ["price", "currency"]
+        if inventory_value is not None:
+            existing.inventory = inventory_value
+            fields.append("inventory")
+        if description_raw is not None:
+            existing.description = description
+            fields.append("description")
+        if short_description:
+            existing.short_description = short_description
+            fields.append("short_description")
+        if tags_raw is not None:
+            existing.tags = tags
+            fields.append("tags")
+        if active_raw is not None:
+            existing.is_active = is_active
+            fields.append("is_active")
+        if main_image_url:
+            existing.main_image = main_image_url
+            fields.append("main_image")
+        writer.update_product(handle, existing, fields)
+        return existing
+
+    category, category_created = registry.category(
+        category_name,
+        default_category=default_category,
+        create_missing=create_missing_categories,
+    )
+    if category_created:
+        result.created_categories += 1
+    if not category and not dry_run:
+        result.errors.append(f"{handle}: missing category and no default set.")
+        result.skipped_products += 1
+        return False
+    if dry_run:
+        result.created_products += 1
+        return None
 
-            if dry_run:
-                result.created_products += 1
-                product = None
-            else:
-                slug_seed = handle or name or base_sku
-                slug_value = _generate_unique_slug(slug_seed, taken_slugs)
-                try:
-                    product = Product.objects.create(
-                        name=name,
-                        sku=base_sku,
-                        slug=slug_value,
-                        category=category,
-                        price=base_price,
-                        currency=currency_default,
-                        inventory=inventory_value or 0,
-                        is_active=is_active,
-                        short_description=short_description,
-                        description=description,
-                        tags=tags,
-                        main_image=main_image_url or None,
-                        import_batch=import_batch,
-                    )
-                except Exception as exc:
-                    result.errors.append(f"{handle}: {exc}")
-                    result.skipped_products += 1
-                    continue
-                else:
-                    result.created_products += 1
+    product = Product(
+        name=name,
+        sku=base_sku,
+        slug=_generate_unique_slug(handle or name or base_sku, registry.slugs),
+        category=category,
+        price=base_price,
+        currency=currency_default,
+        inventory=inventory_value or 0,
+        is_active=is_active,
+        short_description=short_description,
+        description=description,
+        tags=tags,
+        main_image=main_image_url or None,
+        import_batch=import_batch,
+    )
+    writer.create_product(handle, product)
+    return product
 
-        for row_norm in group:
-            opt_label = _shopify_option_label(row_norm)
-            if not opt_label:
-                continue
-            opt_sku_raw = _get_value(row_norm, "variant sku", "sku")
-            opt_sku = _clean_sku(opt_sku_raw) if opt_sku_raw else ""
-            opt_price_raw = _pick_price(row_norm, currency_default)
-            opt_price = _parse_decimal(opt_price_raw)
-            opt_price = _apply_price_multiplier(opt_price, price_multiplier)
-            opt_active_raw = _get_value(row_norm, "published", "status")
-            opt_active = _parse_bool(opt_active_raw, default=True)
-
-            existing_opt = None
-            if opt_sku:
-                existing_opt = ProductOption.objects.filter(sku=opt_sku).first()
-            if not existing_opt and product:
-                existing_opt = ProductOption.objects.filter(product=product, name=opt_label).first()
 
-            if existing_opt:
-                if not update_existing:
-                    result.skipped_options += 1
-                    continue
-                if dry_run:
-                    result.updated_options += 1
-                    continue
-                try:
-                    existing_opt.name = opt_label
-                    if opt_sku:
-                        existing_opt.sku = opt_sku
-                    if opt_price is not None:
-                        existing_opt.price = opt_price
-                    if opt_active_raw is not None:
-                        existing_opt.is_active = opt_active
-                    existing_opt.save()
-                except Exception as exc:
-                    result.errors.append(f"{handle}: option {opt_label} -> {exc}")
-                    result.skipped_options += 1
-                else:
-                    result.updated_options += 1
+def _plan_shopify_options(
+    writer: _BulkWriter,
+    *,
+    handle: str,
+    group: List[Dict[str, object]],
+    product: Optional[Product],
+    options_by_sku: Dict[str, ProductOption],
+    options_by_name: Dict[Tuple[int, str], ProductOption],
+    currency_default: str,
+    price_multiplier: Decimal,
+    update_existing: bool,
+    dry_run: bool,
+    import_batch,
+) -> None:
+    result = writer.result
+    for row_norm in group:
+        opt_label = _shopify_option_label(row_norm)
+        if not opt_label:
+            continue
+        opt_sku_raw = _get_value(row_norm, "variant sku", "sku")
+        opt_sku = _clean_sku(opt_sku_raw) if opt_sku_raw else ""
+        opt_price = _apply_price_multiplier(_parse_decimal(_pick_price(row_norm, currency_default)), price_multiplier)
+        opt_active_raw = _get_value(row_norm, "published", "status")
+        opt_active = _parse_bool(opt_active_raw, default=True)
+
+        product_key = (product.pk or ("pending", id(product))) if product is not None else None
+        existing_opt = options_by_sku.get(opt_sku) if opt_sku else None
+        if not existing_opt and product is not None:
+            existing_opt = options_by_name.get((product_key, opt_label))
+
+        if existing_opt:
+            if not update_existing:
+                result.skipped_options += 1
                 continue
-
             if dry_run:
-                result.created_options += 1
+                result.updated_options += 1
                 continue
-            if not product:
-                continue
-            try:
-                ProductOption.objects.create(
-                    product=product,
-                    name=opt_label,
-                    sku=opt_sku or None,
-                    price=opt_price,
-                    is_active=opt_active,
-                    import_batch=import_batch,
-                )
-            except Exception as exc:
-                result.errors.append(f"{handle}: option {opt_label} -> {exc}")
-                result.skipped_options += 1
-            else:
-                result.created_options += 1
+            existing_opt.name = opt_label
+            fields = ["name"]
+            if opt_sku:
+                existing_opt.sku = opt_sku
+                fields.append("sku")
+            if opt_price is not None:
+                existing_opt.price = opt_price
+                fields.append("price")
+            if opt_active_raw is not None:
+                existing_opt.is_active = opt_active
+                fields.append("is_active")
+            writer.update_option(f"{handle}: option {opt_label} ->", existing_opt, fields)
+            continue
 
-    return result
+        if dry_run:
+            result.created_options += 1
+            continue
+        if product is None:
+            continue
+        option = ProductOption(
+            product=product,
+            name=opt_label,
+            sku=opt_sku or None,
+            price=opt_price,
+            is_active=opt_active,
+            import_batch=import_batch,
+        )
+        # Later rows with the same SKU or label update this pending option.
+        if opt_sku:
+            options_by_sku[opt_sku] = option
+        options_by_name[(product_key, opt_label)] = option
+        writer.create_option(f"{handle}: option {opt_label} ->", option)
@@ -0,0 +1,129 @@
+"""
+Versioned cache and conditional GET for the storefront listing JSON.
+
+The React storefront re-requests `store_home?format=json` on every filter, sort
+and page click. The serialized payload is cached under a key built from the
+normalized listing parameters, the dealer tier, the day (discounts are dated)
+and the catalog version (store.storefront_index.catalog_version), which the
+catalog signals bump on every product/option/discount/category/fitment change.
+Responses carry an ETag of the body and the time it was built, so a repeat
+click with If-None-Match is answered with 304 from the cache alone.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .storefront_index import catalog_version
+
+logger = logging.getLogger(__name__)
+
+LISTING_CACHE_KEY = "bgm:store:listing:{version}:{day}:{tier}:{digest}"
+# Query parameters read by the listing payload; everything else (utm_*, format, ...) is ignored.
+LISTING_PARAMS = ("q", "sort", "page", "category", "make", "model", "year")
+
+
+@dataclass(frozen=True)
+class CachedListing:
+    body: bytes
+    etag: str
+    last_modified: int
+
+
+def listing_cache_params(query) -> list[tuple[str, str]]:
+    """
+    Listing parameters reduced to the values that change the payload, sorted.
+    """
+    values = {name: " ".join((query.get(name) or "").split()) for name in LISTING_PARAMS}
+    if not values["category"]:
+        values["category"] = (query.get("cat") or "").strip()
+    values["sort"] = values["sort"].lower()
+    if values["page"]:
+        values["page"] = str(int(values["page"])) if values["page"].isdigit() else "1"
+    if values["page"] == "1":
+        values["page"] = ""
+    return sorted((name, value) for name, value in values.items() if value)
+
+
+def listing_cache_key(query, *, dealer_tier_code: str = "", version: str) -> str:
+    digest = hashlib.sha1(urlencode(listing_cache_params(query)).encode("utf-8")).hexdigest()
+    return LISTING_CACHE_KEY.format(
+        version=version,
+        day=timezone.localdate().isoformat(),
+        tier=dealer_tier_code or "public",
+        digest=digest,
+    )
+
+
+def render_listing(payload: dict) -> CachedListing:
+    body = json.dumps(payload, cls=DjangoJSONEncoder).encode("utf-8")
+    return CachedListing(
+        body=body,
+        etag=f'"{hashlib.sha1(body).hexdigest()}"',
+        last_modified=int(time.time()),
+    )
+
+
+def get_cached_listing(request, *, dealer_tier_code: str, build: Callable[[], dict]) -> CachedListing:
+    """
+    Serialized listing for this request from the shared cache, building it on a
+    miss. STORE_LISTING_CACHE_SECONDS=0 always builds.
+    """
+    timeout = int(getattr(settings, "STORE_LISTING_CACHE_SECONDS", 0) or 0)
+    version = catalog_version() if timeout > 0 else ""
+    if not version:
+        return render_listing(build())
+
+    key = listing_cache_key(request.GET, dealer_tier_code=dealer_tier_code, version=version)
+    listing = None
+    try:
+        listing = cache.get(key)
+    except Exception:
+        logger.warning("Storefront listing cache read failed", exc_info=True)
+    if listing is None:
+        listing = render_listing(build())
+        try:
+            cache.set(key, listing, timeout)
+        except Exception:
+            logger.warning("Storefront listing cache write failed", exc_info=True)
+    return listing
+
+
+def listing_response(request, listing: CachedListing) -> HttpResponse:
+    """
+    JSON response with validators and caching headers; 304 when the client's copy
+    is current. Anonymous responses are public, dealer pricing stays private.
+    """
+    response = HttpResponse(listing.body, content_type="application/json")
+    response["ETag"] = listing.etag
+    response["Last-Modified"] = http_date(listing.last_modified)
+    if getattr(request.user, "is_authenticated", False):
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=max(0, int(getattr(settings, "STORE_LISTING_MAX_AGE", 0) or 0)),
+            stale_while_revalidate=max(0, int(getattr(settings, "STORE_LISTING_STALE_WHILE_REVALIDATE", 0) or 0)),
+        )
+    # The same URL serves HTML or JSON depending on these headers.
+    patch_vary_headers(response, ("Accept", "X-Requested-With"))
+    return get_conditional_response(
+        request,
+        etag=listing.etag,
+        last_modified=listing.last_modified,
+        response=response,
+    )
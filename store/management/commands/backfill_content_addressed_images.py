@@ -0,0 +1,53 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from store.image_store import DEFAULT_BACKFILL_PREFIXES, backfill_candidates, backfill_content_names
+
+
+class Command(BaseCommand):
+    help = (
+        "Move imported product images to content-addressed names so identical files are stored once. "
+        "Runs as a dry run (reporting the storage that would be saved) unless --apply is passed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes used for hashing (default: CPU count).",
+        )
+        parser.add_argument(
+            "--prefix",
+            action="append",
+            default=[],
+            help=(
+                "Storage prefix to backfill. Can be passed multiple times "
+                f"(default: {', '.join(DEFAULT_BACKFILL_PREFIXES)})."
+            ),
+        )
+        parser.add_argument("--apply", action="store_true", help="Copy files and repoint product rows.")
+        parser.add_argument(
+            "--delete-old",
+            action="store_true",
+            help="With --apply, delete the old files once no product or category uses them.",
+        )
+
+    def handle(self, *args, **options):
+        prefixes = tuple(options["prefix"]) or DEFAULT_BACKFILL_PREFIXES
+        names = backfill_candidates(prefixes)
+        workers = max(1, options["workers"])
+        self.stdout.write(f"Hashing {len(names)} stored image(s) with {workers} worker(s)")
+        stats = backfill_content_names(
+            names,
+            workers=workers,
+            apply=options["apply"],
+            delete_old=options["apply"] and options["delete_old"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Content-addressed image backfill complete (dry_run={not options['apply']}): "
+                + " ".join(f"{key}={value}" for key, value in stats.items())
+            )
+        )
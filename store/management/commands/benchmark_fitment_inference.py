@@ -0,0 +1,108 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.fitment import (
+    clear_fitment_cache,
+    infer_fitment,
+    infer_fitment_uncached,
+    scan_fitment_signals_sequential,
+)
+
+# Title fragments shaped like the supplier feeds: most titles name no vehicle at all.
+VEHICLE_PHRASES = (
+    "Ford 6.7L Powerstroke F250/F350",
+    "Ford 7.3L Powerstroke OBS",
+    "2017-2023 Ford Super Duty",
+    "Chevy/GMC Duramax LML 2500HD/3500HD",
+    "GM 6.6L Duramax L5P",
+    "2020+ Silverado 1500 3.0L LM2",
+    "Colorado/Canyon 2.8L LWN",
+    "Dodge Ram 2500/3500 5.9L Cummins",
+    "2019+ Ram 6.7L Cummins",
+    "Ram 1500 EcoDiesel 3.0L",
+    "Jeep Grand Cherokee EcoDiesel",
+    "Nissan Titan XD 5.0L Cummins",
+    "Toyota Tacoma",
+    "GM 6.5L Detroit 1994-2000",
+    "DIFSRAM1001",
+    "DMAX-7001",
+)
+COMMERCIAL_PHRASES = ("Class 8", "Caterpillar C15", "Detroit DD15", "Versatile Tractor")
+PART_WORDS = (
+    "Fuel", "Lift", "Pump", "Filter", "Injector", "Turbo", "Intake", "Exhaust", "Manifold", "Gasket",
+    "Sensor", "Hose", "Clamp", "Bracket", "Cooler", "Valve", "Spring", "Harness", "Mount", "Flange",
+    "Downpipe", "Race Pipe", "Tuner", "Sending Unit", "Delete Kit", "Billet", "Stainless", "Aluminized",
+)
+
+
+def fitment_benchmark_corpus(size: int, *, seed: int = 7, distinct_ratio: float = 0.5) -> list[tuple[str, str]]:
+    """
+    `size` (name, sku) pairs. About `distinct_ratio` of them are distinct; the
+    rest repeat earlier titles the way variants and re-runs do.
+    """
+    rng = random.Random(seed)
+    distinct: list[tuple[str, str]] = []
+    for index in range(max(1, int(size * distinct_ratio))):
+        words = " ".join(rng.sample(PART_WORDS, rng.randint(2, 4)))
+        roll = rng.random()
+        if roll < 0.35:
+            name = f"{words} | {rng.choice(VEHICLE_PHRASES)}"
+        elif roll < 0.4:
+            name = f"FASS {words} - {rng.choice(COMMERCIAL_PHRASES)}"
+        elif roll < 0.45:
+            name = f"{words} (Universal)"
+        else:
+            name = f"{words} {rng.randint(1, 12)}in"
+        distinct.append((name, f"BENCH-{index:05d}"))
+    return [distinct[index] if index < len(distinct) else rng.choice(distinct) for index in range(size)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time fitment inference over a synthetic title corpus: per-pattern scans, "
+        "the combined matchers, and the memoized entry point."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--names", type=int, default=20000, help="Corpus size.")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        corpus = fitment_benchmark_corpus(options["names"], seed=options["seed"])
+        self.stdout.write(f"Corpus: {len(corpus)} names, {len(set(corpus))} distinct")
+
+        sequential = self._time(
+            "Sequential scans",
+            corpus,
+            lambda name, sku: infer_fitment_uncached(name=name, sku=sku, scan=scan_fitment_signals_sequential),
+        )
+        combined = self._time(
+            "Combined matchers", corpus, lambda name, sku: infer_fitment_uncached(name=name, sku=sku)
+        )
+        clear_fitment_cache()
+        memoized = self._time("Memoized (cold cache)", corpus, lambda name, sku: infer_fitment(name=name, sku=sku))
+
+        mismatches = sum(
+            1
+            for name, sku in set(corpus)
+            if _comparable(infer_fitment_uncached(name=name, sku=sku, scan=scan_fitment_signals_sequential))
+            != _comparable(infer_fitment(name=name, sku=sku))
+        )
+        self.stdout.write(
+            f"Speedup vs sequential: combined {sequential / combined:.1f}x, memoized {sequential / memoized:.1f}x"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Results identical for {len(set(corpus)) - mismatches}/{len(set(corpus))} names"))
+
+    def _time(self, label: str, corpus: list[tuple[str, str]], fn) -> float:
+        started = time.perf_counter()
+        for name, sku in corpus:
+            fn(name, sku)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label}: {elapsed:.2f}s, {len(corpus) / elapsed:,.0f} names/s")
+        return elapsed
+
+
+def _comparable(inference) -> tuple:
+    return inference.kind, inference.note, frozenset(inference.specs)
@@ -0,0 +1,122 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from store.companions import CompanionIndex, load_companion_profiles, rebuild_product_companions
+from store.models import CarMake, CarModel, Category, Product, ProductCompanion
+
+# A few hundred pseudo part words so token overlap looks like a real catalog.
+WORDS = tuple(f"{stem}{suffix}" for stem in (
+    "fuel", "pump", "filter", "inject", "turbo", "intake", "exhaust", "manifold", "gasket", "sensor",
+    "hose", "clamp", "bracket", "cooler", "radiat", "coolant", "oil", "valve", "spring", "shock",
+    "level", "lift", "axle", "steer", "brake", "rotor", "caliper", "harness", "mount", "flange",
+) for suffix in ("", "er", "ing", "set", "kit2", "pro", "max", "hd", "xl", "lite"))
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request companion cost (live scoring vs precomputed rows) on a synthetic catalog. "
+        "Everything runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10000, help="Synthetic catalog size.")
+        parser.add_argument("--samples", type=int, default=5, help="Product pages to time per strategy.")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["products"], options["samples"], random.Random(options["seed"]))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed_catalog(self, size: int, rng: random.Random) -> list[Product]:
+        categories = Category.objects.bulk_create(
+            [Category(name=f"Bench Category {i}", slug=f"bench-category-{i}") for i in range(30)]
+        )
+        make = CarMake.objects.create(name="Bench Make")
+        car_models = CarModel.objects.bulk_create(
+            [CarModel(make=make, name=f"Bench Model {i}", year_from=2000 + i % 20) for i in range(40)]
+        )
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=" ".join(rng.sample(WORDS, 3)).title(),
+                    slug=f"bench-product-{i}",
+                    sku=f"BENCH-{i}",
+                    category=rng.choice(categories),
+                    price=Decimal("10.00"),
+                    short_description=" ".join(rng.sample(WORDS, 6)),
+                    description=" ".join(rng.choices(WORDS, k=60)),
+                    is_active=True,
+                )
+                for i in range(size)
+            ],
+            batch_size=1000,
+        )
+        through = Product.compatible_models.through
+        through.objects.bulk_create(
+            [
+                through(product_id=product.pk, carmodel_id=car_model.pk)
+                for product in products
+                for car_model in rng.sample(car_models, rng.randint(0, 3))
+            ],
+            batch_size=5000,
+        )
+        return products
+
+    def _analyze(self) -> None:
+        # Fresh rows inside one transaction have no planner statistics yet.
+        with connection.cursor() as cursor:
+            for model in (Category, Product, Product.compatible_models.through, ProductCompanion):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    def _time(self, label: str, products: list[Product], fn) -> None:
+        elapsed = 0.0
+        queries = 0
+        for product in products:
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                fn(product)
+                elapsed += time.perf_counter() - started
+            queries += len(ctx.captured_queries)
+        count = max(len(products), 1)
+        self.stdout.write(f"{label}: {elapsed / count * 1000:.1f} ms/request, {queries / count:.1f} queries/request")
+
+    def _run(self, size: int, samples: int, rng: random.Random) -> None:
+        started = time.perf_counter()
+        products = self._seed_catalog(size, rng)
+        self.stdout.write(f"Seeded {len(products)} products in {time.perf_counter() - started:.1f}s")
+
+        self._analyze()
+        sample = [Product.objects.select_related("category").get(pk=p.pk) for p in rng.sample(products, samples)]
+        self._time("Before (live scoring)", sample, lambda product: product.compute_companion_items(limit=3))
+
+        started = time.perf_counter()
+        index = CompanionIndex(load_companion_profiles())
+        stats = rebuild_product_companions(index=index)
+        self.stdout.write(
+            f"Full rebuild: {time.perf_counter() - started:.1f}s, rows_written={stats['rows_written']}"
+        )
+
+        self._analyze()
+        self._time("After (precomputed rows)", sample, lambda product: product.get_companion_items(limit=3))
+        mismatches = sum(
+            1
+            for product in sample
+            if [p.pk for p in product.get_companion_items(limit=3)]
+            != [p.pk for p in product.compute_companion_items(limit=3)]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Rankings identical for {samples - mismatches}/{samples} sampled products")
+        )
@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from store.thumbnails import THUMBNAIL_WIDTHS, generate_thumbnails, pending_thumbnail_jobs, thumbnail_formats
+
+
+class Command(BaseCommand):
+    help = (
+        "Render pre-generated product thumbnails for main and gallery images. "
+        "By default only images without current thumbnails are processed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes used for rendering (default: CPU count).",
+        )
+        parser.add_argument("--force", action="store_true", help="Re-render every image.")
+        parser.add_argument(
+            "--product",
+            action="append",
+            type=int,
+            default=[],
+            help="Product ID to process (main and gallery images). Can be passed multiple times.",
+        )
+
+    def handle(self, *args, **options):
+        product_ids = set(options["product"]) or None
+        jobs = pending_thumbnail_jobs(product_ids=product_ids, force=options["force"])
+        self.stdout.write(
+            f"Rendering {len(jobs)} image(s) at {', '.join(map(str, THUMBNAIL_WIDTHS))}px "
+            f"as {'/'.join(thumbnail_formats())} with {max(1, options['workers'])} worker(s)"
+        )
+        stats = generate_thumbnails(jobs, workers=max(1, options["workers"]))
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Product thumbnails generated: " + " ".join(f"{key}={value}" for key, value in stats.items())
+            )
+        )
@@ -3,6 +3,10 @@ from __future__ import annotations
 from django.core.management.base import BaseCommand
 
 from store.dirtydiesel_import import DEFAULT_EXCLUDED_CATEGORY_PREFIXES, DirtyDieselImportPipeline
+from store.dirtydiesel_import.pipeline import DIRTYDIESEL_IMAGE_PREFIX
+from store.dirtydiesel_import.source import DirtyDieselCatalogClient
+from store.fassride_import.images import ImageAssetManager
+from store.supplier_http_cache import http_cache_from_options
 
 
 class Command(BaseCommand):
@@ -68,6 +72,24 @@ class Command(BaseCommand):
             action="store_true",
             help="Only fill products with empty main images or placeholders.",
         )
+        parser.add_argument(
+            "--rematch-all",
+            action="store_true",
+            help="Ignore stored supplier matches and match every product again.",
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help=(
+                "Replay cached supplier catalog responses and stored image checks; "
+                "no supplier or image host is contacted."
+            ),
+        )
+        parser.add_argument(
+            "--no-http-cache",
+            action="store_true",
+            help="Fetch the supplier catalog without reading or updating the on-disk HTTP cache.",
+        )
 
     def handle(self, *args, **options):
         excluded_category_prefixes = [] if options["include_fass"] else list(DEFAULT_EXCLUDED_CATEGORY_PREFIXES)
@@ -84,6 +106,9 @@ class Command(BaseCommand):
             replace_current_prefixes=options["replace_current_prefix"] or [],
             require_empty_current=options["empty_only"],
             source_report_path=options["source_cache"] or "",
+            reuse_matches=not options["rematch_all"],
+            source_client=DirtyDieselCatalogClient(http_cache=http_cache_from_options(options)),
+            image_manager=ImageAssetManager(storage_prefix=DIRTYDIESEL_IMAGE_PREFIX, offline=options["offline"]),
         )
         report = pipeline.run()
 
@@ -93,8 +118,10 @@ class Command(BaseCommand):
                 "Dirty Diesel import complete "
                 f"(dry_run={not options['apply']}, "
                 f"products_scanned={summary.get('products_scanned', 0)}, "
+                f"reused_matches={summary.get('matches_reused', 0)}, "
                 f"updated_products={summary.get('updated_products', summary.get('planned_product_updates', 0))}, "
                 f"ambiguous={summary.get('ambiguous_matches', 0)}, "
+                f"image_bytes_saved={summary.get('image_bytes_saved', 0)}, "
                 f"failures={len(report.failures)})"
             )
         )
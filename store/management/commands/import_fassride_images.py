@@ -3,6 +3,9 @@ from __future__ import annotations
 from django.core.management.base import BaseCommand
 
 from store.fassride_import import DEFAULT_FASS_CATEGORY_SLUGS, FassrideImportPipeline
+from store.fassride_import.images import ImageAssetManager
+from store.fassride_import.source import FassrideApiClient
+from store.supplier_http_cache import http_cache_from_options
 
 
 class Command(BaseCommand):
@@ -41,6 +44,19 @@ class Command(BaseCommand):
             default=[],
             help="Current image path that is allowed to be replaced. Can be repeated.",
         )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help=(
+                "Replay cached supplier catalog responses and stored image checks; "
+                "no supplier or image host is contacted."
+            ),
+        )
+        parser.add_argument(
+            "--no-http-cache",
+            action="store_true",
+            help="Fetch the supplier catalog without reading or updating the on-disk HTTP cache.",
+        )
 
     def handle(self, *args, **options):
         category_slugs = options["category_slugs"] or list(DEFAULT_FASS_CATEGORY_SLUGS)
@@ -51,6 +67,8 @@ class Command(BaseCommand):
             allow_embedded_code_match=options["match_by_embedded_code"],
             include_gallery_images=not options["skip_gallery"],
             replace_current_images=options["replace_current_image"] or [],
+            source_client=FassrideApiClient(http_cache=http_cache_from_options(options)),
+            image_manager=ImageAssetManager(offline=options["offline"]),
         )
         report = pipeline.run()
 
@@ -63,6 +81,7 @@ class Command(BaseCommand):
                 f"updated_products={summary.get('updated_products', summary.get('planned_product_updates', 0))}, "
                 f"updated_categories={summary.get('updated_categories', summary.get('planned_category_updates', 0))}, "
                 f"ambiguous={summary.get('ambiguous_matches', 0)}, "
+                f"image_bytes_saved={summary.get('image_bytes_saved', 0)}, "
                 f"failures={len(report.failures)})"
             )
         )
@@ -11,19 +11,21 @@ from collections import Counter, defaultdict
 from dataclasses import dataclass
 from difflib import SequenceMatcher
 from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
-from urllib.error import HTTPError, URLError
 from urllib.parse import unquote, urlparse
-from urllib.request import Request, urlopen
 
 from django.core.management.base import BaseCommand, CommandError
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from django.db import transaction
 from django.utils.text import slugify
 
+from store.image_store import ContentImageStore
 from store.models import Product, ProductOption
+from store.remote_image_checks import CachedImageCheck, RemoteImageCheckCache
+from store.remote_images import FetchResult, RemoteImageFetcher
+from store.storefront_index import bump_catalog_version
 
 
+IMPORTED_IMAGE_PREFIX = "store/products/imported/ddc"
+
 MERCH_CATEGORY_SLUGS = {
     # BGM merch
     "merch",
@@ -140,7 +142,6 @@ NAME_MATCH_PHRASES = {
 YEAR_RANGE_RE = re.compile(r"\b(19\d{2}|20\d{2})(?:\.\d+)?\s*[-/]\s*(19\d{2}|20\d{2})(?:\.\d+)?\b")
 YEAR_PLUS_RE = re.compile(r"\b(19\d{2}|20\d{2})(?:\.\d+)?\s*\+\b")
 YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
-IMAGE_CONTENT_TYPE_PREFIX = "image/"
 KNOWN_IMAGE_SUFFIXES = {".avif", ".gif", ".jpeg", ".jpg", ".png", ".webp"}
 
 
@@ -157,13 +158,60 @@ class RemoteImageCheck:
 
 
 class RemoteImageResolver:
-    def __init__(self, *, timeout: float = 8.0, validate: bool = False, localize: bool = False):
+    """
+    Validates and downloads remote image URLs through a pooled, concurrent fetcher.
+    Call `prefetch` / `localize_many` with every URL a phase needs; `inspect`,
+    `is_usable` and `localize` then read the cached results. Checks persist in
+    `check_cache` across runs; stale ones are revalidated with conditional requests.
+    Downloads are stored by content hash through `content_store`.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = 8.0,
+        validate: bool = False,
+        localize: bool = False,
+        workers: int = 8,
+        per_host: int = 2,
+        retries: int = 3,
+        fetcher: Optional[RemoteImageFetcher] = None,
+        check_cache: Optional[RemoteImageCheckCache] = None,
+        content_store: Optional[ContentImageStore] = None,
+    ):
         self.timeout = max(float(timeout or 0.0), 0.5)
         self.validate = bool(validate or localize)
         self.localize_enabled = bool(localize)
+        self.fetcher = fetcher or RemoteImageFetcher(
+            timeout=self.timeout,
+            workers=workers,
+            per_host=per_host,
+            retries=retries,
+        )
+        self.check_cache = check_cache or RemoteImageCheckCache()
+        self.content_store = content_store or ContentImageStore(prefix=IMPORTED_IMAGE_PREFIX)
         self._checks: Dict[str, RemoteImageCheck] = {}
         self._localized: Dict[str, str] = {}
 
+    def cached_check(self, url: str) -> Optional[RemoteImageCheck]:
+        """
+        The known check for a URL, or None while a remote URL still needs a request.
+        """
+        url = (url or "").strip()
+        if not url or not _is_remote_image_value(url) or not self.validate:
+            return self.inspect(url)
+        return self._checks.get(url)
+
+    def prefetch(self, urls: Iterable[str]) -> None:
+        if not self.validate:
+            return
+        pending = []
+        for raw in urls:
+            url = (raw or "").strip()
+            if url and _is_remote_image_value(url) and url not in self._checks:
+                pending.append(url)
+        self._check_remote(pending)
+
     def inspect(self, url: str) -> RemoteImageCheck:
         url = (url or "").strip()
         if not url:
@@ -178,38 +226,8 @@ class RemoteImageResolver:
             self._checks[url] = result
             return result
 
-        req = Request(url, method="GET", headers={"User-Agent": "BGM-CRM/1.0", "Accept": "image/*,*/*;q=0.8"})
-        try:
-            with urlopen(req, timeout=self.timeout) as resp:
-                status = int(getattr(resp, "status", 200) or 200)
-                content_type = (resp.headers.get("Content-Type", "") or "").strip()
-                if 200 <= status < 400 and content_type.startswith(IMAGE_CONTENT_TYPE_PREFIX):
-                    try:
-                        resp.read(1)
-                    except Exception:
-                        pass
-                    result = RemoteImageCheck(ok=True, content_type=content_type, status_code=status)
-                else:
-                    result = RemoteImageCheck(
-                        ok=False,
-                        content_type=content_type,
-                        status_code=status,
-                        error=f"unexpected_response:{status}:{content_type}",
-                    )
-        except HTTPError as exc:
-            result = RemoteImageCheck(
-                ok=False,
-                content_type=(exc.headers.get("Content-Type", "") or "").strip(),
-                status_code=int(exc.code or 0),
-                error=f"http_{exc.code}",
-            )
-        except URLError as exc:
-            result = RemoteImageCheck(ok=False, error=f"url_error:{exc.reason}")
-        except Exception as exc:
-            result = RemoteImageCheck(ok=False, error=exc.__class__.__name__)
-
-        self._checks[url] = result
-        return result
+        self._check_remote([url])
+        return self._checks[url]
 
     def is_usable(self, url: str) -> bool:
         return self.inspect(url).ok
@@ -218,32 +236,106 @@ class RemoteImageResolver:
         url = (url or "").strip()
         if not url or not _is_remote_image_value(url):
             return url
-        cached = self._localized.get(url)
-        if cached:
-            return cached
-        check = self.inspect(url)
-        if not check.ok:
-            raise ValueError(f"Cannot localize broken image URL: {url}")
-
-        storage_name = self._storage_name(url, check.content_type)
-        if default_storage.exists(storage_name):
-            self._localized[url] = storage_name
-            return storage_name
-
-        req = Request(url, method="GET", headers={"User-Agent": "BGM-CRM/1.0", "Accept": "image/*,*/*;q=0.8"})
-        with urlopen(req, timeout=self.timeout) as resp:
-            status = int(getattr(resp, "status", 200) or 200)
-            content_type = (resp.headers.get("Content-Type", "") or check.content_type).strip()
-            if status < 200 or status >= 400 or not content_type.startswith(IMAGE_CONTENT_TYPE_PREFIX):
-                raise ValueError(f"Unexpected response while downloading {url}: {status} {content_type}")
-            body = resp.read()
-            if not body:
-                raise ValueError(f"Downloaded image is empty: {url}")
-
-        saved_name = default_storage.save(storage_name, ContentFile(body))
-        self._checks[url] = RemoteImageCheck(ok=True, content_type=content_type, status_code=200)
-        self._localized[url] = saved_name
-        return saved_name
+        localized = self.localize_many([url])
+        if url not in localized:
+            check = self._checks.get(url)
+            raise ValueError(f"Cannot localize image URL: {url} ({check.error if check else 'failed'})")
+        return localized[url]
+
+    def localize_many(self, urls: Iterable[str]) -> Dict[str, str]:
+        """
+        Download remote URLs concurrently into Django storage (from this thread) and
+        return {url: storage name} for the ones that worked. Each URL is fetched once;
+        a broken URL is recorded in the checks and left out.
+        """
+        wanted = [url for url in dict.fromkeys((raw or "").strip() for raw in urls) if url]
+        unchecked = [url for url in wanted if _is_remote_image_value(url) and url not in self._checks]
+        for url, entry in self.check_cache.get_many(unchecked).items():
+            if entry.fresh and not entry.ok:
+                self._checks[url] = _check_from_cache(entry)
+        remote = [url for url in wanted if _is_remote_image_value(url) and url not in self._localized]
+        self._localized.update(self.content_store.known(remote))
+        pending = []
+        for url in remote:
+            if url in self._localized:
+                continue
+            check = self._checks.get(url)
+            if check is not None and not check.ok:
+                continue
+            # Files saved under the URL-derived name before content addressing (or moved
+            # off it by the backfill) are adopted. That name only depends on the response
+            # when the URL has no image suffix.
+            content_type = check.content_type if check is not None else ""
+            if content_type or self._has_known_suffix(url):
+                legacy_name = self._storage_name(url, content_type)
+                adopted = self.content_store.adopt(url, legacy_name, content_type=content_type)
+                if adopted:
+                    self._localized[url] = adopted
+                    continue
+            pending.append(url)
+
+        records: List[CachedImageCheck] = []
+        for fetched in self.fetcher.fetch_many(pending, download=True):
+            check = _check_from_fetch(fetched)
+            if check.ok and not fetched.body:
+                check = RemoteImageCheck(
+                    ok=False,
+                    content_type=check.content_type,
+                    status_code=check.status_code,
+                    error="empty_body",
+                )
+            self._checks[fetched.url] = check
+            records.append(_cache_entry(fetched, check))
+            if not check.ok:
+                continue
+            self._localized[fetched.url] = self.content_store.save(
+                fetched.url, fetched.body, content_type=check.content_type
+            )
+        self.check_cache.record_many(records)
+
+        localized: Dict[str, str] = {}
+        for url in wanted:
+            if not _is_remote_image_value(url):
+                localized[url] = url
+            elif url in self._localized:
+                localized[url] = self._localized[url]
+        return localized
+
+    def _check_remote(self, urls: List[str]) -> None:
+        """
+        Fill the checks for remote URLs: fresh persisted checks are reused, stale
+        ones are revalidated with conditional requests and the rest are fetched.
+        """
+        known = self.check_cache.get_many(urls)
+        to_fetch = []
+        for url in urls:
+            entry = known.get(url)
+            if entry is not None and entry.fresh:
+                self._checks[url] = _check_from_cache(entry)
+            else:
+                to_fetch.append(url)
+
+        def _conditional_headers(url: str) -> Optional[Dict[str, str]]:
+            entry = known.get(url)
+            return entry.conditional_headers() if entry is not None else None
+
+        confirmed: List[str] = []
+        records: List[CachedImageCheck] = []
+        for fetched in self.fetcher.fetch_many(to_fetch, download=False, headers_for=_conditional_headers):
+            if fetched.status == 304 and fetched.url in known:
+                confirmed.append(fetched.url)
+                continue
+            check = _check_from_fetch(fetched)
+            self._checks[fetched.url] = check
+            records.append(_cache_entry(fetched, check))
+        for entry in self.check_cache.revalidated(confirmed):
+            self._checks[entry.url] = _check_from_cache(entry)
+        self.check_cache.record_many(records)
+
+    @staticmethod
+    def _has_known_suffix(url: str) -> bool:
+        suffix = os.path.splitext(unquote(urlparse(url).path or ""))[1].lower()
+        return suffix in KNOWN_IMAGE_SUFFIXES
 
     def _storage_name(self, url: str, content_type: str) -> str:
         parsed = urlparse(url)
@@ -257,7 +349,48 @@ class RemoteImageResolver:
             suffix = ".jpg"
         safe_stem = slugify(stem) or "image"
         digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
-        return f"store/products/imported/ddc/{safe_stem}-{digest}{suffix}"
+        return f"{IMPORTED_IMAGE_PREFIX}/{safe_stem}-{digest}{suffix}"
+
+
+def _check_from_fetch(fetched: FetchResult) -> RemoteImageCheck:
+    if fetched.error:
+        return RemoteImageCheck(ok=False, error=fetched.error)
+    if fetched.status >= 400:
+        return RemoteImageCheck(
+            ok=False,
+            content_type=fetched.content_type,
+            status_code=fetched.status,
+            error=f"http_{fetched.status}",
+        )
+    if fetched.is_image:
+        return RemoteImageCheck(ok=True, content_type=fetched.content_type, status_code=fetched.status)
+    return RemoteImageCheck(
+        ok=False,
+        content_type=fetched.content_type,
+        status_code=fetched.status,
+        error=f"unexpected_response:{fetched.status}:{fetched.content_type}",
+    )
+
+
+def _check_from_cache(entry: CachedImageCheck) -> RemoteImageCheck:
+    return RemoteImageCheck(
+        ok=entry.ok,
+        content_type=entry.content_type,
+        status_code=entry.status_code,
+        error=entry.error,
+    )
+
+
+def _cache_entry(fetched: FetchResult, check: RemoteImageCheck) -> CachedImageCheck:
+    return CachedImageCheck(
+        url=fetched.url,
+        ok=check.ok,
+        status_code=check.status_code,
+        content_type=check.content_type,
+        etag=fetched.etag,
+        last_modified=fetched.last_modified,
+        error=check.error,
+    )
 
 
 def _is_merch_product(product: Product) -> bool:
@@ -320,6 +453,31 @@ def _pick_primary_image_url(
     return ""
 
 
+def _prefetch_primary_image_urls(
+    groups: List[Tuple[str, List[Dict[str, str]]]],
+    resolver: RemoteImageResolver,
+) -> None:
+    """
+    Check ranked image URLs in rounds: every group's first choice at once, then the
+    next choice of groups whose earlier URLs were broken, so `_pick_primary_image_url`
+    only reads cached checks and no more URLs are requested than it would need.
+    """
+    ranked = [_iter_ranked_group_image_urls(group) for _handle, group in groups]
+    while True:
+        batch = []
+        for urls in ranked:
+            for url in urls:
+                check = resolver.cached_check(url)
+                if check is None:
+                    batch.append(url)
+                    break
+                if check.ok:
+                    break
+        if not batch:
+            return
+        resolver.prefetch(batch)
+
+
 def _pick_group_title(handle: str, group: List[Dict[str, str]]) -> str:
     for row in group:
         title = (row.get("Title") or row.get("title") or "").strip()
@@ -536,6 +694,7 @@ class ImportStats:
     skipped_invalid_image: int = 0
     skipped_low_confidence: int = 0
     skipped_download_failed: int = 0
+    image_bytes_saved: int = 0
 
 
 def _candidate_match_text(candidate: CsvImageCandidate) -> str:
@@ -643,11 +802,43 @@ def _score_name_match(product_profile: NameMatchProfile, candidate_profile: Name
     return score
 
 
+class NameMatchIndex:
+    """
+    Inverted index from core tokens and phrases to CSV candidates.
+
+    `_score_name_match` rejects any pair that shares neither a core token nor a
+    phrase, so a product only needs scoring against the candidates listed here.
+    The shortlist keeps CSV order, which keeps tie-breaking identical to a full scan.
+    """
+
+    def __init__(self, candidates: Iterable[CsvImageCandidate]):
+        self.candidates = list(candidates)
+        self._by_core_token: Dict[str, List[int]] = defaultdict(list)
+        self._by_phrase: Dict[str, List[int]] = defaultdict(list)
+        for position, candidate in enumerate(self.candidates):
+            for token in candidate.profile.core_tokens:
+                self._by_core_token[token].append(position)
+            for phrase in candidate.profile.phrases:
+                self._by_phrase[phrase].append(position)
+
+    def shortlist(self, profile: NameMatchProfile) -> List[CsvImageCandidate]:
+        positions = set()
+        for token in profile.core_tokens:
+            positions.update(self._by_core_token.get(token, ()))
+        for phrase in profile.phrases:
+            positions.update(self._by_phrase.get(phrase, ()))
+        return [self.candidates[position] for position in sorted(positions)]
+
+
 def _find_best_name_match(
     product: Product,
     candidates: List[CsvImageCandidate],
+    *,
+    index: Optional[NameMatchIndex] = None,
 ) -> Optional[NameMatchResult]:
     profile = _build_product_match_profile(product)
+    if index is not None:
+        candidates = index.shortlist(profile)
     scored: List[Tuple[float, CsvImageCandidate]] = []
     for candidate in candidates:
         score = _score_name_match(profile, candidate.profile)
@@ -1104,7 +1295,10 @@ def _build_csv_candidates_with_options(
     resolver: Optional[RemoteImageResolver],
 ) -> List[CsvImageCandidate]:
     candidates: List[CsvImageCandidate] = []
-    for handle, group in _iter_shopify_groups(rows):
+    groups = list(_iter_shopify_groups(rows))
+    if resolver and resolver.validate:
+        _prefetch_primary_image_urls(groups, resolver)
+    for handle, group in groups:
         ranked_urls = _iter_ranked_group_image_urls(group)
         if not ranked_urls:
             stats.skipped_no_image += 1
@@ -1317,6 +1511,33 @@ class Command(BaseCommand):
             default=8.0,
             help="Timeout in seconds for remote image validation/download (default: 8.0).",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Concurrent remote image requests (default: 8).",
+        )
+        parser.add_argument(
+            "--per-host",
+            type=int,
+            default=2,
+            help="Maximum concurrent requests to any one image host (default: 2).",
+        )
+        parser.add_argument(
+            "--url-retries",
+            type=int,
+            default=3,
+            help="Attempts per remote image URL for connection errors, 429 and 5xx (default: 3).",
+        )
+        parser.add_argument(
+            "--check-ttl-hours",
+            type=float,
+            default=None,
+            help=(
+                "Reuse stored image URL checks younger than this; older ones are revalidated "
+                "with conditional requests (default: STORE_IMAGE_CHECK_TTL_SECONDS, 0 = always revalidate)."
+            ),
+        )
 
     def handle(self, *args, **options):
         csv_path = (options.get("csv_path") or "").strip()
@@ -1334,6 +1555,11 @@ class Command(BaseCommand):
         validate_remote_images = bool(options.get("validate_remote_images"))
         download_images = bool(options.get("download_images"))
         url_timeout = float(options.get("url_timeout") or 0.0)
+        workers = max(int(options.get("workers") or 1), 1)
+        per_host = max(int(options.get("per_host") or 1), 1)
+        url_retries = max(int(options.get("url_retries") or 1), 1)
+        check_ttl_hours = options.get("check_ttl_hours")
+        check_ttl_seconds = None if check_ttl_hours is None else max(int(float(check_ttl_hours) * 3600), 0)
 
         if only_current_image and only_current_prefix:
             raise CommandError("Use only one of --only-current-image and --only-current-prefix.")
@@ -1372,12 +1598,20 @@ class Command(BaseCommand):
             timeout=url_timeout,
             validate=(validate_remote_images or include_broken_current or download_images),
             localize=download_images,
+            workers=workers,
+            per_host=per_host,
+            retries=url_retries,
+            check_cache=RemoteImageCheckCache(ttl_seconds=check_ttl_seconds),
         )
 
         candidates = _build_csv_candidates_with_options(reader, stats, resolver=resolver)
 
         all_products = list(Product.objects.select_related("category").all())
         has_product_filter = bool(only_current_image or only_current_prefix or include_broken_current)
+        if include_broken_current:
+            resolver.prefetch(
+                str(getattr(product, "main_image", "") or "").strip() for product in all_products
+            )
         if has_product_filter:
             products: List[Product] = []
             for product in all_products:
@@ -1437,6 +1671,7 @@ class Command(BaseCommand):
 
         if match_by_name and (not limit or len(planned_updates) < limit):
             products_for_matching = sorted(products, key=_product_match_specificity, reverse=True)
+            name_index = NameMatchIndex(candidates)
             for product in products_for_matching:
                 if limit and len(planned_updates) >= limit:
                     break
@@ -1447,7 +1682,7 @@ class Command(BaseCommand):
                     handled_product_ids.add(product.id)
                     continue
 
-                result = _find_best_name_match(product, candidates)
+                result = _find_best_name_match(product, candidates, index=name_index)
                 handled_product_ids.add(product.id)
                 if result and result.score >= name_min_score and result.margin >= name_min_margin:
                     current = str(getattr(product, "main_image", "") or "").strip()
@@ -1503,11 +1738,11 @@ class Command(BaseCommand):
         stats.skipped_missing = len(missing)
 
         if download_images and planned_updates and not dry_run:
+            localized = resolver.localize_many(item.image_url for item in planned_updates)
             localized_updates: List[PlannedUpdate] = []
             for item in planned_updates:
-                try:
-                    image_value = resolver.localize(item.image_url)
-                except Exception:
+                image_value = localized.get(item.image_url)
+                if not image_value:
                     stats.skipped_download_failed += 1
                     _decrement_match_stat(stats, item.source)
                     continue
@@ -1525,6 +1760,8 @@ class Command(BaseCommand):
                     )
                 )
             planned_updates = localized_updates
+            stats.image_bytes_saved = resolver.content_store.stats["bytes_saved"]
+        resolver.fetcher.close()
 
         if show:
             self.stdout.write("")
@@ -1563,8 +1800,11 @@ class Command(BaseCommand):
         for item in planned_updates:
             item.product.main_image = item.image_url
 
+        # Remote URLs are served as-is; thumbnails rendered for the previous local
+        # image stop matching main_image and are ignored (see store.thumbnails).
         with transaction.atomic():
             Product.objects.bulk_update([item.product for item in planned_updates], ["main_image"])
+            transaction.on_commit(bump_catalog_version)
 
         stats.updated = len(planned_updates)
         self.stdout.write("Applied updates.")
@@ -1584,3 +1824,4 @@ class Command(BaseCommand):
         self.stdout.write(f"- skipped_missing_product: {stats.skipped_missing}")
         self.stdout.write(f"- skipped_low_confidence: {stats.skipped_low_confidence}")
         self.stdout.write(f"- skipped_download_failed: {stats.skipped_download_failed}")
+        self.stdout.write(f"- image_bytes_saved: {stats.image_bytes_saved}")
@@ -6,6 +6,7 @@ from django.utils.text import slugify
 from store.dirtydiesel_import.pipeline import DEFAULT_EXCLUDED_CATEGORY_PREFIXES, DirtyDieselImportPipeline
 from store.dirtydiesel_import.source import DirtyDieselCatalogClient
 from store.fassride_import.images import ImageAssetManager
+from store.supplier_http_cache import http_cache_from_options
 
 
 class Command(BaseCommand):
@@ -66,6 +67,24 @@ class Command(BaseCommand):
             action="store_true",
             help="Only fill products with empty main images or placeholders.",
         )
+        parser.add_argument(
+            "--rematch-all",
+            action="store_true",
+            help="Ignore stored supplier matches and match every product again.",
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help=(
+                "Replay cached supplier catalog responses and stored image checks; "
+                "no supplier or image host is contacted."
+            ),
+        )
+        parser.add_argument(
+            "--no-http-cache",
+            action="store_true",
+            help="Fetch the supplier catalog without reading or updating the on-disk HTTP cache.",
+        )
 
     def handle(self, *args, **options):
         supplier_name = options["supplier_name"].strip()
@@ -85,12 +104,14 @@ class Command(BaseCommand):
             replace_current_prefixes=options["replace_current_prefix"] or [],
             require_empty_current=options["empty_only"],
             source_report_path=options["source_cache"] or "",
+            reuse_matches=not options["rematch_all"],
             report_prefix=report_prefix,
             source_client=DirtyDieselCatalogClient(
                 base_url=options["base_url"],
                 catalog_label=supplier_name,
+                http_cache=http_cache_from_options(options),
             ),
-            image_manager=ImageAssetManager(storage_prefix=options["storage_prefix"]),
+            image_manager=ImageAssetManager(storage_prefix=options["storage_prefix"], offline=options["offline"]),
         )
         report = pipeline.run()
         summary = report.summary
@@ -99,8 +120,10 @@ class Command(BaseCommand):
                 f"{supplier_name} import complete "
                 f"(dry_run={not options['apply']}, "
                 f"products_scanned={summary.get('products_scanned', 0)}, "
+                f"reused_matches={summary.get('matches_reused', 0)}, "
                 f"updated_products={summary.get('updated_products', summary.get('planned_product_updates', 0))}, "
                 f"ambiguous={summary.get('ambiguous_matches', 0)}, "
+                f"image_bytes_saved={summary.get('image_bytes_saved', 0)}, "
                 f"failures={len(report.failures)})"
             )
         )
@@ -8,11 +8,15 @@ from django.db import transaction
 from store.fitment import (
     AUTO_GENERATED_COMPATIBILITY_NOTES,
     infer_fitment,
-    resolve_fitment_models,
+    resolve_fitment_model_ids,
     suggested_category_name,
     sync_consumer_vehicle_catalog,
 )
+from store.fitment_index import rebuild_fitment_index
 from store.models import Category, Product
+from store.storefront_index import bump_catalog_version, queue_storefront_index_refresh, refresh_after_bulk_write
+
+WRITE_BATCH_SIZE = 2000
 
 
 class Command(BaseCommand):
@@ -88,6 +92,9 @@ class Command(BaseCommand):
             "category_updates": 0,
         }
         changed_examples: list[str] = []
+        target_fitments: dict[int, set[tuple[str, str, int | None, int | None]]] = {}
+        current_model_ids: dict[int, set[int]] = {}
+        products_to_update: list[Product] = []
 
         write_context = transaction.atomic() if apply else nullcontext()
         with write_context:
@@ -106,7 +113,7 @@ class Command(BaseCommand):
                         model.name,
                         model.year_from,
                         model.year_to,
-                    )
+                    ): model.pk
                     for model in product.compatible_models.all()
                 }
                 target_models = {
@@ -132,7 +139,7 @@ class Command(BaseCommand):
                         target_category = categories_by_name.get(suggested_name)
 
                 category_changed = bool(target_category and product.category_id != target_category.id)
-                fitment_changed = current_models != target_models
+                fitment_changed = set(current_models) != target_models
                 note_changed = current_note != target_note
 
                 if not any((category_changed, fitment_changed, note_changed)):
@@ -157,18 +164,22 @@ class Command(BaseCommand):
                     continue
 
                 if fitment_changed:
-                    resolved_models = resolve_fitment_models(specs=inference.specs)
-                    product.compatible_models.set(resolved_models)
-
-                update_fields: list[str] = []
-                if note_changed:
+                    target_fitments[product.pk] = target_models
+                    current_model_ids[product.pk] = set(current_models.values())
+                if note_changed or category_changed:
                     product.compatibility = target_note
-                    update_fields.append("compatibility")
-                if category_changed and target_category is not None:
-                    product.category = target_category
-                    update_fields.append("category")
-                if update_fields:
-                    product.save(update_fields=update_fields)
+                    if category_changed:
+                        product.category = target_category
+                    products_to_update.append(product)
+
+            if apply:
+                self._write_fitments(target_fitments, current_model_ids)
+                self._write_products(products_to_update)
+                # Signals keep the index current per product; the full pass also
+                # repairs rows written around them (e.g. raw SQL or bulk imports).
+                index_summary = rebuild_fitment_index()
+                summary["fitment_index_created"] = index_summary["created"]
+                summary["fitment_index_deleted"] = index_summary["deleted"]
 
         mode_label = "APPLY" if apply else "DRY-RUN"
         self.stdout.write("")
@@ -182,8 +193,11 @@ class Command(BaseCommand):
             "fitment_updates",
             "note_updates",
             "category_updates",
+            "fitment_index_created",
+            "fitment_index_deleted",
         ):
-            self.stdout.write(f"{key}: {summary[key]}")
+            if key in summary:
+                self.stdout.write(f"{key}: {summary[key]}")
 
         if changed_examples:
             self.stdout.write("")
@@ -199,6 +213,57 @@ class Command(BaseCommand):
                 )
             )
 
+    @staticmethod
+    def _write_fitments(
+        target_fitments: dict[int, set[tuple[str, str, int | None, int | None]]],
+        current_model_ids: dict[int, set[int]],
+    ) -> None:
+        """
+        Apply every product's fitment diff with bulk through-table writes. These skip
+        the m2m_changed handlers; the caller rebuilds the fitment index in full.
+        """
+        if not target_fitments:
+            return
+        ids_by_key = resolve_fitment_model_ids(
+            key for target_models in target_fitments.values() for key in target_models
+        )
+        through = Product.compatible_models.through
+        additions: list = []
+        removals: dict[int, set[int]] = {}
+        for product_id, target_models in target_fitments.items():
+            target_ids = {ids_by_key[key] for key in target_models}
+            current_ids = current_model_ids.get(product_id, set())
+            additions.extend(
+                through(product_id=product_id, carmodel_id=model_id) for model_id in target_ids - current_ids
+            )
+            if current_ids - target_ids:
+                removals[product_id] = current_ids - target_ids
+
+        if removals:
+            product_ids = list(removals)
+            for start in range(0, len(product_ids), WRITE_BATCH_SIZE):
+                chunk = product_ids[start : start + WRITE_BATCH_SIZE]
+                obsolete = [
+                    pk
+                    for pk, product_id, model_id in through.objects.filter(product_id__in=chunk).values_list(
+                        "pk", "product_id", "carmodel_id"
+                    )
+                    if model_id in removals[product_id]
+                ]
+                through.objects.filter(pk__in=obsolete).delete()
+        through.objects.bulk_create(additions, batch_size=WRITE_BATCH_SIZE)
+
+        product_ids = set(target_fitments)
+        queue_storefront_index_refresh(companions=product_ids)
+        transaction.on_commit(bump_catalog_version)
+
+    @staticmethod
+    def _write_products(products: list[Product]) -> None:
+        if not products:
+            return
+        Product.objects.bulk_update(products, ["compatibility", "category"], batch_size=WRITE_BATCH_SIZE)
+        refresh_after_bulk_write(product.pk for product in products)
+
     @staticmethod
     def _desired_note(*, current_note: str, inferred_kind: str, inferred_note: str) -> str:
         current = (current_note or "").strip()
@@ -3,7 +3,7 @@ from __future__ import annotations
 import hashlib
 import re
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from decimal import Decimal, InvalidOperation
 
 from django.core.management.base import BaseCommand
@@ -11,10 +11,13 @@ from django.db import transaction
 from django.utils.text import slugify
 
 from store.models import Category, CleanupBatch, Product, ProductOption
+from store.storefront_index import refresh_after_bulk_write
 
 GROUP_PARENT_SKU_PREFIX = "CAT-GRP-"
 PLACEHOLDER_PREFIX = "store/placeholders/"
 PRICE_QUANT = Decimal("0.01")
+GROUP_OPTION_FIELDS = ["product", "name", "sku", "description", "is_separator", "option_column", "price", "is_active", "sort_order"]
+MERGED_OPTION_FIELDS = ["product", "description", "price", "is_active", "is_separator", "sort_order"]
 
 
 @dataclass(frozen=True)
@@ -379,15 +382,39 @@ def _product_platform(product: Product) -> tuple[str, str]:
     return (rule.code, rule.label)
 
 
+class FamilyRuleTrie:
+    """
+    FAMILY_RULES prefixes compiled into one character trie per category, so a
+    product name is matched against every prefix in a single walk. The longest
+    matching prefix wins; for identical prefixes the first rule does.
+    """
+
+    def __init__(self, rules: tuple[FamilyRule, ...]) -> None:
+        self._roots: dict[str, dict] = {}
+        for rule in rules:
+            node = self._roots.setdefault(rule.category_name, {})
+            for char in rule.prefix:
+                node = node.setdefault(char, {})
+            node.setdefault(None, rule)
+
+    def match(self, category_name: str, product_name: str) -> FamilyRule | None:
+        node = self._roots.get(category_name)
+        best = None
+        for char in product_name if node is not None else "":
+            node = node.get(char)
+            if node is None:
+                break
+            best = node.get(None, best)
+        return best
+
+
+FAMILY_RULE_TRIE = FamilyRuleTrie(FAMILY_RULES)
+
+
 def _match_family_rule(product: Product) -> FamilyRule | None:
     product_name = _normalize_text(getattr(product, "name", ""))
     category_name = getattr(getattr(product, "category", None), "name", "")
-    for rule in sorted(FAMILY_RULES, key=lambda item: len(item.prefix), reverse=True):
-        if category_name != rule.category_name:
-            continue
-        if product_name.startswith(rule.prefix):
-            return rule
-    return None
+    return FAMILY_RULE_TRIE.match(category_name, product_name)
 
 
 def _group_name(rule: FamilyRule, platform_label: str) -> str:
@@ -487,24 +514,152 @@ def _merge_option_onto_target(target: ProductOption, source: ProductOption) -> b
     return changed
 
 
-def _reassign_options(source_product: Product, target_product: Product) -> int:
+def _first_option(options: list[ProductOption], **match) -> ProductOption | None:
+    found = [option for option in options if all(getattr(option, key) == value for key, value in match.items())]
+    return min(found, key=lambda option: (option.sort_order, option.pk), default=None)
+
+
+def _reassign_options(
+    source_options: list[ProductOption],
+    target_product: Product,
+    target_options: list[ProductOption],
+    changed: dict[int, ProductOption],
+) -> int:
+    """
+    Move options onto `target_product` in memory, merging each into the target's
+    option with the same name (or SKU) when there is one. Moved options join
+    `target_options`; every option that needs writing is collected in `changed`.
+    """
     moved = 0
-    for option in source_product.options.all():
-        existing = target_product.options.filter(name=option.name).first()
+    for option in source_options:
+        existing = _first_option(target_options, name=option.name)
         if existing is None and getattr(option, "sku", None):
-            existing = target_product.options.filter(sku=option.sku).first()
+            existing = _first_option(target_options, sku=option.sku)
         if existing is None:
             option.product = target_product
-            option.save(update_fields=["product"])
+            target_options.append(option)
+            changed[option.pk] = option
             moved += 1
             continue
         if existing.pk == option.pk:
             continue
         if _merge_option_onto_target(existing, option):
-            existing.save()
+            changed[existing.pk] = existing
     return moved
 
 
+@dataclass
+class FamilyGroupPlan:
+    rule: FamilyRule
+    platform_code: str
+    platform_label: str
+    sources: list[Product] = field(default_factory=list)
+    options: list[dict[str, object]] = field(default_factory=list)
+
+    @property
+    def parent_sku(self) -> str:
+        return _group_sku(self.rule, self.platform_code)
+
+    @property
+    def parent_name(self) -> str:
+        return _group_name(self.rule, self.platform_label)
+
+    def parent_defaults(self) -> dict[str, object]:
+        sources = self.sources
+        category = sources[0].category
+        return {
+            "name": self.parent_name,
+            "slug": _group_slug(category, self.parent_name, self.parent_sku),
+            "category": category,
+            "price": min(_decimal_or_zero(product.price) for product in sources),
+            "unit_cost": min(
+                (_decimal_or_zero(product.unit_cost) for product in sources if getattr(product, "unit_cost", None) is not None),
+                default=None,
+            ),
+            "inventory": sum(max(int(getattr(product, "inventory", 0) or 0), 0) for product in sources),
+            "is_active": True,
+            "is_in_house": False,
+            "short_description": _group_short_description(self.rule, self.platform_label),
+            "description": _group_description(self.rule, self.platform_label),
+            "contact_for_estimate": any(bool(getattr(product, "contact_for_estimate", False)) for product in sources),
+            "estimate_from_price": None,
+            "option_column_1_label": "Options",
+            "option_column_2_label": "",
+        }
+
+
+@dataclass
+class DuplicateGroupPlan:
+    keeper: Product
+    duplicates: list[Product]
+    products: list[Product]
+
+
+def _plan_family_groups(family_candidates: list[Product]) -> list[FamilyGroupPlan]:
+    """
+    Bucket active family products by (rule, platform) and work out each parent's
+    option list, ordered by group identity like the parents are written.
+    """
+    groups: dict[str, FamilyGroupPlan] = {}
+    for product in family_candidates:
+        if not bool(getattr(product, "is_active", False)):
+            continue
+        rule = _match_family_rule(product)
+        if rule is None:
+            continue
+        platform_code, platform_label = _product_platform(product) if rule.split_platform else ("all", "")
+        identity = _group_identity(rule, platform_code)
+        plan = groups.get(identity)
+        if plan is None:
+            plan = groups[identity] = FamilyGroupPlan(rule=rule, platform_code=platform_code, platform_label=platform_label)
+        plan.sources.append(product)
+
+    plans = [groups[identity] for identity in sorted(groups)]
+    for plan in plans:
+        rule = plan.rule
+        plan.sources.sort(key=lambda product: (_option_label(rule, product).lower(), -int(product.pk or 0)))
+        option_buckets: dict[str, list[Product]] = defaultdict(list)
+        for product in plan.sources:
+            option_buckets[_option_label(rule, product)].append(product)
+        for sort_order, option_name in enumerate(sorted(option_buckets), start=1):
+            option_sources = option_buckets[option_name]
+            representative = sorted(option_sources, key=_product_score, reverse=True)[0]
+            plan.options.append(
+                {
+                    "name": option_name,
+                    "sku": getattr(representative, "sku", "") or None,
+                    "description": _longest_text(
+                        *(getattr(product, "short_description", "") for product in option_sources),
+                        *(getattr(product, "compatibility", "") for product in option_sources),
+                    )[:240],
+                    "is_separator": False,
+                    "option_column": 1,
+                    "price": min(_decimal_or_zero(product.price) for product in option_sources),
+                    "is_active": True,
+                    "sort_order": sort_order,
+                }
+            )
+    return plans
+
+
+def _plan_duplicate_groups(active_products: list[Product]) -> list[DuplicateGroupPlan]:
+    buckets: dict[tuple[int, str], list[Product]] = defaultdict(list)
+    for product in active_products:
+        key = (product.category_id, _normalized_key(getattr(product, "name", "")))
+        if key[1]:
+            buckets[key].append(product)
+
+    plans: list[DuplicateGroupPlan] = []
+    for products in buckets.values():
+        if len(products) <= 1:
+            continue
+        keeper = sorted(products, key=_product_score, reverse=True)[0]
+        duplicates = [product for product in products if product.pk != keeper.pk]
+        if duplicates:
+            plans.append(DuplicateGroupPlan(keeper=keeper, duplicates=duplicates, products=products))
+    return plans
+
+
 class Command(BaseCommand):
     help = (
         "Consolidates non-in-house supplier products into option-based parents, "
@@ -549,6 +704,10 @@ class Command(BaseCommand):
             self.stdout.write(f"... {len(summary['details']) - 50} more detail rows")
 
     def _run_cleanup(self, *, batch: CleanupBatch | None, apply_changes: bool) -> dict[str, object]:
+        """
+        Plan every family group and duplicate set from one load of the candidate
+        products, then apply the plan with bulk option and product updates.
+        """
         summary: dict[str, object] = {
             "matched_products": 0,
             "grouped_parents": 0,
@@ -573,167 +732,141 @@ class Command(BaseCommand):
             .select_related("category")
             .prefetch_related("compatible_models__make", "options")
         )
+        group_plans = _plan_family_groups(family_candidates)
+        grouped_source_ids = {product.pk for plan in group_plans for product in plan.sources}
+        active_products = list(
+            Product.objects.filter(is_active=True, is_in_house=False)
+            .exclude(sku__startswith=GROUP_PARENT_SKU_PREFIX)
+            .exclude(pk__in=grouped_source_ids)
+            .select_related("category")
+            .prefetch_related("compatible_models__make", "options")
+        )
+        duplicate_plans = _plan_duplicate_groups(active_products)
 
-        grouped_source_ids: set[int] = set()
-        groups: dict[str, dict[str, object]] = {}
-        for product in family_candidates:
-            if not bool(getattr(product, "is_active", False)):
-                continue
-            rule = _match_family_rule(product)
-            if rule is None:
-                continue
-            platform_code, platform_label = _product_platform(product) if rule.split_platform else ("all", "")
-            identity = _group_identity(rule, platform_code)
-            bucket = groups.setdefault(
-                identity,
-                {
-                    "rule": rule,
-                    "platform_code": platform_code,
-                    "platform_label": platform_label,
-                    "products": [],
-                },
-            )
-            bucket["products"].append(product)
-            grouped_source_ids.add(product.pk)
+        self._apply_family_groups(group_plans, batch=batch, apply_changes=apply_changes, summary=summary)
+        self._apply_duplicate_groups(duplicate_plans, batch=batch, apply_changes=apply_changes, summary=summary)
+        self._fill_category_images(apply_changes=apply_changes, summary=summary)
+        return summary
 
-        for identity in sorted(groups):
-            bucket = groups[identity]
-            grouped_sources = list(bucket["products"])
-            if not grouped_sources:
-                continue
-            rule = bucket["rule"]
-            category = grouped_sources[0].category
-            platform_code = str(bucket["platform_code"])
-            platform_label = str(bucket["platform_label"])
-            parent_sku = _group_sku(rule, platform_code)
-            parent_name = _group_name(rule, platform_label)
-            existing_parent = Product.objects.filter(sku=parent_sku).first()
-            parent_defaults = {
-                "name": parent_name,
-                "slug": _group_slug(category, parent_name, parent_sku),
-                "category": category,
-                "price": min(_decimal_or_zero(product.price) for product in grouped_sources),
-                "unit_cost": min(
-                    (_decimal_or_zero(product.unit_cost) for product in grouped_sources if getattr(product, "unit_cost", None) is not None),
-                    default=None,
-                ),
-                "inventory": sum(max(int(getattr(product, "inventory", 0) or 0), 0) for product in grouped_sources),
-                "is_active": True,
-                "is_in_house": False,
-                "short_description": _group_short_description(rule, platform_label),
-                "description": _group_description(rule, platform_label),
-                "contact_for_estimate": any(bool(getattr(product, "contact_for_estimate", False)) for product in grouped_sources),
-                "estimate_from_price": None,
-                "option_column_1_label": "Options",
-                "option_column_2_label": "",
-            }
+    def _apply_family_groups(
+        self,
+        plans: list[FamilyGroupPlan],
+        *,
+        batch: CleanupBatch | None,
+        apply_changes: bool,
+        summary: dict[str, object],
+    ) -> None:
+        if not plans:
+            return
+        parents = {product.sku: product for product in Product.objects.filter(sku__in=[plan.parent_sku for plan in plans])}
+        options_by_name: dict[tuple[int, str], ProductOption] = {}
+        for option in ProductOption.objects.filter(product_id__in=[parent.pk for parent in parents.values()]):
+            options_by_name.setdefault((option.product_id, option.name), option)
+        wanted_skus = [option["sku"] for plan in plans for option in plan.options if option["sku"]]
+        options_by_sku = {option.sku: option for option in ProductOption.objects.filter(sku__in=wanted_skus)}
+        # Options already loaded by name are reused so both lookups share one instance.
+        loaded = {option.pk: option for option in options_by_name.values()}
+        options_by_sku = {sku: loaded.get(option.pk, option) for sku, option in options_by_sku.items()}
+
+        to_create: list[ProductOption] = []
+        to_update: dict[int, ProductOption] = {}
+        kept: list[ProductOption] = []
+        parent_ids: set[int] = set()
+        source_ids: set[int] = set()
+        for plan in plans:
+            existing_parent = parents.get(plan.parent_sku)
+            parent_defaults = plan.parent_defaults()
             if apply_changes:
-                parent, created = Product.objects.update_or_create(
-                    sku=parent_sku,
-                    defaults=parent_defaults,
-                )
+                if existing_parent is None:
+                    parent = Product.objects.create(sku=plan.parent_sku, **parent_defaults)
+                    created = True
+                else:
+                    parent = existing_parent
+                    for name, value in parent_defaults.items():
+                        setattr(parent, name, value)
+                    parent.save()
+                    created = False
                 if not _product_image_name(parent):
-                    image_name = _best_image_name(grouped_sources)
+                    image_name = _best_image_name(plan.sources)
                     if image_name:
                         parent.main_image = image_name
                         parent.save(update_fields=["main_image"])
                 parent.compatible_models.set(
-                    sorted(
-                        {
-                            model_id
-                            for product in grouped_sources
-                            for model_id in product.compatible_models.values_list("id", flat=True)
-                        }
-                    )
+                    sorted({model.pk for product in plan.sources for model in product.compatible_models.all()})
                 )
+                parent_ids.add(parent.pk)
+                source_ids.update(product.pk for product in plan.sources if product.pk != parent.pk)
             else:
-                parent = existing_parent or Product(sku=parent_sku, **parent_defaults)
+                parent = existing_parent or Product(sku=plan.parent_sku, **parent_defaults)
                 created = existing_parent is None
 
             summary["grouped_parents"] = int(summary["grouped_parents"]) + (1 if created else 0)
             summary["details"].append(
-                f"group {parent_name}: {len(grouped_sources)} source product(s) -> {parent_sku}"
+                f"group {plan.parent_name}: {len(plan.sources)} source product(s) -> {plan.parent_sku}"
             )
 
-            grouped_sources.sort(key=lambda product: (_option_label(rule, product).lower(), -int(product.pk or 0)))
-            option_buckets: dict[str, list[Product]] = defaultdict(list)
-            for product in grouped_sources:
-                option_buckets[_option_label(rule, product)].append(product)
-
-            kept_option_ids: set[int] = set()
-            for sort_order, option_name in enumerate(sorted(option_buckets), start=1):
-                option_sources = option_buckets[option_name]
-                representative = sorted(option_sources, key=_product_score, reverse=True)[0]
-                option_defaults = {
-                    "name": option_name,
-                    "sku": getattr(representative, "sku", "") or None,
-                    "description": _longest_text(
-                        *(getattr(product, "short_description", "") for product in option_sources),
-                        *(getattr(product, "compatibility", "") for product in option_sources),
-                    )[:240],
-                    "is_separator": False,
-                    "option_column": 1,
-                    "price": min(_decimal_or_zero(product.price) for product in option_sources),
-                    "is_active": True,
-                    "sort_order": sort_order,
-                }
-                if apply_changes:
-                    option = parent.options.filter(name=option_name).first()
-                    if option is None and option_defaults["sku"]:
-                        option = ProductOption.objects.filter(sku=option_defaults["sku"]).first()
-                    if option is None:
-                        option = ProductOption.objects.create(product=parent, **option_defaults)
-                        summary["created_options"] = int(summary["created_options"]) + 1
-                    else:
-                        changed = False
-                        if option.product_id != parent.id:
-                            option.product = parent
-                            changed = True
-                        for field, value in option_defaults.items():
-                            if getattr(option, field) != value:
-                                setattr(option, field, value)
-                                changed = True
-                        if changed:
-                            option.save()
-                            summary["updated_options"] = int(summary["updated_options"]) + 1
-                    kept_option_ids.add(option.id)
+            for option_defaults in plan.options:
+                option = options_by_name.get((parent.pk, option_defaults["name"])) if parent.pk else None
+                if option is not None and option.product_id != parent.pk:
+                    option = None
+                if not apply_changes:
+                    key = "updated_options" if option is not None else "created_options"
+                    summary[key] = int(summary[key]) + 1
+                    continue
+                if option is None and option_defaults["sku"]:
+                    option = options_by_sku.get(option_defaults["sku"])
+                if option is None:
+                    option = ProductOption(product=parent, **option_defaults)
+                    to_create.append(option)
+                    summary["created_options"] = int(summary["created_options"]) + 1
                 else:
-                    existing = False
-                    if parent.pk:
-                        existing = parent.options.filter(name=option_name).exists()
-                    if existing:
+                    changed = option.product_id != parent.pk
+                    option.product = parent
+                    for name, value in option_defaults.items():
+                        if getattr(option, name) != value:
+                            setattr(option, name, value)
+                            changed = True
+                    if changed:
+                        to_update[option.pk] = option
                         summary["updated_options"] = int(summary["updated_options"]) + 1
-                    else:
-                        summary["created_options"] = int(summary["created_options"]) + 1
-
-            if apply_changes:
-                parent.options.exclude(id__in=kept_option_ids).update(is_active=False)
-                deactivated = Product.objects.filter(pk__in=[product.pk for product in grouped_sources]).exclude(pk=parent.pk).update(
-                    is_active=False,
-                    cleanup_batch=batch,
-                )
-                summary["deactivated_products"] = int(summary["deactivated_products"]) + int(deactivated)
-
-        active_products = list(
-            Product.objects.filter(is_active=True, is_in_house=False)
-            .exclude(sku__startswith=GROUP_PARENT_SKU_PREFIX)
-            .exclude(pk__in=grouped_source_ids)
-            .select_related("category")
-            .prefetch_related("compatible_models__make", "options")
+                kept.append(option)
+
+        if not apply_changes:
+            return
+        if to_update:
+            ProductOption.objects.bulk_update(list(to_update.values()), GROUP_OPTION_FIELDS)
+        if to_create:
+            ProductOption.objects.bulk_create(to_create)
+        ProductOption.objects.filter(product_id__in=parent_ids).exclude(id__in=[option.pk for option in kept]).update(
+            is_active=False
         )
-        duplicate_groups: dict[tuple[int, str], list[Product]] = defaultdict(list)
-        for product in active_products:
-            key = (product.category_id, _normalized_key(getattr(product, "name", "")))
-            if key[1]:
-                duplicate_groups[key].append(product)
-
-        for products in duplicate_groups.values():
-            if len(products) <= 1:
-                continue
-            keeper = sorted(products, key=_product_score, reverse=True)[0]
-            duplicates = [product for product in products if product.pk != keeper.pk]
-            if not duplicates:
-                continue
+        deactivated = Product.objects.filter(pk__in=source_ids).exclude(pk__in=parent_ids).update(
+            is_active=False,
+            cleanup_batch=batch,
+        )
+        summary["deactivated_products"] = int(summary["deactivated_products"]) + int(deactivated)
+        refresh_after_bulk_write(parent_ids | source_ids)
+
+    def _apply_duplicate_groups(
+        self,
+        plans: list[DuplicateGroupPlan],
+        *,
+        batch: CleanupBatch | None,
+        apply_changes: bool,
+        summary: dict[str, object],
+    ) -> None:
+        # Options are read after the family groups were written, which may have claimed some by SKU.
+        options_by_product: dict[int, list[ProductOption]] = defaultdict(list)
+        if apply_changes and plans:
+            for option in ProductOption.objects.filter(
+                product_id__in=[product.pk for plan in plans for product in plan.products]
+            ):
+                options_by_product[option.product_id].append(option)
+
+        changed_options: dict[int, ProductOption] = {}
+        duplicate_ids: set[int] = set()
+        for plan in plans:
+            keeper, duplicates, products = plan.keeper, plan.duplicates, plan.products
             summary["duplicate_groups"] = int(summary["duplicate_groups"]) + 1
             summary["details"].append(
                 f"dedupe {keeper.category.name} / {keeper.name}: {len(duplicates)} duplicate(s) removed"
@@ -744,7 +877,6 @@ class Command(BaseCommand):
                 continue
 
             changed_fields: list[str] = []
-            moved_option_count = 0
             best_image = _best_image_name(products)
             if not _product_image_name(keeper) and best_image:
                 keeper.main_image = best_image
@@ -777,33 +909,40 @@ class Command(BaseCommand):
             if changed_fields:
                 keeper.save(update_fields=sorted(set(changed_fields + ["updated_at"])))
             keeper.compatible_models.set(
-                sorted(
-                    {
-                        model_id
-                        for product in products
-                        for model_id in product.compatible_models.values_list("id", flat=True)
-                    }
-                )
+                sorted({model.pk for product in products for model in product.compatible_models.all()})
+            )
+            keeper_options = options_by_product[keeper.pk]
+            moved_option_count = sum(
+                _reassign_options(options_by_product[duplicate.pk], keeper, keeper_options, changed_options)
+                for duplicate in duplicates
             )
-            for duplicate in duplicates:
-                moved_option_count += _reassign_options(duplicate, keeper)
             if moved_option_count:
                 summary["details"].append(
                     f"dedupe {keeper.category.name} / {keeper.name}: moved {moved_option_count} option(s) to keeper"
                 )
+            duplicate_ids.update(product.pk for product in duplicates)
+
+        if not apply_changes or not plans:
+            return
+        if changed_options:
+            ProductOption.objects.bulk_update(list(changed_options.values()), MERGED_OPTION_FIELDS)
+        deactivated = Product.objects.filter(pk__in=duplicate_ids).update(
+            is_active=False,
+            cleanup_batch=batch,
+        )
+        summary["deactivated_products"] = int(summary["deactivated_products"]) + int(deactivated)
+        refresh_after_bulk_write(duplicate_ids | {plan.keeper.pk for plan in plans})
 
-            deactivated = Product.objects.filter(pk__in=[product.pk for product in duplicates]).update(
-                is_active=False,
-                cleanup_batch=batch,
-            )
-            summary["deactivated_products"] = int(summary["deactivated_products"]) + int(deactivated)
-
+    def _fill_category_images(self, *, apply_changes: bool, summary: dict[str, object]) -> None:
         fallback_products = list(
             Product.objects.filter(is_active=True)
             .select_related("category")
             .order_by("-is_in_house", "-created_at")
         )
         fallback_image = _best_image_name(fallback_products)
+        products_by_category: dict[int, list[Product]] = defaultdict(list)
+        for product in fallback_products:
+            products_by_category[product.category_id].append(product)
         categories = list(
             Category.objects.filter(products__is_active=True).distinct().order_by("name")
         )
@@ -811,8 +950,7 @@ class Command(BaseCommand):
             current_image = str(getattr(category.image, "name", "") or "").strip()
             if current_image:
                 continue
-            category_products = list(category.products.filter(is_active=True).order_by("-is_in_house", "-created_at"))
-            image_name = _best_image_name(category_products) or fallback_image
+            image_name = _best_image_name(products_by_category[category.pk]) or fallback_image
             if not image_name:
                 continue
             summary["filled_category_images"] = int(summary["filled_category_images"]) + 1
@@ -820,5 +958,3 @@ class Command(BaseCommand):
             if apply_changes:
                 category.image = image_name
                 category.save(update_fields=["image"])
-
-        return summary
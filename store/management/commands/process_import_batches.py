@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from store.import_jobs import process_import_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued product imports uploaded through the admin. "
+        "Keeps polling for new batches unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process the current queue and exit.")
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when the queue is empty (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_import_batches()
+            if processed:
+                self.stdout.write(f"Processed {processed} import batch(es).")
+            if options["once"]:
+                break
+            if not processed:
+                time.sleep(max(0.5, options["sleep"]))
+            close_old_connections()
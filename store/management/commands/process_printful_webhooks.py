@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from store.printful_fulfillment import process_printful_webhook_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply Printful webhook events queued by the webhook endpoint, one live order "
+        "fetch per order. Keeps polling for new events unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process the current queue and exit.")
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between polls when no event was applied (default: 5).",
+        )
+        parser.add_argument("--limit", type=int, default=None, help="Process at most this many events per pass.")
+
+    def handle(self, *args, **options):
+        while True:
+            stats = process_printful_webhook_events(limit=options["limit"])
+            if stats["processed"] + stats["retrying"] + stats["failed"]:
+                self._report(stats)
+            if options["once"]:
+                break
+            # Events waiting on a retry backoff are not progress; poll again after the pause.
+            if not stats["processed"] + stats["failed"]:
+                time.sleep(max(0.5, options["sleep"]))
+            close_old_connections()
+
+    def _report(self, stats: dict) -> None:
+        self.stdout.write(
+            f"Applied {stats['processed']} Printful webhook event(s) for {stats['orders']} order(s) "
+            f"with {stats['fetches']} live fetch(es); latency avg {stats['avg_latency_seconds']:.1f}s, "
+            f"max {stats['max_latency_seconds']:.1f}s."
+        )
+        if stats["retrying"] or stats["failed"]:
+            self.stdout.write(
+                self.style.WARNING(f"{stats['retrying']} event(s) will be retried, {stats['failed']} failed.")
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from store.fitment_index import rebuild_fitment_index
+from store.storefront_index import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Sync the flattened vehicle fitment index with the fitment bands. Run daily so "
+        "open-ended bands pick up the next model year when the calendar year rolls over."
+    )
+
+    def handle(self, *args, **options):
+        stats = rebuild_fitment_index()
+        if stats["created"] or stats["deleted"]:
+            # Facets cached per catalog version carry the fitment years.
+            bump_catalog_version()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fitment index rebuilt: {stats['created']} row(s) created, {stats['deleted']} deleted."
+            )
+        )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from store.companions import (
+    CompanionIndex,
+    load_companion_profiles,
+    rebuild_product_companions,
+    refresh_companions_for,
+    stale_companion_product_ids,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the precomputed companion items shown on product pages. "
+        "By default only products without rows or edited since their rows were written are re-ranked, "
+        "together with the products listing them or that they would now rank for."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-rank every active product (rows are still only rewritten when the ranking changed).",
+        )
+        parser.add_argument(
+            "--product",
+            action="append",
+            type=int,
+            default=[],
+            help="Product ID to re-rank. Can be passed multiple times.",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"] or options["product"]:
+            product_ids = None if options["all"] else set(options["product"])
+            stats = rebuild_product_companions(product_ids, index=CompanionIndex(load_companion_profiles()))
+        else:
+            # The catalog is only loaded when something is stale.
+            stats = refresh_companions_for(stale_companion_product_ids())
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Product companions rebuilt: "
+                + " ".join(f"{key}={value}" for key, value in stats.items())
+            )
+        )
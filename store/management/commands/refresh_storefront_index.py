@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.search import refresh_product_search_vectors
+from store.storefront_index import refresh_effective_prices, refresh_storefront_sort_ranks, sort_ranks_stale
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized storefront price, featured-rank and search columns. "
+        "Run nightly so discount start/end dates are reflected in price sorting; "
+        "run often with --stale-ranks to place products saved since the last rebuild."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prices-only",
+            action="store_true",
+            help="Refresh effective prices only and keep the featured ranks and search vectors as they are.",
+        )
+        parser.add_argument(
+            "--stale-ranks",
+            action="store_true",
+            help="Rebuild the featured ranks only, and only when a saved product is waiting for one.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stale_ranks"]:
+            if not sort_ranks_stale():
+                self.stdout.write("Featured ranks are current.")
+                return
+            with transaction.atomic():
+                ranks_updated = refresh_storefront_sort_ranks()
+            self.stdout.write(self.style.SUCCESS(f"Featured ranks rebuilt: ranks_updated={ranks_updated}"))
+            return
+
+        with transaction.atomic():
+            prices_updated = refresh_effective_prices()
+            ranks_updated = 0
+            search_updated = 0
+            if not options["prices_only"]:
+                ranks_updated = refresh_storefront_sort_ranks()
+                search_updated = refresh_product_search_vectors()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Storefront index refreshed: "
+                f"prices_updated={prices_updated} ranks_updated={ranks_updated} search_updated={search_updated}"
+            )
+        )
@@ -11,12 +11,23 @@ from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.db.models import Q
+from django.utils import timezone
 from django.utils.text import slugify
 
 from store.models import Category, ImportBatch, Product, ProductOption
+from store.storefront_index import refresh_after_bulk_write
 
 PRICE_QUANT = Decimal("0.01")
 DEFAULT_INVENTORY = 100
+OPTION_BATCH_SIZE = 500
+BATCH_SUMMARY_FIELDS = (
+    "created_categories",
+    "created_products",
+    "updated_products",
+    "created_options",
+    "updated_options",
+    "skipped_options",
+)
 FINISH_LABELS = {
     "ARM": "Armadillo",
     "BR": "Brushed",
@@ -285,21 +296,44 @@ def _inventory_value(existing: Product | None) -> int:
         return DEFAULT_INVENTORY
 
 
-def _find_catalog_image(category_name: str) -> str:
-    for donor_filter in CATALOG_IMAGE_DONORS.get(category_name, ()):
-        donor = (
-            Product.objects.filter(
-                is_in_house=True,
-                category__name=donor_filter["category"],
-                name=donor_filter["name"],
-            )
-            .exclude(main_image="")
-            .exclude(main_image__isnull=True)
-            .first()
-        )
-        if donor and donor.main_image_name:
-            return donor.main_image_name
-    return ""
+def _catalog_images(category_names: list[str]) -> dict[str, str]:
+    """
+    Best donor image per catalog category (see CATALOG_IMAGE_DONORS), in one query.
+    """
+    donor_filters = [donor for name in category_names for donor in CATALOG_IMAGE_DONORS.get(name, ())]
+    if not donor_filters:
+        return {}
+    scope = Q()
+    for donor_filter in donor_filters:
+        scope |= Q(category__name=donor_filter["category"], name=donor_filter["name"])
+    donor_images: dict[tuple[str, str], str] = {}
+    donors = (
+        Product.objects.filter(scope, is_in_house=True)
+        .exclude(main_image="")
+        .exclude(main_image__isnull=True)
+        .values_list("category__name", "name", "main_image")
+    )
+    for category_name, name, image_name in donors:
+        donor_images.setdefault((category_name, name), str(image_name or ""))
+
+    images: dict[str, str] = {}
+    for category_name in category_names:
+        for donor_filter in CATALOG_IMAGE_DONORS.get(category_name, ()):
+            image_name = donor_images.get((donor_filter["category"], donor_filter["name"]))
+            if image_name:
+                images[category_name] = image_name
+                break
+    return images
+
+
+def _apply_changes(instance, values: dict[str, object]) -> list[str]:
+    """Set the differing values on `instance` and return the changed field names."""
+    changed = []
+    for field, value in values.items():
+        if getattr(instance, field) != value:
+            setattr(instance, field, value)
+            changed.append(field)
+    return changed
 
 
 def _unique_option_sku(base_sku: str, row: PricingRow, used: set[str]) -> str:
@@ -355,6 +389,11 @@ class Command(BaseCommand):
             action="store_true",
             help="Deactivate legacy BGM product records in the managed categories that are not part of this sync.",
         )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Report how many product and option rows were inserted, updated and left unchanged.",
+        )
 
     def handle(self, *args, **options):
         msrp_path = Path(options["msrp"])
@@ -385,21 +424,9 @@ class Command(BaseCommand):
                 batch=batch,
                 deactivate_obsolete=bool(options["deactivate_obsolete"]),
             )
-            for field, value in summary.items():
-                setattr(batch, field, value)
-            batch.save(
-                update_fields=[
-                    "created_categories",
-                    "created_products",
-                    "updated_products",
-                    "created_options",
-                    "updated_options",
-                    "skipped_options",
-                    "source_filename",
-                    "mode",
-                    "is_dry_run",
-                ]
-            )
+            for field in BATCH_SUMMARY_FIELDS:
+                setattr(batch, field, summary[field])
+            batch.save(update_fields=[*BATCH_SUMMARY_FIELDS, "source_filename", "mode", "is_dry_run"])
 
         self.stdout.write(self.style.SUCCESS("BGM pricing sync completed."))
         self.stdout.write(
@@ -407,6 +434,17 @@ class Command(BaseCommand):
             f"Products: +{summary['created_products']} / ~{summary['updated_products']} | "
             f"Options: +{summary['created_options']} / ~{summary['updated_options']} / skipped {summary['skipped_options']}"
         )
+        if options["stats"]:
+            self.stdout.write("")
+            self.stdout.write("Rows:")
+            self.stdout.write(
+                f"- products: inserted={summary['created_products']} updated={summary['updated_products']} "
+                f"unchanged={summary['unchanged_products']}"
+            )
+            self.stdout.write(
+                f"- options: inserted={summary['created_options']} updated={summary['updated_options']} "
+                f"unchanged={summary['skipped_options']} deactivated={summary['deactivated_options']}"
+            )
 
     def _load_rows(self, *, msrp_path: Path, tier1_path: Path, tier2_path: Path) -> list[PricingRow]:
         msrp_rows_raw = _read_csv(msrp_path)
@@ -495,42 +533,102 @@ class Command(BaseCommand):
             "created_categories": 0,
             "created_products": 0,
             "updated_products": 0,
+            "unchanged_products": 0,
             "created_options": 0,
             "updated_options": 0,
             "skipped_options": 0,
+            "deactivated_options": 0,
         }
-        managed_product_skus: set[str] = set()
-        managed_categories: set[str] = set()
+        managed_categories = set(grouped_rows)
+        with transaction.atomic():
+            categories = self._sync_categories(grouped_rows, summary)
+            products, touched = self._sync_products(grouped_rows, categories, batch, summary)
+            option_touched = self._sync_options(grouped_rows, products, batch, summary)
+            # Options carry no timestamp of their own; a changed option set dates its product.
+            if option_touched - touched:
+                Product.objects.filter(pk__in=option_touched - touched).update(updated_at=timezone.now())
+            touched |= option_touched
+
+            if deactivate_obsolete and managed_categories:
+                obsolete_scope = Q(category__name__in=managed_categories)
+                for category_name in grouped_rows:
+                    for legacy_filter in LEGACY_PRODUCT_FAMILY_FILTERS.get(category_name, ()):
+                        obsolete_scope |= Q(
+                            category__name=legacy_filter["category"],
+                            name__startswith=legacy_filter["name_prefix"],
+                        )
+
+                obsolete_ids = set(
+                    Product.objects.filter(
+                        obsolete_scope,
+                        is_in_house=True,
+                        is_active=True,
+                        sku__startswith="BGM-",
+                    )
+                    .exclude(sku__in=[product.sku for product in products.values()])
+                    .values_list("pk", flat=True)
+                )
+                if obsolete_ids:
+                    Product.objects.filter(pk__in=obsolete_ids).update(
+                        is_active=False,
+                        import_batch=batch,
+                        updated_at=timezone.now(),
+                    )
+                    touched |= obsolete_ids
 
-        for category_name, rows in grouped_rows.items():
+            if touched:
+                refresh_after_bulk_write(touched)
+        return summary
+
+    def _sync_categories(self, grouped_rows: dict[str, list[PricingRow]], summary: dict[str, int]) -> dict[str, Category]:
+        categories = {category.name: category for category in Category.objects.filter(name__in=list(grouped_rows))}
+        for category_name in grouped_rows:
             definition = PRODUCT_DEFINITIONS[category_name]
-            managed_categories.add(category_name)
-            category, category_created = Category.objects.get_or_create(
-                name=category_name,
-                defaults={
-                    "slug": slugify(category_name),
-                    "description": definition["short_description"],
-                },
-            )
-            if category_created:
+            category = categories.get(category_name)
+            if category is None:
+                categories[category_name] = Category.objects.create(
+                    name=category_name,
+                    slug=slugify(category_name),
+                    description=definition["short_description"],
+                )
                 summary["created_categories"] += 1
             elif not category.description:
                 category.description = definition["short_description"]
                 category.save(update_fields=["description"])
-
-            product_defaults = {
+        return categories
+
+    def _sync_products(
+        self,
+        grouped_rows: dict[str, list[PricingRow]],
+        categories: dict[str, Category],
+        batch: ImportBatch,
+        summary: dict[str, int],
+    ) -> tuple[dict[str, Product], set[int]]:
+        """
+        One catalog product per managed category, keyed by category name, plus the
+        ids written. Existing products are diffed in memory; only changed ones are
+        written (and stamped with this batch).
+        """
+        skus = [PRODUCT_DEFINITIONS[name]["product_sku"] for name in grouped_rows]
+        existing = {product.sku: product for product in Product.objects.filter(sku__in=skus)}
+        products: dict[str, Product] = {}
+        to_create: list[Product] = []
+        to_update: list[Product] = []
+        update_fields: set[str] = set()
+        for category_name, rows in grouped_rows.items():
+            definition = PRODUCT_DEFINITIONS[category_name]
+            values = {
                 "name": definition["product_name"],
                 "slug": slugify(definition["product_name"]),
-                "category": category,
+                "category_id": categories[category_name].pk,
                 "price": min(row.msrp for row in rows),
                 "dealer_tier_1_price": min(row.tier_1_price for row in rows),
                 "dealer_tier_2_price": min(row.tier_2_price for row in rows),
                 "unit_cost": min((row.est_cost for row in rows if row.est_cost is not None), default=None),
-                "inventory": _inventory_value(Product.objects.filter(sku=definition["product_sku"]).first()),
+                "inventory": _inventory_value(existing.get(definition["product_sku"])),
                 "currency": getattr(settings, "DEFAULT_CURRENCY_CODE", "CAD"),
                 "is_active": True,
                 "is_in_house": True,
-                "import_batch": batch,
                 "short_description": definition["short_description"],
                 "description": definition["description"],
                 "contact_for_estimate": False,
@@ -538,38 +636,63 @@ class Command(BaseCommand):
                 "option_column_1_label": definition["option_column_1_label"],
                 "option_column_2_label": definition["option_column_2_label"],
             }
-            product, created = Product.objects.update_or_create(
-                sku=definition["product_sku"],
-                defaults=product_defaults,
-            )
-            if not product.main_image_name:
-                catalog_image = _find_catalog_image(category_name)
-                if catalog_image:
-                    product.main_image = catalog_image
-                    product.save(update_fields=["main_image"])
-            managed_product_skus.add(product.sku)
-            if created:
+            product = existing.get(definition["product_sku"])
+            if product is None:
+                product = Product(sku=definition["product_sku"], import_batch=batch, **values)
+                to_create.append(product)
                 summary["created_products"] += 1
             else:
-                summary["updated_products"] += 1
-
+                changed = _apply_changes(product, values)
+                if changed:
+                    product.import_batch = batch
+                    update_fields.update(changed, {"import_batch"})
+                    to_update.append(product)
+                    summary["updated_products"] += 1
+                else:
+                    summary["unchanged_products"] += 1
+            products[category_name] = product
+
+        missing_images = [name for name, product in products.items() if not product.main_image_name]
+        for category_name, image_name in _catalog_images(missing_images).items():
+            product = products[category_name]
+            product.main_image = image_name
+            if product.pk:
+                update_fields.add("main_image")
+                if product not in to_update:
+                    to_update.append(product)
+                    summary["unchanged_products"] -= 1
+                    summary["updated_products"] += 1
+
+        if to_create:
+            Product.objects.bulk_create(to_create)
+        if to_update:
+            # bulk_update skips auto_now, so the timestamp is written explicitly.
+            now = timezone.now()
+            for product in to_update:
+                product.updated_at = now
+            Product.objects.bulk_update(to_update, sorted(update_fields | {"updated_at"}))
+        return products, {product.pk for product in [*to_create, *to_update]}
+
+    def _sync_options(
+        self,
+        grouped_rows: dict[str, list[PricingRow]],
+        products: dict[str, Product],
+        batch: ImportBatch,
+        summary: dict[str, int],
+    ) -> set[int]:
+        """
+        Diff every option row against the stored options and write the changes in
+        bulk; returns the ids of products whose options changed.
+        """
+        planned: list[tuple[Product, str, dict[str, object]]] = []
+        for category_name, rows in grouped_rows.items():
+            product = products[category_name]
             used_skus: set[str] = set()
-            kept_option_ids: set[int] = set()
             for row in sorted(rows, key=_sort_order):
                 option_sku = _unique_option_sku(row.sku, row, used_skus)
                 used_skus.add(option_sku)
-                option_name = _option_name(row)
-                existing = ProductOption.objects.filter(sku=option_sku).first()
-                if existing is None:
-                    existing = product.options.filter(name=option_name).first()
-
-                reassigned = False
-                if existing and existing.product_id != product.id:
-                    existing.product = product
-                    reassigned = True
-
-                option_defaults = {
-                    "name": option_name,
+                values = {
+                    "name": _option_name(row),
                     "sku": option_sku,
                     "description": "",
                     "price": row.msrp,
@@ -578,46 +701,58 @@ class Command(BaseCommand):
                     "is_separator": False,
                     "option_column": _option_column(row),
                     "is_active": True,
-                    "import_batch": batch,
                     "sort_order": _sort_order(row),
                 }
-                if existing:
-                    changed = False
-                    for field, value in option_defaults.items():
-                        if getattr(existing, field) != value:
-                            setattr(existing, field, value)
-                            changed = True
-                    if changed or reassigned:
-                        existing.save()
-                        summary["updated_options"] += 1
-                    else:
-                        summary["skipped_options"] += 1
-                    option = existing
-                else:
-                    option = ProductOption.objects.create(product=product, **option_defaults)
-                    summary["created_options"] += 1
-                kept_option_ids.add(option.id)
-
-            product.options.exclude(id__in=kept_option_ids).update(is_active=False, import_batch=batch)
-
-        if deactivate_obsolete and managed_categories:
-            obsolete_scope = Q(category__name__in=managed_categories)
-            for category_name in grouped_rows:
-                for legacy_filter in LEGACY_PRODUCT_FAMILY_FILTERS.get(category_name, ()):
-                    obsolete_scope |= Q(
-                        category__name=legacy_filter["category"],
-                        name__startswith=legacy_filter["name_prefix"],
-                    )
+                planned.append((product, option_sku, values))
 
-            Product.objects.filter(
-                obsolete_scope,
-                is_in_house=True,
-                sku__startswith="BGM-",
-            ).exclude(
-                sku__in=managed_product_skus
-            ).update(
-                is_active=False,
-                import_batch=batch,
-            )
-
-        return summary
+        # Existing options are matched by SKU first, then by name within the product.
+        by_sku = {
+            option.sku: option
+            for option in ProductOption.objects.filter(sku__in=[option_sku for _product, option_sku, _values in planned])
+        }
+        by_name: dict[tuple[int, str], ProductOption] = {}
+        for option in ProductOption.objects.filter(
+            product_id__in=[product.pk for product in products.values()],
+            name__in={values["name"] for _product, _sku, values in planned},
+        ):
+            by_name.setdefault((option.product_id, option.name), option)
+
+        to_create: list[ProductOption] = []
+        to_update: list[ProductOption] = []
+        update_fields: set[str] = set()
+        claimed: set[int] = set()
+        touched: set[int] = set()
+        kept: list[ProductOption] = []
+        for product, option_sku, values in planned:
+            option = by_sku.get(option_sku) or by_name.get((product.pk, values["name"]))
+            if option is not None and option.pk in claimed:
+                option = None
+            if option is None:
+                option = ProductOption(product=product, import_batch=batch, **values)
+                to_create.append(option)
+                summary["created_options"] += 1
+            else:
+                claimed.add(option.pk)
+                previous_product_id = option.product_id
+                changed = _apply_changes(option, {"product_id": product.pk, **values})
+                if changed:
+                    touched.add(previous_product_id)
+                    option.import_batch = batch
+                    update_fields.update(changed, {"import_batch"})
+                    to_update.append(option)
+                    summary["updated_options"] += 1
+                else:
+                    summary["skipped_options"] += 1
+            kept.append(option)
+
+        if to_update:
+            ProductOption.objects.bulk_update(to_update, sorted(update_fields), batch_size=OPTION_BATCH_SIZE)
+        if to_create:
+            ProductOption.objects.bulk_create(to_create, batch_size=OPTION_BATCH_SIZE)
+        stale = (
+            ProductOption.objects.filter(product_id__in=[product.pk for product in products.values()], is_active=True)
+            .exclude(id__in=[option.pk for option in kept])
+        )
+        stale_product_ids = set(stale.values_list("product_id", flat=True))
+        summary["deactivated_options"] = stale.update(is_active=False, import_batch=batch) if stale_product_ids else 0
+        return touched | {option.product_id for option in [*to_create, *to_update]} | stale_product_ids
@@ -32,8 +32,8 @@ class Command(BaseCommand):
             products = [product for product in products if product]
             if not products:
                 raise CommandError("Printful merch sync returned no products for the requested product IDs.")
-            sync_printful_merch_products(products)
-            self.stdout.write(self.style.SUCCESS(f"Synced {len(products)} Printful merch products."))
+            summary = sync_printful_merch_products(products)
+            self._report(len(products), summary)
             return
 
         payload = get_printful_merch_feed(force_refresh=True)
@@ -44,5 +44,9 @@ class Command(BaseCommand):
         if not isinstance(products, list) or not products:
             raise CommandError("Printful merch sync returned no products.")
 
-        sync_printful_merch_products(products)
-        self.stdout.write(self.style.SUCCESS(f"Synced {len(products)} Printful merch products."))
+        summary = sync_printful_merch_products(products)
+        self._report(len(products), summary)
+
+    def _report(self, count: int, summary: dict[str, int]) -> None:
+        self.stdout.write(self.style.SUCCESS(f"Synced {count} Printful merch products."))
+        self.stdout.write(" ".join(f"{key}={value}" for key, value in summary.items()))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.services.printful import printful_is_enabled
+from store.printful_fulfillment import prewarm_printful_shipping_quotes
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-warm the shared Printful shipping-quote cache for the most common destination "
+        "postal prefixes and merch carts of recent orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=500, help="Recent merch orders to sample (default: 500).")
+        parser.add_argument("--destinations", type=int, default=10, help="Destinations to warm (default: 10).")
+        parser.add_argument("--carts", type=int, default=3, help="Cart variant sets per destination (default: 3).")
+
+    def handle(self, *args, **options):
+        if not printful_is_enabled():
+            self.stdout.write("Printful is not configured; nothing to warm.")
+            return
+        if not getattr(settings, "CACHE_IS_SHARED", False) or not settings.PRINTFUL_SHIPPING_QUOTE_FRESH_SECONDS:
+            # A process-local cache would only warm this cron process; checkout never sees it.
+            self.stdout.write("Shipping quotes are not cached in a shared backend; nothing to warm.")
+            return
+        stats = prewarm_printful_shipping_quotes(
+            recent_orders=max(1, options["orders"]),
+            destinations=max(0, options["destinations"]),
+            item_sets=max(0, options["carts"]),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Warmed {stats['quoted']} shipping quote(s) for {stats['destinations']} destination(s) "
+                f"x {stats['carts']} cart(s); {stats['failed']} failed."
+            )
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-16 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0038_product_dealer_tier_1_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_public_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Public price after options, discounts and the multiplier. Used for SQL price sorting.', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_sort_rank',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Position in the featured storefront order (category interleave). Empty when hidden.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'is_in_house', 'effective_sort_rank'], name='store_produ_is_acti_de841a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'is_in_house', 'effective_public_price'], name='store_produ_is_acti_811383_idx'),
+        ),
+    ]
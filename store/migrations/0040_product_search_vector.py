@@ -0,0 +1,71 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import DatabaseError, migrations, transaction
+from django.db.models import OuterRef, Subquery
+
+TRIGRAM_INDEXES = (
+    ("store_product_name_trgm", "name"),
+    ("store_product_sku_trgm", "sku"),
+)
+
+
+def backfill_search_vectors(apps, schema_editor):
+    Category = apps.get_model("store", "Category")
+    Product = apps.get_model("store", "Product")
+
+    category_name = Subquery(Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1])
+    Product.objects.update(
+        search_vector=(
+            SearchVector("name", weight="A", config="simple")
+            + SearchVector("sku", weight="B", config="simple")
+            + SearchVector(category_name, weight="C", config="simple")
+            + SearchVector("short_description", weight="D", config="simple")
+        )
+    )
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm ships with postgresql-contrib; skip the fuzzy indexes where it is not installed
+    # or the app role may not create extensions (managed databases).
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    try:
+        # The savepoint keeps a refused CREATE EXTENSION from aborting the migration transaction.
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        return
+    for index_name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "store_product" USING gin ("{column}" gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for index_name, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0039_product_effective_price_and_sort_rank"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["search_vector"], name="store_product_search_gin"),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
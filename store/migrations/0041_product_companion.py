@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0040_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCompanion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('companion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='companion_of_rows', to='store.product')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='companion_rows', to='store.product')),
+            ],
+            options={
+                'ordering': ['product', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='store_productcompanion_product_rank_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_fitment_years(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    ProductFitmentYear = apps.get_model("store", "ProductFitmentYear")
+    through = Product.compatible_models.through
+
+    ceiling = timezone.now().year + 1
+    rows = set()
+    for product_id, make_id, model_name, year_from, year_to in through.objects.values_list(
+        "product_id",
+        "carmodel__make_id",
+        "carmodel__name",
+        "carmodel__year_from",
+        "carmodel__year_to",
+    ).iterator():
+        if year_from is None:
+            rows.add((product_id, make_id, model_name, None))
+            continue
+        last = year_to if year_to is not None else max(ceiling, year_from)
+        rows.update((product_id, make_id, model_name, year) for year in range(year_from, last + 1))
+    ProductFitmentYear.objects.bulk_create(
+        [
+            ProductFitmentYear(product_id=product_id, make_id=make_id, model_name=model_name, year=year)
+            for product_id, make_id, model_name, year in rows
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0041_product_companion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFitmentYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=64)),
+                ('year', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('make', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='store.carmake')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fitment_years', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['make', 'model_name', 'year', 'product'], name='store_fitmentyear_vehicle_idx'), models.Index(fields=['year', 'product'], name='store_fitmentyear_year_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'make', 'model_name', 'year'), name='store_fitmentyear_product_vehicle_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_fitment_years, migrations.RunPython.noop),
+    ]
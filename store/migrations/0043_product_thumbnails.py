@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0042_product_fitment_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=2048),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='thumbnail_source',
+            field=models.CharField(blank=True, default='', editable=False, max_length=2048),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='thumbnail_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
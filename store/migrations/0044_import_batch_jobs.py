@@ -0,0 +1,64 @@
+# Generated by Django 5.2.4 on 2026-10-16 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0043_product_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='errors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='failure_reason',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='import_options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='processed_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Batches recorded before background processing have already run.
+        migrations.AddField(
+            model_name='importbatch',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='completed', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='importbatch',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='queued', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='total_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='upload',
+            field=models.FileField(blank=True, help_text='Uploaded spreadsheet; processed by the process_import_batches worker.', max_length=255, upload_to='store/imports/'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0044_import_batch_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RemoteImageCheckRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64, unique=True)),
+                ('url', models.TextField()),
+                ('ok', models.BooleanField(default=False)),
+                ('status_code', models.PositiveSmallIntegerField(default=0)),
+                ('content_type', models.CharField(blank=True, max_length=120)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('checked_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-checked_at'],
+            },
+        ),
+    ]
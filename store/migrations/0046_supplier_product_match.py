@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0045_remote_image_check_record'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierProductMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('supplier', models.CharField(max_length=80)),
+                ('product_hash', models.CharField(max_length=64)),
+                ('catalog_hash', models.CharField(max_length=64)),
+                ('confidence', models.CharField(max_length=16)),
+                ('reason', models.CharField(max_length=64)),
+                ('source_key', models.CharField(blank=True, max_length=160)),
+                ('source_hash', models.CharField(blank=True, max_length=64)),
+                ('alternatives', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='supplier_matches', to='store.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('supplier', 'product'), name='store_suppliermatch_supplier_product_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0046_supplier_product_match'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RemoteImageContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64)),
+                ('url', models.TextField()),
+                ('prefix', models.CharField(max_length=200)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('storage_name', models.CharField(max_length=255)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('url_hash', 'prefix'), name='store_remoteimagecontent_url_prefix_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0047_remote_image_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='printful_sync_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Hash of the normalized Printful product and variants from the last sync.', max_length=64),
+        ),
+    ]
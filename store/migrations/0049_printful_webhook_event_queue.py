@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-16 22:55
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_events_processed(apps, schema_editor):
+    # Events received before the queue existed were applied inside the webhook request.
+    PrintfulWebhookEvent = apps.get_model("store", "PrintfulWebhookEvent")
+    PrintfulWebhookEvent.objects.update(status="processed", attempts=1, processed_at=F("received_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0048_product_printful_sync_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printfulwebhookevent',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='printfulwebhookevent',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='printfulwebhookevent',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='printfulwebhookevent',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('failed', 'Failed')], db_index=True, default='pending', help_text='Pending events are applied by the process_printful_webhooks worker.', max_length=16),
+        ),
+        migrations.RunPython(mark_existing_events_processed, migrations.RunPython.noop),
+    ]
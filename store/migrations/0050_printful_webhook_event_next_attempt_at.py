@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0049_printful_webhook_event_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printfulwebhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='Pending events are not picked up before this time (retry backoff / worker lease).', null=True),
+        ),
+    ]
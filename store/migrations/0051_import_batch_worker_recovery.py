@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0050_printful_webhook_event_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last progress write of the running worker; stale running batches are requeued.', null=True),
+        ),
+        migrations.AddField(
+            model_name='importbatch',
+            name='upload_data',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:55
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def backfill_companions_checked_at(apps, schema_editor):
+    # Rows aged to 2000-01-01 by the old stale marker stay older than updated_at, so still stale.
+    Product = apps.get_model("store", "Product")
+    ProductCompanion = apps.get_model("store", "ProductCompanion")
+    latest = (
+        ProductCompanion.objects.filter(product_id=OuterRef("pk"))
+        .values("product_id")
+        .annotate(latest=Max("updated_at"))
+        .values("latest")
+    )
+    Product.objects.filter(companion_rows__isnull=False).distinct().update(companions_checked_at=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0051_import_batch_worker_recovery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='companions_checked_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When store.companions last ranked this product. Empty queues it for the next rebuild.', null=True),
+        ),
+        migrations.RunPython(backfill_companions_checked_at, migrations.RunPython.noop),
+    ]
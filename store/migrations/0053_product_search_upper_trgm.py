@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:20
+
+from django.db import migrations
+
+# search_match_q filters with icontains, which PostgreSQL compiles to
+# UPPER("col"::text) LIKE UPPER(...); only an index on that expression serves it.
+UPPER_TRIGRAM_INDEXES = (
+    ("store_product_name_upper_trgm", "name"),
+    ("store_product_sku_upper_trgm", "sku"),
+)
+
+
+def create_upper_trigram_indexes(apps, schema_editor):
+    # Created only where 0040 could install pg_trgm.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    for index_name, column in UPPER_TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "store_product" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_upper_trigram_indexes(apps, schema_editor):
+    for index_name, _column in UPPER_TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0052_product_companions_checked_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_trigram_indexes, drop_upper_trigram_indexes),
+    ]
@@ -1,11 +1,19 @@
+import heapq
 import logging
 import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
-from typing import Any
+from typing import Any, Iterable, Sequence
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models, transaction
@@ -21,6 +29,8 @@ logger = logging.getLogger(__name__)
 PRICE_QUANT = Decimal("0.01")
 DEALER_TIER_CODE_LEVEL_1 = "TIER_1"
 DEALER_TIER_CODE_LEVEL_2 = "TIER_2"
+# Stored per product so inactive companions can be skipped without a re-rank.
+COMPANION_ROWS_PER_PRODUCT = 6
 COMPANION_TOKEN_STOPWORDS = {
     "and",
     "build",
@@ -45,6 +55,130 @@ COMPANION_TOKEN_STOPWORDS = {
 }
 
 
+
+# ─────────────────────────── Catalog: companion scoring ───────────────────────────
+
+def companion_match_tokens(*parts) -> set[str]:
+    tokens = set()
+    for part in parts:
+        if not part:
+            continue
+        for token in re.findall(r"[a-z0-9]+", str(part).lower()):
+            if len(token) < 3 or token.isdigit() or token in COMPANION_TOKEN_STOPWORDS:
+                continue
+            tokens.add(token)
+    return tokens
+
+
+def is_merch_identity(category_slug: str, sku: str, slug: str) -> bool:
+    category_slug = (category_slug or "").strip().lower()
+    sku = (sku or "").strip().upper()
+    slug = (slug or "").strip().lower()
+    return category_slug == "merch" or sku.startswith("PF-") or slug.startswith("merch-")
+
+
+@dataclass(frozen=True)
+class CompanionProfile:
+    """
+    What companion scoring needs from a product, computed once per product.
+    """
+
+    pk: int
+    category_id: int | None
+    created_at: Any
+    tokens: frozenset[str]
+    model_ids: frozenset[int]
+
+
+def score_companion(own: CompanionProfile, candidate: CompanionProfile) -> int:
+    return score_companion_overlap(
+        shared_models=len(own.model_ids & candidate.model_ids),
+        shared_tokens=len(own.tokens & candidate.tokens),
+        same_category=candidate.category_id == own.category_id,
+        own_has_models=bool(own.model_ids),
+        candidate_has_models=bool(candidate.model_ids),
+    )
+
+
+def score_companion_overlap(
+    *,
+    shared_models: int,
+    shared_tokens: int,
+    same_category: bool,
+    own_has_models: bool,
+    candidate_has_models: bool,
+) -> int:
+    score = 0
+    if shared_models:
+        score += 120 + min(shared_models, 3) * 25
+    if same_category:
+        score += 28
+    if shared_tokens:
+        score += min(shared_tokens, 5) * 9
+    if same_category and shared_tokens:
+        score += 12
+    if own_has_models and candidate_has_models and not shared_models:
+        score -= 24
+    return score
+
+
+def rank_companions(
+    own: CompanionProfile,
+    candidates: Iterable[CompanionProfile],
+    limit: int,
+) -> list[tuple[int, int]]:
+    """
+    (pk, score) pairs for the best companions of `own` among `candidates`, which are
+    expected newest first, active and without merch.
+    """
+    candidates = [candidate for candidate in candidates if candidate.pk != own.pk]
+    scored = []
+    for candidate in candidates:
+        value = score_companion(own, candidate)
+        if value > 0:
+            scored.append((value, candidate.created_at, candidate.pk))
+    return order_companions(
+        own,
+        scored,
+        limit,
+        fallback_pools=(
+            [candidate for candidate in candidates if candidate.category_id == own.category_id],
+            [candidate for candidate in candidates if candidate.category_id != own.category_id],
+        ),
+    )
+
+
+def order_companions(
+    own: CompanionProfile,
+    scored: Iterable[tuple[int, Any, int]],
+    limit: int,
+    *,
+    fallback_pools: Sequence[Iterable[CompanionProfile]],
+) -> list[tuple[int, int]]:
+    """
+    Pick the final companions from positive (score, recency, pk) entries, where a
+    larger recency value means a newer product. Highest score wins, then the newest;
+    remaining slots come from the fallback pools (newest first) in order.
+    """
+    ordered: list[tuple[int, int]] = []
+    seen_ids = {own.pk}
+    for value, _, pk in heapq.nlargest(limit, scored):
+        if pk in seen_ids:
+            continue
+        ordered.append((pk, value))
+        seen_ids.add(pk)
+
+    for pool in fallback_pools:
+        for candidate in pool:
+            if len(ordered) >= limit:
+                return ordered
+            if candidate.pk in seen_ids:
+                continue
+            ordered.append((candidate.pk, score_companion(own, candidate)))
+            seen_ids.add(candidate.pk)
+    return ordered[:limit]
+
+
 # ─────────────────────────── Catalog: car directories ───────────────────────────
 
 class CarMake(models.Model):
@@ -72,6 +206,84 @@ class CarModel(models.Model):
         return f"{self.make} {self.name}{(' ' + yr) if yr else ''}"
 
 
+# ─────────────────────────── Store: settings snapshot ───────────────────────────
+
+STORE_SETTINGS_VERSION_CACHE_KEY = "bgm:store_settings:version"
+_store_settings_lock = threading.Lock()
+_store_settings_snapshot: dict[str, Any] = {
+    "version": None,
+    "loaded_at": 0.0,
+    "checked_at": 0.0,
+    "records": {},
+}
+
+
+def store_settings_version() -> str:
+    """
+    Shared version token for the store settings singletons.
+    Lives in the default cache so every gunicorn worker sees the same value.
+    """
+    try:
+        version = cache.get(STORE_SETTINGS_VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(STORE_SETTINGS_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+            version = cache.get(STORE_SETTINGS_VERSION_CACHE_KEY)
+    except Exception:
+        logger.warning("Store settings version lookup failed", exc_info=True)
+        return ""
+    return str(version or "")
+
+
+def reset_store_settings_snapshot() -> None:
+    with _store_settings_lock:
+        _store_settings_snapshot.update(version=None, loaded_at=0.0, checked_at=0.0, records={})
+
+
+def bump_store_settings_version() -> None:
+    """
+    Invalidate the settings snapshot in this process and, through the shared
+    version key, in every other worker on its next version check.
+    """
+    try:
+        cache.set(STORE_SETTINGS_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+    except Exception:
+        logger.warning("Store settings version bump failed", exc_info=True)
+    reset_store_settings_snapshot()
+
+
+def load_store_settings(model_cls):
+    """
+    Process-level snapshot of a settings singleton (pricing/shipping/inventory).
+
+    Price helpers run once per product on listing pages, so the row is loaded once
+    and reused until the shared version changes or the snapshot ages out.
+    STORE_SETTINGS_SNAPSHOT_SECONDS=0 disables the snapshot (used by the test suite).
+    """
+    max_age = int(getattr(settings, "STORE_SETTINGS_SNAPSHOT_SECONDS", 0) or 0)
+    if max_age <= 0:
+        return model_cls.load()
+    check_every = int(getattr(settings, "STORE_SETTINGS_VERSION_CHECK_SECONDS", 5) or 0)
+    label = model_cls._meta.label
+    now = time.monotonic()
+    with _store_settings_lock:
+        snapshot = _store_settings_snapshot
+        expired = now - snapshot["loaded_at"] >= max_age
+        if expired or snapshot["version"] is None or now - snapshot["checked_at"] >= check_every:
+            version = store_settings_version()
+            if expired or version != snapshot["version"]:
+                snapshot.update(version=version, loaded_at=now, records={})
+            snapshot["checked_at"] = now
+        records = snapshot["records"]
+        if label in records:
+            return records[label]
+    record = model_cls.load()
+    with _store_settings_lock:
+        # Only keep the row if no invalidation happened while it was loading.
+        if _store_settings_snapshot["records"] is records:
+            records.setdefault(label, record)
+    return record
+
+
 # ─────────────────────────── Store: pricing settings ───────────────────────────
 
 class StorePricingSettings(models.Model):
@@ -101,9 +313,16 @@ class StorePricingSettings(models.Model):
     def load(cls) -> "StorePricingSettings | None":
         return cls.objects.first()
 
+    @classmethod
+    def cached(cls) -> "StorePricingSettings | None":
+        """
+        Read-only snapshot for hot paths; use load() when the row will be edited.
+        """
+        return load_store_settings(cls)
+
     @classmethod
     def get_multiplier_percent(cls) -> int:
-        obj = cls.load()
+        obj = cls.cached()
         if obj and obj.price_multiplier_percent is not None:
             return int(obj.price_multiplier_percent)
         return 100
@@ -189,9 +408,16 @@ class StoreShippingSettings(models.Model):
     def load(cls) -> "StoreShippingSettings | None":
         return cls.objects.first()
 
+    @classmethod
+    def cached(cls) -> "StoreShippingSettings | None":
+        """
+        Read-only snapshot for hot paths; use load() when the row will be edited.
+        """
+        return load_store_settings(cls)
+
     @classmethod
     def get_free_shipping_threshold_cad(cls) -> Decimal | None:
-        obj = cls.load()
+        obj = cls.cached()
         if not obj:
             return None
         value = obj.free_shipping_threshold_cad
@@ -207,7 +433,7 @@ class StoreShippingSettings(models.Model):
 
     @classmethod
     def get_delivery_cost_under_threshold_cad(cls) -> Decimal | None:
-        obj = cls.load()
+        obj = cls.cached()
         if not obj:
             return None
         value = obj.delivery_cost_under_threshold_cad
@@ -255,9 +481,16 @@ class StoreInventorySettings(models.Model):
     def load(cls) -> "StoreInventorySettings | None":
         return cls.objects.first()
 
+    @classmethod
+    def cached(cls) -> "StoreInventorySettings | None":
+        """
+        Read-only snapshot for hot paths; use load() when the row will be edited.
+        """
+        return load_store_settings(cls)
+
     @classmethod
     def get_low_stock_threshold(cls) -> int:
-        obj = cls.load()
+        obj = cls.cached()
         if obj and obj.low_stock_threshold is not None:
             try:
                 return max(0, int(obj.low_stock_threshold))
@@ -267,7 +500,7 @@ class StoreInventorySettings(models.Model):
 
     @classmethod
     def get_allow_out_of_stock_orders(cls) -> bool:
-        obj = cls.load()
+        obj = cls.cached()
         if obj is None:
             return True
         return bool(obj.allow_out_of_stock_orders)
@@ -275,6 +508,12 @@ class StoreInventorySettings(models.Model):
 
 # ─────────────────────────── Store: categories / products ───────────────────────────
 
+def stored_thumbnail_url(urls, source: str, current: str, width: int, fmt: str = "webp") -> str:
+    if not current or source != current or not isinstance(urls, dict):
+        return ""
+    return str((urls.get(fmt) or {}).get(str(width)) or "")
+
+
 class Category(models.Model):
     name = models.CharField("Name", max_length=120, unique=True)
     slug = models.SlugField("Slug", unique=True)
@@ -356,6 +595,12 @@ class MerchCategory(models.Model):
 
 
 class ImportBatch(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = ("queued", "Queued")
+        RUNNING = ("running", "Running")
+        COMPLETED = ("completed", "Completed")
+        FAILED = ("failed", "Failed")
+
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(
         User,
@@ -376,6 +621,34 @@ class ImportBatch(models.Model):
     created_categories = models.PositiveIntegerField(default=0)
     error_count = models.PositiveIntegerField(default=0)
     rolled_back_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        db_index=True,
+    )
+    upload = models.FileField(
+        upload_to="store/imports/",
+        max_length=255,
+        blank=True,
+        help_text="Uploaded spreadsheet; processed by the process_import_batches worker.",
+    )
+    # The worker dyno cannot read the web dyno's local media, so the upload travels in the
+    # database until the batch finishes.
+    upload_data = models.BinaryField(blank=True, default=b"", editable=False)
+    import_options = models.JSONField(default=dict, blank=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    failure_reason = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last progress write of the running worker; stale running batches are requeued.",
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
@@ -384,6 +657,10 @@ class ImportBatch(models.Model):
         label = self.created_at.strftime("%Y-%m-%d %H:%M")
         return f"Import #{self.pk} — {label}"
 
+    @property
+    def is_finished(self) -> bool:
+        return self.status in {self.Status.COMPLETED, self.Status.FAILED}
+
 
 class CleanupBatch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -407,6 +684,53 @@ class CleanupBatch(models.Model):
         return f"Cleanup #{self.pk} — {label}"
 
 
+class RemoteImageCheckRecord(models.Model):
+    """
+    Last known result of checking a supplier image URL, shared by the image
+    importers through store.remote_image_checks. Rows older than the TTL are
+    revalidated with If-None-Match / If-Modified-Since.
+    """
+
+    url_hash = models.CharField(max_length=64, unique=True)
+    url = models.TextField()
+    ok = models.BooleanField(default=False)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    content_type = models.CharField(max_length=120, blank=True)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    checked_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["-checked_at"]
+
+    def __str__(self):
+        return f"{'ok' if self.ok else self.error or 'broken'} — {self.url}"
+
+
+class RemoteImageContent(models.Model):
+    """
+    Content-addressed file an importer saved for a remote image URL (store.image_store).
+    Lets later imports under the same storage prefix skip downloading the URL.
+    """
+
+    url_hash = models.CharField(max_length=64)
+    url = models.TextField()
+    prefix = models.CharField(max_length=200)
+    digest = models.CharField(max_length=64, db_index=True)
+    storage_name = models.CharField(max_length=255)
+    size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["url_hash", "prefix"], name="store_remoteimagecontent_url_prefix_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.url} -> {self.storage_name}"
+
+
 class Product(models.Model):
     name = models.CharField(max_length=180)
     slug = models.SlugField(max_length=200, unique=True, blank=True)
@@ -472,6 +796,13 @@ class Product(models.Model):
         default="",
         help_text="Optional external identifier mirrored from Printful.",
     )
+    printful_sync_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Hash of the normalized Printful product and variants from the last sync.",
+    )
     currency = models.CharField(max_length=3, default=settings.DEFAULT_CURRENCY_CODE)
     inventory = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
@@ -493,6 +824,10 @@ class Product(models.Model):
     # media
     # Stores either a local path or a remote http(s) URL (see main_image_url).
     main_image = models.ImageField(upload_to="store/products/", blank=True, null=True, max_length=2048)
+    # Pre-rendered {format: {width: url}} for local main images (store.thumbnails);
+    # only valid while thumbnail_source equals the current main_image name.
+    thumbnail_urls = models.JSONField(default=dict, blank=True, editable=False)
+    thumbnail_source = models.CharField(max_length=2048, blank=True, default="", editable=False)
 
     # attributes
     specs = models.JSONField(default=dict, blank=True)
@@ -541,6 +876,30 @@ class Product(models.Model):
     short_description = models.CharField(max_length=240, blank=True)
     description = models.TextField(blank=True)
 
+    # storefront sorting (denormalized, maintained by store.storefront_index)
+    effective_public_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Public price after options, discounts and the multiplier. Used for SQL price sorting.",
+    )
+    effective_sort_rank = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Position in the featured storefront order (category interleave). Empty when hidden.",
+    )
+    # weighted full-text document (name > sku > category > description), maintained by store.search
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    companions_checked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When store.companions last ranked this product. Empty queues it for the next rebuild.",
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -550,11 +909,31 @@ class Product(models.Model):
             models.Index(fields=["slug"]),
             models.Index(fields=["is_active"]),
             models.Index(fields=["category", "is_active"]),
+            models.Index(fields=["is_active", "is_in_house", "effective_sort_rank"]),
+            models.Index(fields=["is_active", "is_in_house", "effective_public_price"]),
+            GinIndex(fields=["search_vector"], name="store_product_search_gin"),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._storefront_rank_state = instance.storefront_rank_state()
+        return instance
+
+    def storefront_rank_state(self):
+        """
+        Fields that decide the featured storefront position; compared on save so the
+        rank is only marked stale when one of them changed. None when any are deferred.
+        """
+        values = self.__dict__
+        keys = ("is_active", "is_in_house", "category_id", "sku", "slug")
+        if any(key not in values for key in keys):
+            return None
+        return tuple(values[key] for key in keys)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
@@ -630,6 +1009,12 @@ class Product(models.Model):
         name = self.main_image_name
         return name.startswith(("http://", "https://"))
 
+    def thumbnail_url(self, width: int, fmt: str = "webp") -> str:
+        """
+        Pre-rendered thumbnail URL for the current main image, "" when none exists.
+        """
+        return stored_thumbnail_url(self.thumbnail_urls, self.thumbnail_source, self.main_image_name, width, fmt)
+
     @property
     def main_image_local(self):
         """
@@ -676,30 +1061,21 @@ class Product(models.Model):
     @property
     def is_merch_product(self) -> bool:
         try:
-            category_slug = (getattr(getattr(self, "category", None), "slug", "") or "").strip().lower()
-            sku = (getattr(self, "sku", "") or "").strip().upper()
-            slug = (getattr(self, "slug", "") or "").strip().lower()
+            category_slug = getattr(getattr(self, "category", None), "slug", "") or ""
+            sku = getattr(self, "sku", "") or ""
+            slug = getattr(self, "slug", "") or ""
         except Exception:
             return False
-        return category_slug == "merch" or sku.startswith("PF-") or slug.startswith("merch-")
+        return is_merch_identity(category_slug, sku, slug)
 
     def _companion_match_tokens(self) -> set[str]:
-        parts = [
+        return companion_match_tokens(
             self.name,
             self.short_description,
             self.description,
             self.compatibility,
             getattr(getattr(self, "category", None), "name", ""),
-        ]
-        tokens = set()
-        for part in parts:
-            if not part:
-                continue
-            for token in re.findall(r"[a-z0-9]+", str(part).lower()):
-                if len(token) < 3 or token.isdigit() or token in COMPANION_TOKEN_STOPWORDS:
-                    continue
-                tokens.add(token)
-        return tokens
+        )
 
     def _companion_model_ids(self) -> set[int]:
         cache = getattr(self, "_prefetched_objects_cache", {})
@@ -707,78 +1083,68 @@ class Product(models.Model):
             return {obj.id for obj in cache["compatible_models"]}
         return set(self.compatible_models.values_list("id", flat=True))
 
+    def companion_profile(self) -> CompanionProfile:
+        return CompanionProfile(
+            pk=self.pk,
+            category_id=self.category_id,
+            created_at=self.created_at,
+            tokens=frozenset(self._companion_match_tokens()),
+            model_ids=frozenset(self._companion_model_ids()),
+        )
+
     def get_companion_items(self, limit: int = 3):
         """
-        Picks companion items using compatibility overlap and lightweight text/category scoring.
+        Companion items precomputed in ProductCompanion (see store.companions).
+        Products the cron has not ranked yet get the newest items from their own category;
+        products ranked with no companions get none. Never scores the catalog inline.
         """
         if limit <= 0 or self.is_merch_product:
             return []
-        candidates = list(
-            Product.objects.filter(is_active=True)
+        rows = list(
+            ProductCompanion.objects.filter(product=self)
+            .select_related("companion__category")
+            .order_by("rank")[:COMPANION_ROWS_PER_PRODUCT]
+        )
+        if rows:
+            return [row.companion for row in rows if row.companion.is_active][:limit]
+        if self.companions_checked_at is not None or not self.category_id:
+            return []
+        # Same-category fallback until the next rebuild_product_companions run.
+        neighbours = (
+            Product.objects.filter(is_active=True, category_id=self.category_id)
             .exclude(pk=self.pk)
             .select_related("category")
-            .prefetch_related("compatible_models")
-            .order_by("-created_at", "-id")
+            .order_by("-created_at", "-id")[: COMPANION_ROWS_PER_PRODUCT * 2]
         )
+        return [item for item in neighbours if not item.is_merch_product][:limit]
+
+    def compute_companion_items(self, limit: int = 3):
+        """
+        Picks companion items using compatibility overlap and lightweight text/category scoring.
+        Loads the whole active catalog; request paths should use get_companion_items().
+        """
+        if limit <= 0 or self.is_merch_product:
+            return []
+        candidates = [
+            candidate
+            for candidate in (
+                Product.objects.filter(is_active=True)
+                .exclude(pk=self.pk)
+                .select_related("category")
+                .prefetch_related("compatible_models")
+                .order_by("-created_at", "-id")
+            )
+            if not candidate.is_merch_product
+        ]
         if not candidates:
             return []
-
-        own_tokens = self._companion_match_tokens()
-        own_model_ids = self._companion_model_ids()
-        own_category_id = self.category_id
-        scored: list[tuple[int, Any, int, Product]] = []
-        same_category_fallback: list[Product] = []
-        catalog_fallback: list[Product] = []
-
-        for candidate in candidates:
-            if candidate.is_merch_product:
-                continue
-            if candidate.category_id == own_category_id:
-                same_category_fallback.append(candidate)
-            else:
-                catalog_fallback.append(candidate)
-
-            candidate_model_ids = candidate._companion_model_ids()
-            shared_models = len(own_model_ids & candidate_model_ids)
-            shared_tokens = len(own_tokens & candidate._companion_match_tokens())
-            same_category = candidate.category_id == own_category_id
-
-            score = 0
-            if shared_models:
-                score += 120 + min(shared_models, 3) * 25
-            if same_category:
-                score += 28
-            if shared_tokens:
-                score += min(shared_tokens, 5) * 9
-            if same_category and shared_tokens:
-                score += 12
-            if own_model_ids and candidate_model_ids and not shared_models:
-                score -= 24
-
-            if score > 0:
-                scored.append((score, candidate.created_at, candidate.pk, candidate))
-
-        scored.sort(key=lambda item: (item[0], item[1], item[2]), reverse=True)
-        ordered: list[Product] = []
-        seen_ids: set[int] = set()
-
-        for _, _, _, candidate in scored:
-            if candidate.pk in seen_ids:
-                continue
-            ordered.append(candidate)
-            seen_ids.add(candidate.pk)
-            if len(ordered) >= limit:
-                return ordered
-
-        for pool in (same_category_fallback, catalog_fallback):
-            for candidate in pool:
-                if candidate.pk in seen_ids:
-                    continue
-                ordered.append(candidate)
-                seen_ids.add(candidate.pk)
-                if len(ordered) >= limit:
-                    return ordered
-        return ordered
+        by_pk = {candidate.pk: candidate for candidate in candidates}
+        ranked = rank_companions(
+            self.companion_profile(),
+            [candidate.companion_profile() for candidate in candidates],
+            limit,
+        )
+        return [by_pk[pk] for pk, _score in ranked]
 
     def get_active_discount(self, today=None):
         today = today or timezone.now().date()
@@ -921,6 +1287,83 @@ class Product(models.Model):
         return False
 
 
+
+class ProductCompanion(models.Model):
+    """
+    Precomputed "goes along with" items for a product, rebuilt by store.companions.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="companion_rows")
+    companion = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="companion_of_rows")
+    score = models.IntegerField(default=0)
+    rank = models.PositiveSmallIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["product", "rank"]
+        constraints = [
+            models.UniqueConstraint(fields=["product", "rank"], name="store_productcompanion_product_rank_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.companion_id} (#{self.rank})"
+
+
+
+class ProductFitmentYear(models.Model):
+    """
+    Flattened fitment: one row per make / model name / model year per product,
+    rebuilt from Product.compatible_models by store.fitment_index. Models without
+    a start year get a single row with an empty year (make/model filters only).
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="fitment_years")
+    make = models.ForeignKey(CarMake, on_delete=models.CASCADE, related_name="+")
+    model_name = models.CharField(max_length=64)
+    year = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "make", "model_name", "year"],
+                name="store_fitmentyear_product_vehicle_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["make", "model_name", "year", "product"], name="store_fitmentyear_vehicle_idx"),
+            models.Index(fields=["year", "product"], name="store_fitmentyear_year_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.make_id} {self.model_name} {self.year or ''}".strip()
+
+
+class SupplierProductMatch(models.Model):
+    """
+    Last result of matching a product against a supplier catalog, reused by
+    store.dirtydiesel_import while neither the product nor the source records change.
+    """
+
+    supplier = models.CharField(max_length=80)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="supplier_matches")
+    product_hash = models.CharField(max_length=64)
+    catalog_hash = models.CharField(max_length=64)
+    confidence = models.CharField(max_length=16)
+    reason = models.CharField(max_length=64)
+    source_key = models.CharField(max_length=160, blank=True)
+    source_hash = models.CharField(max_length=64, blank=True)
+    alternatives = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["supplier", "product"], name="store_suppliermatch_supplier_product_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.supplier}: {self.product_id} -> {self.source_key or self.reason}"
+
+
 class ProductDiscount(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="discounts")
     discount_percent = models.PositiveIntegerField(help_text="Percent of discount")
@@ -1060,10 +1503,17 @@ class ProductImage(models.Model):
     image = models.ImageField(upload_to="store/products/gallery/")
     alt = models.CharField(max_length=140, blank=True)
     sort_order = models.PositiveIntegerField(default=0)
+    thumbnail_urls = models.JSONField(default=dict, blank=True, editable=False)
+    thumbnail_source = models.CharField(max_length=2048, blank=True, default="", editable=False)
 
     class Meta:
         ordering = ["sort_order", "id"]
 
+    def thumbnail_url(self, width: int, fmt: str = "webp") -> str:
+        return stored_thumbnail_url(
+            self.thumbnail_urls, self.thumbnail_source, getattr(self.image, "name", "") or "", width, fmt
+        )
+
 
 # ─────────────────────────── Store: orders ───────────────────────────
 
@@ -1730,6 +2180,14 @@ class OrderItem(models.Model):
             if deduct_qty <= 0:
                 return
             Product.objects.filter(pk=self.product_id).update(inventory=F("inventory") - deduct_qty)
+            # Cached storefront cards only show stock at or below the low-stock threshold
+            # ("Only N left", "Out of stock"); above it a sale changes nothing they display.
+            # The update above skips the catalog signals, so bump by hand when it shows.
+            remaining_qty = available_qty - deduct_qty
+            if remaining_qty <= StoreInventorySettings.get_low_stock_threshold():
+                from store.storefront_index import bump_catalog_version
+
+                transaction.on_commit(bump_catalog_version)
 
     @property
     def subtotal(self) -> Decimal:
@@ -1787,6 +2245,11 @@ class AbandonedCart(models.Model):
 
 
 class PrintfulWebhookEvent(models.Model):
+    class Status(models.TextChoices):
+        PENDING = ("pending", "Pending")
+        PROCESSED = ("processed", "Processed")
+        FAILED = ("failed", "Failed")
+
     event_type = models.CharField(max_length=80, db_index=True)
     event_hash = models.CharField(max_length=64, unique=True)
     order = models.ForeignKey(
@@ -1798,6 +2261,21 @@ class PrintfulWebhookEvent(models.Model):
     )
     payload = models.JSONField(default=dict, blank=True)
     received_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+        help_text="Pending events are applied by the process_printful_webhooks worker.",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Pending events are not picked up before this time (retry backoff / worker lease).",
+    )
+    processed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
 
     class Meta:
         ordering = ["-received_at", "-id"]
@@ -1805,6 +2283,13 @@ class PrintfulWebhookEvent(models.Model):
     def __str__(self) -> str:
         return f"{self.event_type or 'printful'} @ {self.received_at:%Y-%m-%d %H:%M}"
 
+    @property
+    def processing_latency(self):
+        """Time from receipt to being applied by the worker."""
+        if self.processed_at is None or self.received_at is None:
+            return None
+        return self.processed_at - self.received_at
+
 
 # ─────────────────────────── Custom fitment / quote requests ───────────────────────────
 
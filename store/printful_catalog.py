@@ -1,14 +1,57 @@
 from __future__ import annotations
 
+import hashlib
+import json
+from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.utils.text import slugify
 
 from core.services.printful import get_printful_merch_product
 from store.models import Category, MerchCategory, Product, ProductOption
+from store.storefront_index import refresh_after_bulk_write
+from store.thumbnails import queue_thumbnails
 from store.utils_merch import normalize_merch_category
 
+WRITE_BATCH_SIZE = 500
+PRODUCT_SYNC_FIELDS = [
+    "slug",
+    "name",
+    "category",
+    "merch_category",
+    "price",
+    "is_in_house",
+    "printful_product_id",
+    "printful_external_id",
+    "printful_sync_hash",
+    "currency",
+    "inventory",
+    "is_active",
+    "short_description",
+    "description",
+    "contact_for_estimate",
+    "estimate_from_price",
+    "main_image",
+    "updated_at",
+]
+OPTION_SYNC_FIELDS = [
+    "product",
+    "name",
+    "description",
+    "is_separator",
+    "option_column",
+    "price",
+    "is_active",
+    "sort_order",
+    "printful_sync_variant_id",
+    "printful_variant_id",
+    "printful_external_id",
+]
+
 
 def printful_merch_limit_setting(default: int = 8) -> int:
     raw = getattr(settings, "PRINTFUL_MERCH_LIMIT", default)
@@ -75,76 +118,233 @@ def _dedupe_option_name(name: str, *, index: int, used: set[str]) -> str:
         attempt += 1
 
 
-def sync_printful_options_for_product(product: Product, variants: list[dict]) -> int | None:
-    if not variants:
-        ProductOption.objects.filter(product=product).update(is_active=False)
-        return None
+def _parse_printful_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
 
+
+def _plan_printful_options(product_sku: str, variants: list[dict]) -> list[dict]:
+    """
+    ProductOption values for each Printful variant, in feed order.
+    """
+    rows: list[dict] = []
     seen_skus: list[str] = []
     used_names: set[str] = set()
-    default_option_id = None
-
     for index, variant in enumerate(variants, start=1):
         raw_sku = str(variant.get("sku") or "").strip()[:64]
-        variant_id = 0
-        try:
-            variant_id = int(variant.get("id") or 0)
-        except (TypeError, ValueError):
-            variant_id = 0
-
-        option_sku = raw_sku or f"{product.sku}-VAR-{variant_id or index}"
+        option_sku = raw_sku or f"{product_sku}-VAR-{_parse_printful_int(variant.get('id')) or index}"
         if option_sku in seen_skus:
             option_sku = f"{option_sku[:56]}-{index}"[:64]
         seen_skus.append(option_sku)
 
-        option_name = _dedupe_option_name(str(variant.get("name") or ""), index=index, used=used_names)
-        option_price = parse_merch_decimal(variant.get("price"))
-        sync_variant_id = 0
-        variant_id = 0
-        try:
-            sync_variant_id = int(variant.get("sync_variant_id") or variant.get("id") or 0)
-        except (TypeError, ValueError):
-            sync_variant_id = 0
-        try:
-            variant_id = int(variant.get("variant_id") or 0)
-        except (TypeError, ValueError):
-            variant_id = 0
-        external_id = (str(variant.get("external_id") or "") or "").strip()[:140]
-
-        option, _ = ProductOption.objects.update_or_create(
-            sku=option_sku,
-            defaults={
-                "product": product,
-                "name": option_name,
-                "description": "",
-                "is_separator": False,
-                "option_column": 1,
-                "price": option_price,
-                "is_active": True,
+        sync_variant_id = _parse_printful_int(variant.get("sync_variant_id") or variant.get("id"))
+        variant_id = _parse_printful_int(variant.get("variant_id"))
+        rows.append(
+            {
+                "sku": option_sku,
+                "name": _dedupe_option_name(str(variant.get("name") or ""), index=index, used=used_names),
+                "price": parse_merch_decimal(variant.get("price")),
                 "sort_order": index,
                 "printful_sync_variant_id": sync_variant_id or None,
                 "printful_variant_id": variant_id or None,
-                "printful_external_id": external_id,
-            },
+                "printful_external_id": (str(variant.get("external_id") or "") or "").strip()[:140],
+            }
         )
-        if default_option_id is None:
-            default_option_id = option.id
+    return rows
+
+
+@dataclass
+class PrintfulItemPlan:
+    sku: str
+    values: dict
+    options: list[dict]
+    label_source: str
+    sync_hash: str
 
-    ProductOption.objects.filter(product=product).exclude(sku__in=seen_skus).update(is_active=False)
-    return default_option_id
+
+def _plan_printful_item(item: dict, *, default_currency: str) -> PrintfulItemPlan | None:
+    product_id = _parse_printful_int(item.get("id"))
+    if product_id <= 0:
+        return None
+
+    name = (str(item.get("name") or "") or f"Merch item {product_id}").strip()[:180]
+    sku = build_printful_product_sku(product_id)
+    variants = [row for row in item.get("variants", []) if isinstance(row, dict)]
+
+    variant_prices = []
+    for variant in variants:
+        price = parse_merch_decimal(variant.get("price"))
+        if price is not None:
+            variant_prices.append(price)
+
+    base_price = parse_merch_decimal(item.get("base_price"))
+    if base_price is None and variant_prices:
+        base_price = min(variant_prices)
+    if base_price is None:
+        base_price = Decimal("0.00")
+
+    currency = (str(item.get("currency") or "") or default_currency).strip().upper() or default_currency
+    values = {
+        "slug": build_printful_product_slug(product_id, name),
+        "name": name,
+        "price": base_price,
+        "is_in_house": True,
+        "printful_product_id": product_id,
+        "printful_external_id": (str(item.get("external_id") or "") or "").strip()[:140],
+        "currency": currency,
+        "inventory": 9999,
+        # Printful catalog visibility is the source of truth for synced merch.
+        "is_active": True,
+        "short_description": "Fulfilled by Printful.",
+        "description": f"Printful product #{product_id}",
+        "contact_for_estimate": False,
+        "estimate_from_price": None,
+        "main_image": (str(item.get("image_url") or "") or "").strip(),
+    }
+    options = _plan_printful_options(sku, variants)
+    label_source = (item.get("category_label") or item.get("name") or "").strip()
+    payload = json.dumps(
+        {"product": values, "options": options, "label": label_source},
+        sort_keys=True,
+        default=str,
+    )
+    return PrintfulItemPlan(
+        sku=sku,
+        values=values,
+        options=options,
+        label_source=label_source,
+        sync_hash=hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+    )
 
 
-def sync_printful_merch_products(products: list[dict]) -> None:
+def _product_matches_plan(product: Product, plan: PrintfulItemPlan) -> bool:
+    """
+    True when the product still holds every value the sync would write; edits
+    made in the admin since the last sync make it differ and are overwritten.
+    """
+    for field, value in plan.values.items():
+        current = product.main_image_name if field == "main_image" else getattr(product, field)
+        if current != value:
+            return False
+    return True
+
+
+def _planned_option_values(row: dict, product_id: int) -> dict:
+    return {
+        **row,
+        "product_id": product_id,
+        "description": "",
+        "is_separator": False,
+        "option_column": 1,
+        "is_active": True,
+    }
+
+
+def _options_match_plan(options: list[ProductOption], product_id: int, plan: PrintfulItemPlan) -> bool:
+    """
+    True when the product's options are exactly the planned variants with their
+    synced values; options edited, deactivated or added outside the sync differ.
+    """
+    by_sku = {option.sku: option for option in options}
+    for row in plan.options:
+        option = by_sku.get(row["sku"])
+        if option is None:
+            return False
+        if any(getattr(option, field) != value for field, value in _planned_option_values(row, product_id).items()):
+            return False
+    planned_skus = {row["sku"] for row in plan.options}
+    return not any(option.is_active and option.sku not in planned_skus for option in options)
+
+
+def sync_printful_merch_products(products: list[dict]) -> dict[str, int]:
+    """
+    Mirror Printful merch items onto store products and options. Items whose
+    normalized payload hash matches the stored printful_sync_hash, and whose
+    product and options still hold the synced values in the merch category, are
+    skipped; the rest are written with bulk operations. Returns per-item counts.
+    """
+    summary = {
+        "created": 0,
+        "updated": 0,
+        "skipped": 0,
+        "deactivated": 0,
+        "options_created": 0,
+        "options_updated": 0,
+        "options_deactivated": 0,
+    }
     if not products:
-        return
+        return summary
 
     category = _get_or_create_merch_category()
     sync_full_catalog = printful_merch_limit_setting() == 0
     default_currency = (getattr(settings, "DEFAULT_CURRENCY_CODE", "CAD") or "CAD").upper()
+
+    plans: dict[str, PrintfulItemPlan] = {}
+    for item in products:
+        plan = _plan_printful_item(item, default_currency=default_currency)
+        if plan is not None:
+            # A repeated item is applied once, with its last payload.
+            plans.pop(plan.sku, None)
+            plans[plan.sku] = plan
+
+    existing = {product.sku: product for product in Product.objects.filter(sku__in=list(plans))}
+    changed: list[PrintfulItemPlan] = []
+    unchanged: dict[int, PrintfulItemPlan] = {}
+    for plan in plans.values():
+        product = existing.get(plan.sku)
+        if (
+            product is not None
+            and product.printful_sync_hash == plan.sync_hash
+            and product.category_id == category.pk
+            and _product_matches_plan(product, plan)
+        ):
+            unchanged[product.pk] = plan
+            continue
+        changed.append(plan)
+
+    options_by_product: dict[int, list[ProductOption]] = {pk: [] for pk in unchanged}
+    for option in ProductOption.objects.filter(product_id__in=list(unchanged)):
+        options_by_product[option.product_id].append(option)
+    for product_id, plan in unchanged.items():
+        if _options_match_plan(options_by_product[product_id], product_id, plan):
+            summary["skipped"] += 1
+        else:
+            changed.append(plan)
+    # Keep feed order: an option SKU claimed by several items ends up on the last one.
+    changed_skus = {plan.sku for plan in changed}
+    changed = [plan for plan in plans.values() if plan.sku in changed_skus]
+
+    touched: set[int] = set()
+    with transaction.atomic():
+        if changed:
+            products_by_sku = _write_printful_products(changed, existing, category=category, summary=summary)
+            _write_printful_options(changed, products_by_sku, summary=summary)
+            touched.update(product.pk for product in products_by_sku.values())
+
+        if sync_full_catalog and plans:
+            removed = Product.objects.filter(sku__startswith="PF-", is_active=True).exclude(sku__in=list(plans))
+            removed_ids = set(removed.values_list("pk", flat=True))
+            if removed_ids:
+                summary["deactivated"] = Product.objects.filter(pk__in=removed_ids).update(is_active=False)
+                touched.update(removed_ids)
+
+        if touched:
+            refresh_after_bulk_write(touched)
+    return summary
+
+
+def _write_printful_products(
+    plans: list[PrintfulItemPlan],
+    existing: dict[str, Product],
+    *,
+    category: Category,
+    summary: dict[str, int],
+) -> dict[str, Product]:
     merch_categories = list(MerchCategory.objects.all())
     merch_by_slug = {(cat.slug or "").strip().lower(): cat for cat in merch_categories if cat.slug}
     merch_by_name = {(cat.name or "").strip().lower(): cat for cat in merch_categories if cat.name}
-    synced_skus: set[str] = set()
 
     def _resolve_merch_category(label_source: str) -> MerchCategory | None:
         source = (label_source or "").strip()
@@ -155,9 +355,9 @@ def sync_printful_merch_products(products: list[dict]) -> None:
             return None
         key = (category_key or "").strip().lower()
         name_key = category_label.strip().lower()
-        existing = merch_by_slug.get(key) or merch_by_name.get(name_key)
-        if existing:
-            return existing
+        found = merch_by_slug.get(key) or merch_by_name.get(name_key)
+        if found:
+            return found
         created = MerchCategory.objects.create(
             name=category_label,
             slug=category_key or slugify(category_label)[:140],
@@ -167,65 +367,77 @@ def sync_printful_merch_products(products: list[dict]) -> None:
         merch_by_name[(created.name or "").strip().lower()] = created
         return created
 
-    for item in products:
-        try:
-            product_id = int(item.get("id") or 0)
-        except (TypeError, ValueError):
-            product_id = 0
-        if product_id <= 0:
+    now = timezone.now()
+    to_create: list[Product] = []
+    to_update: list[Product] = []
+    for plan in plans:
+        product = existing.get(plan.sku)
+        values = {**plan.values, "category": category, "printful_sync_hash": plan.sync_hash}
+        if product is None or not product.merch_category_id:
+            merch_category = _resolve_merch_category(plan.label_source)
+            if merch_category:
+                values["merch_category"] = merch_category
+        if product is None:
+            to_create.append(Product(sku=plan.sku, **values))
             continue
-
-        name = (str(item.get("name") or "") or f"Merch item {product_id}").strip()[:180]
-        sku = build_printful_product_sku(product_id)
-        synced_skus.add(sku)
-        slug = build_printful_product_slug(product_id, name)
-        variants = [row for row in item.get("variants", []) if isinstance(row, dict)]
-
-        variant_prices = []
-        for variant in variants:
-            price = parse_merch_decimal(variant.get("price"))
-            if price is not None:
-                variant_prices.append(price)
-
-        base_price = parse_merch_decimal(item.get("base_price"))
-        if base_price is None and variant_prices:
-            base_price = min(variant_prices)
-        if base_price is None:
-            base_price = Decimal("0.00")
-
-        currency = (str(item.get("currency") or "") or default_currency).strip().upper() or default_currency
-        image_url = (str(item.get("image_url") or "") or "").strip()
-        external_id = (str(item.get("external_id") or "") or "").strip()[:140]
-        existing = Product.objects.filter(sku=sku).only("id", "is_active", "merch_category_id").first()
-        merch_category = None
-        if existing is None or not existing.merch_category_id:
-            label_source = (item.get("category_label") or item.get("name") or "").strip()
-            merch_category = _resolve_merch_category(label_source)
-        defaults = {
-            "slug": slug,
-            "name": name,
-            "category": category,
-            "price": base_price,
-            "is_in_house": True,
-            "printful_product_id": product_id,
-            "printful_external_id": external_id,
-            "currency": currency,
-            "inventory": 9999,
-            # Printful catalog visibility is the source of truth for synced merch.
-            "is_active": True,
-            "short_description": "Fulfilled by Printful.",
-            "description": f"Printful product #{product_id}",
-            "contact_for_estimate": False,
-            "estimate_from_price": None,
-            "main_image": image_url,
-        }
-        if merch_category:
-            defaults["merch_category"] = merch_category
-        product, _ = Product.objects.update_or_create(sku=sku, defaults=defaults)
-        sync_printful_options_for_product(product, variants)
-
-    if sync_full_catalog and synced_skus:
-        Product.objects.filter(sku__startswith="PF-", is_active=True).exclude(sku__in=synced_skus).update(is_active=False)
+        for field, value in values.items():
+            setattr(product, field, value)
+        product.updated_at = now
+        to_update.append(product)
+
+    Product.objects.bulk_create(to_create, batch_size=WRITE_BATCH_SIZE)
+    Product.objects.bulk_update(to_update, PRODUCT_SYNC_FIELDS, batch_size=WRITE_BATCH_SIZE)
+    summary["created"] += len(to_create)
+    summary["updated"] += len(to_update)
+
+    written = to_create + to_update
+    stale_thumbnails = [product.pk for product in written if product.thumbnail_source != product.main_image_name]
+    if stale_thumbnails:
+        queue_thumbnails(product_ids=stale_thumbnails)
+    return {product.sku: product for product in written}
+
+
+def _write_printful_options(
+    plans: list[PrintfulItemPlan],
+    products_by_sku: dict[str, Product],
+    *,
+    summary: dict[str, int],
+) -> None:
+    product_ids = [product.pk for product in products_by_sku.values()]
+    claimed_skus = {row["sku"] for plan in plans for row in plan.options}
+    current = list(ProductOption.objects.filter(Q(product_id__in=product_ids) | Q(sku__in=claimed_skus)))
+    by_sku = {option.sku: option for option in current if option.sku}
+
+    to_create: list[ProductOption] = []
+    to_update: dict[int, ProductOption] = {}
+    for plan in plans:
+        product = products_by_sku[plan.sku]
+        for row in plan.options:
+            values = _planned_option_values(row, product.pk)
+            option = by_sku.get(row["sku"])
+            if option is None:
+                option = ProductOption(**values)
+                by_sku[option.sku] = option
+                to_create.append(option)
+            elif any(getattr(option, field) != value for field, value in values.items()):
+                # An option SKU claimed by several items ends up on the last one, as before.
+                for field, value in values.items():
+                    setattr(option, field, value)
+                if option.pk is not None:
+                    to_update[option.pk] = option
+    summary["options_created"] += len(to_create)
+    summary["options_updated"] += len(to_update)
+
+    # Options of the synced products that no variant claims any more.
+    synced_product_ids = set(product_ids)
+    for option in current:
+        if option.product_id in synced_product_ids and option.sku not in claimed_skus and option.is_active:
+            option.is_active = False
+            to_update[option.pk] = option
+            summary["options_deactivated"] += 1
+
+    ProductOption.objects.bulk_create(to_create, batch_size=WRITE_BATCH_SIZE)
+    ProductOption.objects.bulk_update(list(to_update.values()), OPTION_SYNC_FIELDS, batch_size=WRITE_BATCH_SIZE)
 
 
 def sync_printful_merch_product(product_id: int) -> Product | None:
@@ -3,10 +3,14 @@ from __future__ import annotations
 import hashlib
 import json
 import logging
+from collections import Counter
+from datetime import timedelta
 from decimal import Decimal
 from typing import Any
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
 from django.urls import reverse
 from django.utils import timezone
 
@@ -24,6 +28,15 @@ from store.printful_catalog import parse_printful_product_id_from_sku, sync_prin
 
 logger = logging.getLogger(__name__)
 
+# Worker passes a webhook event may fail before it is marked failed.
+PRINTFUL_WEBHOOK_MAX_ATTEMPTS = 5
+PRINTFUL_WEBHOOK_BATCH_SIZE = 100
+# A failed event waits RETRY_SECONDS * 2**(attempts - 1) before its next pass (1, 2, 4, 8 min).
+PRINTFUL_WEBHOOK_RETRY_SECONDS = 60
+# Claimed events are leased to the claiming worker for this long; a worker that dies
+# mid-batch leaves them due again once the lease runs out.
+PRINTFUL_WEBHOOK_CLAIM_SECONDS = 600
+
 PRINTFUL_WEBHOOK_TYPES = [
     "package_shipped",
     "package_returned",
@@ -466,6 +479,8 @@ def get_checkout_printful_shipping(
             recipient=recipient,
             items=shipping_items,
             currency=(getattr(settings, "DEFAULT_CURRENCY_CODE", "CAD") or "CAD").upper(),
+            # Placing the order charges the quoted rate, so it never rides on a stale quote.
+            allow_stale=not require_complete,
         )
     except PrintfulAPIError as exc:
         logger.warning("Printful shipping-rate lookup failed: %s", exc)
@@ -517,6 +532,76 @@ def get_checkout_printful_shipping(
     }
 
 
+def prewarm_printful_shipping_quotes(
+    *,
+    recent_orders: int = 500,
+    destinations: int = 10,
+    item_sets: int = 3,
+) -> dict[str, int]:
+    """
+    Quote the most common merch carts to the most common destinations of the
+    last `recent_orders` merch orders, so checkout finds them in the shared
+    cache. Destinations are grouped the way the quote cache keys them; quotes
+    that are still fresh are not fetched again.
+    """
+    prefix_length = int(getattr(settings, "PRINTFUL_SHIPPING_QUOTE_POSTAL_PREFIX", 3) or 0)
+    destination_counts: Counter = Counter()
+    samples: dict[tuple[str, str, str], dict[str, str]] = {}
+    cart_counts: Counter = Counter()
+
+    orders = (
+        Order.objects.filter(items__option__printful_variant_id__isnull=False)
+        .exclude(status=Order.STATUS_CANCELLED)
+        .distinct()
+        .order_by("-pk")
+        .prefetch_related("items__option")[:recent_orders]
+    )
+    for order in orders:
+        quantities: Counter = Counter()
+        for order_item in order.items.all():
+            variant_id = getattr(order_item.option, "printful_variant_id", None)
+            if variant_id:
+                quantities[int(variant_id)] += int(order_item.qty or 1)
+        if quantities:
+            cart_counts[tuple(sorted(quantities.items()))] += 1
+
+        country_code = normalize_country_code(order.country)
+        postal_code = normalize_postal_code(order.postal_code)
+        if not country_code or not postal_code:
+            continue
+        region_code = normalize_region_code(country_code, order.region)
+        compact_postal = postal_code.replace(" ", "")
+        destination = (country_code, region_code, compact_postal[:prefix_length] if prefix_length else compact_postal)
+        destination_counts[destination] += 1
+        # Orders are newest first; the newest address stands in for its prefix.
+        samples.setdefault(
+            destination,
+            {"city": order.city.strip(), "state_code": region_code, "country_code": country_code, "zip": postal_code},
+        )
+
+    stats = {"destinations": 0, "carts": 0, "quoted": 0, "failed": 0}
+    top_carts = [cart for cart, _count in cart_counts.most_common(item_sets)]
+    top_destinations = [destination for destination, _count in destination_counts.most_common(destinations)]
+    stats["destinations"] = len(top_destinations)
+    stats["carts"] = len(top_carts)
+    currency = (getattr(settings, "DEFAULT_CURRENCY_CODE", "CAD") or "CAD").upper()
+    for destination in top_destinations:
+        for cart in top_carts:
+            try:
+                quote_printful_shipping_rates(
+                    recipient=samples[destination],
+                    items=[{"variant_id": variant_id, "quantity": qty} for variant_id, qty in cart],
+                    currency=currency,
+                    allow_stale=False,
+                )
+            except PrintfulAPIError as exc:
+                logger.warning("Printful shipping-quote prewarm failed for %s: %s", destination, exc)
+                stats["failed"] += 1
+                continue
+            stats["quoted"] += 1
+    return stats
+
+
 def build_printful_external_id(order: Order) -> str:
     existing = (order.printful_external_id or "").strip()
     if existing:
@@ -846,7 +931,12 @@ def _extract_order_refs_from_webhook(payload: dict[str, Any]) -> tuple[int, str]
     return 0, ""
 
 
-def record_printful_webhook(payload: dict[str, Any]) -> tuple[PrintfulWebhookEvent, Order | None]:
+def record_printful_webhook(payload: dict[str, Any]) -> tuple[PrintfulWebhookEvent, bool]:
+    """
+    Store a webhook delivery as a pending event and return (event, created).
+    Redeliveries of the same payload hit the hash and are dropped; the order sync
+    itself runs later in process_printful_webhook_events.
+    """
     serialized = json.dumps(payload, sort_keys=True, default=str)
     event_hash = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
     event_type = (
@@ -856,42 +946,204 @@ def record_printful_webhook(payload: dict[str, Any]) -> tuple[PrintfulWebhookEve
         or payload.get("name")
         or "printful"
     )
-
-    printful_order_id, external_id = _extract_order_refs_from_webhook(payload)
-    order = None
-    if printful_order_id:
-        order = Order.objects.filter(printful_order_id=printful_order_id).first()
-    if order is None and external_id:
-        order = Order.objects.filter(printful_external_id=external_id).first()
-
-    event, created = PrintfulWebhookEvent.objects.get_or_create(
+    return PrintfulWebhookEvent.objects.get_or_create(
         event_hash=event_hash,
         defaults={
             "event_type": str(event_type)[:80],
-            "order": order,
             "payload": payload,
+            "status": PrintfulWebhookEvent.Status.PENDING,
         },
     )
-    if not created:
-        return event, order
 
-    try:
-        live_payload = {}
-        if printful_order_id:
-            live_payload = get_printful_order(printful_order_id)
-        elif order and order.printful_order_id:
-            live_payload = get_printful_order(order.printful_order_id)
-        if order and live_payload:
-            order = sync_order_from_printful_payload(order, live_payload)
-        if order and (not live_payload or not order.tracking_entries) and _extract_tracking_entries(payload):
-            order = sync_order_from_printful_payload(order, payload)
-    except Exception:
-        logger.exception("Failed to sync local order from Printful webhook payload")
 
-    if order and event.order_id != order.id:
-        event.order = order
-        event.save(update_fields=["order"])
-    return event, order
+def _resolve_webhook_orders(events: list[PrintfulWebhookEvent]) -> dict[int, tuple[Order | None, int]]:
+    """Local order and Printful order id for each event, with two order queries per batch."""
+    refs = {event.pk: _extract_order_refs_from_webhook(event.payload or {}) for event in events}
+    printful_ids = {printful_order_id for printful_order_id, _ in refs.values() if printful_order_id}
+    external_ids = {external_id for _, external_id in refs.values() if external_id}
+
+    by_printful_id: dict[int, Order] = {}
+    for order in Order.objects.filter(printful_order_id__in=printful_ids).order_by("pk"):
+        by_printful_id.setdefault(order.printful_order_id, order)
+    by_external_id: dict[str, Order] = {}
+    for order in Order.objects.filter(printful_external_id__in=external_ids).order_by("pk"):
+        by_external_id.setdefault(order.printful_external_id, order)
+
+    resolved: dict[int, tuple[Order | None, int]] = {}
+    for event in events:
+        printful_order_id, external_id = refs[event.pk]
+        order = by_printful_id.get(printful_order_id) if printful_order_id else None
+        if order is None and external_id:
+            order = by_external_id.get(external_id)
+        resolved[event.pk] = (order, printful_order_id)
+    return resolved
+
+
+def _sync_order_from_webhook_events(
+    order: Order, events: list[PrintfulWebhookEvent], live_payload: dict[str, Any]
+) -> None:
+    """
+    Apply a run of webhook events for one order from a single live order payload.
+    Falls back to the newest tracking data carried by the events themselves.
+    """
+    if live_payload:
+        order = sync_order_from_printful_payload(order, live_payload)
+    if not live_payload or not order.tracking_entries:
+        tracked_payload = next(
+            (event.payload for event in reversed(events) if _extract_tracking_entries(event.payload or {})),
+            None,
+        )
+        if tracked_payload:
+            sync_order_from_printful_payload(order, tracked_payload)
+
+
+def _apply_claimed_webhook_events(
+    events: list[PrintfulWebhookEvent],
+    resolved: dict[int, tuple[Order | None, int]],
+    stats: dict[str, Any],
+) -> None:
+    groups: dict[Any, list[PrintfulWebhookEvent]] = {}
+    for event in events:
+        order, _ = resolved[event.pk]
+        # Events with no local order have nothing to sync; each forms its own group.
+        groups.setdefault(order.pk if order else ("event", event.pk), []).append(event)
+
+    # Claimed events are ordered by pk, so groups run in order of their oldest event.
+    for group in groups.values():
+        order = resolved[group[0].pk][0]
+        printful_order_id = next(
+            (resolved[event.pk][1] for event in reversed(group) if resolved[event.pk][1]),
+            0,
+        )
+        error = ""
+        try:
+            if order is not None:
+                stats["orders"] += 1
+                fetch_id = printful_order_id or order.printful_order_id or 0
+                live_payload = {}
+                if fetch_id:
+                    # The live fetch runs outside any transaction; only the local writes are atomic.
+                    live_payload = get_printful_order(fetch_id)
+                    stats["fetches"] += 1
+                with transaction.atomic():
+                    _sync_order_from_webhook_events(order, group, live_payload)
+        except Exception as exc:
+            logger.exception("Failed to sync local order from Printful webhook events %s", [event.pk for event in group])
+            error = str(exc)[:2000] or type(exc).__name__
+
+        now = timezone.now()
+        event_ids = [event.pk for event in group]
+        if error:
+            retry_after: dict[int, list[int]] = {}
+            exhausted = []
+            for event in group:
+                attempts = event.attempts + 1
+                if attempts >= PRINTFUL_WEBHOOK_MAX_ATTEMPTS:
+                    exhausted.append(event.pk)
+                else:
+                    retry_after.setdefault(PRINTFUL_WEBHOOK_RETRY_SECONDS * 2 ** (attempts - 1), []).append(event.pk)
+            PrintfulWebhookEvent.objects.filter(pk__in=event_ids).update(
+                order=order, attempts=F("attempts") + 1, last_error=error
+            )
+            for delay, pks in retry_after.items():
+                PrintfulWebhookEvent.objects.filter(pk__in=pks).update(next_attempt_at=now + timedelta(seconds=delay))
+            PrintfulWebhookEvent.objects.filter(pk__in=exhausted).update(
+                status=PrintfulWebhookEvent.Status.FAILED, processed_at=now, next_attempt_at=None
+            )
+            stats["failed"] += len(exhausted)
+            stats["retrying"] += len(group) - len(exhausted)
+            continue
+
+        PrintfulWebhookEvent.objects.filter(pk__in=event_ids).update(
+            order=order,
+            status=PrintfulWebhookEvent.Status.PROCESSED,
+            attempts=F("attempts") + 1,
+            processed_at=now,
+            next_attempt_at=None,
+            last_error="",
+        )
+        stats["processed"] += len(group)
+        stats["latencies"].extend((now - event.received_at).total_seconds() for event in group)
+
+
+def _claim_webhook_events(size: int) -> tuple[list[PrintfulWebhookEvent], dict[int, tuple[Order | None, int]]]:
+    """
+    Lease the oldest due pending events to this worker and return them with their
+    resolved orders. Row locks are held only for the claim; the lease keeps other
+    workers (and later batches of this call) away while the events are applied.
+    Events stay in order per order: while an earlier event for the same order is
+    backing off or leased elsewhere, the newer ones are deferred rather than applied.
+    """
+    now = timezone.now()
+    recheck_at = now + timedelta(seconds=PRINTFUL_WEBHOOK_RETRY_SECONDS)
+    lease_until = now + timedelta(seconds=PRINTFUL_WEBHOOK_CLAIM_SECONDS)
+    with transaction.atomic():
+        while True:
+            candidates = list(
+                PrintfulWebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(status=PrintfulWebhookEvent.Status.PENDING)
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+                .order_by("pk")[:size]
+            )
+            if not candidates:
+                return [], {}
+            resolved = _resolve_webhook_orders(candidates)
+            order_ids = {order.pk for order, _ in resolved.values() if order is not None}
+            # Oldest pending event per order that is not due yet (backing off or leased).
+            waiting: dict[int, tuple[int, Any]] = {}
+            for order_id, event_pk, next_attempt_at in (
+                PrintfulWebhookEvent.objects.filter(
+                    status=PrintfulWebhookEvent.Status.PENDING,
+                    order_id__in=order_ids,
+                    next_attempt_at__gt=now,
+                )
+                .order_by("pk")
+                .values_list("order_id", "pk", "next_attempt_at")
+            ):
+                waiting.setdefault(order_id, (event_pk, next_attempt_at))
+
+            events = []
+            for event in candidates:
+                order = resolved[event.pk][0]
+                # Stamped at claim time so later claims see this event waiting on its order.
+                event.order = order
+                blocker = waiting.get(order.pk) if order is not None else None
+                if blocker is not None and blocker[0] < event.pk:
+                    event.next_attempt_at = min(blocker[1], recheck_at)
+                else:
+                    event.next_attempt_at = lease_until
+                    events.append(event)
+            PrintfulWebhookEvent.objects.bulk_update(candidates, ["order", "next_attempt_at"])
+            if events:
+                return events, {event.pk: resolved[event.pk] for event in events}
+
+
+def process_printful_webhook_events(
+    *,
+    limit: int | None = None,
+    batch_size: int = PRINTFUL_WEBHOOK_BATCH_SIZE,
+) -> dict[str, Any]:
+    """
+    Apply due pending webhook events, oldest first and in order per order. Each
+    claimed batch is grouped by local order so a burst of events for one order
+    costs a single live Printful fetch. A failed sync is retried with exponential backoff until
+    PRINTFUL_WEBHOOK_MAX_ATTEMPTS is used up; every event is tried at most once
+    per call.
+    """
+    stats: dict[str, Any] = {"processed": 0, "orders": 0, "fetches": 0, "retrying": 0, "failed": 0, "latencies": []}
+    claimed = 0
+    while limit is None or claimed < limit:
+        size = max(1, batch_size if limit is None else min(batch_size, limit - claimed))
+        events, resolved = _claim_webhook_events(size)
+        if not events:
+            break
+        claimed += len(events)
+        _apply_claimed_webhook_events(events, resolved, stats)
+
+    latencies = stats.pop("latencies")
+    stats["max_latency_seconds"] = max(latencies, default=0.0)
+    stats["avg_latency_seconds"] = sum(latencies) / len(latencies) if latencies else 0.0
+    return stats
 
 
 def handle_order_payment_status_transition(order_id: int) -> None:
@@ -0,0 +1,197 @@
+"""
+Persistent results of supplier image URL checks.
+
+The image importers (import_product_images and the fassride / dirtydiesel /
+Shopify supplier pipelines) check thousands of remote URLs per run.
+RemoteImageCheckCache keeps each outcome in RemoteImageCheckRecord, keyed by a
+hash of the URL, so a URL checked by one run or importer is free for the next.
+Entries older than STORE_IMAGE_CHECK_TTL_SECONDS are stale: callers revalidate
+them with `conditional_headers()` and call `revalidated()` on a 304.
+
+Only definitive outcomes are stored (an image, a 4xx, a non-image response);
+connection errors, 429 and 5xx responses are checked again on the next run.
+An offline cache (the importers' --offline runs) treats every stored entry as fresh.
+The cache is not thread-safe; use it from the thread that owns the DB connection.
+"""
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from store.models import RemoteImageCheckRecord
+
+LOOKUP_CHUNK_SIZE = 500
+TRANSIENT_STATUSES = {408, 425, 429}
+
+
+@dataclass(frozen=True)
+class CachedImageCheck:
+    url: str
+    ok: bool
+    status_code: int = 0
+    content_type: str = ""
+    etag: str = ""
+    last_modified: str = ""
+    error: str = ""
+    checked_at: Optional[datetime] = None
+    fresh: bool = True
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256((url or "").strip().encode("utf-8")).hexdigest()
+
+
+def is_definitive(*, status_code: int, error: str = "") -> bool:
+    """
+    Whether a check outcome is worth remembering across runs.
+    """
+    if not status_code:
+        return not error
+    return status_code < 500 and status_code not in TRANSIENT_STATUSES
+
+
+class RemoteImageCheckCache:
+    def __init__(self, *, ttl_seconds: Optional[int] = None, offline: bool = False):
+        if ttl_seconds is None:
+            ttl_seconds = getattr(settings, "STORE_IMAGE_CHECK_TTL_SECONDS", 0)
+        self.ttl_seconds = max(int(ttl_seconds or 0), 0)
+        self.offline = bool(offline)
+        self._entries: Dict[str, CachedImageCheck] = {}
+        self._looked_up: set[str] = set()
+
+    def get(self, url: str) -> Optional[CachedImageCheck]:
+        url = (url or "").strip()
+        return self.get_many([url]).get(url) if url else None
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, CachedImageCheck]:
+        """
+        Known checks for the given URLs, fresh or stale; URLs never checked are left out.
+        """
+        wanted = [url for url in dict.fromkeys((raw or "").strip() for raw in urls) if url]
+        missing = [url for url in wanted if url not in self._looked_up]
+        if missing:
+            cutoff = self._fresh_cutoff()
+            for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+                chunk = missing[start : start + LOOKUP_CHUNK_SIZE]
+                by_hash = {url_hash(url): url for url in chunk}
+                rows = RemoteImageCheckRecord.objects.filter(url_hash__in=list(by_hash))
+                for row in rows:
+                    url = by_hash[row.url_hash]
+                    self._entries[url] = CachedImageCheck(
+                        url=url,
+                        ok=row.ok,
+                        status_code=row.status_code,
+                        content_type=row.content_type,
+                        etag=row.etag,
+                        last_modified=row.last_modified,
+                        error=row.error,
+                        checked_at=row.checked_at,
+                        fresh=self.offline or (cutoff is not None and row.checked_at >= cutoff),
+                    )
+            self._looked_up.update(missing)
+        return {url: self._entries[url] for url in wanted if url in self._entries}
+
+    def record(
+        self,
+        url: str,
+        *,
+        ok: bool,
+        status_code: int = 0,
+        content_type: str = "",
+        etag: str = "",
+        last_modified: str = "",
+        error: str = "",
+    ) -> None:
+        self.record_many(
+            [
+                CachedImageCheck(
+                    url=(url or "").strip(),
+                    ok=ok,
+                    status_code=status_code,
+                    content_type=content_type,
+                    etag=etag,
+                    last_modified=last_modified,
+                    error=error,
+                )
+            ]
+        )
+
+    def record_many(self, checks: Iterable[CachedImageCheck]) -> None:
+        """
+        Upsert definitive check results; transient failures are skipped.
+        """
+        now = timezone.now()
+        rows: Dict[str, RemoteImageCheckRecord] = {}
+        for check in checks:
+            if not check.url:
+                continue
+            self._looked_up.add(check.url)
+            if not is_definitive(status_code=check.status_code, error=check.error):
+                continue
+            self._entries[check.url] = replace(check, checked_at=now, fresh=True)
+            rows[url_hash(check.url)] = RemoteImageCheckRecord(
+                url_hash=url_hash(check.url),
+                url=check.url,
+                ok=check.ok,
+                status_code=check.status_code,
+                content_type=check.content_type[:120],
+                etag=check.etag[:255],
+                last_modified=check.last_modified[:64],
+                error=check.error[:255],
+                checked_at=now,
+            )
+        if rows:
+            RemoteImageCheckRecord.objects.bulk_create(
+                list(rows.values()),
+                batch_size=LOOKUP_CHUNK_SIZE,
+                update_conflicts=True,
+                unique_fields=["url_hash"],
+                update_fields=[
+                    "url",
+                    "ok",
+                    "status_code",
+                    "content_type",
+                    "etag",
+                    "last_modified",
+                    "error",
+                    "checked_at",
+                ],
+            )
+
+    def revalidated(self, urls: Iterable[str]) -> List[CachedImageCheck]:
+        """
+        Mark stale entries as confirmed by a 304 and return them as fresh checks.
+        """
+        now = timezone.now()
+        confirmed: List[CachedImageCheck] = []
+        for url in dict.fromkeys((raw or "").strip() for raw in urls):
+            entry = self._entries.get(url)
+            if entry is None:
+                continue
+            entry = replace(entry, checked_at=now, fresh=True)
+            self._entries[url] = entry
+            confirmed.append(entry)
+        hashes = [url_hash(entry.url) for entry in confirmed]
+        for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            RemoteImageCheckRecord.objects.filter(url_hash__in=hashes[start : start + LOOKUP_CHUNK_SIZE]).update(
+                checked_at=now
+            )
+        return confirmed
+
+    def _fresh_cutoff(self) -> Optional[datetime]:
+        if not self.ttl_seconds:
+            return None
+        return timezone.now() - timedelta(seconds=self.ttl_seconds)
@@ -0,0 +1,262 @@
+"""
+Pooled HTTP client for supplier image checks and downloads.
+
+Image import commands validate and download thousands of remote image URLs.
+RemoteImageFetcher runs those requests on a bounded thread pool and keeps
+keep-alive connections per host. It allows at most `per_host` requests in
+flight to any one host, follows redirects, and retries connection errors,
+429 and 5xx responses with exponential backoff. Per-URL request headers allow
+conditional revalidation; a 304 comes back as status 304 with no body. Worker threads never touch the
+database or Django storage; callers save downloaded bodies from the main thread.
+"""
+from __future__ import annotations
+
+import http.client
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CONTENT_TYPE_PREFIX = "image/"
+DEFAULT_HEADERS = {"User-Agent": "BGM-CRM/1.0", "Accept": "image/*,*/*;q=0.8"}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_REDIRECTS = 5
+MAX_RETRY_AFTER = 30.0
+# Validation reads bodies up to this size so the connection can be reused; larger
+# bodies are abandoned and their connection closed.
+DRAIN_LIMIT = 256 * 1024
+# A reused keep-alive connection the server already closed fails like this; such
+# requests are resent once on a fresh connection without counting as a retry.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    url: str
+    status: int = 0
+    content_type: str = ""
+    body: bytes = b""
+    error: str = ""
+    etag: str = ""
+    last_modified: str = ""
+
+    @property
+    def is_image(self) -> bool:
+        return (
+            not self.error
+            and 200 <= self.status < 300
+            and self.content_type.startswith(IMAGE_CONTENT_TYPE_PREFIX)
+        )
+
+
+class _HostPool:
+    def __init__(self, scheme: str, netloc: str, *, limit: int, timeout: float):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(limit)
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def checkout(self) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.netloc, timeout=self.timeout), False
+
+    def release(self, connection: http.client.HTTPConnection, *, reusable: bool) -> None:
+        if not reusable:
+            connection.close()
+            return
+        with self._lock:
+            self._idle.append(connection)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class RemoteImageFetcher:
+    def __init__(
+        self,
+        *,
+        timeout: float = 8.0,
+        workers: int = 8,
+        per_host: int = 2,
+        retries: int = 3,
+        backoff: float = 0.5,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.timeout = max(float(timeout or 0.0), 0.5)
+        self.workers = max(int(workers or 1), 1)
+        self.per_host = max(int(per_host or 1), 1)
+        self.retries = max(int(retries or 1), 1)
+        self.backoff = max(float(backoff or 0.0), 0.0)
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self._pools: Dict[Tuple[str, str], _HostPool] = {}
+        self._pools_lock = threading.Lock()
+
+    def __enter__(self) -> "RemoteImageFetcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._pools_lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def fetch(self, url: str, *, download: bool = True, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """
+        GET one URL. With download=False the body is not kept (validation only).
+        `headers` are sent in addition to the defaults (e.g. If-None-Match).
+        Never raises; failures are reported in FetchResult.error.
+        """
+        request_headers = {**self.headers, **headers} if headers else self.headers
+        last = FetchResult(url=url, error="not_fetched")
+        for attempt in range(1, self.retries + 1):
+            retry_after = None
+            try:
+                last, retry_after = self._get_following_redirects(url, download=download, headers=request_headers)
+                if last.status not in RETRY_STATUSES:
+                    return last
+            except Exception as exc:
+                last = FetchResult(url=url, error=_error_label(exc))
+            if attempt >= self.retries:
+                break
+            delay = retry_after if retry_after is not None else self.backoff * (2 ** (attempt - 1))
+            logger.debug("Retrying %s in %.2fs (%s/%s): %s", url, delay, attempt, self.retries, last.error or last.status)
+            if delay > 0:
+                time.sleep(delay)
+        return last
+
+    def fetch_many(
+        self,
+        urls: Iterable[str],
+        *,
+        download: bool = True,
+        headers_for: Optional[Callable[[str], Optional[Dict[str, str]]]] = None,
+    ) -> Iterator[FetchResult]:
+        """
+        Fetch URLs concurrently and yield results as they complete.
+        `headers_for(url)` supplies extra request headers per URL; it runs on the caller's thread.
+        """
+        unique = list(dict.fromkeys(url for url in urls if url))
+        if not unique:
+            return
+        extra = {url: headers_for(url) for url in unique} if headers_for else {}
+        if self.workers == 1 or len(unique) == 1:
+            for url in unique:
+                yield self.fetch(url, download=download, headers=extra.get(url))
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(unique))) as executor:
+            futures = [executor.submit(self.fetch, url, download=download, headers=extra.get(url)) for url in unique]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _pool(self, scheme: str, netloc: str) -> _HostPool:
+        key = (scheme, netloc.lower())
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = _HostPool(scheme, netloc, limit=self.per_host, timeout=self.timeout)
+                self._pools[key] = pool
+            return pool
+
+    def _get_following_redirects(
+        self,
+        url: str,
+        *,
+        download: bool,
+        headers: Dict[str, str],
+    ) -> Tuple[FetchResult, Optional[float]]:
+        current = url
+        for _hop in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self._get(current, download=download, headers=headers)
+            location = response_headers.get("location", "")
+            if status in REDIRECT_STATUSES and location:
+                current = urljoin(current, location)
+                continue
+            result = FetchResult(
+                url=url,
+                status=status,
+                content_type=response_headers.get("content-type", "").strip(),
+                body=body if download and 200 <= status < 300 else b"",
+                etag=response_headers.get("etag", "").strip(),
+                last_modified=response_headers.get("last-modified", "").strip(),
+            )
+            return result, _retry_after(response_headers.get("retry-after", ""))
+        return FetchResult(url=url, error="too_many_redirects"), None
+
+    def _get(self, url: str, *, download: bool, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        parts = urlsplit(url)
+        if parts.scheme not in {"http", "https"} or not parts.netloc:
+            raise ValueError(f"unsupported_url:{url}")
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+        pool = self._pool(parts.scheme, parts.netloc)
+        with pool.slots:
+            for _attempt in range(2):
+                connection, reused = pool.checkout()
+                try:
+                    connection.request("GET", target, headers=headers)
+                    response = connection.getresponse()
+                    status = int(response.status or 0)
+                    response_headers = {key.lower(): value for key, value in response.getheaders()}
+                    body, drained = self._read_body(response, status, response_headers, download=download)
+                except STALE_CONNECTION_ERRORS:
+                    connection.close()
+                    if reused:
+                        continue
+                    raise
+                except Exception:
+                    connection.close()
+                    raise
+                pool.release(connection, reusable=drained and not response.will_close)
+                return status, response_headers, body
+        raise http.client.RemoteDisconnected("connection closed by server")
+
+    @staticmethod
+    def _read_body(response, status: int, headers: Dict[str, str], *, download: bool) -> Tuple[bytes, bool]:
+        content_type = headers.get("content-type", "")
+        if download and 200 <= status < 300 and content_type.startswith(IMAGE_CONTENT_TYPE_PREFIX):
+            return response.read(), True
+        if status in {204, 304}:
+            response.read()
+            return b"", True
+        try:
+            length = int(headers.get("content-length", ""))
+        except ValueError:
+            length = -1
+        if 0 <= length <= DRAIN_LIMIT:
+            response.read()
+            return b"", True
+        return b"", False
+
+
+def _retry_after(value: str) -> Optional[float]:
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return None
+
+
+def _error_label(exc: Exception) -> str:
+    if isinstance(exc, ValueError) and str(exc).startswith("unsupported_url:"):
+        return "unsupported_url"
+    if isinstance(exc, OSError) and not isinstance(exc, http.client.HTTPException):
+        reason = getattr(exc, "strerror", None) or str(exc) or exc.__class__.__name__
+        return f"url_error:{reason}"
+    return exc.__class__.__name__
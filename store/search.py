@@ -0,0 +1,161 @@
+"""
+Product search backed by Postgres full-text search (and pg_trgm when installed).
+
+Product.search_vector holds a weighted tsvector (name > sku > category > short
+description) kept current from the Product/Category signals. Matching uses
+word-prefix full-text queries, substring matches on name/SKU for infix and
+partial-SKU fragments ("250" finds "F250"), and trigram similarity on name/SKU
+for typos. Ranking runs in SQL with the same boosts the live search has always used.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from typing import Iterable
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Lower
+
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "simple"
+SEARCH_VECTOR_FIELDS = {"name", "sku", "short_description", "category"}
+
+# (field, full-query points, prefix points, per-token points)
+SEARCH_FIELD_BOOSTS = (
+    ("name", 200, 40, 12),
+    ("sku", 180, 30, 10),
+    ("category__name", 60, 0, 4),
+    ("short_description", 20, 0, 2),
+)
+
+_trigram_available: bool | None = None
+
+
+def normalize_search_text(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+def search_tokens(query: str) -> list[str]:
+    return [token for token in re.split(r"[^a-z0-9]+", normalize_search_text(query)) if token]
+
+
+def product_search_vector():
+    """
+    Weighted tsvector expression for Product rows; usable in queryset.update().
+    """
+    category_name = Subquery(Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1])
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("sku", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight="C", config=SEARCH_CONFIG)
+        + SearchVector("short_description", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def refresh_product_search_vectors(product_ids: Iterable[int] | None = None) -> int:
+    qs = Product.objects.all()
+    if product_ids is not None:
+        ids = {int(pk) for pk in product_ids if pk}
+        if not ids:
+            return 0
+        qs = qs.filter(pk__in=ids)
+    return qs.update(search_vector=product_search_vector())
+
+
+def trigram_search_available() -> bool:
+    """
+    pg_trgm is optional: the migration only creates its indexes when the extension
+    can be installed, and matching falls back to full-text only without it.
+    """
+    global _trigram_available
+    if _trigram_available is None:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _trigram_available = cursor.fetchone() is not None
+        except Exception:
+            logger.warning("Could not check for the pg_trgm extension", exc_info=True)
+            _trigram_available = False
+    return _trigram_available
+
+
+def build_search_query(query: str) -> SearchQuery | None:
+    tokens = search_tokens(query)
+    if not tokens:
+        return None
+    # Tokens are [a-z0-9]+ only, so the raw prefix query cannot carry tsquery syntax.
+    raw = " & ".join(f"{token}:*" for token in tokens)
+    return SearchQuery(raw, config=SEARCH_CONFIG, search_type="raw")
+
+
+def search_match_q(query: str) -> Q | None:
+    search_query = build_search_query(query)
+    if search_query is None:
+        return None
+    match = Q(search_vector=search_query)
+    # Full-text matching is word-prefix only; every token may also appear anywhere in
+    # the name or SKU. icontains compiles to UPPER(col) LIKE, served by the UPPER()
+    # pg_trgm GIN indexes (migration 0053) where the extension is installed.
+    substring = Q()
+    for token in search_tokens(query):
+        substring &= Q(name__icontains=token) | Q(sku__icontains=token)
+    match |= substring
+    if trigram_search_available():
+        needle = normalize_search_text(query)
+        match |= Q(name__trigram_word_similar=needle) | Q(sku__trigram_similar=needle)
+    return match
+
+
+def filter_products_by_search(qs, query: str):
+    match = search_match_q(query)
+    if match is None:
+        return qs
+    return qs.filter(match)
+
+
+def _boost(field: str, lookup: str, value: str, points: int):
+    if not points or not value:
+        return Value(0)
+    return Case(
+        When(**{f"{field}__{lookup}": value}, then=Value(points)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def search_score_expression(query: str):
+    """
+    Relevance score: full-query hits, prefix hits and per-token hits per field.
+    """
+    needle = normalize_search_text(query)
+    tokens = search_tokens(query)
+    score = Value(0)
+    for field, full_points, prefix_points, token_points in SEARCH_FIELD_BOOSTS:
+        score = score + _boost(field, "icontains", needle, full_points)
+        score = score + _boost(field, "istartswith", needle, prefix_points)
+        for token in tokens:
+            score = score + _boost(field, "icontains", token, token_points)
+    return score
+
+
+def search_products(qs, query: str):
+    """
+    Filter and rank products for a text query in one SQL statement.
+    In-house products stay first, then score, then text rank, then name.
+    """
+    search_query = build_search_query(query)
+    if search_query is None:
+        return qs.order_by("-is_in_house", Lower("name"))
+    return (
+        filter_products_by_search(qs, query)
+        .annotate(
+            search_score=search_score_expression(query),
+            search_rank=SearchRank(F("search_vector"), search_query),
+        )
+        .order_by("-is_in_house", "-search_score", "-search_rank", Lower("name"), "pk")
+    )
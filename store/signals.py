@@ -0,0 +1,153 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import (
+    CarMake,
+    CarModel,
+    Category,
+    Product,
+    ProductDiscount,
+    ProductImage,
+    ProductOption,
+    StoreInventorySettings,
+    StorePricingSettings,
+    StoreShippingSettings,
+    bump_store_settings_version,
+)
+from .fitment_index import rebuild_fitment_index
+from .search import SEARCH_VECTOR_FIELDS, refresh_product_search_vectors
+from .storefront_index import bump_catalog_version, queue_storefront_index_refresh
+from .thumbnails import queue_thumbnails
+
+STOREFRONT_INDEX_FIELDS = {"effective_public_price", "effective_sort_rank", "search_vector"}
+# Fields read by companion scoring (see store.companions).
+COMPANION_FIELDS = {
+    "name",
+    "short_description",
+    "description",
+    "compatibility",
+    "category",
+    "is_active",
+    "sku",
+    "slug",
+}
+
+
+@receiver(post_save, sender=StorePricingSettings)
+@receiver(post_delete, sender=StorePricingSettings)
+@receiver(post_save, sender=StoreShippingSettings)
+@receiver(post_delete, sender=StoreShippingSettings)
+@receiver(post_save, sender=StoreInventorySettings)
+@receiver(post_delete, sender=StoreInventorySettings)
+def store_settings_changed(sender, **kwargs):
+    # Bump after commit so other workers never snapshot the pre-save row again.
+    transaction.on_commit(bump_store_settings_version)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=CarMake)
+@receiver(post_delete, sender=CarMake)
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+@receiver(post_save, sender=ProductOption)
+@receiver(post_delete, sender=ProductOption)
+@receiver(post_save, sender=ProductDiscount)
+@receiver(post_delete, sender=ProductDiscount)
+@receiver(post_save, sender=StorePricingSettings)
+@receiver(post_delete, sender=StorePricingSettings)
+@receiver(post_save, sender=StoreInventorySettings)
+@receiver(post_delete, sender=StoreInventorySettings)
+@receiver(m2m_changed, sender=Product.compatible_models.through)
+def catalog_changed(sender, update_fields=None, action=None, **kwargs):
+    if action is not None and not action.startswith("post_"):
+        return
+    if update_fields is not None and set(update_fields) <= STOREFRONT_INDEX_FIELDS:
+        return
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=StorePricingSettings)
+@receiver(post_delete, sender=StorePricingSettings)
+def pricing_settings_changed(sender, **kwargs):
+    queue_storefront_index_refresh(all_prices=True)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= STOREFRONT_INDEX_FIELDS:
+        return
+    if update_fields is None or SEARCH_VECTOR_FIELDS & set(update_fields):
+        # Synchronous on purpose: a product must be searchable as soon as it is saved.
+        refresh_product_search_vectors([instance.pk])
+    previous_state = None if created else getattr(instance, "_storefront_rank_state", None)
+    current_state = instance.storefront_rank_state()
+    instance._storefront_rank_state = current_state
+    ranks_changed = (current_state != previous_state) and not (created and not instance.is_active)
+    if (update_fields is None or "main_image" in update_fields) and instance.thumbnail_source != instance.main_image_name:
+        queue_thumbnails(product_ids=[instance.pk])
+    companions_changed = update_fields is None or bool(COMPANION_FIELDS & set(update_fields))
+    queue_storefront_index_refresh(
+        [instance.pk],
+        ranks=ranks_changed,
+        companions=[instance.pk] if companions_changed else (),
+    )
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_product_search_vectors(instance.products.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=Product.compatible_models.through)
+def product_fitment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # pk_set is empty on clear(); remember whose fitment is about to go.
+        instance._fitment_cleared_product_ids = list(instance.compatible_products.values_list("pk", flat=True))
+        return
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    if not reverse:
+        product_ids = [instance.pk]
+    elif action == "post_clear":
+        product_ids = getattr(instance, "_fitment_cleared_product_ids", [])
+    else:
+        product_ids = list(pk_set or ())
+    if product_ids:
+        rebuild_fitment_index(product_ids)
+        queue_storefront_index_refresh(companions=product_ids)
+
+
+@receiver(pre_delete, sender=CarModel)
+def car_model_deleting(sender, instance, **kwargs):
+    instance._fitment_product_ids = list(instance.compatible_products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+def car_model_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    product_ids = getattr(instance, "_fitment_product_ids", None)
+    if product_ids is None:
+        product_ids = list(instance.compatible_products.values_list("pk", flat=True))
+    if product_ids:
+        rebuild_fitment_index(product_ids)
+
+
+@receiver(post_save, sender=ProductImage)
+def product_image_saved(sender, instance, **kwargs):
+    if instance.thumbnail_source != (instance.image.name or ""):
+        queue_thumbnails(image_ids=[instance.pk])
+
+
+@receiver(post_save, sender=ProductOption)
+@receiver(post_delete, sender=ProductOption)
+@receiver(post_save, sender=ProductDiscount)
+@receiver(post_delete, sender=ProductDiscount)
+def product_pricing_row_changed(sender, instance, **kwargs):
+    queue_storefront_index_refresh([instance.product_id])
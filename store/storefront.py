@@ -19,6 +19,7 @@ from core.utils import format_currency
 
 from .forms_store import CustomFitmentRequestForm, StoreReviewForm
 from .models import Product, ProductOption, StoreInventorySettings, StoreShippingSettings, StoreReview
+from .thumbnails import THUMBNAIL_WIDTHS
 
 
 def request_wants_json(request) -> bool:
@@ -139,6 +140,7 @@ def _serialize_gallery(product: Product) -> list[dict[str, str]]:
         gallery.append(
             {
                 "src": main_image_url,
+                "thumb": product.thumbnail_url(320) or main_image_url,
                 "alt": (getattr(product, "name", "") or "Product").strip() or "Product",
             }
         )
@@ -158,6 +160,7 @@ def _serialize_gallery(product: Product) -> list[dict[str, str]]:
         gallery.append(
             {
                 "src": image_url,
+                "thumb": image.thumbnail_url(320) or image_url,
                 "alt": (getattr(image, "alt", "") or getattr(product, "name", "") or "Product image").strip(),
             }
         )
@@ -242,6 +245,11 @@ def _build_badges(product: Product) -> list[dict[str, str]]:
     return badges
 
 
+def _thumbnail_srcset(item, fmt: str = "webp") -> str:
+    rows = [(item.thumbnail_url(width, fmt), width) for width in THUMBNAIL_WIDTHS]
+    return ", ".join(f"{url} {width}w" for url, width in rows if url)
+
+
 def serialize_product_card(
     product: Product,
     *,
@@ -263,6 +271,7 @@ def serialize_product_card(
     category = getattr(product, "category", None)
     compatibility_rows = _serialize_compatibility(product, limit=3)
     image_url = (getattr(product, "main_image_url", "") or "").strip()
+    thumbnail_src = product.thumbnail_url(640)
 
     card = {
         "id": int(getattr(product, "pk", 0) or 0),
@@ -273,8 +282,9 @@ def serialize_product_card(
         "description": (getattr(product, "description", "") or "").strip(),
         "sku": getattr(product, "sku", "") or "",
         "image": {
-            "src": image_url,
+            "src": thumbnail_src or image_url,
             "alt": (getattr(product, "name", "") or "Product").strip() or "Product",
+            "srcSet": _thumbnail_srcset(product),
         },
         "category": {
             "label": category_label or getattr(category, "display_name", "") or "",
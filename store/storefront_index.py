@@ -0,0 +1,305 @@
+"""
+Denormalized storefront sort columns on Product.
+
+`effective_public_price` mirrors Product.public_price (cheapest selectable option,
+active discount, global multiplier) and `effective_sort_rank` stores the featured
+order (in-house first, then supplier products interleaved by category). Keeping both
+in the table lets /store/ sort and paginate in SQL instead of loading the catalog.
+
+Signals queue refreshes through `queue_storefront_index_refresh`, which also
+carries companion-recommendation refreshes (store.companions) so both share one
+post-commit flush. Prices are refreshed in the flush; ranks are not, because one
+new supplier product can move every other supplier rank. The flush only marks
+the saved products' ranks stale (`mark_sort_ranks_stale`) and
+`refresh_storefront_index --stale-ranks` rebuilds them from the cron. Until then an
+edited product keeps its old featured position, and a new supplier product has no
+rank and is listed after the ranked ones (newest first). The nightly
+`refresh_storefront_index` run also catches discount start/end dates and any
+queryset.update() writes that bypass signals.
+
+`catalog_version()` is a shared token bumped after every catalog commit; caches of
+data derived from the catalog (filter facets, listing payloads) key on it. The
+refreshes here write with bulk_update()/update(), which fire no signals, so they
+bump it themselves whenever they change rows.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+from typing import Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .companions import mark_companions_stale
+from .models import Product
+from .search import refresh_product_search_vectors
+
+logger = logging.getLogger(__name__)
+
+PRICE_REFRESH_CHUNK_SIZE = 500
+IN_HOUSE_SORT_RANK = 0
+CATALOG_VERSION_CACHE_KEY = "bgm:store:catalog_version"
+SORT_RANKS_STALE_CACHE_KEY = "bgm:store:sort_ranks_stale"
+
+_pending = threading.local()
+
+
+def exclude_merch_products(qs):
+    """
+    Keep Printful / merch catalog off the main /store/ storefront.
+    """
+    return qs.exclude(
+        Q(category__slug="merch")
+        | Q(sku__startswith="PF-")
+        | Q(slug__startswith="merch-")
+    )
+
+
+def catalog_version() -> str:
+    try:
+        version = cache.get(CATALOG_VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(CATALOG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+            version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    except Exception:
+        logger.warning("Catalog version lookup failed", exc_info=True)
+        return ""
+    return str(version or "")
+
+
+def bump_catalog_version() -> None:
+    try:
+        cache.set(CATALOG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+    except Exception:
+        logger.warning("Catalog version bump failed", exc_info=True)
+
+
+def compute_effective_public_price(product: Product) -> Decimal | None:
+    try:
+        return Decimal(product.public_price).quantize(Decimal("0.01"))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def refresh_effective_prices(product_ids: Iterable[int] | None = None) -> int:
+    """
+    Recompute effective_public_price for the given products (all when None).
+    Only rows whose value changed are written. Returns the number of rows updated.
+    """
+    qs = Product.objects.select_related("category").prefetch_related("options", "discounts").order_by("pk")
+    if product_ids is not None:
+        ids = {int(pk) for pk in product_ids if pk}
+        if not ids:
+            return 0
+        qs = qs.filter(pk__in=ids)
+
+    changed: list[Product] = []
+    updated = 0
+    for product in qs.iterator(chunk_size=PRICE_REFRESH_CHUNK_SIZE):
+        value = compute_effective_public_price(product)
+        if value == product.effective_public_price:
+            continue
+        product.effective_public_price = value
+        changed.append(product)
+        if len(changed) >= PRICE_REFRESH_CHUNK_SIZE:
+            updated += Product.objects.bulk_update(changed, ["effective_public_price"])
+            changed = []
+    if changed:
+        updated += Product.objects.bulk_update(changed, ["effective_public_price"])
+    if updated:
+        transaction.on_commit(bump_catalog_version)
+    return updated
+
+
+def build_storefront_sort_ranks(rows: Iterable[tuple[int, int, bool]]) -> dict[int, int]:
+    """
+    Featured ranks for storefront-visible rows of (pk, category_id, is_in_house),
+    given newest first. In-house rows all rank 0 and fall back to the listing's
+    newest-first tiebreak, so adding one never moves the others; supplier rows
+    rank by round-robin over categories in order of each category's newest product.
+    """
+    ranks: dict[int, int] = {}
+    category_positions: dict[int, int] = {}
+    category_counts: dict[int, int] = defaultdict(int)
+    external: list[tuple[int, int]] = []
+    for pk, category_id, is_in_house in rows:
+        if is_in_house:
+            ranks[pk] = IN_HOUSE_SORT_RANK
+            continue
+        if category_id not in category_positions:
+            category_positions[category_id] = len(category_positions)
+        external.append((pk, category_id))
+
+    category_total = max(len(category_positions), 1)
+    for pk, category_id in external:
+        round_index = category_counts[category_id]
+        category_counts[category_id] += 1
+        ranks[pk] = round_index * category_total + category_positions[category_id]
+    return ranks
+
+
+def refresh_storefront_sort_ranks() -> int:
+    """
+    Rebuild effective_sort_rank for the storefront catalog. Hidden products
+    (inactive or merch) get an empty rank. Returns the number of rows updated.
+    """
+    # Cleared before reading, so products marked stale during the rebuild wait for the next run.
+    try:
+        cache.delete(SORT_RANKS_STALE_CACHE_KEY)
+    except Exception:
+        logger.warning("Could not clear the stale featured-rank flag", exc_info=True)
+    visible_rows = list(
+        exclude_merch_products(Product.objects.filter(is_active=True))
+        .order_by("-created_at", "pk")
+        .values_list("pk", "category_id", "is_in_house")
+    )
+    ranks = build_storefront_sort_ranks(visible_rows)
+    current = dict(
+        Product.objects.filter(effective_sort_rank__isnull=False).values_list("pk", "effective_sort_rank")
+    )
+
+    changed = [
+        Product(pk=pk, effective_sort_rank=ranks.get(pk))
+        for pk in set(current) | set(ranks)
+        if current.get(pk) != ranks.get(pk)
+    ]
+    if not changed:
+        return 0
+    updated = Product.objects.bulk_update(changed, ["effective_sort_rank"], batch_size=PRICE_REFRESH_CHUNK_SIZE)
+    transaction.on_commit(bump_catalog_version)
+    return updated
+
+
+def mark_sort_ranks_stale(product_ids: Iterable[int]) -> int:
+    """
+    Flag the featured order for the next `refresh_storefront_index --stale-ranks`
+    run. Supplier products keep their current rank (or none, when new) until then;
+    in-house products take their fixed rank right away. Returns the number of
+    in-house rows moved.
+    """
+    ids = {int(pk) for pk in product_ids if pk}
+    if not ids:
+        return 0
+    try:
+        cache.set(SORT_RANKS_STALE_CACHE_KEY, True, None)
+    except Exception:
+        logger.warning("Could not flag the featured ranks as stale", exc_info=True)
+    updated = (
+        Product.objects.filter(pk__in=ids, is_in_house=True)
+        .exclude(effective_sort_rank=IN_HOUSE_SORT_RANK)
+        .update(effective_sort_rank=IN_HOUSE_SORT_RANK)
+    )
+    if updated:
+        transaction.on_commit(bump_catalog_version)
+    return updated
+
+
+def sort_ranks_stale() -> bool:
+    """True when ranks were flagged stale or a visible supplier product has no rank yet."""
+    try:
+        if cache.get(SORT_RANKS_STALE_CACHE_KEY):
+            return True
+    except Exception:
+        logger.warning("Stale featured-rank flag lookup failed", exc_info=True)
+    return (
+        exclude_merch_products(Product.objects.filter(is_active=True, is_in_house=False))
+        .filter(effective_sort_rank__isnull=True)
+        .exists()
+    )
+
+
+def refresh_storefront_index(*, product_ids: Iterable[int] | None = None, ranks: bool = True) -> dict[str, int]:
+    prices_updated = refresh_effective_prices(product_ids)
+    ranks_updated = refresh_storefront_sort_ranks() if ranks else 0
+    return {"prices_updated": prices_updated, "ranks_updated": ranks_updated}
+
+
+def refresh_after_bulk_write(product_ids: Iterable[int]) -> None:
+    """
+    Do what store.signals would for products written with bulk_create, bulk_update
+    or queryset.update(), which fire no model signals: refresh their search vectors,
+    queue their price, rank and companion refreshes and bump the catalog version.
+    """
+    ids = {int(pk) for pk in product_ids if pk}
+    if not ids:
+        return
+    refresh_product_search_vectors(ids)
+    queue_storefront_index_refresh(ids, ranks=True, companions=ids)
+    transaction.on_commit(bump_catalog_version)
+
+
+def _pending_state() -> dict:
+    state = getattr(_pending, "state", None)
+    if state is None:
+        state = {"product_ids": set(), "all_prices": False, "ranks": set(), "companions": set(), "deferred": 0}
+        _pending.state = state
+    return state
+
+
+def _flush_pending_refresh() -> None:
+    state = _pending_state()
+    if state["deferred"]:
+        return
+    product_ids = None if state["all_prices"] else set(state["product_ids"])
+    rank_ids = set(state["ranks"])
+    companion_ids = set(state["companions"])
+    state.update(product_ids=set(), all_prices=False, ranks=set(), companions=set())
+    if product_ids is None or product_ids or rank_ids:
+        try:
+            if product_ids is None or product_ids:
+                refresh_effective_prices(product_ids)
+            if rank_ids:
+                mark_sort_ranks_stale(rank_ids)
+        except Exception:
+            logger.exception("Failed to refresh the storefront sort index")
+    if companion_ids:
+        # Re-ranking needs the whole catalog; the rebuild_product_companions cron does it.
+        try:
+            mark_companions_stale(companion_ids)
+        except Exception:
+            logger.exception("Failed to queue product companions for a rebuild")
+
+
+def queue_storefront_index_refresh(
+    product_ids: Iterable[int] = (),
+    *,
+    all_prices: bool = False,
+    ranks: bool = False,
+    companions: Iterable[int] = (),
+) -> None:
+    """
+    Collect refresh work and run it once the surrounding transaction commits.
+    Repeated calls within one transaction (or deferred block) share one flush.
+    `ranks` marks the given products' featured ranks stale.
+    """
+    state = _pending_state()
+    product_ids = {int(pk) for pk in product_ids if pk}
+    state["product_ids"].update(product_ids)
+    state["all_prices"] = state["all_prices"] or all_prices
+    if ranks:
+        state["ranks"].update(product_ids)
+    state["companions"].update(int(pk) for pk in companions if pk)
+    if not state["deferred"]:
+        transaction.on_commit(_flush_pending_refresh)
+
+
+@contextmanager
+def deferred_storefront_index():
+    """
+    Hold signal-driven refreshes until the block exits, e.g. around row-by-row imports
+    that run outside a transaction.
+    """
+    state = _pending_state()
+    state["deferred"] += 1
+    try:
+        yield
+    finally:
+        state["deferred"] -= 1
+        if not state["deferred"]:
+            transaction.on_commit(_flush_pending_refresh)
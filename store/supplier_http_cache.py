@@ -0,0 +1,139 @@
+"""
+On-disk HTTP response cache for supplier catalog clients.
+
+Each response body is kept gzip-compressed under STORE_SUPPLIER_HTTP_CACHE_DIR
+next to a small JSON file with its validators. Later requests for the same URL
+send If-None-Match / If-Modified-Since; a 304 answer returns the cached body.
+In offline mode the last snapshot is replayed without touching the network,
+which keeps dry runs and matching experiments fast and repeatable.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+
+class OfflineCacheMiss(LookupError):
+    """Offline mode was asked for a URL that has no stored snapshot."""
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    url: str
+    body: bytes
+    etag: str = ""
+    last_modified: str = ""
+    fetched_at: str = ""
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class SupplierHttpCache:
+    def __init__(self, directory: str | os.PathLike | None = None, *, offline: bool = False) -> None:
+        self.directory = Path(directory or settings.STORE_SUPPLIER_HTTP_CACHE_DIR)
+        self.offline = bool(offline)
+        self.stats = {"fetched": 0, "not_modified": 0, "replayed": 0}
+
+    def fetch(self, url: str, *, headers: dict[str, str] | None = None, timeout: float = 20.0) -> bytes:
+        """
+        Body for `url`, revalidating a stored copy when there is one. HTTP errors
+        other than 304 propagate so the caller's retry policy still applies.
+        """
+        cached = self.get(url)
+        if self.offline:
+            if cached is None:
+                raise OfflineCacheMiss(f"No cached supplier response for {url}")
+            self.stats["replayed"] += 1
+            return cached.body
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            request_headers.update(cached.conditional_headers())
+        try:
+            with urlopen(Request(url, headers=request_headers), timeout=timeout) as response:
+                body = response.read()
+                etag = str(response.headers.get("ETag") or "").strip()
+                last_modified = str(response.headers.get("Last-Modified") or "").strip()
+        except HTTPError as exc:
+            if exc.code != 304 or cached is None:
+                raise
+            self.stats["not_modified"] += 1
+            return cached.body
+        self.store(url, body, etag=etag, last_modified=last_modified)
+        self.stats["fetched"] += 1
+        return body
+
+    def get(self, url: str) -> CachedResponse | None:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            with gzip.open(body_path, "rb") as handle:
+                body = handle.read()
+        except (OSError, ValueError, EOFError):
+            return None
+        if meta.get("url") != url:
+            return None
+        return CachedResponse(
+            url=url,
+            body=body,
+            etag=str(meta.get("etag") or ""),
+            last_modified=str(meta.get("last_modified") or ""),
+            fetched_at=str(meta.get("fetched_at") or ""),
+        )
+
+    def store(self, url: str, body: bytes, *, etag: str = "", last_modified: str = "") -> None:
+        meta_path, body_path = self._paths(url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "size": len(body),
+        }
+        # Body first, then metadata: a reader never sees validators for a half-written body.
+        self._write_atomic(body_path, gzip.compress(body))
+        self._write_atomic(meta_path, json.dumps(meta, sort_keys=True).encode("utf-8"))
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body.gz"
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+
+def http_cache_from_options(options) -> SupplierHttpCache | None:
+    """The cache selected by an import command's --offline / --no-http-cache flags."""
+    if options["offline"] and options["no_http_cache"]:
+        raise CommandError("--offline replays the HTTP cache and cannot be combined with --no-http-cache.")
+    if options["no_http_cache"]:
+        return None
+    return SupplierHttpCache(offline=options["offline"])
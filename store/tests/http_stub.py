@@ -0,0 +1,80 @@
+"""
+Local HTTP/1.1 stub server for tests of the pooled HTTP clients.
+
+Routes map a path to a list of (status, headers, body) responses; the last one
+repeats. The server records every request, the client connections it saw and
+the peak number of requests in flight.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHTTPServer:
+    def __init__(self, routes=None, *, delay: float = 0.0):
+        self.routes = {path: list(responses) for path, responses in (routes or {}).items()}
+        self.delay = delay
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StubHTTPServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def hits(self, path: str) -> int:
+        return sum(1 for request in self.requests if request["path"] == path)
+
+    def _respond(self, handler) -> None:
+        with self._lock:
+            self.requests.append({"path": handler.path, "headers": dict(handler.headers)})
+            self.connections.add(handler.client_address)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            responses = self.routes.get(handler.path) or [(404, {"Content-Type": "text/plain"}, b"missing")]
+            status, headers, body = responses.pop(0) if len(responses) > 1 else responses[0]
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            handler.send_response(status)
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub._respond(self)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def image(body: bytes = b"image-bytes", content_type: str = "image/jpeg"):
+    return (200, {"Content-Type": content_type}, body)
@@ -0,0 +1,128 @@
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from store.fitment_index import rebuild_fitment_index
+from store.models import CarMake, CarModel, Category, Product, ProductFitmentYear
+
+
+class FitmentIndexTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Exhaust", slug="exhaust")
+        self.ram = CarMake.objects.create(name="Ram")
+        self.ford = CarMake.objects.create(name="Ford")
+        self.ram_2500 = CarModel.objects.create(make=self.ram, name="2500", year_from=2019, year_to=2021)
+        self.ram_3500 = CarModel.objects.create(make=self.ram, name="3500", year_from=2013, year_to=2018)
+        self.f250 = CarModel.objects.create(make=self.ford, name="F-250", year_from=2017, year_to=None)
+        self.downpipe = self._product("Ram Downpipe", self.ram_2500)
+
+    def _product(self, name, *models) -> Product:
+        product = Product.objects.create(
+            name=name,
+            slug=name.lower().replace(" ", "-"),
+            sku=name.upper().replace(" ", "-"),
+            category=self.category,
+            price=Decimal("10.00"),
+            is_active=True,
+        )
+        product.compatible_models.add(*models)
+        return product
+
+    def _rows(self, product):
+        return set(
+            ProductFitmentYear.objects.filter(product=product).values_list("make_id", "model_name", "year")
+        )
+
+    def test_fitment_changes_keep_rows_current(self):
+        self.assertEqual(
+            self._rows(self.downpipe),
+            {(self.ram.pk, "2500", 2019), (self.ram.pk, "2500", 2020), (self.ram.pk, "2500", 2021)},
+        )
+
+        self.downpipe.compatible_models.add(self.f250)
+        ceiling = timezone.now().year + 1
+        self.assertIn((self.ford.pk, "F-250", ceiling), self._rows(self.downpipe))
+        self.assertNotIn((self.ford.pk, "F-250", ceiling + 1), self._rows(self.downpipe))
+
+        self.downpipe.compatible_models.remove(self.ram_2500)
+        self.assertFalse(any(row[0] == self.ram.pk for row in self._rows(self.downpipe)))
+
+        self.f250.compatible_products.clear()
+        self.assertEqual(self._rows(self.downpipe), set())
+
+    def test_car_model_year_edit_reindexes_products(self):
+        self.ram_2500.year_to = 2019
+        self.ram_2500.save()
+
+        self.assertEqual(self._rows(self.downpipe), {(self.ram.pk, "2500", 2019)})
+
+    def test_rebuild_only_writes_differences(self):
+        ProductFitmentYear.objects.filter(product=self.downpipe, year=2020).delete()
+
+        stats = rebuild_fitment_index()
+
+        self.assertEqual(stats, {"created": 1, "deleted": 0})
+        self.assertEqual(rebuild_fitment_index(), {"created": 0, "deleted": 0})
+
+    def test_vehicle_filter_is_a_single_exists_probe(self):
+        ram_1500 = CarModel.objects.create(make=self.ram, name="1500", year_from=2019)
+        self._product("Ram 3500 Intake", self.ram_3500, ram_1500)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                reverse("store:store"),
+                {"format": "json", "make": self.ram.pk, "model": "2500", "year": 2019},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        names = [row["name"] for row in response.json()["catalog"]["products"]]
+        self.assertEqual(names, ["Ram Downpipe"])
+        listing_sql = [q["sql"] for q in ctx.captured_queries if "store_productfitmentyear" in q["sql"]]
+        self.assertTrue(listing_sql)
+        for sql in listing_sql:
+            self.assertIn("EXISTS", sql)
+            self.assertNotIn("DISTINCT", sql)
+
+        # Model and year have to hold for the same fitment row.
+        response = self.client.get(
+            reverse("store:store"),
+            {"format": "json", "make": self.ram.pk, "model": "3500", "year": 2019},
+        )
+        self.assertEqual(response.json()["catalog"]["products"], [])
+
+    def test_year_picker_lists_indexed_years(self):
+        self._product("Ram 3500 Intake", self.ram_3500)
+        url = reverse("store:fitment-years")
+
+        response = self.client.get(url, {"make": self.ram.pk, "model": "2500"})
+        self.assertEqual(response.json(), {"years": [2021, 2020, 2019]})
+
+        response = self.client.get(url, {"make": self.ram.pk})
+        self.assertEqual(response.json()["years"], list(range(2021, 2012, -1)))
+
+        self.assertEqual(self.client.get(url).json(), {"years": []})
+
+    def test_daily_rebuild_extends_open_ended_bands(self):
+        self.downpipe.compatible_models.add(self.f250)
+        ceiling = timezone.now().year + 1
+        out = StringIO()
+
+        with patch("store.fitment_index.fitment_year_ceiling", return_value=ceiling + 1):
+            call_command("rebuild_fitment_index", stdout=out)
+
+        self.assertIn((self.ford.pk, "F-250", ceiling + 1), self._rows(self.downpipe))
+        self.assertIn("1 row(s) created", out.getvalue())
+
+    def test_normalize_command_rebuilds_index(self):
+        ProductFitmentYear.objects.all().delete()
+
+        call_command("normalize_store_fitment", "--apply", stdout=StringIO())
+
+        self.assertTrue(ProductFitmentYear.objects.filter(product=self.downpipe).exists())
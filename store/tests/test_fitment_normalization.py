@@ -1,15 +1,24 @@
 from decimal import Decimal
+from io import StringIO
 
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from store.fitment import (
     COMMERCIAL_COMPATIBILITY_NOTE,
     UNIVERSAL_COMPATIBILITY_NOTE,
+    clear_fitment_cache,
     infer_fitment,
+    infer_fitment_uncached,
+    scan_fitment_signals,
+    scan_fitment_signals_sequential,
     suggested_category_name,
     sync_consumer_vehicle_catalog,
 )
+from store.management.commands.benchmark_fitment_inference import fitment_benchmark_corpus
 from store.models import CarMake, CarModel, Category, Product
 
 
@@ -113,6 +122,85 @@ class FitmentInferenceTests(TestCase):
         self.assertEqual(suggestion, "Motor Vehicle Engine Parts")
 
 
+class CompiledFitmentMatcherTests(SimpleTestCase):
+    def test_combined_matchers_agree_with_sequential_pattern_scans(self):
+        corpus = set(fitment_benchmark_corpus(2000, seed=11)) | {
+            ("Caterpillar C15 Lift Pump", ""),
+            ("FASS Mounting Package - DIFSCAT1001 DIFSRAM1001", ""),
+            ("Sending Unit DMAX 7002 for 2011 Silverado 2500", ""),
+            ("Titan XD 5.0L and Grand Cherokee EcoDiesel Filter", ""),
+            ("Range Arranger Bracket", "F-250"),
+        }
+        for name, sku in sorted(corpus):
+            with self.subTest(name=name, sku=sku):
+                compiled = infer_fitment_uncached(name=name, sku=sku)
+                sequential = infer_fitment_uncached(name=name, sku=sku, scan=scan_fitment_signals_sequential)
+                self.assertEqual(compiled.kind, sequential.kind)
+                self.assertEqual(set(compiled.specs), set(sequential.specs))
+                signals = scan_fitment_signals(f"{name} {sku}")
+                self.assertLessEqual(signals.makes, scan_fitment_signals_sequential(f"{name} {sku}").makes)
+
+    def test_infer_fitment_is_memoized_per_normalized_title(self):
+        clear_fitment_cache()
+        first = infer_fitment(name="Lift Pump | Ford 6.7L  Powerstroke", sku="FA-1", category_name="Fuel")
+        second = infer_fitment(name="lift pump | FORD 6.7L Powerstroke", sku="fa-1", category_name="Filters")
+
+        self.assertIs(first, second)
+        self.assertTrue(first.is_consumer_specific)
+
+
+class NormalizeStoreFitmentCommandTests(TestCase):
+    def setUp(self):
+        sync_consumer_vehicle_catalog(apply=True)
+        self.category = Category.objects.create(name="Exhaust", slug="exhaust")
+        self.tacoma = CarModel.objects.get(make__name="Toyota", name="Tacoma")
+
+    def _products(self, count: int, *, offset: int = 0) -> list[Product]:
+        products = []
+        for index in range(offset, offset + count):
+            product = Product.objects.create(
+                name=f"Race Pipe {index} | Ford 6.4L F250 Powerstroke (2008-2010)",
+                slug=f"race-pipe-{index}",
+                sku=f"RP-{index}",
+                category=self.category,
+                price=Decimal("10.00"),
+                is_active=True,
+                compatibility=UNIVERSAL_COMPATIBILITY_NOTE,
+            )
+            product.compatible_models.add(self.tacoma)
+            products.append(product)
+        return products
+
+    def _normalize(self) -> int:
+        # Post-commit storefront refreshes are per product by design; count the command's own queries.
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("normalize_store_fitment", "--apply", stdout=StringIO())
+        return len(ctx.captured_queries)
+
+    def test_apply_replaces_fitment_with_bulk_writes(self):
+        products = self._products(3)
+        self._normalize()
+
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(
+                {(m.make.name, m.name, m.year_from, m.year_to) for m in product.compatible_models.all()},
+                {("Ford", "F-250", 2008, 2010)},
+            )
+            self.assertEqual(product.compatibility, "")
+        self.assertTrue(CarModel.objects.filter(make__name="Ford", name="F-250", year_from=2008, year_to=2010).exists())
+
+    def test_query_count_does_not_grow_with_catalog_size(self):
+        CarModel.objects.create(make=CarMake.objects.get(name="Ford"), name="F-250", year_from=2008, year_to=2010)
+        self._products(2)
+        small = self._normalize()
+        Product.objects.all().delete()
+        self._products(12, offset=100)
+        large = self._normalize()
+
+        self.assertEqual(small, large)
+
+
 class StorefrontFitmentFilterTests(TestCase):
     def setUp(self):
         sync_consumer_vehicle_catalog(apply=True)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from store.fassride_import.images import ImageAssetManager
+from store.image_store import backfill_candidates, backfill_content_names, is_content_name
+from store.management.commands.import_product_images import RemoteImageResolver
+from store.models import Category, Product, ProductImage, RemoteImageContent
+from store.remote_image_checks import RemoteImageCheckCache
+from store.tests.http_stub import StubHTTPServer, image
+
+
+def _resolver() -> RemoteImageResolver:
+    return RemoteImageResolver(localize=True, retries=1, check_cache=RemoteImageCheckCache(ttl_seconds=3600))
+
+
+class ContentImageStoreTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def test_same_bytes_from_different_urls_are_stored_once(self):
+        routes = {"/a.jpg": [image(b"same-bytes")], "/b.jpg?v=2": [image(b"same-bytes")]}
+        with StubHTTPServer(routes) as server:
+            urls = [server.url("/a.jpg"), server.url("/b.jpg?v=2")]
+            resolver = _resolver()
+            localized = resolver.localize_many(urls)
+
+        self.assertEqual(localized[urls[0]], localized[urls[1]])
+        self.assertTrue(is_content_name(localized[urls[0]]))
+        self.assertTrue(localized[urls[0]].startswith("store/products/imported/ddc/"))
+        self.assertEqual(resolver.content_store.stats["stored"], 1)
+        self.assertEqual(resolver.content_store.stats["deduplicated"], 1)
+        self.assertEqual(resolver.content_store.stats["bytes_saved"], len(b"same-bytes"))
+        self.assertEqual(RemoteImageContent.objects.count(), 2)
+
+    def test_mapped_urls_are_not_downloaded_again(self):
+        with StubHTTPServer({"/a.jpg": [image(b"first")]}) as server:
+            url = server.url("/a.jpg")
+            first = _resolver().localize_many([url])
+            second_resolver = _resolver()
+            second = second_resolver.localize_many([url])
+
+        self.assertEqual(server.hits("/a.jpg"), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second_resolver.content_store.stats["reused_urls"], 1)
+
+    def test_backfill_repoints_rows_to_content_names(self):
+        category = Category.objects.create(name="Exhaust", slug="exhaust")
+        first = default_storage.save("store/imports/fassride/assets/one-aaaa.jpg", ContentFile(b"shared"))
+        second = default_storage.save("store/imports/fassride/assets/two-bbbb.jpg", ContentFile(b"shared"))
+        product = Product.objects.create(
+            name="Pump",
+            slug="pump",
+            sku="P-1",
+            category=category,
+            price=Decimal("10.00"),
+            main_image=first,
+        )
+        gallery = ProductImage.objects.create(product=product, image=second)
+
+        names = backfill_candidates()
+        self.assertEqual(names, sorted([first, second]))
+        dry_run = backfill_content_names(names)
+        self.assertEqual(dry_run["bytes_saved"], len(b"shared"))
+        self.assertEqual(dry_run["repointed_rows"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = backfill_content_names(names, apply=True, delete_old=True)
+
+        product.refresh_from_db()
+        gallery.refresh_from_db()
+        self.assertEqual(product.main_image.name, gallery.image.name)
+        self.assertTrue(is_content_name(product.main_image.name))
+        self.assertEqual(stats["unique"], 1)
+        self.assertEqual(stats["deleted"], 2)
+        self.assertFalse(default_storage.exists(first))
+        self.assertEqual(backfill_candidates(), [])
+
+    def test_importer_follows_backfilled_legacy_files(self):
+        manager = ImageAssetManager(retries=1, check_cache=RemoteImageCheckCache(ttl_seconds=3600))
+        with StubHTTPServer({"/pump.jpg": [image(b"pump")]}) as server:
+            url = server.url("/pump.jpg")
+            legacy = default_storage.save(manager.storage_name(url), ContentFile(b"pump"))
+            backfill_content_names([legacy], apply=True, delete_old=True)
+
+            planner = ImageAssetManager(retries=1, check_cache=RemoteImageCheckCache(ttl_seconds=3600))
+            planner.prime_storage_names([url])
+            planned = planner.storage_name(url)
+            localized = planner.localize(url)
+
+        self.assertTrue(is_content_name(planned))
+        self.assertEqual(localized, planned)
+        self.assertFalse(default_storage.exists(legacy))
+        self.assertEqual(planner.storage_stats()["images_stored"], 0)
+        self.assertEqual(RemoteImageContent.objects.get(url=url).storage_name, planned)
+
+    def test_primed_importer_reuses_stored_checks_and_files_without_lookups(self):
+        routes = {f"/part-{index}.jpg": [image(f"part-{index}".encode())] for index in range(3)}
+        with StubHTTPServer(routes) as server:
+            urls = [server.url(path) for path in routes]
+            first = ImageAssetManager(retries=1, check_cache=RemoteImageCheckCache(ttl_seconds=3600))
+            stored = [first.localize(url) for url in urls]
+
+            rerun = ImageAssetManager(retries=1, check_cache=RemoteImageCheckCache(ttl_seconds=3600))
+            with self.assertNumQueries(2):
+                rerun.prime(urls)
+            with self.assertNumQueries(0):
+                checks = [rerun.validate(url) for url in urls]
+                localized = [rerun.localize(url) for url in urls]
+
+        self.assertTrue(all(check.ok for check in checks))
+        self.assertEqual(localized, stored)
+        self.assertEqual(sum(server.hits(path) for path in routes), 6)  # first run only
+
+    def test_importer_adopts_legacy_files_left_in_place(self):
+        manager = ImageAssetManager(retries=1, check_cache=RemoteImageCheckCache(ttl_seconds=3600))
+        with StubHTTPServer({"/pump.jpg": [image(b"pump")]}) as server:
+            url = server.url("/pump.jpg")
+            legacy = default_storage.save(manager.storage_name(url), ContentFile(b"pump"))
+            localized = manager.localize(url)
+            hits = server.hits("/pump.jpg")
+
+        self.assertTrue(is_content_name(localized))
+        self.assertEqual(hits, 1)  # the validation request only
+        self.assertTrue(default_storage.exists(legacy))
+        self.assertEqual(manager.storage_name(url), localized)
+
+    def test_resolver_follows_backfilled_legacy_files(self):
+        with StubHTTPServer({"/pump.jpg": [image(b"pump")]}) as server:
+            url = server.url("/pump.jpg")
+            resolver = _resolver()
+            legacy = default_storage.save(resolver._storage_name(url, ""), ContentFile(b"pump"))
+            backfill_content_names([legacy], apply=True, delete_old=True)
+
+            localized = resolver.localize_many([url])[url]
+            hits = server.hits("/pump.jpg")
+
+        self.assertTrue(is_content_name(localized))
+        self.assertEqual(hits, 0)
+        self.assertFalse(default_storage.exists(legacy))
+        self.assertEqual(RemoteImageContent.objects.get(url=url).storage_name, localized)
+
+    def test_resolver_adopts_legacy_files_left_in_place(self):
+        with StubHTTPServer({"/pump.jpg": [image(b"pump")]}) as server:
+            url = server.url("/pump.jpg")
+            resolver = _resolver()
+            legacy = default_storage.save(resolver._storage_name(url, ""), ContentFile(b"pump"))
+            localized = resolver.localize_many([url])[url]
+            hits = server.hits("/pump.jpg")
+
+        self.assertTrue(is_content_name(localized))
+        self.assertNotEqual(localized, legacy)
+        self.assertEqual(hits, 0)
+        self.assertTrue(default_storage.exists(legacy))
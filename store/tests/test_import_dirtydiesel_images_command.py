@@ -10,8 +10,9 @@ from django.core.management import call_command
 from django.test import TestCase
 from django.test.utils import override_settings
 
+from store.dirtydiesel_import.match_cache import source_hash
 from store.dirtydiesel_import.types import SourceProduct
-from store.models import Category, Product
+from store.models import Category, Product, SupplierProductMatch
 
 
 class _FakeHTTPResponse:
@@ -235,3 +236,50 @@ class ImportDirtyDieselImagesCommandTests(TestCase):
         self.assertTrue(self.product.main_image.name.startswith("store/imports/dirtydiesel/assets/"))
         self.assertEqual(self.product.images.count(), 1)
         self.assertIn("updated_products=1", output.getvalue())
+
+    def _run_dry(self, source_products, *args) -> str:
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        output = StringIO()
+        with override_settings(MEDIA_ROOT=media_root):
+            with patch(
+                "store.dirtydiesel_import.source.DirtyDieselCatalogClient.fetch_catalog",
+                return_value=source_products,
+            ):
+                with patch("store.fassride_import.images.urlopen", side_effect=self._fake_urlopen):
+                    call_command("import_dirtydiesel_images", *args, stdout=output)
+        return output.getvalue()
+
+    def test_unchanged_products_reuse_stored_matches(self):
+        first = self._run_dry([self.source_product])
+        with patch(
+            "store.dirtydiesel_import.pipeline.build_name_index",
+            side_effect=AssertionError("catalog should not be re-indexed"),
+        ):
+            second = self._run_dry([self.source_product])
+
+        self.assertIn("reused_matches=0", first)
+        self.assertIn("reused_matches=1", second)
+        self.assertIn("failures=0", second)
+        stored = SupplierProductMatch.objects.get(product=self.product)
+        self.assertEqual((stored.supplier, stored.reason), ("dirty-diesel", "exact_sku"))
+
+    def test_changed_product_or_source_record_is_matched_again(self):
+        self._run_dry([self.source_product])
+
+        renamed_source = SourceProduct(**{**self.source_product.to_dict(), "product_name": "Renamed Splitter Cable"})
+        after_source_change = self._run_dry([renamed_source])
+
+        self.product.name = "OBD-II Splitter Cable"
+        self.product.save(update_fields=["name"])
+        after_product_change = self._run_dry([renamed_source])
+
+        forced = self._run_dry([renamed_source], "--rematch-all")
+
+        self.assertIn("reused_matches=0", after_source_change)
+        self.assertIn("reused_matches=0", after_product_change)
+        self.assertIn("reused_matches=0", forced)
+        self.assertEqual(
+            SupplierProductMatch.objects.get(product=self.product).source_hash,
+            source_hash(renamed_source),
+        )
@@ -7,7 +7,6 @@ from collections import Counter
 from decimal import Decimal
 from io import StringIO
 from unittest.mock import patch
-from urllib.error import HTTPError
 
 from django.core.management import call_command
 from django.test import SimpleTestCase, TestCase
@@ -16,10 +15,14 @@ from django.test.utils import override_settings
 from store.models import Category, Product
 from store.management.commands.import_product_images import (
     ImportStats,
+    NameMatchIndex,
     RemoteImageResolver,
     _build_csv_candidates_with_options,
+    _build_product_match_profile,
     _choose_diverse_fallback_candidate,
+    _find_best_name_match,
 )
+from store.tests.http_stub import StubHTTPServer, image
 
 
 def _csv_text(*rows: str) -> str:
@@ -27,31 +30,6 @@ def _csv_text(*rows: str) -> str:
     return "\n".join([header, *rows]) + "\n"
 
 
-class _FakeHTTPResponse:
-    def __init__(self, body: bytes, *, status: int = 200, content_type: str = "image/jpeg"):
-        self._body = body
-        self._offset = 0
-        self.status = status
-        self.headers = {"Content-Type": content_type}
-
-    def read(self, size: int = -1) -> bytes:
-        if size is None or size < 0:
-            size = len(self._body) - self._offset
-        start = self._offset
-        end = min(len(self._body), start + size)
-        self._offset = end
-        return self._body[start:end]
-
-    def getcode(self) -> int:
-        return self.status
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        return False
-
-
 class ImportProductImagesCommandTests(TestCase):
     def setUp(self):
         self.category = Category.objects.create(name="Default", slug="default")
@@ -205,20 +183,15 @@ class ImportProductImagesCommandTests(TestCase):
             slug="exact-match-product",
             sku="BROKEN-FIRST-SKU",
         )
-        csv_text = _csv_text(
-            "BROKEN-FIRST-SKU,$55.00,Exact Match Product,exact-match-product,https://cdn.example.com/broken.jpg,1",
-            "BROKEN-FIRST-SKU,$55.00,Exact Match Product,exact-match-product,https://cdn.example.com/valid.jpg,2",
-        )
-
-        def _urlopen(req, timeout=0):
-            url = req.full_url
-            if url.endswith("/broken.jpg"):
-                raise HTTPError(url, 404, "Not Found", hdrs={"Content-Type": "text/html"}, fp=None)
-            if url.endswith("/valid.jpg"):
-                return _FakeHTTPResponse(b"valid-image", content_type="image/jpeg")
-            raise AssertionError(f"Unexpected URL: {url}")
-
-        with patch("store.management.commands.import_product_images.urlopen", side_effect=_urlopen):
+        routes = {
+            "/broken.jpg": [(404, {"Content-Type": "text/html"}, b"Not Found")],
+            "/valid.jpg": [image(b"valid-image")],
+        }
+        with StubHTTPServer(routes) as server:
+            csv_text = _csv_text(
+                f"BROKEN-FIRST-SKU,$55.00,Exact Match Product,exact-match-product,{server.url('/broken.jpg')},1",
+                f"BROKEN-FIRST-SKU,$55.00,Exact Match Product,exact-match-product,{server.url('/valid.jpg')},2",
+            )
             with patch("sys.stdin", StringIO(csv_text)):
                 call_command(
                     "import_product_images",
@@ -226,41 +199,39 @@ class ImportProductImagesCommandTests(TestCase):
                     "--validate-remote-images",
                     "--only-current-prefix",
                     "store/placeholders/",
+                    stdout=StringIO(),
                 )
 
         product.refresh_from_db()
-        self.assertEqual(product.main_image.name, "https://cdn.example.com/valid.jpg")
+        self.assertEqual(product.main_image.name, server.url("/valid.jpg"))
 
     def test_include_broken_current_targets_broken_remote_products(self):
-        product = self._create_product(
-            name="Exact Match Product",
-            slug="exact-match-product",
-            sku="BROKEN-CURRENT-SKU",
-            main_image="https://cdn.example.com/current-broken.jpg",
-        )
-        csv_text = _csv_text(
-            "BROKEN-CURRENT-SKU,$55.00,Exact Match Product,exact-match-product,https://cdn.example.com/replacement.jpg,1"
-        )
-
-        def _urlopen(req, timeout=0):
-            url = req.full_url
-            if url.endswith("/current-broken.jpg"):
-                raise HTTPError(url, 404, "Not Found", hdrs={"Content-Type": "text/html"}, fp=None)
-            if url.endswith("/replacement.jpg"):
-                return _FakeHTTPResponse(b"replacement-image", content_type="image/jpeg")
-            raise AssertionError(f"Unexpected URL: {url}")
-
-        with patch("store.management.commands.import_product_images.urlopen", side_effect=_urlopen):
+        routes = {
+            "/current-broken.jpg": [(404, {"Content-Type": "text/html"}, b"Not Found")],
+            "/replacement.jpg": [image(b"replacement-image")],
+        }
+        with StubHTTPServer(routes) as server:
+            product = self._create_product(
+                name="Exact Match Product",
+                slug="exact-match-product",
+                sku="BROKEN-CURRENT-SKU",
+                main_image=server.url("/current-broken.jpg"),
+            )
+            csv_text = _csv_text(
+                "BROKEN-CURRENT-SKU,$55.00,Exact Match Product,exact-match-product,"
+                f"{server.url('/replacement.jpg')},1"
+            )
             with patch("sys.stdin", StringIO(csv_text)):
                 call_command(
                     "import_product_images",
                     "--stdin",
                     "--include-broken-current",
                     "--validate-remote-images",
+                    stdout=StringIO(),
                 )
 
         product.refresh_from_db()
-        self.assertEqual(product.main_image.name, "https://cdn.example.com/replacement.jpg")
+        self.assertEqual(product.main_image.name, server.url("/replacement.jpg"))
 
     def test_download_images_saves_local_file_into_storage(self):
         product = self._create_product(
@@ -268,20 +239,15 @@ class ImportProductImagesCommandTests(TestCase):
             slug="download-match-product",
             sku="DOWNLOAD-SKU",
         )
-        csv_text = _csv_text(
-            "DOWNLOAD-SKU,$55.00,Download Match Product,download-match-product,https://cdn.example.com/download.webp,1"
-        )
         media_root = tempfile.mkdtemp()
         self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
 
-        def _urlopen(req, timeout=0):
-            url = req.full_url
-            if url.endswith("/download.webp"):
-                return _FakeHTTPResponse(b"webp-image", content_type="image/webp")
-            raise AssertionError(f"Unexpected URL: {url}")
-
-        with override_settings(MEDIA_ROOT=media_root):
-            with patch("store.management.commands.import_product_images.urlopen", side_effect=_urlopen):
+        with StubHTTPServer({"/download.webp": [image(b"webp-image", "image/webp")]}) as server:
+            csv_text = _csv_text(
+                "DOWNLOAD-SKU,$55.00,Download Match Product,download-match-product,"
+                f"{server.url('/download.webp')},1"
+            )
+            with override_settings(MEDIA_ROOT=media_root):
                 with patch("sys.stdin", StringIO(csv_text)):
                     call_command(
                         "import_product_images",
@@ -290,14 +256,50 @@ class ImportProductImagesCommandTests(TestCase):
                         "--download-images",
                         "--only-current-prefix",
                         "store/placeholders/",
+                        stdout=StringIO(),
                     )
-            product.refresh_from_db()
-            self.assertTrue(product.main_image.name.startswith("store/products/imported/ddc/"))
-            self.assertTrue(product.main_image.storage.exists(product.main_image.name))
+                product.refresh_from_db()
+                self.assertTrue(product.main_image.name.startswith("store/products/imported/ddc/"))
+                self.assertTrue(product.main_image.storage.exists(product.main_image.name))
 
+        # One validation request while picking candidates, one download for the planned update.
+        self.assertEqual(server.hits("/download.webp"), 2)
         product.refresh_from_db()
         self.assertTrue(product.main_image.name.startswith("store/products/imported/ddc/"))
 
+    def test_remote_checks_run_concurrently_with_per_host_limit(self):
+        products = [
+            self._create_product(name=f"Pump {idx}", slug=f"pump-{idx}", sku=f"PUMP-{idx}") for idx in range(12)
+        ]
+        routes = {f"/pump-{idx}.jpg": [image()] for idx in range(12)}
+        routes["/pump-0.jpg"] = [(503, {"Content-Type": "text/plain"}, b"busy"), image()]
+        with StubHTTPServer(routes, delay=0.05) as server:
+            csv_text = _csv_text(
+                *(
+                    f"PUMP-{idx},$55.00,Pump {idx},pump-{idx},{server.url(f'/pump-{idx}.jpg')},1"
+                    for idx in range(12)
+                )
+            )
+            with patch("sys.stdin", StringIO(csv_text)):
+                call_command(
+                    "import_product_images",
+                    "--stdin",
+                    "--validate-remote-images",
+                    "--workers",
+                    "8",
+                    "--per-host",
+                    "3",
+                    stdout=StringIO(),
+                )
+
+        for idx, product in enumerate(products):
+            product.refresh_from_db()
+            self.assertEqual(product.main_image.name, server.url(f"/pump-{idx}.jpg"))
+        self.assertEqual(server.peak_in_flight, 3)
+        self.assertEqual(server.hits("/pump-0.jpg"), 2)
+        # Keep-alive: at most one connection per in-flight slot (plus the retried one).
+        self.assertLessEqual(len(server.connections), 4)
+
 
 class ImportProductImagesHelperTests(SimpleTestCase):
     def test_candidate_build_uses_type_and_years_for_classification(self):
@@ -341,3 +343,35 @@ class ImportProductImagesHelperTests(SimpleTestCase):
         second_candidate, _ = _choose_diverse_fallback_candidate(second, candidates, image_usage=usage)
         self.assertIsNotNone(second_candidate)
         self.assertNotEqual(first_candidate.image_url, second_candidate.image_url)
+
+    def test_name_match_index_gives_same_matches_as_full_scan(self):
+        csv_text = (
+            "SKU,RETAIL PRICE,Title,Handle,Image Src,Image Position,Vendor,Type,Years\n"
+            "SW-1114,$55.00,Powerstroke Switch Alpha,powerstroke-switch-alpha,https://cdn.example.com/a.jpg,1,Dirty Diesel Customs,Switch,\"2011-2014 Ford Powerstroke 6.7L\"\n"
+            "SW-1519,$55.00,Powerstroke Switch Beta,powerstroke-switch-beta,https://cdn.example.com/b.jpg,1,Dirty Diesel Customs,Switch,\"2015-2019 Ford Powerstroke 6.7L\"\n"
+            "EX-4210,$55.00,Performance Exhaust,performance-exhaust,https://cdn.example.com/c.jpg,1,Dirty Diesel Customs,Downpipe Back Exhaust System,\"2011-2019 Ford 6.7L Powerstroke\"\n"
+            "CM-5900,$55.00,Cummins Lift Pump Kit,cummins-lift-pump-kit,https://cdn.example.com/d.jpg,1,Dirty Diesel Customs,Fuel Pump,\"2003-2007 Dodge Cummins 5.9L\"\n"
+        )
+        candidates = _build_csv_candidates_with_options(
+            csv.DictReader(StringIO(csv_text)),
+            ImportStats(),
+            resolver=RemoteImageResolver(validate=False),
+        )
+        index = NameMatchIndex(candidates)
+        products = [
+            Product(name="SOTF Harness (2011-2014 Powerstroke)", slug="sotf-harness-2011-2014-powerstroke"),
+            Product(name="Powerstroke Switch", slug="powerstroke-switch"),
+            Product(name="Exhaust System 6.7L", slug="exhaust-system-6-7l"),
+            Product(name="Lift Pump 5.9 Cummins", slug="lift-pump-5-9-cummins"),
+            Product(name="Unrelated Sticker", slug="unrelated-sticker"),
+        ]
+
+        for product in products:
+            full = _find_best_name_match(product, candidates)
+            indexed = _find_best_name_match(product, candidates, index=index)
+            with self.subTest(product=product.slug):
+                self.assertEqual(
+                    (full.candidate.handle, full.score, full.runner_up_score) if full else None,
+                    (indexed.candidate.handle, indexed.score, indexed.runner_up_score) if indexed else None,
+                )
+        self.assertEqual(index.shortlist(_build_product_match_profile(products[-1])), [])
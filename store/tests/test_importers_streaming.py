@@ -0,0 +1,92 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from openpyxl import Workbook
+
+from store.importers import CSV_SNIFF_BYTES, _iter_shopify_groups, iter_spreadsheet, read_spreadsheet
+
+
+class _TrackedUpload(SimpleUploadedFile):
+    def __init__(self, name, content):
+        super().__init__(name, content)
+        self.max_offset = 0
+
+    def read(self, *args, **kwargs):
+        data = super().read(*args, **kwargs)
+        self.max_offset = max(self.max_offset, self.tell())
+        return data
+
+
+class SpreadsheetStreamingTests(SimpleTestCase):
+    def test_csv_rows_are_read_lazily(self):
+        lines = ["sku;name;price"] + [f"SKU-{idx};Part {idx};{idx}.00" for idx in range(20000)]
+        content = ("\n".join(lines) + "\n").encode("utf-8")
+        upload = _TrackedUpload("parts.csv", content)
+
+        spreadsheet = iter_spreadsheet(upload)
+        first = next(spreadsheet.rows)
+
+        self.assertEqual(spreadsheet.headers, ["sku", "name", "price"])
+        self.assertEqual(first, {"sku": "SKU-0", "name": "Part 0", "price": "0.00"})
+        self.assertIsNone(spreadsheet.total_rows)
+        self.assertLess(upload.max_offset, CSV_SNIFF_BYTES * 2)
+        self.assertLess(CSV_SNIFF_BYTES * 2, len(content))
+        self.assertEqual(sum(1 for _row in spreadsheet.rows), 19999)
+
+    def test_csv_falls_back_to_cp1252(self):
+        upload = SimpleUploadedFile("parts.csv", "sku,name\nA-1,Caf\xe9 kit\n".encode("cp1252"))
+
+        headers, rows = read_spreadsheet(upload)
+
+        self.assertEqual(headers, ["sku", "name"])
+        self.assertEqual(rows, [{"sku": "A-1", "name": "Caf\xe9 kit"}])
+
+    def test_csv_switches_to_cp1252_after_the_sniffed_sample(self):
+        lines = ["sku,name"] + [f"SKU-{idx},Part {idx}" for idx in range(CSV_SNIFF_BYTES // 10)]
+        content = ("\n".join(lines) + "\n").encode("utf-8") + "A-1,Caf\xe9 kit\n".encode("cp1252")
+        self.assertGreater(content.index(b"\xe9"), CSV_SNIFF_BYTES)
+
+        headers, rows = read_spreadsheet(SimpleUploadedFile("parts.csv", content))
+
+        self.assertEqual(headers, ["sku", "name"])
+        self.assertEqual(len(rows), len(lines))
+        self.assertEqual(rows[0], {"sku": "SKU-0", "name": "Part 0"})
+        self.assertEqual(rows[-1], {"sku": "A-1", "name": "Caf\xe9 kit"})
+
+    def test_xlsx_rows_stream_from_a_read_only_sheet(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["sku", "name", "price"])
+        ws.append(["A-1", "Intake", 10])
+        ws.append([None, None, None])
+        ws.append(["A-2", "Downpipe"])
+        buffer = BytesIO()
+        wb.save(buffer)
+
+        spreadsheet = iter_spreadsheet(SimpleUploadedFile("parts.xlsx", buffer.getvalue()))
+
+        self.assertEqual(spreadsheet.headers, ["sku", "name", "price"])
+        self.assertEqual(spreadsheet.total_rows, 3)
+        self.assertEqual(
+            list(spreadsheet.rows),
+            [
+                {"sku": "A-1", "name": "Intake", "price": 10},
+                {"sku": "A-2", "name": "Downpipe", "price": None},
+            ],
+        )
+
+    def test_shopify_rows_group_per_contiguous_handle(self):
+        rows = iter(
+            [
+                {"Handle": "tuner", "Title": "Tuner"},
+                {"Handle": "tuner", "Option1 Value": "6.7L"},
+                {"Handle": "", "Title": ""},
+                {"Handle": "mirror", "Title": "Mirror"},
+                {"Handle": "tuner", "Option1 Value": "6.6L"},
+            ]
+        )
+
+        groups = [(handle, len(group)) for handle, group in _iter_shopify_groups(rows)]
+
+        self.assertEqual(groups, [("tuner", 2), ("", 1), ("mirror", 1), ("tuner", 1)])
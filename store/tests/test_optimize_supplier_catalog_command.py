@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from decimal import Decimal
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from store.management.commands.optimize_supplier_catalog import FAMILY_RULES, Command, _group_sku
+from store.management.commands.optimize_supplier_catalog import FAMILY_RULE_TRIE, FAMILY_RULES, Command, _group_sku
 from store.models import Category, CleanupBatch, Product, ProductOption
 
 
@@ -141,3 +143,41 @@ class OptimizeSupplierCatalogCommandTests(TestCase):
         blank_category.refresh_from_db()
         self.assertEqual(blank_category.image.name, "store/products/bgm-donor.jpg")
         self.assertEqual(summary["filled_category_images"], 2)
+
+    def test_prefix_trie_picks_the_longest_matching_family_rule(self):
+        for rule in FAMILY_RULES:
+            name = f"{rule.prefix} 2019+ Ram Cummins"
+            expected = max(
+                (item for item in FAMILY_RULES if item.category_name == rule.category_name and name.startswith(item.prefix)),
+                key=lambda item: len(item.prefix),
+            )
+            self.assertEqual(FAMILY_RULE_TRIE.match(rule.category_name, name), expected)
+        self.assertIsNone(FAMILY_RULE_TRIE.match("Unknown", "EZ Lynk Tune Files 2019+"))
+
+    def test_cleanup_queries_do_not_grow_with_family_size(self):
+        category = Category.objects.create(name="Motor Vehicle Engine Parts", slug="motor-vehicle-engine-parts")
+
+        def run_with(count: int, offset: int) -> int:
+            for index in range(offset, offset + count):
+                product = Product.objects.create(
+                    name=f"EZ Lynk Tune Files {2000 + index} Ram Cummins",
+                    slug=f"ez-lynk-{index}",
+                    sku=f"EZLYNK-{index}",
+                    category=category,
+                    price=Decimal("899.00"),
+                    inventory=1,
+                    is_active=True,
+                    is_in_house=False,
+                )
+                ProductOption.objects.create(product=product, name="Stage 1", sku=f"EZLYNK-{index}-S1", is_active=True)
+            with CaptureQueriesContext(connection) as ctx:
+                self.command._run_cleanup(batch=self.batch, apply_changes=True)
+            return len(ctx.captured_queries)
+
+        small = run_with(2, 0)
+        large = run_with(25, 100)
+
+        parent = Product.objects.get(sku__startswith="CAT-GRP-")
+        self.assertEqual(parent.options.filter(is_active=True).count(), 25)
+        self.assertEqual(Product.objects.filter(sku__startswith="EZLYNK-", is_active=True).count(), 0)
+        self.assertLessEqual(large, small + 5)
@@ -1,8 +1,10 @@
 from decimal import Decimal
 
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-from store.models import Category, Product
+from store.models import Category, Product, ProductOption
 from store.printful_catalog import sync_printful_merch_products
 
 
@@ -98,3 +100,64 @@ class PrintfulMerchSyncTests(TestCase):
 
         inactive.refresh_from_db()
         self.assertTrue(inactive.is_active)
+
+    @override_settings(PRINTFUL_MERCH_LIMIT=0)
+    def test_resync_of_unchanged_items_skips_writes(self):
+        payload = self._sync_payload(101, base_price="19.99")
+        first = sync_printful_merch_products(payload)
+        product = Product.objects.get(sku="PF-101")
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = sync_printful_merch_products(payload)
+
+        self.assertEqual((first["created"], first["options_created"]), (1, 1))
+        self.assertEqual(second["skipped"], 1)
+        self.assertEqual((second["created"], second["updated"], second["deactivated"]), (0, 0, 0))
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith(("UPDATE", "INSERT", "DELETE"))])
+        self.assertEqual(Product.objects.get(pk=product.pk).updated_at, product.updated_at)
+
+    @override_settings(PRINTFUL_MERCH_LIMIT=0)
+    def test_resync_restores_fields_edited_outside_the_sync(self):
+        payload = self._sync_payload(101, base_price="19.99")
+        sync_printful_merch_products(payload)
+        product = Product.objects.get(sku="PF-101")
+        product.name = "Edited in admin"
+        product.price = Decimal("5.00")
+        product.save()
+
+        summary = sync_printful_merch_products(payload)
+
+        product.refresh_from_db()
+        self.assertEqual((summary["skipped"], summary["updated"]), (0, 1))
+        self.assertEqual((product.name, product.price), ("Synced 101", Decimal("19.99")))
+
+    @override_settings(PRINTFUL_MERCH_LIMIT=0)
+    def test_resync_restores_options_edited_outside_the_sync(self):
+        payload = self._sync_payload(101, base_price="19.99")
+        sync_printful_merch_products(payload)
+        option = ProductOption.objects.get(product__sku="PF-101")
+        ProductOption.objects.filter(pk=option.pk).update(is_active=False, name="Edited in admin")
+
+        summary = sync_printful_merch_products(payload)
+
+        option.refresh_from_db()
+        self.assertEqual((summary["skipped"], summary["updated"], summary["options_updated"]), (0, 1, 1))
+        self.assertTrue(option.is_active)
+        self.assertNotEqual(option.name, "Edited in admin")
+
+    def test_changed_items_update_products_and_options_in_bulk(self):
+        sync_printful_merch_products(self._sync_payload(101, base_price="19.99"))
+        payload = self._sync_payload(101, base_price="24.00")
+        payload[0]["variants"][0].update(sku="PF-101-XL", name="XL")
+
+        summary = sync_printful_merch_products(payload)
+
+        product = Product.objects.get(sku="PF-101")
+        self.assertEqual(summary["updated"], 1)
+        self.assertEqual(summary["options_created"], 1)
+        self.assertEqual(summary["options_deactivated"], 1)
+        self.assertEqual(product.price, Decimal("24.00"))
+        self.assertEqual(
+            list(product.options.order_by("sku").values_list("sku", "is_active")),
+            [("PF-101-1", False), ("PF-101-XL", True)],
+        )
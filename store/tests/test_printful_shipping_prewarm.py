@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from store.models import Category, Order, OrderItem, Product, ProductOption
+from store.printful_fulfillment import prewarm_printful_shipping_quotes
+
+
+@override_settings(PRINTFUL_TOKEN="token-123", PRINTFUL_SHIPPING_QUOTE_POSTAL_PREFIX=3)
+class PrintfulShippingPrewarmTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Merch", slug="merch")
+        product = Product.objects.create(
+            name="BGM Tee", slug="merch-bgm-tee", sku="PF-101", category=category, price=Decimal("30.00")
+        )
+        self.small = ProductOption.objects.create(product=product, name="S", printful_variant_id=501)
+        self.large = ProductOption.objects.create(product=product, name="L", printful_variant_id=502)
+        self.product = product
+
+    def _order(self, option, *, postal_code: str, region: str = "AB", qty: int = 1) -> Order:
+        order = Order.objects.create(
+            customer_name="Buyer",
+            email="buyer@example.com",
+            country="Canada",
+            region=region,
+            city="Calgary",
+            postal_code=postal_code,
+        )
+        OrderItem.objects.create(order=order, product=self.product, option=option, qty=qty)
+        return order
+
+    def test_top_destinations_and_carts_are_quoted(self):
+        self._order(self.small, postal_code="T2P 1J9")
+        self._order(self.small, postal_code="t2p4k2")
+        self._order(self.large, postal_code="T1A 0A1", qty=2)
+        self._order(self.small, postal_code="V6B 1A1", region="BC")
+
+        with patch("store.printful_fulfillment.quote_printful_shipping_rates", return_value=[]) as quote:
+            stats = prewarm_printful_shipping_quotes(destinations=2, item_sets=1)
+
+        self.assertEqual(stats, {"destinations": 2, "carts": 1, "quoted": 2, "failed": 0})
+        calls = [call.kwargs for call in quote.call_args_list]
+        self.assertEqual(calls[0]["recipient"]["zip"], "T2P 4K2")
+        self.assertEqual(calls[0]["items"], [{"variant_id": 501, "quantity": 1}])
+        self.assertEqual({call["recipient"]["country_code"] for call in calls}, {"CA"})
+        self.assertTrue(all(call["allow_stale"] is False for call in calls))
+
+    @override_settings(CACHE_IS_SHARED=False, PRINTFUL_SHIPPING_QUOTE_FRESH_SECONDS=300)
+    def test_command_skips_process_local_cache(self):
+        self._order(self.small, postal_code="T2P 1J9")
+        out = StringIO()
+
+        with patch("store.printful_fulfillment.quote_printful_shipping_rates") as quote:
+            call_command("warm_printful_shipping_quotes", stdout=out)
+
+        quote.assert_not_called()
+        self.assertIn("nothing to warm", out.getvalue())
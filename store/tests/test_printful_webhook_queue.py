@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, modify_settings, override_settings
+from django.utils import timezone
+
+from core.services.printful import PrintfulAPIError
+from store.models import Order, PrintfulWebhookEvent
+from store.printful_fulfillment import (
+    PRINTFUL_WEBHOOK_MAX_ATTEMPTS,
+    process_printful_webhook_events,
+    record_printful_webhook,
+)
+
+
+def _live_order(printful_order_id: int, *, status: str = "fulfilled") -> dict:
+    return {
+        "id": printful_order_id,
+        "status": status,
+        "shipments": [{"tracking_number": "TRACK-1", "tracking_url": "https://tracking.example/1", "carrier": "UPS"}],
+    }
+
+
+@modify_settings(MIDDLEWARE={"remove": ["core.middleware.VisitorAnalyticsMiddleware"]})
+@override_settings(
+    PRINTFUL_WEBHOOK_SECRET="secret-123",
+    SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+)
+class PrintfulWebhookQueueTests(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            customer_name="Merch Buyer",
+            email="buyer@example.com",
+            status=Order.STATUS_PROCESSING,
+            printful_order_id=9001,
+        )
+
+    def test_webhook_only_queues_the_event(self):
+        body = json.dumps({"type": "order_updated", "order_id": 9001})
+        with patch("store.printful_fulfillment.get_printful_order") as get_printful_order:
+            for _ in range(2):
+                response = self.client.post(
+                    "/store/printful/webhook/secret-123/", data=body, content_type="application/json"
+                )
+
+        self.assertEqual(response.status_code, 200)
+        get_printful_order.assert_not_called()
+        event = PrintfulWebhookEvent.objects.get()
+        self.assertEqual(event.status, PrintfulWebhookEvent.Status.PENDING)
+        self.assertIsNone(event.order_id)
+
+    def test_events_for_one_order_share_a_single_live_fetch(self):
+        for seq, event_type in enumerate(("order_updated", "package_shipped", "order_updated")):
+            record_printful_webhook({"type": event_type, "order_id": 9001, "seq": seq})
+        record_printful_webhook({"type": "order_updated", "order_id": 7777})
+
+        with patch(
+            "store.printful_fulfillment.get_printful_order", return_value=_live_order(9001)
+        ) as get_printful_order:
+            stats = process_printful_webhook_events()
+
+        get_printful_order.assert_called_once_with(9001)
+        self.assertEqual(stats["processed"], 4)
+        self.assertEqual(stats["orders"], 1)
+        self.assertEqual(stats["fetches"], 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_SHIPPED)
+        self.assertEqual(self.order.tracking_numbers, "TRACK-1")
+
+        events = PrintfulWebhookEvent.objects.order_by("pk")
+        self.assertEqual({event.status for event in events}, {PrintfulWebhookEvent.Status.PROCESSED})
+        self.assertEqual([event.order_id for event in events], [self.order.pk] * 3 + [None])
+        self.assertTrue(all(event.processing_latency is not None for event in events))
+
+    def test_failed_fetches_are_retried_until_attempts_run_out(self):
+        event, _ = record_printful_webhook({"type": "order_updated", "order_id": 9001})
+
+        with patch("store.printful_fulfillment.get_printful_order", side_effect=PrintfulAPIError("http_503")):
+            delays = []
+            for _ in range(PRINTFUL_WEBHOOK_MAX_ATTEMPTS - 1):
+                self.assertEqual(process_printful_webhook_events()["retrying"], 1)
+                # Backed off: a second pass right away leaves the event alone.
+                self.assertEqual(process_printful_webhook_events()["retrying"], 0)
+                event.refresh_from_db()
+                delays.append(round((event.next_attempt_at - timezone.now()).total_seconds() / 60))
+                PrintfulWebhookEvent.objects.filter(pk=event.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(delays, [1, 2, 4, 8])
+            self.assertEqual(event.status, PrintfulWebhookEvent.Status.PENDING)
+            self.assertEqual(event.last_error, "http_503")
+
+            self.assertEqual(process_printful_webhook_events()["failed"], 1)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, PrintfulWebhookEvent.Status.FAILED)
+        self.assertEqual(event.attempts, PRINTFUL_WEBHOOK_MAX_ATTEMPTS)
+
+    def test_newer_events_wait_for_an_earlier_event_backing_off(self):
+        first, _ = record_printful_webhook({"type": "order_updated", "order_id": 9001, "seq": 0})
+        with patch("store.printful_fulfillment.get_printful_order", side_effect=PrintfulAPIError("http_503")):
+            self.assertEqual(process_printful_webhook_events()["retrying"], 1)
+
+        newer, _ = record_printful_webhook({"type": "package_shipped", "order_id": 9001, "seq": 1})
+        other_order = Order.objects.create(
+            customer_name="Other Buyer",
+            email="other@example.com",
+            status=Order.STATUS_PROCESSING,
+            printful_order_id=9002,
+        )
+        record_printful_webhook({"type": "order_updated", "order_id": 9002})
+        with patch(
+            "store.printful_fulfillment.get_printful_order", return_value=_live_order(9002)
+        ) as get_printful_order:
+            stats = process_printful_webhook_events()
+
+        get_printful_order.assert_called_once_with(9002)
+        self.assertEqual(stats["processed"], 1)
+        newer.refresh_from_db()
+        self.assertEqual(newer.status, PrintfulWebhookEvent.Status.PENDING)
+        self.assertEqual(newer.attempts, 0)
+        self.assertEqual(newer.order_id, self.order.pk)
+        self.assertEqual(other_order.printful_webhook_events.get().status, PrintfulWebhookEvent.Status.PROCESSED)
+
+        PrintfulWebhookEvent.objects.filter(pk__in=[first.pk, newer.pk]).update(next_attempt_at=timezone.now())
+        with patch(
+            "store.printful_fulfillment.get_printful_order", return_value=_live_order(9001)
+        ) as get_printful_order:
+            stats = process_printful_webhook_events()
+
+        get_printful_order.assert_called_once_with(9001)
+        self.assertEqual(stats["processed"], 2)
+
+    def test_worker_command_reports_latency(self):
+        record_printful_webhook({"type": "order_updated", "order_id": 9001})
+        with patch("store.printful_fulfillment.get_printful_order", return_value=_live_order(9001)):
+            with patch("sys.stdout") as stdout:
+                call_command("process_printful_webhooks", "--once", stdout=stdout)
+
+        output = "".join(call.args[0] for call in stdout.write.call_args_list)
+        self.assertIn("Applied 1 Printful webhook event(s) for 1 order(s) with 1 live fetch(es)", output)
+
+    def test_claimed_events_are_leased_outside_the_claim_transaction(self):
+        record_printful_webhook({"type": "order_updated", "order_id": 9001})
+
+        def _fetch(printful_order_id):
+            # A concurrent worker polling mid-fetch finds nothing to claim.
+            self.assertEqual(process_printful_webhook_events()["orders"], 0)
+            return _live_order(printful_order_id)
+
+        with patch("store.printful_fulfillment.get_printful_order", side_effect=_fetch):
+            stats = process_printful_webhook_events()
+
+        self.assertEqual(stats["processed"], 1)
+        event = PrintfulWebhookEvent.objects.get()
+        self.assertEqual(event.status, PrintfulWebhookEvent.Status.PROCESSED)
+        self.assertIsNone(event.next_attempt_at)
@@ -1,9 +1,24 @@
+import random
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
 
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
+from django.utils import timezone
 
-from store.models import CarMake, CarModel, Category, Product
+from store.companions import CompanionIndex, rebuild_product_companions, stale_companion_product_ids
+from store.models import (
+    COMPANION_ROWS_PER_PRODUCT,
+    CarMake,
+    CarModel,
+    Category,
+    CompanionProfile,
+    Product,
+    ProductCompanion,
+    rank_companions,
+)
 
 
 class ProductCompanionItemsTests(TestCase):
@@ -76,6 +91,8 @@ class ProductCompanionItemsTests(TestCase):
             short_description="Unrelated catalog item.",
         )
 
+        rebuild_product_companions()
+        product = Product.objects.get(pk=product.pk)
         companions = product.get_companion_items(limit=3)
 
         self.assertEqual(
@@ -85,6 +102,26 @@ class ProductCompanionItemsTests(TestCase):
         self.assertNotIn(merch.pk, [item.pk for item in companions])
         self.assertNotIn(unrelated.pk, [item.pk for item in companions])
 
+    def test_unranked_product_falls_back_to_its_category_without_scoring(self):
+        product = self._product(name="Lift Pump", slug="lift-pump", sku="LP-1", category=self.fuel_category)
+        older = self._product(name="Pump Filter", slug="pump-filter", sku="FLT-1", category=self.fuel_category)
+        newer = self._product(name="Pump Hose", slug="pump-hose", sku="PH-1", category=self.fuel_category)
+        self._product(name="Engine Gasket", slug="engine-gasket", sku="EG-1", category=self.engine_category)
+
+        with self.assertNumQueries(2):
+            companions = product.get_companion_items(limit=3)
+
+        self.assertEqual([item.pk for item in companions], [newer.pk, older.pk])
+
+    def test_product_ranked_without_companions_gets_none(self):
+        product = self._product(name="Lift Pump", slug="lift-pump", sku="LP-1", category=self.fuel_category)
+        self._product(name="Pump Hose", slug="pump-hose", sku="PH-1", category=self.fuel_category)
+        Product.objects.filter(pk=product.pk).update(companions_checked_at=timezone.now())
+        product = Product.objects.get(pk=product.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(product.get_companion_items(limit=3), [])
+
     def test_product_detail_renders_go_along_section_before_quote_request(self):
         product = self._product(
             name="Bridge Deck",
@@ -110,3 +147,109 @@ class ProductCompanionItemsTests(TestCase):
             content.index("Items that go along to complete your build"),
             content.index("Share the inputs, we’ll send the plan"),
         )
+
+
+class CompanionIndexRankingTests(SimpleTestCase):
+    def test_index_ranking_matches_full_scan(self):
+        rng = random.Random(11)
+        vocab = [f"word{i}" for i in range(40)]
+        start = timezone.now()
+        profiles = [
+            CompanionProfile(
+                pk=pk,
+                category_id=rng.randint(1, 6),
+                created_at=start - timedelta(minutes=pk),
+                tokens=frozenset(rng.sample(vocab, rng.randint(0, 8))),
+                model_ids=frozenset(rng.sample(range(1, 12), rng.choice((0, 0, 1, 2, 3)))),
+            )
+            for pk in range(1, 301)
+        ]
+        index = CompanionIndex(profiles)
+
+        for own in profiles:
+            self.assertEqual(index.rank(own), rank_companions(own, profiles, COMPANION_ROWS_PER_PRODUCT))
+
+
+class ProductCompanionTableTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Fuel System", slug="fuel-system")
+        self.other_category = Category.objects.create(name="Exhaust", slug="exhaust")
+        make = CarMake.objects.create(name="Ford")
+        self.platform = CarModel.objects.create(make=make, name="F-250", year_from=2020, year_to=2024)
+
+    def _product(self, name: str, **kwargs) -> Product:
+        defaults = {
+            "slug": name.lower().replace(" ", "-"),
+            "sku": name.upper().replace(" ", "-"),
+            "category": self.category,
+            "price": Decimal("10.00"),
+            "is_active": True,
+        }
+        defaults.update(kwargs)
+        return Product.objects.create(name=name, **defaults)
+
+    def test_product_page_reads_precomputed_rows(self):
+        product = self._product("Lift Pump")
+        for name in ("Pump Filter", "Pump Hose", "Sending Unit", "Muffler"):
+            self._product(name, category=self.other_category if name == "Muffler" else self.category)
+        stats = rebuild_product_companions()
+        self.assertEqual(stats["products_updated"], 5)
+
+        product = Product.objects.get(pk=product.pk)
+        expected = [item.pk for item in product.compute_companion_items(limit=3)]
+        with self.assertNumQueries(1):
+            companions = product.get_companion_items(limit=3)
+        self.assertEqual([item.pk for item in companions], expected)
+
+        again = rebuild_product_companions()
+        self.assertEqual(again["products_updated"], 0)
+
+    def test_fitment_change_refreshes_companions_after_commit(self):
+        product = self._product("Lift Pump")
+        product.compatible_models.add(self.platform)
+        for index in range(4):
+            self._product(f"Exhaust Clamp {index}", category=self.other_category)
+        rebuild_product_companions()
+        fitted = Product.objects.get(slug="exhaust-clamp-0")
+        self.assertNotEqual(product.companion_rows.order_by("rank").first().companion_id, fitted.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            fitted.compatible_models.add(self.platform)
+
+        # The signal only queues the change; the cron re-ranks.
+        self.assertNotEqual(product.companion_rows.order_by("rank").first().companion_id, fitted.pk)
+        self.assertIn(fitted.pk, stale_companion_product_ids())
+        call_command("rebuild_product_companions", stdout=StringIO())
+        self.assertEqual(product.companion_rows.order_by("rank").first().companion_id, fitted.pk)
+
+    def test_command_rebuilds_only_stale_products(self):
+        first = self._product("Lift Pump")
+        self._product("Pump Filter")
+        call_command("rebuild_product_companions", stdout=StringIO())
+        self.assertEqual(ProductCompanion.objects.filter(product=first).count(), 1)
+
+        third = self._product("Pump Hose")
+        out = StringIO()
+        call_command("rebuild_product_companions", stdout=out)
+
+        # The new product plus the two products it now ranks for.
+        self.assertIn("products_checked=3", out.getvalue())
+        self.assertEqual(ProductCompanion.objects.filter(product=third).count(), 2)
+        self.assertEqual(ProductCompanion.objects.filter(product=first).count(), 2)
+
+    def test_merch_and_unmatched_products_are_not_stale_after_a_rebuild(self):
+        merch = Category.objects.create(name="Merch", slug="merch")
+        self._product("Logo Hoodie", sku="PF-HOODIE", category=merch)
+        # The only rankable product, so its ranking is empty.
+        loner = self._product("Lift Pump")
+        rebuild_product_companions()
+
+        self.assertFalse(ProductCompanion.objects.filter(product=loner).exists())
+        self.assertEqual(stale_companion_product_ids(), set())
+        out = StringIO()
+        call_command("rebuild_product_companions", stdout=out)
+        self.assertIn("products_checked=0", out.getvalue())
+
+        loner.name = "Lift Pump Kit"
+        loner.save()
+        self.assertEqual(stale_companion_product_ids(), {loner.pk})
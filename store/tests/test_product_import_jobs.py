@@ -0,0 +1,231 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from store.import_jobs import IMPORT_MAX_ATTEMPTS, IMPORT_STALE_SECONDS, enqueue_import
+from store.importers import import_products
+from store.models import Category, ImportBatch, Product, ProductOption
+
+
+def _simple_csv(count: int, *, start: int = 1, price: str = "10.00") -> SimpleUploadedFile:
+    lines = ["sku,name,price,category,inventory"]
+    for idx in range(start, start + count):
+        category = "Intakes" if idx % 2 else "Exhaust"
+        lines.append(f"SKU-{idx},Part {idx},{price},{category},{idx}")
+    return SimpleUploadedFile("parts.csv", ("\n".join(lines) + "\n").encode("utf-8"), content_type="text/csv")
+
+
+def _shopify_csv() -> SimpleUploadedFile:
+    rows = [
+        "Handle,Title,Variant SKU,Variant Price,Option1 Name,Option1 Value,Type",
+        "tuner,Tuner,TUNER,400.00,,,Electronics",
+        "tuner,,TUNER-66,450.00,Engine,6.6L,",
+        "tuner,,TUNER-67,460.00,Engine,6.7L,",
+        "mirror,Mirror,MIRROR,90.00,,,Body",
+    ]
+    return SimpleUploadedFile("shopify.csv", ("\n".join(rows) + "\n").encode("utf-8"), content_type="text/csv")
+
+
+class ProductImportEngineTests(TestCase):
+    def setUp(self):
+        self.default = Category.objects.create(name="Default", slug="default")
+
+    def _import(self, uploaded, **kwargs):
+        options = {
+            "uploaded_file": uploaded,
+            "mode": "auto",
+            "default_category": self.default,
+            "default_currency": "CAD",
+            "update_existing": True,
+            "create_missing_categories": True,
+            "dry_run": False,
+        }
+        options.update(kwargs)
+        return import_products(**options)
+
+    def test_rows_are_written_in_bulk(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result = self._import(_simple_csv(120))
+
+        self.assertEqual(result.created_products, 120)
+        self.assertEqual(result.created_categories, 2)
+        self.assertEqual(result.errors, [])
+        self.assertEqual(Product.objects.filter(category__name="Intakes").count(), 60)
+        product = Product.objects.get(sku="SKU-7")
+        self.assertEqual((product.name, product.slug, product.inventory), ("Part 7", "part-7", 7))
+        self.assertLess(len(ctx.captured_queries), 40)
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = self._import(_simple_csv(120, price="12.50"))
+        self.assertEqual((result.created_products, result.updated_products), (0, 120))
+        self.assertEqual(Product.objects.get(sku="SKU-7").price, Decimal("12.50"))
+        self.assertLess(len(ctx.captured_queries), 40)
+
+    def test_bulk_updates_touch_updated_at(self):
+        self._import(_simple_csv(3))
+        Product.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+        self._import(_simple_csv(3, price="12.50"))
+
+        stale = Product.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=1))
+        self.assertFalse(stale.exists())
+
+    def test_progress_is_reported_per_chunk(self):
+        calls = []
+        with patch("store.importers.IMPORT_CHUNK_SIZE", 25):
+            self._import(_simple_csv(60), progress=lambda done, total, result: calls.append((done, total)))
+        # CSV rows are streamed, so the total is unknown until the end.
+        self.assertEqual(calls, [(25, 0), (50, 0), (60, 0)])
+
+    def test_dry_run_reports_the_same_counts_without_writing(self):
+        Product.objects.create(name="Existing", slug="tuner", sku="OLD", category=self.default, price=Decimal("1.00"))
+
+        dry = self._import(_shopify_csv(), dry_run=True)
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertFalse(ProductOption.objects.exists())
+        self.assertFalse(Category.objects.filter(name="Body").exists())
+
+        real = self._import(_shopify_csv())
+        for field in (
+            "created_products",
+            "updated_products",
+            "skipped_products",
+            "created_options",
+            "updated_options",
+            "skipped_options",
+            "created_categories",
+        ):
+            self.assertEqual(getattr(dry, field), getattr(real, field), field)
+        self.assertEqual((real.created_products, real.updated_products, real.created_options), (1, 1, 2))
+        tuner = Product.objects.get(slug="tuner")
+        self.assertEqual(tuner.price, Decimal("400.00"))
+        self.assertEqual(
+            list(tuner.options.order_by("sku").values_list("sku", "name")),
+            [("TUNER-66", "Engine: 6.6L"), ("TUNER-67", "Engine: 6.7L")],
+        )
+
+
+class ProductImportJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.admin = get_user_model().objects.create_superuser(
+            username="admin", password="pass12345", email="admin@example.com"
+        )
+        self.client.force_login(self.admin)
+        self.default = Category.objects.create(name="Default", slug="default")
+
+    def test_admin_upload_is_queued_and_processed_by_the_worker(self):
+        response = self.client.post(
+            reverse("admin:store_product_import"),
+            {
+                "mode": "auto",
+                "file": _simple_csv(3),
+                "default_category": self.default.pk,
+                "default_currency": "CAD",
+                "create_missing_categories": "on",
+            },
+        )
+
+        batch = ImportBatch.objects.get()
+        self.assertRedirects(response, reverse("admin:store_importbatch_change", args=[batch.pk]))
+        self.assertEqual(batch.status, ImportBatch.Status.QUEUED)
+        self.assertFalse(Product.objects.exists())
+
+        output = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("process_import_batches", "--once", stdout=output)
+
+        batch.refresh_from_db()
+        self.assertIn("Processed 1 import batch(es).", output.getvalue())
+        self.assertEqual(batch.status, ImportBatch.Status.COMPLETED)
+        self.assertEqual((batch.processed_rows, batch.total_rows, batch.created_products), (3, 3, 3))
+        self.assertIsNotNone(batch.finished_at)
+        self.assertEqual(Product.objects.filter(import_batch=batch).count(), 3)
+
+        progress = self.client.get(reverse("admin:store_importbatch_progress", args=[batch.pk])).json()
+        self.assertTrue(progress["finished"])
+        self.assertEqual(progress["createdProducts"], 3)
+        self.assertEqual(self.client.get(reverse("admin:store_importbatch_change", args=[batch.pk])).status_code, 200)
+
+    def test_row_errors_and_failures_are_recorded_on_the_batch(self):
+        batch = enqueue_import(
+            uploaded_file=_simple_csv(2),
+            created_by=self.admin,
+            create_missing_categories=False,
+        )
+        broken = enqueue_import(
+            uploaded_file=SimpleUploadedFile("prices.txt", b"sku,name\n1,a\n"),
+            created_by=self.admin,
+        )
+
+        call_command("process_import_batches", "--once", stdout=StringIO())
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, ImportBatch.Status.COMPLETED)
+        self.assertEqual(batch.error_count, 2)
+        self.assertEqual(batch.errors[0], "Row 2: missing category and no default set.")
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, ImportBatch.Status.FAILED)
+        self.assertIn("Unsupported file type", broken.failure_reason)
+
+        # Failed batches wrote nothing here, but are still eligible for rollback.
+        response = self.client.get(reverse("admin:store_product_rollback_last_import"))
+        self.assertEqual(response.context["batch"], broken)
+
+    def test_queued_dry_runs_write_nothing_and_cannot_be_rolled_back(self):
+        batch = enqueue_import(uploaded_file=_simple_csv(2), created_by=self.admin, default_category=self.default, dry_run=True)
+
+        call_command("process_import_batches", "--once", stdout=StringIO())
+
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.created_products), (ImportBatch.Status.COMPLETED, 2))
+        self.assertFalse(Product.objects.exists())
+        response = self.client.get(reverse("admin:store_product_rollback_last_import"))
+        self.assertRedirects(response, reverse("admin:store_product_changelist"), fetch_redirect_response=False)
+
+    def test_worker_reads_the_upload_from_the_database(self):
+        batch = enqueue_import(uploaded_file=_simple_csv(2), created_by=self.admin, default_category=self.default)
+        # The worker dyno does not share the web dyno's media directory.
+        default_storage.delete(batch.upload.name)
+
+        call_command("process_import_batches", "--once", stdout=StringIO())
+
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.created_products), (ImportBatch.Status.COMPLETED, 2))
+        self.assertEqual(bytes(batch.upload_data), b"")
+
+    def test_stale_running_batches_are_requeued(self):
+        batch = enqueue_import(uploaded_file=_simple_csv(2), created_by=self.admin, default_category=self.default)
+        abandoned = timezone.now() - timedelta(seconds=IMPORT_STALE_SECONDS + 60)
+        ImportBatch.objects.filter(pk=batch.pk).update(
+            status=ImportBatch.Status.RUNNING, attempts=1, started_at=abandoned, heartbeat_at=abandoned
+        )
+        exhausted = enqueue_import(uploaded_file=_simple_csv(1), created_by=self.admin, default_category=self.default)
+        ImportBatch.objects.filter(pk=exhausted.pk).update(
+            status=ImportBatch.Status.RUNNING, attempts=IMPORT_MAX_ATTEMPTS, started_at=abandoned, heartbeat_at=abandoned
+        )
+
+        call_command("process_import_batches", "--once", stdout=StringIO())
+
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.attempts, batch.created_products), (ImportBatch.Status.COMPLETED, 2, 2))
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, ImportBatch.Status.FAILED)
+        self.assertIn("stopped", exhausted.failure_reason)
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.models import Category, Product
+from store.search import search_products
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.search_url = reverse("store:product-search")
+        self.store_url = reverse("store:store")
+        self.category = Category.objects.create(name="Suspension", slug="suspension")
+
+    def _create_product(self, *, name: str, sku: str, is_in_house: bool = False, **extra) -> Product:
+        return Product.objects.create(
+            name=name,
+            slug=sku.lower(),
+            sku=sku,
+            category=extra.pop("category", self.category),
+            price=Decimal("10.00"),
+            is_active=True,
+            is_in_house=is_in_house,
+            **extra,
+        )
+
+    def _search_names(self, q: str) -> list[str]:
+        response = self.client.get(self.search_url, {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.json()["results"]]
+
+    def test_search_vector_is_maintained_on_save(self):
+        product = self._create_product(name="Leveling Kit", sku="LVL-1")
+        self.assertEqual(list(search_products(Product.objects.all(), "lev")), [product])
+
+        product.name = "Track Bar"
+        product.save()
+        self.assertEqual(list(search_products(Product.objects.all(), "lev")), [])
+        self.assertEqual(list(search_products(Product.objects.all(), "track bar")), [product])
+
+    def test_category_rename_refreshes_product_vectors(self):
+        product = self._create_product(name="Front Shocks", sku="SHK-1")
+        self.category.name = "Dampers"
+        self.category.save()
+        self.assertEqual(list(search_products(Product.objects.all(), "dampers")), [product])
+
+    def test_ranking_keeps_in_house_first_then_field_boosts(self):
+        self._create_product(name="Coilover Mount", sku="MNT-1", short_description="Leveling hardware")
+        self._create_product(name="Leveling Kit Pro", sku="KIT-2")
+        self._create_product(name="Spacer Kit", sku="SPC-3", is_in_house=True, short_description="Leveling spacer")
+
+        self.assertEqual(
+            self._search_names("leveling"),
+            ["Spacer Kit", "Leveling Kit Pro", "Coilover Mount"],
+        )
+
+    def test_infix_and_partial_sku_fragments_still_match(self):
+        truck = self._create_product(name="F250 Leveling Kit", sku="LVL-F250")
+        bar = self._create_product(name="Track Bar", sku="BGM-TRK-0042")
+        self._create_product(name="Front Shocks", sku="SHK-1")
+
+        self.assertEqual(list(search_products(Product.objects.all(), "250")), [truck])
+        self.assertEqual(list(search_products(Product.objects.all(), "trk-004")), [bar])
+        self.assertEqual(list(search_products(Product.objects.all(), "250 kit")), [truck])
+
+    def test_live_search_is_one_indexed_query_without_fallback_scan(self):
+        self._create_product(name="Leveling Kit", sku="LVL-1")
+
+        with CaptureQueriesContext(connection) as ctx:
+            names = self._search_names("zzz-nothing")
+        self.assertEqual(names, [])
+        product_queries = [q["sql"] for q in ctx.captured_queries if 'FROM "store_product"' in q["sql"]]
+        self.assertEqual(len(product_queries), 1)
+        self.assertIn("@@", product_queries[0])
+
+    def test_storefront_listing_filters_by_search(self):
+        self._create_product(name="Leveling Kit", sku="LVL-1")
+        self._create_product(name="Track Bar", sku="TRK-2")
+
+        response = self.client.get(self.store_url, {"q": "level"}, HTTP_ACCEPT="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Leveling Kit")
+        self.assertNotContains(response, "Track Bar")
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from PIL import Image
+
+from store.models import Category, Product, ProductImage
+from store.thumbnails import deferred_thumbnails, pending_thumbnail_jobs, thumbnail_path
+
+
+def _png(width: int = 1200, height: int = 800) -> SimpleUploadedFile:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, format="PNG")
+    return SimpleUploadedFile("Down Pipe.png", buffer.getvalue(), content_type="image/png")
+
+
+class ProductThumbnailTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.category = Category.objects.create(name="Exhaust", slug="exhaust")
+
+    def _product(self, **kwargs) -> Product:
+        return Product.objects.create(
+            name=kwargs.pop("name", "Downpipe"),
+            slug=kwargs.pop("slug", "downpipe"),
+            sku=kwargs.pop("sku", "DP-1"),
+            category=self.category,
+            price=Decimal("10.00"),
+            is_active=True,
+            **kwargs,
+        )
+
+    def test_upload_renders_thumbnails_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self._product(main_image=_png())
+            gallery = ProductImage.objects.create(product=product, image=_png(300, 200))
+
+        product.refresh_from_db()
+        gallery.refresh_from_db()
+        self.assertEqual(product.thumbnail_source, product.main_image.name)
+        self.assertTrue(product.thumbnail_url(320).endswith("-320.webp"))
+        self.assertTrue(product.thumbnail_url(640).endswith("-640.webp"))
+        self.assertTrue(gallery.thumbnail_url(320).endswith("-320.webp"))
+        with default_storage.open(thumbnail_path(product.main_image.name, 320, "webp")) as handle:
+            with Image.open(handle) as thumb:
+                self.assertEqual(thumb.size, (320, 213))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.main_image = "https://cdn.example.com/downpipe.jpg"
+            product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.thumbnail_url(320), "")
+        self.assertEqual(product.thumbnail_source, "https://cdn.example.com/downpipe.jpg")
+
+    def test_search_and_cards_read_stored_urls_without_rendering(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self._product(main_image=_png())
+        product.refresh_from_db()
+
+        with patch("store.thumbnails.render_thumbnails") as render, patch("PIL.Image.open") as image_open:
+            search = self.client.get(reverse("store:product-search"), {"q": "downpipe"})
+            listing = self.client.get(reverse("store:store"), {"format": "json"})
+
+        render.assert_not_called()
+        image_open.assert_not_called()
+        self.assertEqual(search.json()["results"][0]["image"], product.thumbnail_url(320))
+        card = listing.json()["catalog"]["products"][0]
+        self.assertEqual(card["image"]["src"], product.thumbnail_url(640))
+        self.assertIn("320w", card["image"]["srcSet"])
+
+    def test_bulk_imports_leave_thumbnails_to_the_backfill_command(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with deferred_thumbnails():
+                product = self._product(main_image=_png())
+        self.assertEqual([job[1] for job in pending_thumbnail_jobs()], [product.pk])
+
+        output = StringIO()
+        call_command("generate_product_thumbnails", "--workers", "1", stdout=output)
+
+        product.refresh_from_db()
+        self.assertTrue(product.thumbnail_url(640))
+        self.assertIn("rendered=1", output.getvalue())
+        self.assertEqual(pending_thumbnail_jobs(), [])
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from store.fassride_import.images import ImageAssetManager
+from store.management.commands.import_product_images import RemoteImageResolver
+from store.models import RemoteImageCheckRecord
+from store.remote_image_checks import RemoteImageCheckCache, url_hash
+from store.tests.http_stub import StubHTTPServer, image
+
+
+def _resolver(ttl_seconds: int = 3600) -> RemoteImageResolver:
+    return RemoteImageResolver(
+        validate=True,
+        retries=1,
+        check_cache=RemoteImageCheckCache(ttl_seconds=ttl_seconds),
+    )
+
+
+class RemoteImageCheckCacheTests(TestCase):
+    def test_fresh_checks_are_reused_by_the_next_run(self):
+        routes = {
+            "/ok.jpg": [image()],
+            "/missing.jpg": [(404, {"Content-Type": "text/html"}, b"missing")],
+        }
+        with StubHTTPServer(routes) as server:
+            urls = [server.url("/ok.jpg"), server.url("/missing.jpg")]
+            _resolver().prefetch(urls)
+            second = _resolver()
+            second.prefetch(urls)
+
+        self.assertEqual(server.hits("/ok.jpg"), 1)
+        self.assertEqual(server.hits("/missing.jpg"), 1)
+        self.assertTrue(second.is_usable(urls[0]))
+        self.assertEqual(second.inspect(urls[1]).error, "http_404")
+        self.assertEqual(RemoteImageCheckRecord.objects.count(), 2)
+
+    def test_stale_checks_are_revalidated_with_conditional_requests(self):
+        routes = {
+            "/ok.jpg": [
+                (200, {"Content-Type": "image/jpeg", "ETag": '"v1"'}, b"image-bytes"),
+                (304, {"ETag": '"v1"'}, b""),
+            ],
+        }
+        with StubHTTPServer(routes) as server:
+            url = server.url("/ok.jpg")
+            _resolver().prefetch([url])
+            RemoteImageCheckRecord.objects.update(checked_at=timezone.now() - timedelta(days=30))
+            second = _resolver()
+            second.prefetch([url])
+
+        self.assertEqual(server.hits("/ok.jpg"), 2)
+        self.assertEqual(server.requests[-1]["headers"].get("If-None-Match"), '"v1"')
+        self.assertTrue(second.is_usable(url))
+        record = RemoteImageCheckRecord.objects.get(url_hash=url_hash(url))
+        self.assertGreater(record.checked_at, timezone.now() - timedelta(minutes=5))
+        self.assertEqual(record.content_type, "image/jpeg")
+
+    def test_transient_failures_are_not_stored(self):
+        routes = {"/busy.jpg": [(503, {}, b"")]}
+        with StubHTTPServer(routes) as server:
+            url = server.url("/busy.jpg")
+            resolver = _resolver()
+            resolver.prefetch([url])
+
+        self.assertFalse(resolver.is_usable(url))
+        self.assertFalse(RemoteImageCheckRecord.objects.exists())
+
+    def test_supplier_pipelines_share_checks_with_the_csv_importer(self):
+        with StubHTTPServer({"/shared.jpg": [image()]}) as server:
+            url = server.url("/shared.jpg")
+            _resolver().prefetch([url])
+
+        manager = ImageAssetManager(check_cache=RemoteImageCheckCache(ttl_seconds=3600))
+        with patch("store.fassride_import.images.urlopen", side_effect=AssertionError("unexpected request")):
+            check = manager.validate(url)
+
+        self.assertTrue(check.ok)
+        self.assertEqual(check.content_type, "image/jpeg")
+
+    def test_offline_image_manager_never_contacts_image_hosts(self):
+        with StubHTTPServer({"/known.jpg": [image()]}) as server:
+            known = server.url("/known.jpg")
+            _resolver().prefetch([known])
+        RemoteImageCheckRecord.objects.update(checked_at=timezone.now() - timedelta(days=30))
+        unknown = "https://images.example.com/never-checked.jpg"
+
+        manager = ImageAssetManager(offline=True)
+        with patch("store.fassride_import.images.urlopen", side_effect=AssertionError("unexpected request")):
+            self.assertTrue(manager.validate(known).ok)
+            self.assertEqual(manager.validate(unknown).error, "offline_unchecked")
+            with self.assertRaises(ValueError):
+                manager.localize(known)
@@ -0,0 +1,44 @@
+from django.test import SimpleTestCase
+
+from store.remote_images import RemoteImageFetcher
+from store.tests.http_stub import StubHTTPServer, image
+
+
+class RemoteImageFetcherTests(SimpleTestCase):
+    def test_connections_are_reused_per_host(self):
+        routes = {f"/{idx}.jpg": [image()] for idx in range(6)}
+        with StubHTTPServer(routes) as server:
+            with RemoteImageFetcher(workers=1, retries=1) as fetcher:
+                results = list(fetcher.fetch_many(server.url(f"/{idx}.jpg") for idx in range(6)))
+
+        self.assertTrue(all(result.is_image for result in results))
+        self.assertEqual(len(server.connections), 1)
+
+    def test_retries_with_backoff_and_follows_redirects(self):
+        routes = {
+            "/flaky.jpg": [(503, {"Retry-After": "0"}, b""), (502, {}, b""), image(b"ok")],
+            "/moved.jpg": [(301, {"Location": "/final.jpg"}, b"")],
+            "/final.jpg": [image(b"final")],
+            "/gone.jpg": [(500, {}, b"")],
+        }
+        with StubHTTPServer(routes) as server:
+            with RemoteImageFetcher(retries=3, backoff=0.01) as fetcher:
+                flaky = fetcher.fetch(server.url("/flaky.jpg"))
+                moved = fetcher.fetch(server.url("/moved.jpg"))
+                gone = fetcher.fetch(server.url("/gone.jpg"), download=False)
+
+        self.assertEqual((flaky.status, flaky.body), (200, b"ok"))
+        self.assertEqual(server.hits("/flaky.jpg"), 3)
+        self.assertEqual((moved.url, moved.body), (server.url("/moved.jpg"), b"final"))
+        self.assertEqual(gone.status, 500)
+        self.assertEqual(server.hits("/gone.jpg"), 3)
+
+    def test_connection_errors_are_reported(self):
+        with StubHTTPServer() as server:
+            dead_url = server.url("/down.jpg")
+        with RemoteImageFetcher(retries=1, timeout=1) as fetcher:
+            result = fetcher.fetch(dead_url)
+            unsupported = fetcher.fetch("ftp://example.com/a.jpg")
+
+        self.assertTrue(result.error.startswith("url_error:"))
+        self.assertEqual(unsupported.error, "unsupported_url")
@@ -8,6 +8,7 @@ from django.utils import timezone
 
 from core.models import PageSection, StorePageCopy
 from store.models import Category, Product
+from store.storefront_index import refresh_storefront_sort_ranks
 
 
 class StoreHomeViewTests(TestCase):
@@ -217,6 +218,8 @@ class StoreHomeViewTests(TestCase):
         ):
             product = self._create_product(name=name, slug=slug, sku=sku, category=category)
             Product.objects.filter(pk=product.pk).update(created_at=base_time - timedelta(minutes=offset))
+        # Raw created_at updates bypass the signals that maintain the featured ranks.
+        refresh_storefront_sort_ranks()
 
         response = self.client.get(self.store_url, {"format": "json"})
 
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.models import (
+    Category,
+    Product,
+    StoreInventorySettings,
+    StorePricingSettings,
+    StoreShippingSettings,
+    reset_store_settings_snapshot,
+)
+
+
+@override_settings(STORE_SETTINGS_SNAPSHOT_SECONDS=300, STORE_SETTINGS_VERSION_CHECK_SECONDS=300)
+class StoreSettingsSnapshotTests(TestCase):
+    def setUp(self):
+        reset_store_settings_snapshot()
+        self.addCleanup(reset_store_settings_snapshot)
+        self.category = Category.objects.create(name="Suspension", slug="suspension")
+
+    def _settings_queries(self, queries) -> list[str]:
+        tables = (
+            StorePricingSettings._meta.db_table,
+            StoreShippingSettings._meta.db_table,
+            StoreInventorySettings._meta.db_table,
+        )
+        return [query["sql"] for query in queries if any(f'"{table}"' in query["sql"] for table in tables)]
+
+    def test_multiplier_is_loaded_once_per_snapshot(self):
+        StorePricingSettings.objects.create(price_multiplier_percent=110)
+        reset_store_settings_snapshot()
+
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(25):
+                self.assertEqual(StorePricingSettings.get_multiplier(), Decimal("1.1"))
+
+        self.assertEqual(len(self._settings_queries(ctx.captured_queries)), 1)
+
+    def test_save_invalidates_snapshot(self):
+        settings_obj = StorePricingSettings.objects.create(price_multiplier_percent=110)
+        self.assertEqual(StorePricingSettings.get_multiplier_percent(), 110)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            settings_obj.price_multiplier_percent = 125
+            settings_obj.save()
+
+        self.assertEqual(StorePricingSettings.get_multiplier_percent(), 125)
+
+    def test_price_sorted_listing_costs_constant_settings_queries(self):
+        StorePricingSettings.objects.create(price_multiplier_percent=110)
+        StoreInventorySettings.objects.create(low_stock_threshold=3, allow_out_of_stock_orders=True)
+        for index in range(40):
+            Product.objects.create(
+                name=f"Shock {index:02d}",
+                slug=f"shock-{index:02d}",
+                sku=f"BGM-SHOCK-{index:02d}",
+                category=self.category,
+                price=Decimal("10.00") + index,
+                is_active=True,
+            )
+        reset_store_settings_snapshot()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("store:store"), {"sort": "price-asc", "format": "json"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["catalog"]["products"][0]["name"], "Shock 00")
+        self.assertLessEqual(len(self._settings_queries(ctx.captured_queries)), 3)
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from store import facets as facets_module
+from store.facets import build_storefront_facets, get_storefront_facets
+from store.models import CarMake, CarModel, Category, Product
+
+
+class StorefrontFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        facets_module._process_facets = None
+        self.store_url = reverse("store:store")
+        self.exhaust = Category.objects.create(name="Exhaust", slug="exhaust")
+        self.fuel = Category.objects.create(name="Fuel System", slug="fuel-system")
+        self.ford = CarMake.objects.create(name="Ford")
+        self.ram = CarMake.objects.create(name="Ram")
+        self.f250 = CarModel.objects.create(make=self.ford, name="F-250", year_from=2008, year_to=2010)
+        self.f250_late = CarModel.objects.create(make=self.ford, name="F-250", year_from=2017, year_to=None)
+        self.ram_2500 = CarModel.objects.create(make=self.ram, name="2500", year_from=2013, year_to=2018)
+
+        self.downpipe = self._product("Downpipe", self.exhaust, self.f250)
+        self.muffler = self._product("Muffler", self.exhaust, self.ram_2500)
+        self.lift_pump = self._product("Lift Pump", self.fuel, self.f250_late)
+        self._product("Hat", self.exhaust, self.f250, slug="merch-hat")
+
+    def _product(self, name, category, *models, slug=None) -> Product:
+        product = Product.objects.create(
+            name=name,
+            slug=slug or name.lower().replace(" ", "-"),
+            sku=name.upper().replace(" ", "-"),
+            category=category,
+            price=Decimal("10.00"),
+            is_active=True,
+        )
+        product.compatible_models.add(*models)
+        return product
+
+    def test_counts_follow_the_other_selected_filters(self):
+        facets = build_storefront_facets()
+
+        counts = facets.counts(make_id=self.ford.pk)
+
+        self.assertEqual(counts["categories"], {self.exhaust.pk: 1, self.fuel.pk: 1})
+        self.assertEqual(counts["makes"], {self.ford.pk: 2, self.ram.pk: 1})
+        self.assertEqual(counts["models"][(self.ford.pk, "F-250")], 2)
+        self.assertEqual(
+            facets.matching_ids(category_id=self.exhaust.pk, make_id=self.ford.pk),
+            {self.downpipe.pk},
+        )
+
+    def test_year_matches_storefront_filter(self):
+        facets = build_storefront_facets()
+
+        self.assertEqual(facets.matching_ids(year=2009), {self.downpipe.pk})
+        self.assertEqual(facets.matching_ids(year=2015), {self.muffler.pk})
+        self.assertEqual(facets.matching_ids(year=2018), {self.muffler.pk, self.lift_pump.pk})
+        self.assertEqual(facets.matching_ids(make_id=self.ford.pk, year=2015), set())
+        self.assertEqual(facets.year_min, 2008)
+        self.assertEqual(facets.year_max, timezone.now().year + 1)
+
+    def test_listing_payload_reports_facet_counts(self):
+        response = self.client.get(self.store_url, {"format": "json", "category": self.exhaust.pk})
+
+        self.assertEqual(response.status_code, 200)
+        available = response.json()["filters"]["available"]
+        self.assertEqual(
+            [(row["label"], row["productCount"]) for row in available["categories"]],
+            [("Exhaust", 2), ("Fuel System", 1)],
+        )
+        self.assertEqual([(row["label"], row["productCount"]) for row in available["makes"]], [("Ford", 1), ("Ram", 1)])
+
+    @override_settings(STORE_FACETS_CACHE_SECONDS=60)
+    def test_facets_are_cached_per_catalog_version(self):
+        first = get_storefront_facets()
+        facets_module._process_facets = None
+        with CaptureQueriesContext(connection) as ctx:
+            second = get_storefront_facets()
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.product_ids, first.product_ids)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            injector = self._product("Injector", self.fuel, self.f250)
+
+        self.assertIn(injector.pk, get_storefront_facets().product_ids)
@@ -0,0 +1,179 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from store.models import Category, Product, ProductDiscount, ProductOption, StorePricingSettings
+from store.storefront_index import build_storefront_sort_ranks, catalog_version, sort_ranks_stale
+
+
+class StorefrontSortRankBuilderTests(SimpleTestCase):
+    def test_in_house_first_then_round_robin_by_category(self):
+        rows = [
+            (1, 10, False),
+            (2, 10, False),
+            (3, 20, True),
+            (4, 20, False),
+            (5, 30, False),
+            (6, 20, False),
+        ]
+
+        ranks = build_storefront_sort_ranks(rows)
+
+        self.assertEqual(ranks[3], 0)
+        external_order = sorted((pk for pk in ranks if pk != 3), key=lambda pk: ranks[pk])
+        self.assertEqual(external_order, [1, 4, 5, 2, 6])
+
+
+class StorefrontIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store_url = reverse("store:store")
+        self.category = Category.objects.create(name="Exhaust", slug="exhaust")
+
+    def _create_product(self, *, name: str, price: str, **extra) -> Product:
+        return Product.objects.create(
+            name=name,
+            slug=name.lower().replace(" ", "-"),
+            sku=name.upper().replace(" ", "-"),
+            category=self.category,
+            price=Decimal(price),
+            is_active=True,
+            **extra,
+        )
+
+    def test_signals_keep_effective_price_in_sync(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self._create_product(name="Down Pipe", price="200.00")
+        product.refresh_from_db()
+        self.assertEqual(product.effective_public_price, Decimal("200.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductOption.objects.create(product=product, name="Polished", price=Decimal("150.00"), is_active=True)
+        product.refresh_from_db()
+        self.assertEqual(product.effective_public_price, Decimal("150.00"))
+
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductDiscount.objects.create(
+                product=product,
+                discount_percent=10,
+                start_date=today - timedelta(days=1),
+                end_date=today + timedelta(days=1),
+            )
+        product.refresh_from_db()
+        self.assertEqual(product.effective_public_price, Decimal("135.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StorePricingSettings.objects.create(price_multiplier_percent=200)
+        product.refresh_from_db()
+        self.assertEqual(product.effective_public_price, Decimal("270.00"))
+
+    def test_price_sort_runs_in_sql_and_fetches_one_page(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(30):
+                self._create_product(name=f"Muffler {index:02d}", price=str(300 - index))
+            cheap = self._create_product(name="Zeta Clamp", price="500.00")
+            ProductOption.objects.create(product=cheap, name="Single", price=Decimal("5.00"), is_active=True)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.store_url, {"format": "json", "sort": "price-asc"})
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        names = [row["name"] for row in payload["catalog"]["products"]]
+        self.assertEqual(names[:2], ["Zeta Clamp", "Muffler 29"])
+        self.assertEqual(len(names), 24)
+        self.assertEqual(payload["catalog"]["pagination"]["totalResults"], 31)
+        product_selects = [
+            query["sql"]
+            for query in ctx.captured_queries
+            if query["sql"].startswith('SELECT "store_product"."id", ')
+        ]
+        self.assertTrue(product_selects)
+        self.assertTrue(all("LIMIT 24" in sql for sql in product_selects))
+
+    def test_nightly_command_repairs_stale_prices_and_ranks(self):
+        product = self._create_product(name="Exhaust Tip", price="40.00")
+        Product.objects.filter(pk=product.pk).update(effective_public_price=None, effective_sort_rank=None)
+
+        out = StringIO()
+        call_command("refresh_storefront_index", stdout=out)
+
+        product.refresh_from_db()
+        self.assertEqual(product.effective_public_price, Decimal("40.00"))
+        self.assertEqual(product.effective_sort_rank, 0)
+        self.assertIn("prices_updated=1", out.getvalue())
+
+    def test_saves_mark_ranks_stale_and_the_cron_rebuilds_them(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._create_product(name="Exhaust Tip", price="40.00")
+            second = self._create_product(name="Cold Air Kit", price="90.00")
+        call_command("refresh_storefront_index", "--stale-ranks", stdout=StringIO())
+        ranked = dict(Product.objects.values_list("pk", "effective_sort_rank"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            newest = self._create_product(name="Heat Shield", price="25.00")
+            in_house = self._create_product(name="Bgm Bumper", price="900.00", is_in_house=True)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        newest.refresh_from_db()
+        in_house.refresh_from_db()
+        self.assertEqual(
+            (first.effective_sort_rank, second.effective_sort_rank),
+            (ranked[first.pk], ranked[second.pk]),
+        )
+        self.assertIsNone(newest.effective_sort_rank)
+        self.assertEqual(in_house.effective_sort_rank, 0)
+
+        out = StringIO()
+        call_command("refresh_storefront_index", "--stale-ranks", stdout=out)
+        newest.refresh_from_db()
+        self.assertEqual(newest.effective_sort_rank, 0)
+        self.assertIn("ranks_updated=", out.getvalue())
+
+        out = StringIO()
+        call_command("refresh_storefront_index", "--stale-ranks", stdout=out)
+        self.assertIn("Featured ranks are current.", out.getvalue())
+
+    def test_edited_products_keep_their_rank_until_the_cron(self):
+        other = Category.objects.create(name="Intake", slug="intake")
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._create_product(name="Exhaust Tip", price="40.00")
+            self._create_product(name="Cold Air Kit", price="90.00", category=other)
+        call_command("refresh_storefront_index", "--stale-ranks", stdout=StringIO())
+        first.refresh_from_db()
+        rank = first.effective_sort_rank
+        self.assertIsNotNone(rank)
+        self.assertFalse(sort_ranks_stale())
+
+        first.category = other
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        first.refresh_from_db()
+        self.assertEqual(first.effective_sort_rank, rank)
+        self.assertTrue(sort_ranks_stale())
+
+        call_command("refresh_storefront_index", "--stale-ranks", stdout=StringIO())
+        self.assertFalse(sort_ranks_stale())
+
+    def test_index_refreshes_bump_the_catalog_version(self):
+        product = self._create_product(name="Exhaust Tip", price="40.00")
+        Product.objects.filter(pk=product.pk).update(effective_public_price=None, effective_sort_rank=None)
+        version = catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("refresh_storefront_index", stdout=StringIO())
+        self.assertNotEqual(catalog_version(), version)
+
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("refresh_storefront_index", stdout=StringIO())
+        self.assertEqual(catalog_version(), version)
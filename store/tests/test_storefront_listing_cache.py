@@ -0,0 +1,119 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.listing_cache import listing_cache_params
+from store.models import Category, Order, OrderItem, Product, ProductOption
+from store.storefront_index import catalog_version
+
+
+class StorefrontListingCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store_url = reverse("store:store")
+        self.category = Category.objects.create(name="Exhaust", slug="exhaust")
+        self.product = Product.objects.create(
+            name="Downpipe",
+            slug="downpipe",
+            sku="DP-1",
+            category=self.category,
+            price=Decimal("100.00"),
+            is_active=True,
+        )
+
+    def test_params_are_normalized(self):
+        self.assertEqual(
+            listing_cache_params(QueryDict("format=json&utm_source=x&page=1&q=  fuel   pump &cat=3&sort=Name")),
+            [("category", "3"), ("q", "fuel pump"), ("sort", "name")],
+        )
+        self.assertEqual(listing_cache_params(QueryDict("page=abc")), [])
+
+    def test_anonymous_listing_is_public_and_revalidates(self):
+        response = self.client.get(self.store_url, {"format": "json"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["catalog"]["products"][0]["name"], "Downpipe")
+        self.assertTrue(response["ETag"])
+        self.assertTrue(response["Last-Modified"])
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("stale-while-revalidate=", response["Cache-Control"])
+        self.assertIn("Accept", response["Vary"])
+
+        not_modified = self.client.get(
+            self.store_url,
+            {"format": "json"},
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+
+    def test_signed_in_listing_is_private(self):
+        user = get_user_model().objects.create_user(username="shopper", password="pass12345", email="s@example.com")
+        self.client.force_login(user)
+
+        response = self.client.get(self.store_url, {"format": "json"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotIn("public", response["Cache-Control"])
+
+    @override_settings(STORE_LISTING_CACHE_SECONDS=60)
+    def test_repeat_requests_are_served_from_cache_until_catalog_changes(self):
+        first = self.client.get(self.store_url, {"format": "json", "sort": "name"})
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(self.store_url, {"sort": "name", "format": "json", "page": "1"})
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([q for q in ctx.captured_queries if "store_product" in q["sql"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductOption.objects.create(product=self.product, name="Kit", price=Decimal("80.00"), is_active=True)
+
+        third = self.client.get(self.store_url, {"format": "json", "sort": "name"})
+        self.assertNotEqual(third["ETag"], first["ETag"])
+        self.assertTrue(third.json()["catalog"]["products"][0]["hasOptions"])
+
+    def test_sales_only_invalidate_listings_when_the_stock_badge_changes(self):
+        order = Order.objects.create(customer_name="Buyer", email="buyer@example.com")
+        self.product.inventory = 50
+        self.product.save(update_fields=["inventory"])
+
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItem.objects.create(order=order, product=self.product, qty=2)
+        self.assertEqual(catalog_version(), version)
+
+        # Default low-stock threshold is 5: the card now reads "Only 5 left".
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItem.objects.create(order=order, product=self.product, qty=43)
+        self.assertNotEqual(catalog_version(), version)
+
+    @override_settings(STORE_LISTING_CACHE_SECONDS=60)
+    def test_queryset_writes_outside_the_signals_still_invalidate_listings(self):
+        self.client.get(self.store_url, {"format": "json"})
+        order = Order.objects.create(customer_name="Buyer", email="buyer@example.com")
+        self.product.inventory = 1
+        self.product.save(update_fields=["inventory"])
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItem.objects.create(order=order, product=self.product, qty=1)
+        self.assertNotEqual(catalog_version(), version)
+        badges = self.client.get(self.store_url, {"format": "json"}).json()["catalog"]["products"][0]["badges"]
+        self.assertIn("Out of stock", [badge["label"] for badge in badges])
+
+        version = catalog_version()
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "pass12345")
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("admin:store_product_changelist"),
+                {"action": "hide_selected_products", "_selected_action": [self.product.pk]},
+            )
+        self.assertNotEqual(catalog_version(), version)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from store.dirtydiesel_import.source import DirtyDieselCatalogClient
+from store.fassride_import.source import FassrideApiClient
+from store.supplier_http_cache import OfflineCacheMiss, SupplierHttpCache
+from store.tests.http_stub import StubHTTPServer
+
+FASS_PATH = "/Products/Search?pageSize=1000&sort=CustomAsc"
+FASS_PAYLOAD = {"products": [{"id": 7, "partNumber": "DDRP-1", "shortDescription": "Lift Pump", "images": []}]}
+
+
+class SupplierHttpCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+
+    def _client(self, server, *, offline: bool = False) -> FassrideApiClient:
+        return FassrideApiClient(
+            api_base_url=server.url(""),
+            retries=1,
+            http_cache=SupplierHttpCache(self.cache_dir, offline=offline),
+        )
+
+    def test_not_modified_responses_reuse_the_cached_catalog(self):
+        body = json.dumps(FASS_PAYLOAD).encode("utf-8")
+        routes = {
+            FASS_PATH: [
+                (200, {"Content-Type": "application/json", "ETag": '"cat-1"'}, body),
+                (304, {"ETag": '"cat-1"'}, b""),
+            ]
+        }
+        with StubHTTPServer(routes) as server:
+            first = self._client(server).fetch_catalog()
+            client = self._client(server)
+            second = client.fetch_catalog()
+
+        self.assertEqual(first, second)
+        self.assertEqual(second[0].part_number, "DDRP-1")
+        self.assertEqual(server.requests[-1]["headers"].get("If-None-Match"), '"cat-1"')
+        self.assertEqual(client.http_cache.stats["not_modified"], 1)
+
+    def test_offline_mode_replays_the_last_snapshot_without_requests(self):
+        pages = {
+            "/products.json?limit=250&page=1": [
+                (200, {"Content-Type": "application/json"}, json.dumps({"products": [_shopify_product()]}).encode()),
+            ],
+            "/products.json?limit=250&page=2": [(200, {"Content-Type": "application/json"}, b'{"products": []}')],
+        }
+        with StubHTTPServer(pages) as server:
+            online = DirtyDieselCatalogClient(
+                base_url=server.url(""), http_cache=SupplierHttpCache(self.cache_dir)
+            ).fetch_catalog(page_delay=0)
+            offline = DirtyDieselCatalogClient(
+                base_url=server.url(""), http_cache=SupplierHttpCache(self.cache_dir, offline=True)
+            ).fetch_catalog(page_delay=0)
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(online, offline)
+        self.assertEqual(offline[0].sku, "DD-100")
+
+    def test_offline_mode_without_a_snapshot_fails_fast(self):
+        with StubHTTPServer({}) as server:
+            with self.assertRaises(OfflineCacheMiss):
+                self._client(server, offline=True).fetch_catalog()
+        self.assertEqual(server.requests, [])
+
+
+def _shopify_product() -> dict:
+    return {
+        "id": 1,
+        "handle": "lift-pump",
+        "title": "Lift Pump",
+        "vendor": "Dirty Diesel",
+        "product_type": "Fuel",
+        "tags": [],
+        "images": [],
+        "variants": [{"id": 11, "sku": "DD-100", "title": "Default"}],
+    }
@@ -1,11 +1,31 @@
 from __future__ import annotations
 
 from decimal import Decimal
+from unittest import mock
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from store.management.commands.sync_bgm_pricing import Command, PricingRow
-from store.models import Category, ImportBatch, Product
+from store.models import Category, ImportBatch, Product, ProductOption
+
+
+def _mudflap_rows(count: int, *, msrp: str = "300.00") -> list[PricingRow]:
+    return [
+        PricingRow(
+            sku=f"BGM-KB-{index:03d}",
+            category="Kickback Mudflap",
+            description="Shorty" if index % 2 else "Long John",
+            finish="ARM",
+            size_class=f"{index}",
+            unit="Pair",
+            msrp=Decimal(msrp),
+            tier_1_price=Decimal("250.00"),
+            tier_2_price=Decimal("200.00"),
+        )
+        for index in range(count)
+    ]
 
 
 class SyncBgmPricingCommandTests(TestCase):
@@ -38,25 +58,30 @@ class SyncBgmPricingCommandTests(TestCase):
             is_active=True,
         )
 
-        summary = self.command._sync_catalog(
-            grouped_rows={
-                "Rear Bumper": [
-                    PricingRow(
-                        sku="BGM-SCL-REARB",
-                        category="Rear Bumper",
-                        description="Base",
-                        finish="SCL",
-                        size_class="2500/3500",
-                        unit="Each",
-                        msrp=Decimal("2200.00"),
-                        tier_1_price=Decimal("2000.00"),
-                        tier_2_price=Decimal("1800.00"),
-                    )
-                ]
-            },
-            batch=self.batch,
-            deactivate_obsolete=True,
-        )
+        stamped_at = legacy.updated_at
+
+        with mock.patch(
+            "store.management.commands.sync_bgm_pricing.refresh_after_bulk_write"
+        ) as refresh:
+            summary = self.command._sync_catalog(
+                grouped_rows={
+                    "Rear Bumper": [
+                        PricingRow(
+                            sku="BGM-SCL-REARB",
+                            category="Rear Bumper",
+                            description="Base",
+                            finish="SCL",
+                            size_class="2500/3500",
+                            unit="Each",
+                            msrp=Decimal("2200.00"),
+                            tier_1_price=Decimal("2000.00"),
+                            tier_2_price=Decimal("1800.00"),
+                        )
+                    ]
+                },
+                batch=self.batch,
+                deactivate_obsolete=True,
+            )
 
         legacy.refresh_from_db()
         unrelated.refresh_from_db()
@@ -65,6 +90,8 @@ class SyncBgmPricingCommandTests(TestCase):
         self.assertEqual(summary["created_products"], 1)
         self.assertFalse(legacy.is_active)
         self.assertEqual(legacy.import_batch_id, self.batch.id)
+        self.assertGreater(legacy.updated_at, stamped_at)
+        self.assertIn(legacy.pk, refresh.call_args.args[0])
         self.assertTrue(unrelated.is_active)
         self.assertTrue(catalog_product.is_active)
         self.assertEqual(catalog_product.dealer_tier_1_price, Decimal("2000.00"))
@@ -104,3 +131,53 @@ class SyncBgmPricingCommandTests(TestCase):
 
         catalog_product = Product.objects.get(sku="BGM-BADLAND-BAR-CATALOG")
         self.assertEqual(catalog_product.main_image_name, "store/products/photo_2025-08-22_06-57-57_2.jpg")
+
+    def test_sync_writes_in_bulk_and_skips_unchanged_rows(self):
+        Category.objects.create(name="Kickback Mudflap", slug="kickback-mudflap")
+
+        def sync(rows):
+            with CaptureQueriesContext(connection) as ctx:
+                summary = self.command._sync_catalog(
+                    grouped_rows={"Kickback Mudflap": rows},
+                    batch=self.batch,
+                    deactivate_obsolete=False,
+                )
+            return summary, len(ctx.captured_queries)
+
+        summary, small_queries = sync(_mudflap_rows(4))
+        self.assertEqual((summary["created_products"], summary["created_options"]), (1, 4))
+
+        summary, large_queries = sync(_mudflap_rows(60))
+        self.assertEqual((summary["created_options"], summary["skipped_options"]), (56, 4))
+        self.assertLessEqual(large_queries, small_queries + 2)
+        self.assertLess(large_queries, 20)
+
+        summary, _queries = sync(_mudflap_rows(60))
+        self.assertEqual(summary["unchanged_products"], 1)
+        self.assertEqual((summary["created_options"], summary["updated_options"]), (0, 0))
+        self.assertEqual(summary["skipped_options"], 60)
+
+        summary, _queries = sync(_mudflap_rows(50, msrp="320.00"))
+        self.assertEqual((summary["updated_products"], summary["updated_options"]), (1, 50))
+        self.assertEqual(summary["deactivated_options"], 10)
+        self.assertEqual(ProductOption.objects.filter(is_active=True).count(), 50)
+        self.assertEqual(ProductOption.objects.get(sku="BGM-KB-007").price, Decimal("320.00"))
+
+    def test_bulk_updates_stamp_product_updated_at(self):
+        Category.objects.create(name="Kickback Mudflap", slug="kickback-mudflap")
+
+        def sync(rows):
+            self.command._sync_catalog(
+                grouped_rows={"Kickback Mudflap": rows},
+                batch=self.batch,
+                deactivate_obsolete=False,
+            )
+            return Product.objects.get(sku="BGM-KICKBACK-CATALOG").updated_at
+
+        created_at = sync(_mudflap_rows(4))
+        repriced_at = sync(_mudflap_rows(4, msrp="320.00"))
+        self.assertGreater(repriced_at, created_at)
+
+        options_changed_at = sync(_mudflap_rows(6, msrp="320.00"))
+        self.assertGreater(options_changed_at, repriced_at)
+        self.assertEqual(sync(_mudflap_rows(6, msrp="320.00")), options_changed_at)
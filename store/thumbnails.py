@@ -0,0 +1,237 @@
+"""
+Pre-rendered product thumbnails.
+
+Every local product image (Product.main_image, ProductImage.image) gets fixed-width
+WEBP renditions (plus AVIF when Pillow can encode it). Their URLs are stored on the
+row next to the image name they were rendered from (`thumbnail_source`), so search
+results and product cards read thumbnail URLs from the database with no image I/O;
+a row whose `thumbnail_source` differs from its current image name is pending.
+
+Signals queue pending rows and render them after commit. Bulk imports run inside
+`deferred_thumbnails()` and leave their rows pending for `generate_product_thumbnails`
+(cron), which renders them in a process pool. Remote (http) images are recorded
+with no renditions; they are served as-is.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import PurePosixPath
+from typing import Iterable, Iterator
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils.text import slugify
+from PIL import Image, ImageOps
+
+from .models import Product, ProductImage
+from .storefront_index import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTHS = (320, 640)
+THUMBNAIL_DIR = "store/thumbs"
+THUMBNAIL_QUALITY = {"webp": 72, "avif": 55}
+# Larger post-commit batches are left for the cron backfill instead of rendering inline.
+THUMBNAIL_INLINE_LIMIT = 12
+
+PRODUCT = "product"
+GALLERY = "gallery"
+
+_pending = threading.local()
+
+
+def thumbnail_formats() -> tuple[str, ...]:
+    Image.init()
+    return ("avif", "webp") if "AVIF" in Image.SAVE else ("webp",)
+
+
+def thumbnail_path(source_name: str, width: int, fmt: str) -> str:
+    digest = hashlib.sha1(source_name.encode("utf-8")).hexdigest()
+    stem = slugify(PurePosixPath(source_name).stem)[:60] or "image"
+    return f"{THUMBNAIL_DIR}/{digest[:2]}/{stem}-{digest[:12]}-{width}.{fmt}"
+
+
+def is_renderable(source_name: str) -> bool:
+    name = (source_name or "").strip()
+    return bool(name) and not name.startswith(("http://", "https://"))
+
+
+def render_thumbnails(source_name: str, *, storage=None) -> dict[str, dict[str, str]]:
+    """
+    Render every width/format for a stored image and return {format: {width: url}}.
+    Images narrower than a width are encoded at their own size.
+    """
+    storage = storage or default_storage
+    with storage.open(source_name, "rb") as handle:
+        with Image.open(handle) as opened:
+            source = ImageOps.exif_transpose(opened)
+            source.load()
+    if source.mode not in {"RGB", "RGBA"}:
+        source = source.convert("RGBA" if "A" in source.getbands() or "transparency" in source.info else "RGB")
+
+    urls: dict[str, dict[str, str]] = {}
+    for width in THUMBNAIL_WIDTHS:
+        image = source
+        if source.width > width:
+            image = source.resize((width, max(1, round(source.height * width / source.width))), Image.LANCZOS)
+        for fmt in thumbnail_formats():
+            buffer = BytesIO()
+            image.save(buffer, format=fmt.upper(), quality=THUMBNAIL_QUALITY[fmt])
+            path = thumbnail_path(source_name, width, fmt)
+            if storage.exists(path):
+                storage.delete(path)
+            saved = storage.save(path, ContentFile(buffer.getvalue()))
+            urls.setdefault(fmt, {})[str(width)] = storage.url(saved)
+    return urls
+
+
+# ─────────────────────────── jobs ───────────────────────────
+
+def _job_querysets(*, product_ids=None, image_ids=None, force: bool = False):
+    products = Product.objects.all()
+    images = ProductImage.objects.all()
+    if product_ids is not None or image_ids is not None:
+        product_ids = list(product_ids or ())
+        products = products.filter(pk__in=product_ids)
+        images = images.filter(Q(pk__in=list(image_ids or ())) | Q(product_id__in=product_ids))
+    if not force:
+        products = products.exclude(thumbnail_source=F("main_image")).exclude(
+            Q(main_image__isnull=True) | Q(main_image=""), thumbnail_source=""
+        )
+        images = images.exclude(thumbnail_source=F("image"))
+    return products, images
+
+
+def pending_thumbnail_jobs(
+    *,
+    product_ids: Iterable[int] | None = None,
+    image_ids: Iterable[int] | None = None,
+    force: bool = False,
+) -> list[tuple[str, int, str]]:
+    """
+    (kind, pk, image name) for rows whose thumbnails are missing or stale; gallery
+    images of the given products are included. Everything when no ids are given.
+    """
+    products, images = _job_querysets(product_ids=product_ids, image_ids=image_ids, force=force)
+    jobs = [(PRODUCT, pk, str(name or "")) for pk, name in products.order_by("pk").values_list("pk", "main_image")]
+    jobs += [(GALLERY, pk, str(name or "")) for pk, name in images.order_by("pk").values_list("pk", "image")]
+    return jobs
+
+
+def render_thumbnail_job(job: tuple[str, int, str]) -> tuple[str, int, str, dict, str]:
+    """
+    Render one job; returns (kind, pk, name, urls, error). Safe to run in a worker process.
+    """
+    kind, pk, name = job
+    if not is_renderable(name):
+        return kind, pk, name, {}, ""
+    try:
+        return kind, pk, name, render_thumbnails(name), ""
+    except Exception as exc:
+        return kind, pk, name, {}, f"{type(exc).__name__}: {exc}"
+
+
+def save_thumbnail_result(kind: str, pk: int, name: str, urls: dict) -> bool:
+    """
+    Store rendered URLs unless the image changed while rendering.
+    """
+    if kind == PRODUCT:
+        qs = Product.objects.filter(pk=pk, main_image=name) if name else Product.objects.filter(
+            Q(main_image__isnull=True) | Q(main_image=""), pk=pk
+        )
+    else:
+        qs = ProductImage.objects.filter(pk=pk, image=name)
+    # queryset.update() skips the product signals; the listing cache is bumped below.
+    return bool(qs.update(thumbnail_urls=urls, thumbnail_source=name))
+
+
+def iter_rendered_jobs(jobs: list[tuple[str, int, str]], *, workers: int = 1) -> Iterator[tuple]:
+    if workers <= 1 or len(jobs) <= 1:
+        yield from map(render_thumbnail_job, jobs)
+        return
+    # Workers only touch storage; forked children must not inherit open DB connections.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(render_thumbnail_job, jobs, chunksize=4)
+
+
+def generate_thumbnails(jobs: list[tuple[str, int, str]], *, workers: int = 1) -> dict[str, int]:
+    """
+    Render and store thumbnails for the given jobs. Failed renders are recorded
+    with no renditions (so they are not retried until the image changes).
+    """
+    stats = {"rendered": 0, "skipped": 0, "failed": 0, "stale": 0}
+    for kind, pk, name, urls, error in iter_rendered_jobs(jobs, workers=workers):
+        if error:
+            logger.warning("Thumbnail render failed for %s %s (%s): %s", kind, pk, name, error)
+            stats["failed"] += 1
+        elif urls:
+            stats["rendered"] += 1
+        else:
+            stats["skipped"] += 1
+        if not save_thumbnail_result(kind, pk, name, urls):
+            stats["stale"] += 1
+    if stats["rendered"]:
+        transaction.on_commit(bump_catalog_version)
+    return stats
+
+
+# ─────────────────────────── signal queue ───────────────────────────
+
+def _pending_state() -> dict:
+    state = getattr(_pending, "state", None)
+    if state is None:
+        state = {"product_ids": set(), "image_ids": set(), "deferred": 0}
+        _pending.state = state
+    return state
+
+
+def _flush_pending_thumbnails() -> None:
+    state = _pending_state()
+    product_ids, image_ids = set(state["product_ids"]), set(state["image_ids"])
+    state.update(product_ids=set(), image_ids=set())
+    if not product_ids and not image_ids:
+        return
+    try:
+        jobs = pending_thumbnail_jobs(product_ids=product_ids, image_ids=image_ids)
+        renderable = [job for job in jobs if is_renderable(job[2])]
+        if len(renderable) > THUMBNAIL_INLINE_LIMIT:
+            # Record remote/empty images now; the cron renders the rest in a pool.
+            jobs = [job for job in jobs if not is_renderable(job[2])]
+        generate_thumbnails(jobs)
+    except Exception:
+        logger.exception("Failed to generate product thumbnails")
+
+
+def queue_thumbnails(product_ids: Iterable[int] = (), image_ids: Iterable[int] = ()) -> None:
+    """
+    Render thumbnails for these rows once the surrounding transaction commits.
+    Inside `deferred_thumbnails()` rows are left pending for the backfill command.
+    """
+    state = _pending_state()
+    if state["deferred"]:
+        return
+    state["product_ids"].update(int(pk) for pk in product_ids if pk)
+    state["image_ids"].update(int(pk) for pk in image_ids if pk)
+    transaction.on_commit(_flush_pending_thumbnails)
+
+
+@contextmanager
+def deferred_thumbnails():
+    """
+    Leave thumbnails of rows saved in this block to `generate_product_thumbnails`,
+    e.g. around supplier imports that touch thousands of images.
+    """
+    state = _pending_state()
+    state["deferred"] += 1
+    try:
+        yield
+    finally:
+        state["deferred"] -= 1
@@ -6,6 +6,7 @@ app_name = "store"
 urlpatterns = [
     path("", views.store_home, name="store"),
     path("api/products/search/", views.product_search, name="product-search"),
+    path("api/fitment/years/", views.fitment_year_options, name="fitment-years"),
     path("category/<slug:slug>/", views.category_list, name="store-category"),
     path("p/<slug:slug>/", views.product_detail, name="store-product"),
     path("cart/", views.cart_view, name="store-cart"),
@@ -18,7 +18,8 @@ from core.email_templates import base_email_context, email_brand_name, join_text
 from core.emails import build_email_html, send_html_email
 from django.core.validators import validate_email
 from django.db import transaction
-from django.db.models import Avg, Count, Prefetch, Q
+from django.db.models import Avg, Count, F, Prefetch, Q
+from django.db.models.functions import Lower
 from django.shortcuts import get_object_or_404, redirect, render
 from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
 from django.urls import reverse
@@ -40,9 +41,10 @@ from .models import (
     StoreReview,
     StoreInventorySettings,
     StoreShippingSettings,
-    CarMake,
-    CarModel,
 )
+from .facets import get_storefront_facets
+from .fitment_index import fitment_filter, fitment_years
+from .listing_cache import get_cached_listing, listing_response
 from .forms_store import ProductFilterForm, CustomFitmentRequestForm, StoreReviewForm
 from .printful_fulfillment import (
     _refresh_merch_option_mapping,
@@ -63,6 +65,7 @@ from core.utils import get_dealer_tier_code, get_dealer_tier_level
 from core.services.fonts import build_page_font_context
 from core.services.lead_security import evaluate_lead_submission, log_lead_submission
 from notifications import services as notification_services
+from .search import filter_products_by_search, search_products
 from .storefront import (
     request_wants_json,
     serialize_product_card,
@@ -72,6 +75,7 @@ from .storefront import (
     storefront_lead_security_payload,
     storefront_shell_payload,
 )
+from .storefront_index import exclude_merch_products
 
 logger = logging.getLogger(__name__)
 UserModel = get_user_model()
@@ -85,6 +89,7 @@ STORE_HOME_SHOWCASE_LIMIT = 100
 STORE_HOME_BAD_IMAGE_TERMS = ("banner", "favicon", "icon", "logo", "placeholder")
 STORE_HOME_GENERIC_IMAGE_PREFIXES = ("store/categories/",)
 STOREFRONT_PAGE_SIZE = 24
+PRODUCT_SEARCH_LIMIT = 60
 
 
 def _dealer_pricing_context(user) -> tuple[str, str]:
@@ -607,30 +612,19 @@ def _apply_filters(qs, form: ProductFilterForm):
     if cat:
         qs = qs.filter(category=cat)
 
-    if make:
-        qs = qs.filter(compatible_models__make=make)
-    if model_name:
-        qs = qs.filter(compatible_models__name=model_name)
-
-    if year:
-        qs = qs.filter(
-            compatible_models__year_from__lte=year
-        ).filter(
-            Q(compatible_models__year_to__isnull=True) | Q(compatible_models__year_to__gte=year)
-        )
+    # Flattened fitment index: one EXISTS probe, no join fan-out to de-duplicate.
+    fits_vehicle = fitment_filter(make=make, model_name=model_name, year=year)
+    if fits_vehicle is not None:
+        qs = qs.filter(fits_vehicle)
 
-    return qs.distinct()
+    return qs
 
 
 def _exclude_merch_products(qs):
     """
     Keep Printful / merch catalog off the main /store/ storefront.
     """
-    return qs.exclude(
-        Q(category__slug="merch")
-        | Q(sku__startswith="PF-")
-        | Q(slug__startswith="merch-")
-    )
+    return exclude_merch_products(qs)
 
 
 def _normalize_storefront_sort(raw_value: str) -> str:
@@ -650,68 +644,21 @@ def _storefront_sort_options() -> list[dict[str, str]]:
     ]
 
 
-def _storefront_inhouse_rank(product: Product) -> int:
-    return int(not bool(getattr(product, "is_in_house", False)))
-
-
-def _sort_storefront_products(products: list[Product], sort_key: str) -> list[Product]:
+def _storefront_ordering(sort_key: str) -> tuple:
+    """
+    SQL ordering for the storefront listing. Every sort keeps in-house products first;
+    price and featured orders read the denormalized columns kept by store.storefront_index.
+    """
     sort_key = _normalize_storefront_sort(sort_key)
     if sort_key == "newest":
-        return sorted(
-            products,
-            key=lambda product: (
-                _storefront_inhouse_rank(product),
-                -(getattr(product, "created_at", None).timestamp() if getattr(product, "created_at", None) else 0),
-                -int(getattr(product, "pk", 0) or 0),
-            ),
-        )
+        return ("-is_in_house", "-created_at", "-pk")
     if sort_key == "price-asc":
-        return sorted(
-            products,
-            key=lambda product: (
-                _storefront_inhouse_rank(product),
-                product.public_price,
-                (getattr(product, "name", "") or "").lower(),
-            ),
-        )
+        return ("-is_in_house", F("effective_public_price").asc(nulls_last=True), Lower("name"), "pk")
     if sort_key == "price-desc":
-        return sorted(
-            products,
-            key=lambda product: (
-                _storefront_inhouse_rank(product),
-                -product.public_price,
-                (getattr(product, "name", "") or "").lower(),
-            ),
-        )
+        return ("-is_in_house", F("effective_public_price").desc(nulls_last=True), Lower("name"), "pk")
     if sort_key == "name":
-        return sorted(
-            products,
-            key=lambda product: (
-                _storefront_inhouse_rank(product),
-                (getattr(product, "name", "") or "").lower(),
-                int(getattr(product, "pk", 0) or 0),
-            ),
-        )
-    featured_products = sorted(
-        products,
-        key=lambda product: (
-            _storefront_inhouse_rank(product),
-            -(getattr(product, "created_at", None).timestamp() if getattr(product, "created_at", None) else 0),
-            int(getattr(product, "pk", 0) or 0),
-        ),
-    )
-    in_house_products = [
-        product for product in featured_products if bool(getattr(product, "is_in_house", False))
-    ]
-    external_products = [
-        product for product in featured_products if not bool(getattr(product, "is_in_house", False))
-    ]
-    if not external_products:
-        return in_house_products
-    return in_house_products + _interleave_storefront_categories(
-        external_products,
-        limit=len(external_products),
-    )
+        return ("-is_in_house", Lower("name"), "pk")
+    return ("-is_in_house", F("effective_sort_rank").asc(nulls_last=True), "-created_at", "pk")
 
 
 def _storefront_active_chips(form: ProductFilterForm, *, q: str) -> list[dict[str, str]]:
@@ -759,46 +706,27 @@ def _build_storefront_listing_payload(request) -> dict:
         .prefetch_related("compatible_models__make", "options", "discounts")
     )
 
-    categories_qs = Category.objects.filter(products__in=base_qs).distinct().order_by("name")
-    categories = list(categories_qs)
-    form.fields["category"].queryset = categories_qs
+    facets = get_storefront_facets()
+    form.fields["category"].queryset = Category.objects.filter(pk__in=facets.by_category).order_by("name")
     form.fields["category"].label_from_instance = lambda obj: obj.display_name
 
     filtered_qs = _apply_filters(base_qs, form)
     if q:
-        tokens = [token for token in re.split(r"[^a-z0-9]+", q.lower()) if token]
-        if tokens:
-            q_obj = Q()
-            for token in tokens:
-                q_obj &= (
-                    Q(name__icontains=token)
-                    | Q(sku__icontains=token)
-                    | Q(short_description__icontains=token)
-                    | Q(category__name__icontains=token)
-                )
-            filtered_qs = filtered_qs.filter(q_obj)
+        filtered_qs = filter_products_by_search(filtered_qs, q)
 
-    products = _sort_storefront_products(list(filtered_qs), sort)
-    paginator = Paginator(products, STOREFRONT_PAGE_SIZE)
+    paginator = Paginator(filtered_qs.order_by(*_storefront_ordering(sort)), STOREFRONT_PAGE_SIZE)
     page_obj = paginator.get_page(page_number)
     dealer_tier_code, _dealer_tier_label = _dealer_pricing_context(request.user)
 
-    category_counts = {
-        row["category_id"]: int(row["total"] or 0)
-        for row in base_qs.values("category_id").annotate(total=Count("id"))
-    }
-
-    compatible_makes = list(
-        CarMake.objects.filter(models__compatible_products__in=base_qs)
-        .distinct()
-        .order_by("name")
-    )
-    model_options = list(
-        CarModel.objects.filter(compatible_products__in=base_qs)
-        .values("make_id", "make__name", "name")
-        .distinct()
-        .order_by("make__name", "name")
-    )
+    selection = {}
+    if form.is_valid():
+        selection = {
+            "category_id": getattr(form.cleaned_data.get("category"), "pk", None),
+            "make_id": getattr(form.cleaned_data.get("make"), "pk", None),
+            "model_name": (form.cleaned_data.get("model") or "").strip(),
+            "year": form.cleaned_data.get("year"),
+        }
+    facet_counts = facets.counts(**selection)
 
     return {
         "filters": {
@@ -814,19 +742,31 @@ def _build_storefront_listing_payload(request) -> dict:
             },
             "available": {
                 "categories": [
-                    serialize_store_category(category, product_count=category_counts.get(category.pk, 0))
-                    for category in categories
+                    serialize_store_category(
+                        category,
+                        product_count=facet_counts["categories"].get(category.pk, 0),
+                    )
+                    for category in facets.categories
                 ],
                 "makes": [
-                    {"id": int(make.pk), "label": make.name}
-                    for make in compatible_makes
+                    {
+                        "id": int(make_id),
+                        "label": make_name,
+                        "productCount": facet_counts["makes"].get(make_id, 0),
+                    }
+                    for make_id, make_name in facets.makes
                 ],
                 "models": [
-                    {"id": str(model["name"]), "label": str(model["name"]), "makeId": int(model["make_id"])}
-                    for model in model_options
+                    {
+                        "id": str(model_name),
+                        "label": str(model_name),
+                        "makeId": int(make_id),
+                        "productCount": facet_counts["models"].get((make_id, model_name), 0),
+                    }
+                    for make_id, model_name in facets.models
                 ],
-                "yearMin": 1950,
-                "yearMax": 2100,
+                "yearMin": facets.year_min,
+                "yearMax": facets.year_max,
             },
         },
         "catalog": {
@@ -936,72 +876,6 @@ def _build_storefront_showcase_products(products: Iterable[Product], *, limit: i
     return featured[:limit]
 
 
-def _normalize_search_text(text: str) -> str:
-    return re.sub(r"\s+", " ", (text or "").strip().lower())
-
-
-def _score_product_match(product: Product, query: str, tokens: list[str]) -> int:
-    """
-    Simple relevance scoring for live-search. Keep it deterministic and fast.
-    """
-    qn = _normalize_search_text(query)
-    if not qn:
-        return 0
-    name = _normalize_search_text(getattr(product, "name", "") or "")
-    sku = _normalize_search_text(getattr(product, "sku", "") or "")
-    cat = ""
-    try:
-        cat = _normalize_search_text(getattr(product.category, "display_name", "") or getattr(product.category, "name", "") or "")
-    except Exception:
-        cat = ""
-    desc = _normalize_search_text(getattr(product, "short_description", "") or "")
-
-    score = 0
-    if qn in name:
-        score += 200
-        if name.startswith(qn):
-            score += 40
-    if qn in sku:
-        score += 180
-        if sku.startswith(qn):
-            score += 30
-    if qn in cat:
-        score += 60
-    if qn in desc:
-        score += 20
-
-    for token in tokens:
-        if token in name:
-            score += 12
-        if token in sku:
-            score += 10
-        if token in cat:
-            score += 4
-        if token in desc:
-            score += 2
-    return score
-
-
-def _rank_products(qs, query: str, limit: int = 60):
-    products = list(qs)
-    if not query:
-        products.sort(key=lambda p: (_storefront_inhouse_rank(p), (getattr(p, "name", "") or "").lower()))
-        return products[:limit]
-
-    tokens = [t for t in re.split(r"[^a-z0-9]+", _normalize_search_text(query)) if t]
-    scored = [(p, _score_product_match(p, query, tokens)) for p in products]
-    positive = [pair for pair in scored if pair[1] > 0]
-    ranked = positive if positive else scored
-    ranked.sort(
-        key=lambda pair: (
-            _storefront_inhouse_rank(pair[0]),
-            -pair[1],
-            (getattr(pair[0], "name", "") or "").lower(),
-        )
-    )
-    return [p for p, _ in ranked[:limit]]
-
-
 def _quote_notification_recipients() -> list[str]:
     """
     Resolve the notification list for custom fitment requests with sensible fallbacks.
@@ -1350,9 +1224,16 @@ def _send_order_confirmation(
 
 
 def store_home(request):
-    listing_payload = _build_storefront_listing_payload(request)
     if request_wants_json(request):
-        return JsonResponse(listing_payload)
+        dealer_tier_code, _dealer_tier_label = _dealer_pricing_context(request.user)
+        listing = get_cached_listing(
+            request,
+            dealer_tier_code=dealer_tier_code,
+            build=lambda: _build_storefront_listing_payload(request),
+        )
+        return listing_response(request, listing)
+
+    listing_payload = _build_storefront_listing_payload(request)
 
     store_copy = StorePageCopy.get_solo()
     from core.context_processors_core import hero_media as hero_media_context
@@ -1409,39 +1290,16 @@ def product_search(request):
     if cat and not cat.isdigit():
         cat = ""
 
-    all_qs = (
+    qs = (
         _exclude_merch_products(Product.objects.filter(is_active=True))
         .select_related("category")
         .prefetch_related("options", "discounts")
     )
-    qs = all_qs
     if cat:
         qs = qs.filter(category_id=cat)
 
-    ranked = []
-    if not q:
-        ranked = _rank_products(qs.order_by("-is_in_house", "name")[:120], "", limit=60)
-    else:
-        tokens = [t for t in re.split(r"[^a-z0-9]+", q.lower()) if t]
-        if tokens:
-            q_obj = Q()
-            for token in tokens:
-                q_obj &= (
-                    Q(name__icontains=token)
-                    | Q(sku__icontains=token)
-                    | Q(short_description__icontains=token)
-                    | Q(category__name__icontains=token)
-                )
-            qs = qs.filter(q_obj)
-        # Rank a bounded candidate set to keep response snappy.
-        ranked = _rank_products(qs.order_by("-created_at")[:400], q, limit=60)
-        if not ranked and all_qs.exists():
-            ranked = _rank_products(all_qs.order_by("-created_at")[:400], q, limit=60)
-
-    try:
-        from sorl.thumbnail import get_thumbnail  # type: ignore
-    except Exception:  # pragma: no cover
-        get_thumbnail = None
+    # Matching and ranking both run in SQL against the indexed search vector.
+    ranked = list(search_products(qs, q)[:PRODUCT_SEARCH_LIMIT])
 
     results = []
     for p in ranked:
@@ -1451,15 +1309,8 @@ def product_search(request):
         except Exception:
             cat_name = ""
 
-        image_url = ""
-        local_image = getattr(p, "main_image_local", None)
-        if local_image and get_thumbnail is not None:
-            try:
-                image_url = get_thumbnail(local_image, "320", quality=72, format="WEBP").url
-            except Exception:
-                image_url = ""
-        if not image_url:
-            image_url = p.main_image_url
+        # Pre-rendered by store.thumbnails; no image decoding inside the request.
+        image_url = p.thumbnail_url(320) or p.main_image_url
 
         results.append(
             {
@@ -1482,6 +1333,18 @@ def product_search(request):
     return JsonResponse({"results": results})
 
 
+@require_GET
+def fitment_year_options(request):
+    """
+    Valid model years for the storefront year picker, straight from the fitment index.
+    """
+    make_id = (request.GET.get("make") or "").strip()
+    model_name = (request.GET.get("model") or "").strip()
+    if not make_id.isdigit():
+        return JsonResponse({"years": []})
+    return JsonResponse({"years": fitment_years(make_id=int(make_id), model_name=model_name)})
+
+
 def category_list(request, slug):
     category = get_object_or_404(Category, slug=slug)
     category_products = list(